@@ -10,17 +10,23 @@ import asyncio
 import logging
 import os
 import sys
+import time
+import uuid
+from collections.abc import AsyncIterator, Callable, Mapping
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Any
+from typing import Any, Literal
 
 from bedrock_agentcore.runtime import BedrockAgentCoreApp
 from botocore.config import Config
 from dotenv import load_dotenv
 from mcp import StdioServerParameters, stdio_client
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 from strands import Agent
-from strands.models import BedrockModel
+from strands.handlers import CompositeCallbackHandler, PrintingCallbackHandler
+from strands.models import BedrockModel, CacheConfig
 from strands.tools.mcp import MCPClient
+from strands.types.content import ContentBlock
 
 # .env ファイルの読み込み
 load_dotenv()
@@ -28,12 +34,126 @@ load_dotenv()
 # 環境検出による動的インポート（AgentCore vs ローカル環境対応）
 try:
     # AgentCore環境では相対インポートが必要
-    from domain_memory_client import DomainMemoryClient
+    from circuit_breaker import circuit_breakers
+    from coverage_tracker import (
+        DEFAULT_WINDOW_DAYS,
+        CoverageTracker,
+        LocalCoverageStore,
+        MemoryCoverageStore,
+    )
+    from deadline import (
+        Deadline,
+        DeadlineExceededError,
+        current_deadline,
+        deadline_scope,
+        phase_timeout,
+    )
+    from delivery_queue import DeliveryQueue, DeliveryQueueFullError
+    from domain_memory_client import MEMORY_BREAKER_NAME, DomainMemoryClient
+    from domain_normalizer import DomainNormalizer, get_domain_normalizer
+    from exam_guide_index import ExamGuideIndex, load_exam_guide_index
+    from idempotency_store import (
+        IdempotencyStore,
+        LocalIdempotencyStore,
+        MemoryIdempotencyStore,
+    )
+    from invocation_metrics import (
+        InvocationMetrics,
+        TokenBudgetExceededError,
+        current_metrics,
+        metrics_scope,
+        record_metrics_callback,
+        timed,
+    )
+    from latency_stats import latency_stats
+    from prompt_cache import (
+        build_prompt_blocks,
+        record_usage_callback,
+        supports_prompt_cache,
+        usage_scope,
+    )
+    from question_archive import (
+        DEFAULT_SIMILARITY_THRESHOLD,
+        MemoryQuestionArchiveBackend,
+        QuestionArchive,
+    )
+    from question_pool import (
+        DEFAULT_LOW_WATER_MARK,
+        DEFAULT_TARGET_SIZE,
+        MemoryQuestionPoolBackend,
+        QuestionPool,
+        SQLiteQuestionPoolBackend,
+    )
+    from question_validator import ValidationIssue, validate_questions
+    from rate_limiter import rate_limiters
+    from run_tracker import RunTracker
+    from service_catalog import ServiceCatalog, get_service_catalog
     from teams_client import TeamsClient
+    from tracing import remote_parent, set_attributes, span
 except ImportError:
     # ローカル環境（テスト・開発）では絶対インポートが必要
-    from app.agentcore.domain_memory_client import DomainMemoryClient
+    from app.agentcore.circuit_breaker import circuit_breakers
+    from app.agentcore.coverage_tracker import (
+        DEFAULT_WINDOW_DAYS,
+        CoverageTracker,
+        LocalCoverageStore,
+        MemoryCoverageStore,
+    )
+    from app.agentcore.deadline import (
+        Deadline,
+        DeadlineExceededError,
+        current_deadline,
+        deadline_scope,
+        phase_timeout,
+    )
+    from app.agentcore.delivery_queue import DeliveryQueue, DeliveryQueueFullError
+    from app.agentcore.domain_memory_client import (
+        MEMORY_BREAKER_NAME,
+        DomainMemoryClient,
+    )
+    from app.agentcore.domain_normalizer import DomainNormalizer, get_domain_normalizer
+    from app.agentcore.exam_guide_index import ExamGuideIndex, load_exam_guide_index
+    from app.agentcore.idempotency_store import (
+        IdempotencyStore,
+        LocalIdempotencyStore,
+        MemoryIdempotencyStore,
+    )
+    from app.agentcore.invocation_metrics import (
+        InvocationMetrics,
+        TokenBudgetExceededError,
+        current_metrics,
+        metrics_scope,
+        record_metrics_callback,
+        timed,
+    )
+    from app.agentcore.latency_stats import latency_stats
+    from app.agentcore.prompt_cache import (
+        build_prompt_blocks,
+        record_usage_callback,
+        supports_prompt_cache,
+        usage_scope,
+    )
+    from app.agentcore.question_archive import (
+        DEFAULT_SIMILARITY_THRESHOLD,
+        MemoryQuestionArchiveBackend,
+        QuestionArchive,
+    )
+    from app.agentcore.question_pool import (
+        DEFAULT_LOW_WATER_MARK,
+        DEFAULT_TARGET_SIZE,
+        MemoryQuestionPoolBackend,
+        QuestionPool,
+        SQLiteQuestionPoolBackend,
+    )
+    from app.agentcore.question_validator import (
+        ValidationIssue,
+        validate_questions,
+    )
+    from app.agentcore.rate_limiter import rate_limiters
+    from app.agentcore.run_tracker import RunTracker
+    from app.agentcore.service_catalog import ServiceCatalog, get_service_catalog
     from app.agentcore.teams_client import TeamsClient
+    from app.agentcore.tracing import remote_parent, set_attributes, span
 
 # ログ設定
 logging.basicConfig(
@@ -148,12 +268,86 @@ def load_sample_questions(exam_type: str = "AWS-SAP") -> str:
         raise RuntimeError(f"サンプル問題ファイルの読み込みに失敗しました: {e}") from e
 
 
+def get_sample_questions(exam_type: str) -> str:
+    """サンプル問題を取得（ファイルがない場合は空文字、サンプルなしで生成する）"""
+    try:
+        return load_sample_questions(exam_type)
+    except Exception as e:
+        logger.warning(f"サンプル問題を利用できません（サンプルなしで継続）: {e}")
+        return ""
+
+
+def build_static_prompt_prefix(exam_type: str, exam_guide_content: str) -> str:
+    """問題生成プロンプトの静的な接頭辞（試験・試験ガイド・サンプル問題）
+
+    実行ごとに変わらない内容のみで構成する（プロンプトキャッシュの対象）。
+    """
+    sample_questions = get_sample_questions(exam_type)
+    sample_section = (
+        f"""
+            # サンプル問題（形式・難易度の参考。同じ問題は出題しないでください）
+            {sample_questions}
+            """
+        if sample_questions
+        else ""
+    )
+    return f"""
+            # 生成条件
+            - **試験**: {EXAM_TYPES[exam_type]["name"]}
+
+            # 試験ガイド情報
+            {exam_guide_content if exam_guide_content else "試験ガイド情報は利用できません。指定された試験レベルに適した問題を生成してください。"}
+            {sample_section}
+            # 注意事項
+            - 各問題は重複しない内容にしてください
+            - 異なるサービスや機能を扱ってください
+            - 試験ガイドの内容に基づいて適切な分類情報を設定してください
+        """
+
+
+def build_generation_prompt(
+    exam_type: str,
+    question_count: int,
+    exam_guide_content: str,
+    diversity_instruction: str = "",
+) -> list[ContentBlock]:
+    """問題生成プロンプトを作成（試験ガイド統合 + ジャンル分散）
+
+    静的な接頭辞（試験・試験ガイド・サンプル問題）の後に cachePoint を置き、
+    問題数と追加指示は動的な接尾辞に分ける。
+
+    Args:
+        exam_type: 試験タイプ
+        question_count: 生成する問題数
+        exam_guide_content: 試験ガイドの内容（空の場合は汎用指示）
+        diversity_instruction: ジャンル分散・補充対象分野などの追加指示
+
+    Returns:
+        list[ContentBlock]: プロンプト
+    """
+    dynamic_suffix = f"""
+            上記の条件に沿って、{question_count}問の実践的な問題を作成してください。
+            - **問題数**: {question_count}問
+
+            {diversity_instruction}
+        """
+    prompt: list[ContentBlock] = build_prompt_blocks(
+        build_static_prompt_prefix(exam_type, exam_guide_content),
+        dynamic_suffix,
+        cache=PROMPT_CACHE_ENABLED,
+    )
+    return prompt
+
+
 # Bedrock設定（環境変数から取得）
 BEDROCK_MODEL_ID = os.getenv(
     "BEDROCK_MODEL_ID", "jp.anthropic.claude-sonnet-4-5-20250929-v1:0"
 )
 BEDROCK_REGION = os.getenv("BEDROCK_REGION", "ap-northeast-1")
 
+# プロンプトキャッシュ（対応モデルのみ、PROMPT_CACHE_ENABLED=false で無効化）
+PROMPT_CACHE_ENABLED = supports_prompt_cache(BEDROCK_MODEL_ID)
+
 
 class AgentInput(BaseModel):
     """問題生成エージェントの入力パラメータ"""
@@ -166,6 +360,60 @@ class AgentInput(BaseModel):
 
     question_count: int = Field(default=1, description="生成する問題数", ge=1, le=5)
 
+    async_delivery: bool = Field(
+        default=False,
+        description="Teams投稿をバックグラウンドの配信キューに委譲し、投稿完了を待たずに結果を返す",
+    )
+
+    action: Literal[
+        "generate",
+        "run_status",
+        "delivery_status",
+        "compact_memory",
+        "breaker_status",
+        "stats",
+    ] = Field(
+        default="generate",
+        description="実行する処理（generate: 問題生成、run_status: バックグラウンド実行の状態照会、delivery_status: バックグラウンド配信の状態照会、compact_memory: 学習分野履歴の圧縮、breaker_status: サーキットブレーカーの状態照会、stats: 現在のセッションのフェーズごとのレイテンシ統計と Webhook レート制限の待機統計の照会）",
+    )
+
+    run_async: bool = Field(
+        default=False,
+        description="問題生成をバックグラウンドで実行し、完了を待たずに実行IDを返す（非同期トリガーモード）",
+    )
+
+    run_id: str | None = Field(
+        default=None,
+        description="バックグラウンド実行のID（トリガー側の runtimeSessionId。未指定時は自動採番）",
+    )
+
+    ticket_id: str | None = Field(
+        default=None,
+        description="配信チケットのID（async_delivery の応答の delivery.ticket_id）。delivery_status で使用",
+    )
+
+    run_key: str | None = Field(
+        default=None,
+        description="冪等性キー（スケジュール時刻とターゲットから導出）。同じキーの再送は前回の結果を返す",
+    )
+
+    deadline_seconds: float | None = Field(
+        default=None,
+        description="呼び出し全体の期限（秒）。未指定時は環境変数 INVOCATION_DEADLINE_SECONDS。超過時はそれまでの結果を返す",
+        gt=0,
+    )
+
+    token_budget: int | None = Field(
+        default=None,
+        description="実行1回あたりのトークン予算。未指定時は環境変数 INVOCATION_TOKEN_BUDGET。超過後はモデルを呼び出さずそれまでの結果を返す",
+        gt=0,
+    )
+
+    trace_context: dict[str, str] | None = Field(
+        default=None,
+        description="呼び出し元のトレースコンテキスト（W3C traceparent 等）。生成処理のスパンの親になる",
+    )
+
 
 class Question(BaseModel):
     """単一問題のモデル"""
@@ -184,7 +432,7 @@ class Question(BaseModel):
 
     # 新機能: 試験ガイド活用による問題分類表示
     learning_domain: str = Field(
-        description='試験ガイドで定義された学習分野分類。例: "複雑な組織に対応するソリューションの設計", "セキュリティの設計", "信頼性とビジネス継続性の設計"。複数分野にまたがる場合は最も関連の深い分野を1つ選択する。'
+        description='試験ガイドで定義された学習分野分類（「コンテンツ分野」の名称をそのまま記載する）。例: "複雑な組織に対応するソリューションの設計", "新しいソリューションのための設計", "既存のソリューションの継続的な改善"。複数分野にまたがる場合は最も関連の深い分野を1つ選択する。'
     )
     primary_technologies: list[str] = Field(
         description='問題で扱われる主要なサービス・技術を2-4個リスト化。例: ["AWS Organizations", "AWS Control Tower"], ["Azure Active Directory", "Azure Policy"]。サービス名は正式名称を使用（略称ではなく）。'
@@ -208,6 +456,14 @@ class Question(BaseModel):
 "試験ガイドとの直接的な関連付けができませんでした。"（正直な回答）"""
     )
 
+    # 正規化で確定した分野・タスクのコンパクトID（出力スキーマ・model_dump には含めない）
+    _learning_domain_id: str | None = PrivateAttr(default=None)
+
+    @property
+    def learning_domain_id(self) -> str | None:
+        """正規化で確定したコンパクトID（"D1" または "D1/T1.4"、未確定の場合は None）"""
+        return self._learning_domain_id
+
 
 class AgentOutput(BaseModel):
     """エージェントのアウトプットモデル（複数問題対応）"""
@@ -215,11 +471,27 @@ class AgentOutput(BaseModel):
     questions: list[Question] = Field(description="生成された問題のリスト")
 
 
+class FailedSlot(BaseModel):
+    """生成できなかった問題枠（部分的な結果の内訳）"""
+
+    slot: int = Field(description="問題枠の位置（0始まり、要求した問題数の範囲内）")
+    stage: Literal["generation", "validation", "deadline", "budget"] = Field(
+        description="失敗した段階（生成・構造検証・呼び出し期限・トークン予算）"
+    )
+    reason: str = Field(description="失敗の理由")
+
+
 # シンプルで安全な初期化（テスト環境対応）
 agent: Agent | None = None
 memory_client: DomainMemoryClient | None = None
+idempotency_store: IdempotencyStore = LocalIdempotencyStore()
 
 try:
+    # テスト実行時は MCP サーバーを起動しない
+    # （起動に失敗すると strands の後始末が停止済みのループにコルーチンを残し、警告になるため）
+    if os.getenv("DISABLE_AGENT_INIT", "false").lower() == "true":
+        raise RuntimeError("DISABLE_AGENT_INIT=true のためエージェントを初期化しません")
+
     # 本番環境での初期化
     mcp_client = MCPClient(
         lambda: stdio_client(
@@ -240,8 +512,18 @@ try:
                     connect_timeout=60,  # 1分
                     retries={"max_attempts": 3},
                 ),
+                # システムプロンプトの末尾に cachePoint を付ける（対応モデルのみ）
+                cache_config=(
+                    CacheConfig(strategy="auto") if PROMPT_CACHE_ENABLED else None
+                ),
             ),
             tools=mcp_client.list_tools_sync(),
+            # モデル応答の usage からトークン数（キャッシュの読み書きを含む）を記録する
+            callback_handler=CompositeCallbackHandler(
+                PrintingCallbackHandler(),
+                record_usage_callback,
+                record_metrics_callback,
+            ),
             system_prompt="""
         あなたはAWS認定試験の問題を生成する専門エージェントです。
 
@@ -266,6 +548,12 @@ try:
                 region_name=MEMORY_CONFIG["region_name"],
             )
             logger.info("AgentCore Memory クライアント初期化完了")
+
+            # 冪等性ストア（セッションをまたいで実行キーを共有）
+            idempotency_store = MemoryIdempotencyStore(
+                memory_id=MEMORY_CONFIG["memory_id"],
+                region_name=MEMORY_CONFIG["region_name"],
+            )
         else:
             logger.info("AgentCore Memory 機能は無効化されています")
 
@@ -274,9 +562,772 @@ except Exception as e:
     logger.warning(f"MCP初期化に失敗しました（テスト環境の可能性）: {e}")
     agent = None
     memory_client = None
+    idempotency_store = LocalIdempotencyStore()
+
+
+async def run_structured_output(prompt: list[ContentBlock]) -> "AgentOutput":
+    """エージェントで問題を生成（呼び出し期限の Bedrock フェーズの予算内）
+
+    イベントループを塞がないようスレッドで実行し、予算を超えた場合は待機を打ち切る。
+    structured_output は出力モデルのツールのみをモデルに渡すため、MCP ツールは呼び出されない
+    （期限・メトリクス・スパンは Bedrock フェーズのみが対象）。
+
+    期限による打ち切りはベストエフォート: structured_output は中断できないため、
+    スレッドの Bedrock 呼び出しは Bedrock クライアントの read_timeout・再試行の範囲で
+    完了まで動き続ける（期限が制限するのは invoke の応答時間で、リソースの使用ではない）。
+
+    Raises:
+        RuntimeError: エージェントが初期化されていない場合
+        DeadlineExceededError: 予算内に生成が完了しなかった場合
+        TokenBudgetExceededError: トークン予算を使い切っている場合
+    """
+    if agent is None:
+        raise RuntimeError("エージェントが初期化されていません（MCP初期化失敗）")
+
+    metrics = current_metrics()
+    if metrics is not None:
+        metrics.check_token_budget()
+
+    timeout = phase_timeout("bedrock")
+    try:
+        with (
+            usage_scope("generation") as usage,
+            timed("bedrock"),
+            span(
+                "bedrock.generate",
+                {"model_id": BEDROCK_MODEL_ID, "prompt_cache": PROMPT_CACHE_ENABLED},
+            ),
+        ):
+            try:
+                output: AgentOutput = await asyncio.wait_for(
+                    asyncio.to_thread(
+                        agent.structured_output,
+                        output_model=AgentOutput,
+                        prompt=prompt,
+                    ),
+                    timeout=timeout,
+                )
+            finally:
+                set_attributes(usage_attributes(usage.to_dict()))
+    except TimeoutError as e:
+        deadline = current_deadline()
+        if deadline is None:
+            raise DeadlineExceededError("bedrock") from e
+        raise deadline.exceed("bedrock") from e
+    return output
+
+
+async def deliver_to_teams(agent_output: AgentOutput) -> None:
+    """生成結果をTeamsに投稿（配信キューのワーカーから呼び出される）"""
+    teams_client = TeamsClient()
+    started = time.perf_counter()
+    await teams_client.send(agent_output)
+    latency_stats.record("teams_delivery", (time.perf_counter() - started) * 1000)
+
+
+# Teams 配信キュー（Fire-and-forget 配信用、プロセス内で共有）
+delivery_queue = DeliveryQueue(send=deliver_to_teams)
+
+# バックグラウンド実行トラッカー（非同期トリガーモード用、プロセス内で共有）
+run_tracker = RunTracker()
+
+# シャットダウン時にバックグラウンド実行の完了を待つ最大秒数
+RUN_SHUTDOWN_TIMEOUT = 30.0
+
+# エージェントによる生成の排他（ライブ生成とプール補充が同じエージェントを同時に使わない）
+generation_lock = asyncio.Lock()
+
+
+async def generate_for_pool(
+    exam_type: str, count: int, focus_domains: list[str]
+) -> list[dict[str, Any]]:
+    """問題プール補充用に問題を生成（イベントループを塞がないようスレッドで実行）"""
+    if agent is None:
+        raise RuntimeError("エージェントが初期化されていません（MCP初期化失敗）")
+
+    try:
+        exam_guide_content = load_exam_guide(exam_type)
+    except Exception as e:
+        logger.warning(f"試験ガイド読み込みに失敗しました。基本機能で継続します: {e}")
+        exam_guide_content = ""
+
+    focus_instruction = ""
+    if focus_domains:
+        focus_instruction = f"""
+            # 補充対象分野
+            - 在庫の少ない学習分野: {", ".join(focus_domains)}
+            - これらの分野を優先して問題を生成してください
+            """
+
+    prompt = build_generation_prompt(
+        exam_type, count, exam_guide_content, focus_instruction
+    )
+    async with generation_lock:
+        with usage_scope("pool"):
+            output = await asyncio.to_thread(
+                agent.structured_output, output_model=AgentOutput, prompt=prompt
+            )
+    # ライブ生成と同じく学習分野を正規名に揃えてから検証し、正規名で在庫に入れる
+    # （払い出し時の分散指示は正規名で比較するため）
+    questions = [
+        question.model_dump()
+        for question in canonicalize_learning_domains(exam_type, output.questions)
+    ]
+
+    # 検証に失敗した問題は在庫に入れない（補充は次のバッチで不足分を埋める）
+    if QUESTION_VALIDATION_ENABLED:
+        failures = validate_questions(
+            questions, get_guide_index(exam_type), get_catalog(exam_type)
+        )
+        if failures:
+            logger.warning(
+                f"検証に失敗した問題を在庫から除外: exam_type={exam_type}, failures={_format_failures(failures)}"
+            )
+            questions = [q for i, q in enumerate(questions) if i not in failures]
+    return questions
+
+
+def create_question_pool() -> QuestionPool | None:
+    """環境変数に基づいて問題プールを生成（QUESTION_POOL_ENABLED=true の場合のみ）
+
+    実行ごとに新しいセッションが割り当てられ /tmp は引き継がれないため、Memory が有効な場合は
+    Memory の在庫スナップショット、無効な場合（ローカル開発）はローカルの SQLite に保存する。
+    """
+    if os.getenv("QUESTION_POOL_ENABLED", "false").lower() != "true":
+        return None
+
+    backend: MemoryQuestionPoolBackend | SQLiteQuestionPoolBackend
+    if MEMORY_CONFIG["enabled"]:
+        backend = MemoryQuestionPoolBackend(
+            memory_id=MEMORY_CONFIG["memory_id"],
+            region_name=MEMORY_CONFIG["region_name"],
+        )
+    else:
+        backend = SQLiteQuestionPoolBackend(
+            os.getenv("QUESTION_POOL_PATH", "/tmp/question_pool.sqlite3")
+        )
+    low_water_mark = DEFAULT_LOW_WATER_MARK
+    target_size = DEFAULT_TARGET_SIZE
+    raw_low = os.getenv("QUESTION_POOL_LOW_WATER_MARK")
+    raw_target = os.getenv("QUESTION_POOL_TARGET_SIZE")
+    try:
+        if raw_low:
+            low_water_mark = int(raw_low)
+        if raw_target:
+            target_size = int(raw_target)
+        if low_water_mark < 0:
+            raise ValueError("下限は0以上が必須です")
+        if target_size <= low_water_mark:
+            raise ValueError("目標在庫は下限より大きい値が必須です")
+    except ValueError as e:
+        low_water_mark, target_size = DEFAULT_LOW_WATER_MARK, DEFAULT_TARGET_SIZE
+        logger.warning(
+            f"QUESTION_POOL_LOW_WATER_MARK / QUESTION_POOL_TARGET_SIZE の解析に失敗（既定値で継続）: "
+            f"{raw_low!r}, {raw_target!r}, {e}"
+        )
+
+    pool = QuestionPool(
+        backend=backend,
+        generate=generate_for_pool,
+        low_water_mark=low_water_mark,
+        target_size=target_size,
+        # Memory の在庫は学習分野履歴と同じサーキットブレーカーを経由して読み書きする
+        breaker=(
+            circuit_breakers.get(MEMORY_BREAKER_NAME)
+            if MEMORY_CONFIG["enabled"]
+            else None
+        ),
+    )
+    logger.info(f"問題プールを有効化しました: backend={type(backend).__name__}")
+    return pool
+
+
+# 事前生成した問題プール（無効の場合は None、毎回ライブ生成）
+question_pool = create_question_pool()
+
+# 問題の構造検証（QUESTION_VALIDATION_ENABLED=false で無効化）
+QUESTION_VALIDATION_ENABLED = (
+    os.getenv("QUESTION_VALIDATION_ENABLED", "true").lower() == "true"
+)
+
+# 検証に失敗した問題を再生成する最大回数（超えた場合はその問題を除外する）
+MAX_REPAIR_ATTEMPTS = 2
+
+
+def get_guide_index(exam_type: str) -> ExamGuideIndex | None:
+    """試験ガイドの索引を取得（ガイドがない場合は None、学習分野は検証しない）"""
+    try:
+        return load_exam_guide_index(exam_type)
+    except Exception as e:
+        logger.warning(
+            f"試験ガイドの索引を作成できません（学習分野の検証をスキップ）: {e}"
+        )
+        return None
+
+
+def get_normalizer(exam_type: str) -> DomainNormalizer | None:
+    """学習分野ノーマライザーを取得（ガイドがない場合は None、自由記述のまま扱う）"""
+    try:
+        return get_domain_normalizer(exam_type)
+    except Exception as e:
+        logger.warning(
+            f"学習分野ノーマライザーを作成できません（正規化をスキップ）: {e}"
+        )
+        return None
+
+
+def get_catalog(exam_type: str) -> ServiceCatalog | None:
+    """サービスカタログを取得（ガイドがない場合は None、サービスを照合しない）"""
+    try:
+        return get_service_catalog(exam_type)
+    except Exception as e:
+        logger.warning(
+            f"サービスカタログを作成できません（サービス照合をスキップ）: {e}"
+        )
+        return None
+
+
+def log_service_coverage(exam_type: str, questions: list[Question]) -> None:
+    """投稿する問題のサービスを照合し、範囲外・未知のサービスとサービス別出題数を記録"""
+    catalog = get_catalog(exam_type)
+    if catalog is None:
+        return
+
+    for question in questions:
+        for resolution in catalog.check(question.primary_technologies):
+            if resolution.status == "out_of_scope":
+                logger.warning(f"試験範囲外のサービスを含む問題: {resolution.text}")
+            elif resolution.status == "unknown":
+                logger.info(f"カタログで解決できないサービス表記: {resolution.text}")
+    counts = catalog.coverage_counts(q.primary_technologies for q in questions)
+    logger.info(f"サービス別出題数: {dict(counts)}")
+
+
+def canonicalize_learning_domains(
+    exam_type: str, questions: list[Question]
+) -> list[Question]:
+    """learning_domain を試験ガイドの分野の正規名に置き換える（確定できない場合はそのまま）
+
+    正規名は分野名のためタスクが失われる。照合で確定したコンパクトID（タスクを含む）は
+    learning_domain_id に保持し、Memory・カバレッジへの記録に使う。
+    """
+    normalizer = get_normalizer(exam_type)
+    if normalizer is None:
+        return questions
+
+    canonicalized: list[Question] = []
+    for question in questions:
+        match = normalizer.resolve(question.learning_domain)
+        if match is None:
+            canonicalized.append(question)
+            continue
+        copied = question.model_copy(
+            update={"learning_domain": normalizer.domain_name(question.learning_domain)}
+        )
+        # 正規化済みの問題を再度正規化してもタスクは失わない（正規名からはタスクを確定できない）
+        if match.task_id is not None or copied.learning_domain_id is None:
+            copied._learning_domain_id = match.compact_id
+        canonicalized.append(copied)
+    return canonicalized
+
+
+def learning_domain_id(normalizer: DomainNormalizer, question: Question) -> str:
+    """Memory に記録する学習分野（正規化で確定したコンパクトID、未確定の場合は照合結果）"""
+    return question.learning_domain_id or normalizer.compact_id(
+        question.learning_domain
+    )
+
+
+# 残りの問題枠の生成を打ち切る例外（呼び出し期限・トークン予算）
+GENERATION_STOP_ERRORS = (DeadlineExceededError, TokenBudgetExceededError)
+
+
+def _stop_stage(error: Exception) -> Literal["deadline", "budget"]:
+    """生成を打ち切った例外に対応する問題枠の失敗段階"""
+    return "budget" if isinstance(error, TokenBudgetExceededError) else "deadline"
+
+
+def _format_failures(failures: dict[int, list[ValidationIssue]]) -> str:
+    """検証失敗のログ・プロンプト用表記"""
+    return "; ".join(
+        f"問題{index + 1}: " + ", ".join(str(issue) for issue in issues)
+        for index, issues in failures.items()
+    )
+
+
+async def repair_invalid_questions(
+    input: AgentInput,
+    questions: list[Question],
+    exam_guide_content: str,
+    diversity_instruction: str,
+) -> tuple[list[Question], list[FailedSlot]]:
+    """検証に失敗した問題のみを再生成して差し替える
+
+    合格した問題はそのまま残し、違反のあった問題の数だけ違反内容を添えて再生成する。
+    上限回数を超えても違反が残る問題は投稿しない。
+
+    Args:
+        input: 入力パラメータ
+        questions: 投稿予定の問題
+        exam_guide_content: 試験ガイドの内容
+        diversity_instruction: ジャンル分散指示
+
+    Returns:
+        tuple[list[Question], list[FailedSlot]]: 検証に合格した問題リストと、
+        除外した問題（slot は引数 questions の添字）
+    """
+    if not QUESTION_VALIDATION_ENABLED:
+        return questions, []
+
+    guide_index = get_guide_index(input.exam_type)
+    catalog = get_catalog(input.exam_type)
+    questions = list(questions)
+    dropped: list[FailedSlot] = []
+    for attempt in range(MAX_REPAIR_ATTEMPTS + 1):
+        failures = validate_questions(
+            [question.model_dump() for question in questions], guide_index, catalog
+        )
+        if not failures:
+            break
+
+        logger.warning(
+            f"検証に失敗した問題を検出: attempt={attempt}, {_format_failures(failures)}"
+        )
+        if attempt == MAX_REPAIR_ATTEMPTS or agent is None:
+            dropped = [
+                FailedSlot(
+                    slot=index,
+                    stage="validation",
+                    reason=", ".join(str(issue) for issue in issues),
+                )
+                for index, issues in failures.items()
+            ]
+            logger.warning(f"検証に失敗した問題を除外しました: {len(failures)}問")
+            break
+
+        repair_instruction = f"""
+            # 修正指示
+            - 前回生成した問題に以下の違反がありました。違反のない問題を新たに生成してください
+            - {_format_failures(failures)}
+            """
+        prompt = build_generation_prompt(
+            input.exam_type,
+            len(failures),
+            exam_guide_content,
+            diversity_instruction + repair_instruction,
+        )
+        try:
+            async with generation_lock:
+                regenerated = (await run_structured_output(prompt)).questions
+        except GENERATION_STOP_ERRORS as e:
+            dropped = [
+                FailedSlot(slot=index, stage=_stop_stage(e), reason=str(e))
+                for index in failures
+            ]
+            logger.warning(f"期限・予算のため検証に失敗した問題を除外しました: {e}")
+            break
+        for index, question in zip(
+            failures,
+            canonicalize_learning_domains(input.exam_type, regenerated),
+            strict=False,
+        ):
+            questions[index] = question
+
+    dropped_indexes = {failed.slot for failed in dropped}
+    return [
+        question for i, question in enumerate(questions) if i not in dropped_indexes
+    ], dropped
+
+
+async def call_memory_store(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """問題アーカイブ・カバレッジの保存先を使う同期処理をスレッドで実行
+
+    Memory が有効な場合（保存先が Memory）は学習分野履歴と同じサーキットブレーカーを経由し、
+    呼び出し期限の Memory フェーズの予算内に収める。
+
+    Raises:
+        CircuitOpenError: Memory の回路が開いている場合
+        TimeoutError: 期限内に完了しなかった場合
+    """
+    if not MEMORY_CONFIG["enabled"]:
+        return await asyncio.to_thread(func, *args, **kwargs)
+    breaker = circuit_breakers.get(MEMORY_BREAKER_NAME)
+    timeout = phase_timeout("memory", default=breaker.call_timeout)
+    return await breaker.call(func, *args, timeout=timeout, **kwargs)
+
+
+# 類似問題を再生成する最大回数（超えた場合は警告を出して投稿する）
+MAX_DUPLICATE_REGENERATIONS = 2
+
+
+def create_question_archive() -> QuestionArchive | None:
+    """環境変数に基づいて問題アーカイブを生成（QUESTION_ARCHIVE_ENABLED=true の場合のみ）
+
+    実行ごとに新しいセッションが割り当てられ /tmp は引き継がれないため、Memory が有効な場合は
+    Memory のイベント、無効な場合（ローカル開発）はローカルの SQLite に保存する。
+    """
+    if os.getenv("QUESTION_ARCHIVE_ENABLED", "false").lower() != "true":
+        return None
+
+    similarity_threshold = DEFAULT_SIMILARITY_THRESHOLD
+    raw_similarity = os.getenv("QUESTION_ARCHIVE_SIMILARITY")
+    if raw_similarity:
+        try:
+            similarity_threshold = float(raw_similarity)
+            if not 0 < similarity_threshold <= 1:
+                raise ValueError("0より大きく1以下の値が必須です")
+        except ValueError as e:
+            similarity_threshold = DEFAULT_SIMILARITY_THRESHOLD
+            logger.warning(
+                f"QUESTION_ARCHIVE_SIMILARITY の解析に失敗（既定値で継続）: {raw_similarity!r}, {e}"
+            )
+
+    archive = QuestionArchive(
+        os.getenv("QUESTION_ARCHIVE_PATH", "/tmp/question_archive.sqlite3"),
+        similarity_threshold=similarity_threshold,
+        backend=(
+            MemoryQuestionArchiveBackend(
+                memory_id=MEMORY_CONFIG["memory_id"],
+                region_name=MEMORY_CONFIG["region_name"],
+            )
+            if MEMORY_CONFIG["enabled"]
+            else None
+        ),
+        # 保存先の読み込みは初回の照合時に行う（Memory の障害でモジュールを読み込めなくなるのを防ぐ）
+        lazy_load=True,
+    )
+    logger.info(
+        f"問題アーカイブを有効化しました: backend={type(archive.backend).__name__}"
+    )
+    return archive
+
+
+# 過去に生成した問題のアーカイブ（無効の場合は None、類似判定なし）
+question_archive = create_question_archive()
+
+# 未出題タスクとしてプロンプトに示す最大件数
+MAX_UNCOVERED_TASKS_IN_PROMPT = 5
+
+
+def create_coverage_tracker() -> CoverageTracker | None:
+    """環境変数に基づいてカバレッジトラッカーを生成（COVERAGE_TRACKING_ENABLED=true の場合のみ）
+
+    Memory が有効な場合は Memory の要約イベント、無効な場合はローカルの JSON ファイルに保存する。
+    """
+    if os.getenv("COVERAGE_TRACKING_ENABLED", "false").lower() != "true":
+        return None
+
+    store: LocalCoverageStore | MemoryCoverageStore
+    if MEMORY_CONFIG["enabled"]:
+        store = MemoryCoverageStore(
+            memory_id=MEMORY_CONFIG["memory_id"],
+            region_name=MEMORY_CONFIG["region_name"],
+        )
+    else:
+        store = LocalCoverageStore(
+            os.getenv("COVERAGE_PATH", "/tmp/question_coverage.json")
+        )
+    window_days = DEFAULT_WINDOW_DAYS
+    raw_window = os.getenv("COVERAGE_WINDOW_DAYS")
+    if raw_window:
+        try:
+            window_days = int(raw_window)
+            if not window_days > 0:
+                raise ValueError("正の値が必須です")
+        except ValueError as e:
+            window_days = DEFAULT_WINDOW_DAYS
+            logger.warning(
+                f"COVERAGE_WINDOW_DAYS の解析に失敗（既定値で継続）: {raw_window!r}, {e}"
+            )
+
+    tracker = CoverageTracker(store, window_days=window_days)
+    logger.info(f"カバレッジトラッカーを有効化しました: store={type(store).__name__}")
+    return tracker
+
+
+# タスク・サービスの出題状況（無効の場合は None）
+coverage_tracker = create_coverage_tracker()
+
+
+async def build_coverage_instruction(exam_type: str) -> str:
+    """保持期間内に出題していないタスクを優先させる指示（トラッカー無効時は空）"""
+    normalizer = get_normalizer(exam_type)
+    if coverage_tracker is None or normalizer is None:
+        return ""
+
+    try:
+        tasks = normalizer.guide_index.tasks
+        uncovered = await call_memory_store(
+            coverage_tracker.uncovered_tasks, exam_type, tasks
+        )
+    except Exception as e:
+        logger.warning(f"未出題タスクの取得に失敗（処理継続）: {e}")
+        return ""
+    if not uncovered:
+        return ""
+
+    listed = "\n".join(
+        f"            - タスク {task_id[1:]}: {tasks[task_id].name}"
+        for task_id in uncovered[:MAX_UNCOVERED_TASKS_IN_PROMPT]
+    )
+    return f"""
+            # 未出題タスク（カバレッジ向上）
+            - 直近{coverage_tracker.window_days}日間に出題していないタスクが{len(uncovered)}件あります
+            - 以下のタスクを優先して問題を生成してください
+{listed}
+            """
+
+
+async def record_coverage(exam_type: str, questions: list[Question]) -> None:
+    """出題したタスク・サービスをカバレッジに記録（失敗しても処理継続）"""
+    normalizer = get_normalizer(exam_type)
+    catalog = get_catalog(exam_type)
+    if coverage_tracker is None or normalizer is None or catalog is None:
+        return
+
+    task_ids: set[str] = set()
+    service_ids: set[int] = set()
+    for question in questions:
+        match = normalizer.resolve(learning_domain_id(normalizer, question))
+        if match is not None and match.task_id is not None:
+            task_ids.add(match.task_id)
+        task_ids.update(normalizer.task_ids(question.learning_insights))
+        for resolution in catalog.check(question.primary_technologies):
+            if resolution.entry is not None and resolution.entry.in_scope:
+                service_ids.add(resolution.entry.id)
+
+    try:
+        await call_memory_store(
+            coverage_tracker.record, exam_type, task_ids, service_ids
+        )
+        logger.info(
+            f"カバレッジ記録完了: tasks={sorted(task_ids)}, {coverage_tracker.summary(exam_type)}"
+        )
+    except Exception as e:
+        logger.warning(f"カバレッジ記録に失敗（処理継続）: {e}")
+
+
+async def replace_near_duplicates(
+    input: AgentInput,
+    questions: list[Question],
+    exam_guide_content: str,
+    diversity_instruction: str,
+) -> list[Question]:
+    """過去の問題・同じバッチ内の問題と類似する問題を再生成して差し替える
+
+    構造検証の後に実行するため、再生成した問題は学習分野を正規化して検証し、
+    合格した問題のみで差し替える（不合格の場合は元の問題を残して再試行する）。
+
+    Args:
+        input: 入力パラメータ
+        questions: 投稿予定の問題（検証済み）
+        exam_guide_content: 試験ガイドの内容
+        diversity_instruction: ジャンル分散指示
+
+    Returns:
+        list[Question]: 類似問題を差し替えた問題リスト
+    """
+    if question_archive is None:
+        return questions
+
+    guide_index = get_guide_index(input.exam_type)
+    catalog = get_catalog(input.exam_type)
+    questions = list(questions)
+    for attempt in range(MAX_DUPLICATE_REGENERATIONS + 1):
+        try:
+            matches = await call_memory_store(
+                question_archive.find_duplicates,
+                [question.model_dump() for question in questions],
+            )
+        except Exception as e:
+            # アーカイブを読み込めない場合は類似判定なしで投稿する
+            logger.warning(f"類似問題の照合に失敗（処理継続）: {e}")
+            break
+        if not matches:
+            break
+
+        logger.info(
+            f"過去・同じバッチの問題と類似する問題を検出: attempt={attempt}, "
+            f"matches={[(i, m.question_id, m.batch_index, round(m.similarity, 2)) for i, m in matches.items()]}"
+        )
+        if attempt == MAX_DUPLICATE_REGENERATIONS or agent is None:
+            logger.warning("類似問題を差し替えられないため、そのまま投稿します")
+            break
+
+        avoided = "\n".join(
+            f"            - {match.question[:120]}" for match in matches.values()
+        )
+        avoid_instruction = f"""
+            # 重複回避指示
+            - 以下の問題と同じシナリオ・同じ論点の問題は生成しないでください
+{avoided}
+            """
+        prompt = build_generation_prompt(
+            input.exam_type,
+            len(matches),
+            exam_guide_content,
+            diversity_instruction + avoid_instruction,
+        )
+        try:
+            async with generation_lock:
+                regenerated = (await run_structured_output(prompt)).questions
+        except GENERATION_STOP_ERRORS as e:
+            logger.warning(f"期限・予算のため類似問題を差し替えずに投稿します: {e}")
+            break
+
+        regenerated = canonicalize_learning_domains(input.exam_type, regenerated)
+        failures = (
+            validate_questions(
+                [question.model_dump() for question in regenerated],
+                guide_index,
+                catalog,
+            )
+            if QUESTION_VALIDATION_ENABLED
+            else {}
+        )
+        if failures:
+            logger.warning(
+                f"再生成した問題が検証に失敗したため差し替えません: {_format_failures(failures)}"
+            )
+        for position, (index, question) in enumerate(
+            zip(matches, regenerated, strict=False)
+        ):
+            if position not in failures:
+                questions[index] = question
+
+    return questions
+
+
+async def generate_live_questions(
+    input: AgentInput,
+    slots: list[int],
+    exam_guide_content: str,
+    diversity_instruction: str,
+) -> tuple[list[int], list[Question], list[FailedSlot]]:
+    """問題枠をライブ生成（まとめての生成に失敗した場合は1問ずつ生成して完了分を残す）
+
+    呼び出し元で generation_lock を取得していること。
+
+    Args:
+        input: 入力パラメータ
+        slots: 生成する問題枠
+        exam_guide_content: 試験ガイドの内容
+        diversity_instruction: ジャンル分散指示
+
+    Returns:
+        tuple[list[int], list[Question], list[FailedSlot]]:
+        生成できた問題枠、その問題、生成できなかった問題枠
+    """
+    # 1回のプロンプトで複数問題を生成（試験ガイド統合 + ジャンル分散）
+    prompt = build_generation_prompt(
+        input.exam_type, len(slots), exam_guide_content, diversity_instruction
+    )
+    logger.info("問題生成プロンプト（試験ガイド統合 + ジャンル分散版）を作成しました")
+    try:
+        generated = (await run_structured_output(prompt)).questions
+    except GENERATION_STOP_ERRORS as e:
+        logger.warning(f"期限・予算のため生成を打ち切りました: {e}")
+        return (
+            [],
+            [],
+            [FailedSlot(slot=s, stage=_stop_stage(e), reason=str(e)) for s in slots],
+        )
+    except Exception as e:
+        if len(slots) == 1:
+            logger.warning(f"問題生成に失敗しました: {e}")
+            return (
+                [],
+                [],
+                [FailedSlot(slot=slots[0], stage="generation", reason=str(e))],
+            )
+        logger.warning(f"まとめての生成に失敗したため1問ずつ生成します: {e}")
+        return await _generate_one_by_one(
+            input, slots, exam_guide_content, diversity_instruction
+        )
+
+    # 要求より少ない問題しか返されなかった場合、不足分の問題枠は失敗として返す
+    # （要求より多い場合は問題枠の数に揃える）
+    failed = [
+        FailedSlot(
+            slot=slot,
+            stage="generation",
+            reason=f"生成された問題数が不足しています（{len(generated)}/{len(slots)}問）",
+        )
+        for slot in slots[len(generated) :]
+    ]
+    return slots[: len(generated)], generated[: len(slots)], failed
+
+
+async def _generate_one_by_one(
+    input: AgentInput,
+    slots: list[int],
+    exam_guide_content: str,
+    diversity_instruction: str,
+) -> tuple[list[int], list[Question], list[FailedSlot]]:
+    """問題枠を1問ずつ生成（1問の失敗で他の問題を失わない）"""
+    completed: list[int] = []
+    questions: list[Question] = []
+    failed: list[FailedSlot] = []
+    for position, slot in enumerate(slots):
+        avoid_instruction = ""
+        if questions:
+            generated = "\n".join(
+                f"            - {question.question[:120]}" for question in questions
+            )
+            avoid_instruction = f"""
+            # 生成済みの問題（同じシナリオ・同じ論点は避ける）
+{generated}
+            """
+        prompt = build_generation_prompt(
+            input.exam_type,
+            1,
+            exam_guide_content,
+            diversity_instruction + avoid_instruction,
+        )
+        try:
+            output = await run_structured_output(prompt)
+        except GENERATION_STOP_ERRORS as e:
+            logger.warning(f"期限・予算のため残りの問題枠の生成を打ち切りました: {e}")
+            failed += [
+                FailedSlot(slot=s, stage=_stop_stage(e), reason=str(e))
+                for s in slots[position:]
+            ]
+            break
+        except Exception as e:
+            logger.warning(f"問題枠の生成に失敗しました: slot={slot}, {e}")
+            failed.append(FailedSlot(slot=slot, stage="generation", reason=str(e)))
+            continue
+
+        if not output.questions:
+            failed.append(
+                FailedSlot(
+                    slot=slot, stage="generation", reason="問題が返されませんでした"
+                )
+            )
+            continue
+        completed.append(slot)
+        questions.append(output.questions[0])
+    return completed, questions, failed
+
+
+@asynccontextmanager
+async def lifespan(_app: Any) -> AsyncIterator[None]:
+    """アプリのライフサイクル管理（シャットダウン時に実行中の生成・補充と配信キューを排出）"""
+    yield
+    await run_tracker.wait(timeout=RUN_SHUTDOWN_TIMEOUT)
+    if question_pool is not None:
+        await question_pool.wait_replenished(timeout=RUN_SHUTDOWN_TIMEOUT)
+    await delivery_queue.shutdown()
+    await latency_stats.shutdown()
+
 
 # AgentCore アプリケーションの初期化
-app = BedrockAgentCoreApp()
+app = BedrockAgentCoreApp(lifespan=lifespan)
+
+# 配信中・問題プールの補充中は非同期タスクとして登録し、/ping が HealthyBusy を返すようにする
+delivery_queue.task_tracker = app
+if question_pool is not None:
+    question_pool.task_tracker = app
 
 
 @app.entrypoint
@@ -289,15 +1340,275 @@ async def invoke(payload: dict[str, Any]) -> dict[str, Any]:
     Returns:
         dict[str, Any]: AgentOutputモデルまたはエラー情報
         - 成功時: AgentOutput.model_dump()
+        - 成功時（async_delivery=True）: AgentOutput.model_dump() + {"delivery": 配信チケット}
+        - 受付時（run_async=True）: {"run_id": str, "run": 実行記録}
+        - 状態照会時（action="run_status"）: {"run_id": str, "run": 実行記録}
+        - 状態照会時（action="delivery_status"）: {"ticket_id": str, "delivery": 配信チケット}
+        - 圧縮時（action="compact_memory"）: {"exam_type": str, "summary": 要約, "folded": int, "deleted": int}
+        - 状態照会時（action="breaker_status"）: {"circuit_breakers": 依存先ごとの状態と統計}
+        - 統計照会時（action="stats"）: {"latency": フェーズごとのレイテンシの分位点（現在のセッション分）,
+          "rate_limits": Webhook ホストごとの待機統計}
         - エラー時: {"error": str}
     """
 
     try:
         input = AgentInput(**payload)
+    except Exception as error:
+        logger.error(f"問題生成処理でエラーが発生しました: {str(error)}", exc_info=True)
+        return {"error": str(error)}
+
+    # 呼び出し元（Lambda）のスパンを親にする（バックグラウンド実行にも引き継がれる）
+    with remote_parent(input.trace_context):
+        if input.action == "run_status":
+            return get_run_status(input.run_id)
+
+        if input.action == "delivery_status":
+            return get_delivery_status(input.ticket_id)
+
+        if input.action == "compact_memory":
+            return await compact_memory(input.exam_type)
+
+        if input.action == "breaker_status":
+            return {"circuit_breakers": circuit_breakers.snapshot()}
+
+        if input.action == "stats":
+            return {
+                "latency": latency_stats.snapshot(),
+                "rate_limits": rate_limiters.snapshot(),
+            }
+
+        if input.run_async:
+            return start_background_run(input)
 
+        return await generate_questions(input)
+
+
+def start_background_run(input: AgentInput) -> dict[str, Any]:
+    """問題生成をバックグラウンドで開始し、完了を待たずに実行記録を返す
+
+    実行中は AgentCore Runtime の非同期タスクとして登録し、/ping が HealthyBusy を
+    返すことでセッションが生成途中で終了されないようにする。
+    """
+    run_id = input.run_id or str(uuid.uuid4())
+
+    async def work() -> dict[str, Any]:
+        task_id = app.add_async_task(
+            "question_generation", {"run_id": run_id, "exam_type": input.exam_type}
+        )
+        try:
+            return await generate_questions(input)
+        finally:
+            app.complete_async_task(task_id)
+
+    record = run_tracker.start(run_id, work)
+    return {"run_id": run_id, "run": record.to_dict()}
+
+
+def get_run_status(run_id: str | None) -> dict[str, Any]:
+    """バックグラウンド実行の状態を照会"""
+    if run_id is None:
+        return {"error": "run_status には run_id が必要です"}
+
+    record = run_tracker.get(run_id)
+    if record is None:
+        return {"error": f"実行記録が見つかりません: {run_id}"}
+    return {"run_id": run_id, "run": record.to_dict()}
+
+
+def get_delivery_status(ticket_id: str | None) -> dict[str, Any]:
+    """バックグラウンド配信の状態を照会"""
+    if ticket_id is None:
+        return {"error": "delivery_status には ticket_id が必要です"}
+
+    ticket = delivery_queue.get_ticket(ticket_id)
+    if ticket is None:
+        return {"error": f"配信チケットが見つかりません: {ticket_id}"}
+    return {"ticket_id": ticket_id, "delivery": ticket.to_dict()}
+
+
+async def compact_memory(exam_type: str) -> dict[str, Any]:
+    """学習分野履歴の生イベントを要約イベントに圧縮"""
+    if memory_client is None:
+        return {"error": "Memory クライアントが無効のため、履歴を圧縮できません"}
+
+    try:
+        result = await memory_client.compact_history(exam_type)
+    except Exception as e:
+        logger.error(f"学習分野履歴の圧縮に失敗しました: {e}", exc_info=True)
+        return {"error": str(e)}
+    return {"exam_type": exam_type, **result}
+
+
+async def generate_questions(input: AgentInput) -> dict[str, Any]:
+    """冪等性キーを確認してから問題を生成する
+
+    同じ run_key の実行が完了済みの場合は前回の結果を、実行中の場合は
+    実行中である旨を返し、再生成・再投稿は行わない。
+
+    Args:
+        input: 入力パラメータ
+
+    Returns:
+        dict[str, Any]: generate_and_deliver の結果、前回の結果、または実行中の通知
+    """
+    run_key = input.run_key
+    if run_key is None:
+        return await generate_and_deliver(input)
+
+    try:
+        existing = await idempotency_store.begin(run_key)
+    except Exception as e:
+        # ストア障害時は重複防止より生成を優先する
+        logger.warning(f"冪等性ストアの確認に失敗（生成を継続）: {e}")
+        return await generate_and_deliver(input)
+
+    if existing is not None:
+        logger.info(
+            f"実行キーが重複しているため生成をスキップします: run_key={run_key}, status={existing.status}"
+        )
+        if existing.status == "completed" and existing.result is not None:
+            return {**existing.result, "idempotent_replay": True}
+        return {"run_key": run_key, "status": existing.status}
+
+    result = await generate_and_deliver(input)
+    try:
+        if "error" in result:
+            await idempotency_store.release(run_key)
+        else:
+            await idempotency_store.complete(run_key, result)
+    except Exception as e:
+        logger.warning(f"冪等性ストアへの記録に失敗（処理継続）: {e}")
+    return result
+
+
+async def generate_and_deliver(input: AgentInput) -> dict[str, Any]:
+    """問題を生成して Teams に投稿（呼び出し期限・トークン予算の範囲内）
+
+    期限はペイロードの deadline_seconds、未指定時は環境変数から決め、
+    Memory・Bedrock・Teams の各フェーズに予算として配分する。
+    トークン数・フェーズの所要時間・概算コストを集計し、
+    終了時に1行のメトリクスレコード（CloudWatch EMF）を出力し、
+    フェーズごとの所要時間をプロセス内のレイテンシ統計に記録する。
+
+    Args:
+        input: 入力パラメータ
+
+    Returns:
+        dict[str, Any]: AgentOutput.model_dump()（+ 配信チケット、予算超過時は + 期限情報、
+        生成できなかった問題枠がある場合は + failed_slots）またはエラー情報
+    """
+    deadline = Deadline.from_config(input.deadline_seconds)
+    metrics = InvocationMetrics.from_config(
+        input.exam_type,
+        input.question_count,
+        BEDROCK_MODEL_ID,
+        token_budget=input.token_budget,
+    )
+    with (
+        deadline_scope(deadline),
+        metrics_scope(metrics),
+        span(
+            "generate_and_deliver",
+            {
+                "exam_type": input.exam_type,
+                "question_count": input.question_count,
+                "async_delivery": input.async_delivery,
+            },
+        ),
+    ):
+        result = await _generate_and_deliver(input, deadline)
+        summary = metrics.summary()
+        set_attributes(
+            {
+                "outcome": _outcome(result),
+                "questions_generated": len(result.get("questions", [])),
+                "failed_slots": len(result.get("failed_slots", [])),
+                "estimated_cost_usd": summary["estimated_cost_usd"],
+                **usage_attributes(summary["usage"]),
+            }
+        )
+
+    try:
+        metrics.emit(_outcome(result))
+        summary = metrics.summary()
+        latency_stats.record_many(
+            {"invocation": summary["duration_ms"], **summary["phase_ms"]}
+        )
+    except Exception as e:
+        logger.warning(f"メトリクスの出力に失敗（処理継続）: {e}")
+    return result
+
+
+def usage_attributes(usage: Mapping[str, Any]) -> dict[str, Any]:
+    """トークン使用量（PromptUsage.to_dict()）をスパン属性に変換"""
+    return {
+        "model_calls": usage["calls"],
+        "tokens.input": usage["input_tokens"],
+        "tokens.output": usage["output_tokens"],
+        "tokens.cache_read": usage["cache_read_tokens"],
+        "tokens.cache_write": usage["cache_write_tokens"],
+        "cache.hit_ratio": usage["cache_hit_ratio"],
+    }
+
+
+def _outcome(result: dict[str, Any]) -> str:
+    """メトリクス用の実行結果（succeeded / partial / error）"""
+    if "error" in result:
+        return "error"
+    if "failed_slots" in result or "deadline" in result:
+        return "partial"
+    return "succeeded"
+
+
+def _with_partial_info(
+    result: dict[str, Any], deadline: Deadline, failed_slots: list[FailedSlot]
+) -> dict[str, Any]:
+    """部分的な結果であることを示す情報を付ける
+
+    - deadline: 予算を超過したフェーズがある場合の期限情報
+    - failed_slots: 生成できなかった問題枠と理由（問題枠の位置順）
+    """
+    if deadline.was_exceeded:
+        result = {**result, "deadline": deadline.to_dict()}
+    if failed_slots:
+        result = {
+            **result,
+            "failed_slots": [
+                failed.model_dump()
+                for failed in sorted(failed_slots, key=lambda failed: failed.slot)
+            ],
+        }
+    return result
+
+
+def _no_questions_result(
+    deadline: Deadline, failed_slots: list[FailedSlot]
+) -> dict[str, Any]:
+    """1問も生成できなかった場合の結果（期限超過時は空の結果、それ以外はエラー情報）"""
+    if deadline.was_exceeded:
+        logger.warning("期限内に生成できた問題がないため、空の結果を返します")
+        return _with_partial_info(
+            AgentOutput(questions=[]).model_dump(), deadline, failed_slots
+        )
+    reasons = "; ".join(dict.fromkeys(failed.reason for failed in failed_slots))
+    return _with_partial_info(
+        {"error": f"問題を生成できませんでした: {reasons}"}, deadline, failed_slots
+    )
+
+
+async def _generate_and_deliver(
+    input: AgentInput, deadline: Deadline
+) -> dict[str, Any]:
+    """問題を生成して Teams に投稿（一部の問題枠が失敗・予算超過しても完了した問題を返す）"""
+
+    try:
         # 試験ガイドファイルを読み込み
         try:
-            exam_guide_content = load_exam_guide(input.exam_type)
+            with (
+                timed("guide"),
+                span("guide.load", {"exam_type": input.exam_type}),
+            ):
+                exam_guide_content = load_exam_guide(input.exam_type)
         except Exception as e:
             logger.warning(
                 f"試験ガイド読み込みに失敗しました。基本機能で継続します: {e}"
@@ -309,10 +1620,18 @@ async def invoke(payload: dict[str, Any]) -> dict[str, Any]:
         recent_domains = []
         if memory_client is not None:
             try:
-                recent_domains = await memory_client.get_recent_domains(
-                    exam_type=input.exam_type
-                )
+                with timed("memory"):
+                    recent_domains = await memory_client.get_recent_domains(
+                        exam_type=input.exam_type
+                    )
                 logger.info(f"最近使用された分野を取得（30日以内）: {recent_domains}")
+
+                # コンパクトID・過去の自由記述イベントを分野の正規名に揃える
+                normalizer = get_normalizer(input.exam_type)
+                if normalizer is not None:
+                    recent_domains = [
+                        normalizer.domain_name(domain) for domain in recent_domains
+                    ]
             except Exception as e:
                 logger.warning(f"最近の分野取得に失敗（処理継続）: {e}")
         else:
@@ -320,6 +1639,7 @@ async def invoke(payload: dict[str, Any]) -> dict[str, Any]:
 
         # ジャンル分散指示の作成
         diversity_instruction = ""
+        most_used_domains: list[str] = []
         if recent_domains:
             # 使用頻度を分析
             from collections import Counter
@@ -338,48 +1658,114 @@ async def invoke(payload: dict[str, Any]) -> dict[str, Any]:
             - 適切な問題が作成できる範囲で、多様性を最優先してください
             """
 
-        # 1回のプロンプトで複数問題を生成（試験ガイド統合 + ジャンル分散）
-        prompt = f"""
-            以下の条件に沿って、{input.question_count}問の実践的な問題を作成してください。
-
-            # 生成条件
-            - **試験**: {EXAM_TYPES[input.exam_type]["name"]}
-            - **問題数**: {input.question_count}問
+        # 未出題タスクの優先指示（カバレッジトラッカー有効時）
+        diversity_instruction += await build_coverage_instruction(input.exam_type)
+
+        # 問題プールから払い出し（在庫不足分のみライブ生成）
+        # slots は各問題の問題枠の位置（questions と同じ並び）
+        questions: list[Question] = []
+        failed_slots: list[FailedSlot] = []
+        if question_pool is not None:
+            questions = [
+                Question(**q)
+                for q in await question_pool.take(
+                    input.exam_type, input.question_count, most_used_domains
+                )
+            ]
+        slots = list(range(len(questions)))
 
-            # 試験ガイド情報
-            {exam_guide_content if exam_guide_content else "試験ガイド情報は利用できません。指定された試験レベルに適した問題を生成してください。"}
+        if len(questions) < input.question_count:
+            # エージェントが利用可能かチェック
+            if agent is None:
+                raise RuntimeError(
+                    "エージェントが初期化されていません（MCP初期化失敗）"
+                )
 
-            {diversity_instruction}
+            async with generation_lock:
+                # 補充の完了を待った場合は、在庫から再度払い出す
+                if question_pool is not None:
+                    questions += [
+                        Question(**q)
+                        for q in await question_pool.take(
+                            input.exam_type,
+                            input.question_count - len(questions),
+                            most_used_domains,
+                        )
+                    ]
+                    slots = list(range(len(questions)))
+
+                live_slots = list(range(len(questions), input.question_count))
+                if live_slots:
+                    # 失敗した問題枠は記録して、完了した問題のみで継続する
+                    (
+                        live_completed,
+                        live_questions,
+                        live_failed,
+                    ) = await generate_live_questions(
+                        input, live_slots, exam_guide_content, diversity_instruction
+                    )
+                    slots += live_completed
+                    questions += live_questions
+                    failed_slots += live_failed
 
-            # 注意事項
-            - 各問題は重複しない内容にしてください
-            - 異なるサービスや機能を扱ってください
-            - 試験ガイドの内容に基づいて適切な分類情報を設定してください
-        """
-        logger.info(
-            "問題生成プロンプト（試験ガイド統合 + ジャンル分散版）を作成しました"
-        )
+        if not questions:
+            return _no_questions_result(deadline, failed_slots)
 
-        # エージェントが利用可能かチェック
-        if agent is None:
-            raise RuntimeError("エージェントが初期化されていません（MCP初期化失敗）")
+        # 学習分野の表記揺れを試験ガイドの正規名に揃える
+        questions = canonicalize_learning_domains(input.exam_type, questions)
 
-        # 複数問題を一度に生成
-        agent_output = agent.structured_output(
-            output_model=AgentOutput,
-            prompt=prompt,
+        # 構造検証に失敗した問題のみを再生成する（合格した問題は再生成しない）
+        questions, dropped = await repair_invalid_questions(
+            input, questions, exam_guide_content, diversity_instruction
         )
+        failed_slots += [
+            failed.model_copy(update={"slot": slots[failed.slot]}) for failed in dropped
+        ]
+        if not questions:
+            return _no_questions_result(deadline, failed_slots)
+
+        # 過去の問題・同じバッチ内の問題と類似する問題は投稿前に再生成する
+        # （修正で再生成された問題も照合するため、検証の後に実行する）
+        questions = await replace_near_duplicates(
+            input, questions, exam_guide_content, diversity_instruction
+        )
+        if failed_slots:
+            logger.warning(
+                f"一部の問題枠を生成できませんでした: {len(questions)}/{input.question_count}問を投稿, "
+                f"failed_slots={[(failed.slot, failed.stage) for failed in failed_slots]}"
+            )
+
+        agent_output = AgentOutput(questions=questions)
+        log_service_coverage(input.exam_type, agent_output.questions)
+        await record_coverage(input.exam_type, agent_output.questions)
+        if question_pool is not None:
+            await question_pool.schedule_replenish(input.exam_type)
+        if question_archive is not None:
+            try:
+                await call_memory_store(
+                    question_archive.add_many,
+                    [question.model_dump() for question in agent_output.questions],
+                    exam_type=input.exam_type,
+                )
+            except Exception as e:
+                logger.warning(f"問題アーカイブへの保存に失敗（処理継続）: {e}")
         logger.info(f"問題生成結果: {agent_output.model_dump_json()}")
 
         # 分野履歴記録（Memory への記録）
         if memory_client is not None:
             try:
-                # 生成された各問題の学習分野を記録
+                # 生成された各問題の学習分野を記録（正規化できた分野はコンパクトID）
+                normalizer = get_normalizer(input.exam_type)
                 for question in agent_output.questions:
-                    await memory_client.record_domain_usage(
-                        learning_domain=question.learning_domain,
-                        exam_type=input.exam_type,
-                    )
+                    with timed("memory"):
+                        await memory_client.record_domain_usage(
+                            learning_domain=(
+                                learning_domain_id(normalizer, question)
+                                if normalizer is not None
+                                else question.learning_domain
+                            ),
+                            exam_type=input.exam_type,
+                        )
                 logger.info(
                     f"分野履歴記録完了: {len(agent_output.questions)}問の学習分野を記録"
                 )
@@ -391,16 +1777,35 @@ async def invoke(payload: dict[str, Any]) -> dict[str, Any]:
         else:
             logger.info("Memory クライアントが無効のため、分野履歴記録をスキップします")
 
-        # Teams投稿
-        teams_client = TeamsClient()
+        # Teams投稿（バックグラウンド配信: キュー投入後すぐに結果を返す）
+        if input.async_delivery:
+            try:
+                ticket = await delivery_queue.submit(agent_output)
+                return _with_partial_info(
+                    {**agent_output.model_dump(), "delivery": ticket.to_dict()},
+                    deadline,
+                    failed_slots,
+                )
+            except DeliveryQueueFullError as e:
+                # キューに入らない場合は同期投稿にフォールバック（配信を失わない）
+                logger.warning(f"配信キューに投入できないため同期投稿します: {e}")
+
+        # Teams投稿（Teams フェーズの予算をタイムアウトとする）
         try:
-            await teams_client.send(agent_output)
+            teams_timeout = deadline.check("teams")
+            teams_client = TeamsClient(timeout=teams_timeout)
+            with timed("teams"):
+                await asyncio.wait_for(
+                    teams_client.send(agent_output), timeout=teams_timeout
+                )
 
         except Exception as e:
             # Teams投稿失敗でも問題生成結果は返す（処理継続）
+            if isinstance(e, TimeoutError):
+                deadline.exceed("teams")
             logger.warning(f"Teams投稿に失敗しましたが、処理を継続します: {str(e)}")
 
-        return agent_output.model_dump()
+        return _with_partial_info(agent_output.model_dump(), deadline, failed_slots)
 
     except Exception as error:
         logger.error(f"問題生成処理でエラーが発生しました: {str(error)}", exc_info=True)
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Adaptive Card レンダラー - サーバーサイドでのカード JSON 生成
+
+templates/teams/adaptive_card.json（Power Automate 式を含むテンプレート）を
+一度だけ解析して「置換プラン」にコンパイルし、問題ごとに完成済みのカード JSON を生成します。
+Power Automate 側はレンダリング済みのカードを転送するだけになります。
+
+設計判断:
+- テンプレートは Power Automate 式を含むため JSON として不正。
+  値位置の @{outputs('X').body} をスロットに置換してから解析する
+- 文字列内の @{items('...')?['field']} は問題フィールドへの置換に変換する
+- 置換を含まない部分木はコンパイル時に定数化し、描画時は参照を共有する
+  （描画結果はシリアライズ専用として扱い、呼び出し側で変更しないこと）
+- コンパイル結果はテンプレート内容のハッシュ（バージョン）単位でキャッシュする
+- 選択肢（Options）と参考リンク（Source）のコンテナはローカルで組み立てる
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# テンプレート探索パス（環境変数 ADAPTIVE_CARD_TEMPLATE_PATH が最優先）
+# - AgentCore Runtime: デプロイ時に app/agentcore/templates/ へ同梱される
+# - ローカル環境: リポジトリの templates/teams/ を直接参照する
+TEMPLATE_PATH_CANDIDATES = [
+    Path(__file__).parent / "templates" / "adaptive_card.json",
+    Path(__file__).parents[2] / "templates" / "teams" / "adaptive_card.json",
+]
+
+# Power Automate 式のパターン
+_SLOT_PATTERN = re.compile(r":\s*@\{outputs\('(\w+)'\)\.body\}")
+_FIELD_PATTERN = re.compile(r"@\{items\('[^']*'\)\?\['(\w+)'\]\}")
+_SLOT_PREFIX = "\x00slot:"
+
+Renderer = Callable[[dict[str, Any]], Any]
+
+
+class CardTemplateError(Exception):
+    """テンプレートの読み込み・コンパイルに失敗した場合の例外"""
+
+
+def _build_options(question: dict[str, Any]) -> list[dict[str, Any]]:
+    """選択肢コンテナの要素を生成（Power Automate の Options ステップ相当）"""
+    return [
+        {"type": "TextBlock", "text": option, "wrap": True}
+        for option in question.get("options", [])
+    ]
+
+
+def _build_sources(question: dict[str, Any]) -> list[dict[str, Any]]:
+    """参考リンクコンテナの要素を生成（Power Automate の Source ステップ相当）"""
+    return [
+        {"type": "TextBlock", "text": f"[{url}]({url})", "size": "Small", "wrap": True}
+        for url in question.get("source", [])
+    ]
+
+
+# スロット名 → コンテナ要素の生成関数
+SLOT_BUILDERS: dict[str, Callable[[dict[str, Any]], list[dict[str, Any]]]] = {
+    "Options": _build_options,
+    "Source": _build_sources,
+}
+
+
+class CompiledCardTemplate:
+    """コンパイル済みカードテンプレート"""
+
+    def __init__(self, version: str, renderer: Renderer) -> None:
+        """
+        Args:
+            version: テンプレート内容のハッシュ
+            renderer: 問題データからカードを生成する関数
+        """
+        self.version = version
+        self._renderer = renderer
+
+    def render(self, question: dict[str, Any]) -> dict[str, Any]:
+        """1問分のカード JSON を生成
+
+        Args:
+            question: Question.model_dump() 相当の辞書
+
+        Returns:
+            dict[str, Any]: Adaptive Card JSON
+        """
+        card: dict[str, Any] = self._renderer(question)
+        return card
+
+
+def _compile_string(value: str) -> tuple[bool, Any]:
+    """文字列ノードをコンパイル（戻り値: (動的か, 定数値 or 描画関数)）"""
+    if value.startswith(_SLOT_PREFIX):
+        slot_name = value[len(_SLOT_PREFIX) :]
+        builder = SLOT_BUILDERS.get(slot_name)
+        if builder is None:
+            raise CardTemplateError(f"未対応のスロットです: {slot_name}")
+        return True, builder
+
+    parts = _FIELD_PATTERN.split(value)
+    if len(parts) == 1:
+        return False, value
+
+    # split の結果は [リテラル, フィールド名, リテラル, ...] の交互列
+    literals = parts[0::2]
+    fields = parts[1::2]
+
+    def render_text(question: dict[str, Any]) -> str:
+        chunks = [literals[0]]
+        for field_name, literal in zip(fields, literals[1:], strict=True):
+            chunks.append(str(question.get(field_name, "")))
+            chunks.append(literal)
+        return "".join(chunks)
+
+    return True, render_text
+
+
+def _compile_node(node: Any) -> tuple[bool, Any]:
+    """JSON ノードを再帰的にコンパイル（戻り値: (動的か, 定数値 or 描画関数)）"""
+    if isinstance(node, str):
+        return _compile_string(node)
+
+    if isinstance(node, dict):
+        compiled = [(key, *_compile_node(value)) for key, value in node.items()]
+        if not any(dynamic for _, dynamic, _ in compiled):
+            return False, node
+
+        def render_dict(question: dict[str, Any]) -> dict[str, Any]:
+            return {
+                key: (value(question) if dynamic else value)
+                for key, dynamic, value in compiled
+            }
+
+        return True, render_dict
+
+    if isinstance(node, list):
+        items = [_compile_node(item) for item in node]
+        if not any(dynamic for dynamic, _ in items):
+            return False, node
+
+        def render_list(question: dict[str, Any]) -> list[Any]:
+            return [value(question) if dynamic else value for dynamic, value in items]
+
+        return True, render_list
+
+    return False, node
+
+
+def compile_template(template_text: str) -> CompiledCardTemplate:
+    """テンプレート文字列を置換プランにコンパイル
+
+    Args:
+        template_text: Power Automate 式を含むテンプレート文字列
+
+    Returns:
+        CompiledCardTemplate: コンパイル済みテンプレート
+
+    Raises:
+        CardTemplateError: JSON として解析できない場合
+    """
+    version = hashlib.sha256(template_text.encode("utf-8")).hexdigest()[:12]
+    normalized = _SLOT_PATTERN.sub(
+        lambda m: f": {json.dumps(_SLOT_PREFIX + m.group(1))}", template_text
+    )
+    try:
+        tree = json.loads(normalized)
+    except json.JSONDecodeError as e:
+        raise CardTemplateError(f"テンプレートの解析に失敗しました: {e}") from e
+
+    dynamic, value = _compile_node(tree)
+    renderer: Renderer = value if dynamic else (lambda _question: value)
+    return CompiledCardTemplate(version=version, renderer=renderer)
+
+
+# コンパイル済みテンプレートのキャッシュ
+# - _compiled_by_version: テンプレートバージョン（内容ハッシュ）→ コンパイル結果
+# - _version_by_path: パス → (更新時刻, バージョン)。未変更ならファイルを再読込しない
+_compiled_by_version: dict[str, CompiledCardTemplate] = {}
+_version_by_path: dict[Path, tuple[int, str]] = {}
+
+
+def resolve_template_path() -> Path:
+    """テンプレートファイルのパスを解決
+
+    Raises:
+        CardTemplateError: テンプレートファイルが見つからない場合
+    """
+    env_path = os.getenv("ADAPTIVE_CARD_TEMPLATE_PATH")
+    candidates = [Path(env_path)] if env_path else TEMPLATE_PATH_CANDIDATES
+    for candidate in candidates:
+        if candidate.exists():
+            return candidate
+    raise CardTemplateError(
+        f"Adaptive Card テンプレートが見つかりません: {[str(c) for c in candidates]}"
+    )
+
+
+def load_card_template(path: Path | None = None) -> CompiledCardTemplate:
+    """コンパイル済みテンプレートを取得（バージョン単位でキャッシュ）
+
+    Args:
+        path: テンプレートファイルのパス（省略時は resolve_template_path()）
+
+    Returns:
+        CompiledCardTemplate: コンパイル済みテンプレート
+    """
+    template_path = path or resolve_template_path()
+    mtime_ns = template_path.stat().st_mtime_ns
+
+    cached = _version_by_path.get(template_path)
+    if cached is not None and cached[0] == mtime_ns:
+        return _compiled_by_version[cached[1]]
+
+    template_text = template_path.read_text(encoding="utf-8")
+    version = hashlib.sha256(template_text.encode("utf-8")).hexdigest()[:12]
+    compiled = _compiled_by_version.get(version)
+    if compiled is None:
+        compiled = compile_template(template_text)
+        _compiled_by_version[version] = compiled
+        logger.info(f"Adaptive Card テンプレートをコンパイル: version={version}")
+
+    _version_by_path[template_path] = (mtime_ns, version)
+    return compiled
+
+
+def render_cards(
+    questions: list[dict[str, Any]], template: CompiledCardTemplate | None = None
+) -> list[dict[str, Any]]:
+    """複数問題のカード JSON を生成
+
+    Args:
+        questions: Question.model_dump() 相当の辞書のリスト
+        template: コンパイル済みテンプレート（省略時はキャッシュから取得）
+
+    Returns:
+        list[dict[str, Any]]: 問題ごとの Adaptive Card JSON
+    """
+    compiled = template or load_card_template()
+    return [compiled.render(question) for question in questions]
+
+
+def run_benchmark(card_count: int = 1000) -> dict[str, float]:
+    """カード生成のベンチマークを実行
+
+    Args:
+        card_count: 生成するカード数
+
+    Returns:
+        dict[str, float]: コンパイル時間・描画時間（ミリ秒）
+    """
+    template_text = resolve_template_path().read_text(encoding="utf-8")
+    question = {
+        "question": "ベンチマーク用の問題文" * 10,
+        "options": [f"**{label}.** 選択肢{label}" for label in "ABCD"],
+        "correct_answer": "B",
+        "explanation": "ベンチマーク用の解説" * 20,
+        "source": ["https://docs.aws.amazon.com/organizations/latest/userguide/"],
+        "learning_domain": "複雑な組織に対応するソリューションの設計",
+        "primary_technologies": ["AWS Organizations"],
+        "learning_insights": "ベンチマーク用の学習ポイント" * 10,
+    }
+
+    start = time.perf_counter()
+    compiled = compile_template(template_text)
+    compile_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    cards = render_cards([question] * card_count, template=compiled)
+    render_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    json.dumps(cards, ensure_ascii=False)
+    serialize_ms = (time.perf_counter() - start) * 1000
+
+    return {
+        "card_count": card_count,
+        "compile_ms": compile_ms,
+        "render_ms": render_ms,
+        "render_per_card_us": render_ms * 1000 / card_count,
+        "serialize_ms": serialize_ms,
+    }
+
+
+if __name__ == "__main__":
+    # ベンチマーク実行 (uv run python app/agentcore/card_renderer.py --benchmark 1000)
+    if len(sys.argv) > 1 and sys.argv[1] == "--benchmark":
+        count = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+        print(json.dumps(run_benchmark(count), indent=2))
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+サーキットブレーカー - 外部依存（AgentCore Memory 等）の呼び出し保護
+
+Memory が遅延・障害中でも、呼び出しのたびに boto の呼び出しがタイムアウトするまで
+待たないよう、依存先ごとのサーキットブレーカーと呼び出し単位の期限を提供します。
+
+設計判断:
+- 状態は closed（通常）→ open（連続失敗で遮断）→ half_open（待機時間経過後に1件だけ試行）の3つ。
+  試行が成功すれば closed に戻り、失敗すれば再び open になる
+- 期限は asyncio.wait_for で呼び出し単位に設け、期限切れも失敗として数える。
+  同期 API（boto）はスレッドで実行するため、期限切れ後もスレッド自体は完了まで残る
+- 遮断中の呼び出しは CircuitOpenError で即座に失敗させ、フォールバックは呼び出し側が選ぶ
+- rate_limiter と同じく複数のイベントループ・スレッドから利用されるため threading.Lock で保護し、
+  依存先ごとの状態・統計をレジストリから参照できるようにする（監視用）
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from typing import Any, Literal, TypeVar
+
+logger = logging.getLogger(__name__)
+
+# サーキットブレーカー設定定数
+# - 連続失敗回数: 一時的な失敗1回では遮断しない
+# - 待機時間: 遮断後に試行を再開するまでの秒数
+# - 呼び出し期限: Memory API は通常1秒未満で応答するため、5秒で打ち切る
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_RESET_TIMEOUT = 60.0
+DEFAULT_CALL_TIMEOUT = 5.0
+
+BreakerState = Literal["closed", "open", "half_open"]
+
+T = TypeVar("T")
+
+# 依存先ごとに設定できる値と変換関数（環境変数・CIRCUIT_BREAKERS 共通）
+_SETTING_PARSERS: dict[str, Callable[[Any], Any]] = {
+    "failure_threshold": int,
+    "reset_timeout": float,
+    "call_timeout": float,
+}
+
+
+def _parse_setting(key: str, value: Any) -> Any:
+    """設定値を変換して検証（いずれも正の値、failure_threshold は整数）
+
+    Raises:
+        TypeError: 数値に変換できない型の場合
+        ValueError: 数値でない、または正の値でない場合
+    """
+    parsed = _SETTING_PARSERS[key](value)
+    if not parsed > 0:
+        raise ValueError(f"{key} は正の値が必須です: {value!r}")
+    return parsed
+
+
+class CircuitOpenError(Exception):
+    """回路が開いているため呼び出しを行わなかった"""
+
+
+@dataclass
+class CircuitBreakerStats:
+    """サーキットブレーカーの呼び出し統計"""
+
+    calls: int = 0
+    successes: int = 0
+    failures: int = 0
+    timeouts: int = 0
+    rejected: int = 0
+    opened: int = 0
+
+
+class CircuitBreaker:
+    """依存先1つ分のサーキットブレーカー"""
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        reset_timeout: float = DEFAULT_RESET_TIMEOUT,
+        call_timeout: float = DEFAULT_CALL_TIMEOUT,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Args:
+            name: 依存先の名前（ログ・監視用）
+            failure_threshold: 回路を開くまでの連続失敗回数
+            reset_timeout: 回路を開いてから試行を再開するまでの秒数
+            call_timeout: 呼び出し1回あたりの期限（秒）
+            clock: 単調増加する時刻関数（テスト用に差し替え可能）
+
+        Raises:
+            ValueError: 設定値が正の値でない場合
+        """
+        if failure_threshold < 1 or reset_timeout <= 0 or call_timeout <= 0:
+            raise ValueError(
+                "failure_threshold は1以上、reset_timeout と call_timeout は正の値が必須です"
+            )
+
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.call_timeout = call_timeout
+        self._clock = clock
+        self._state: BreakerState = "closed"
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self.stats = CircuitBreakerStats()
+
+    @property
+    def state(self) -> BreakerState:
+        """現在の状態（待機時間を過ぎた open は half_open として扱う）"""
+        with self._lock:
+            if self._state == "open" and self._cooled_down():
+                return "half_open"
+            return self._state
+
+    async def call(
+        self,
+        func: Callable[..., T],
+        *args: Any,
+        timeout: float | None = None,
+        **kwargs: Any,
+    ) -> T:
+        """同期関数をスレッドで実行（期限・遮断付き）
+
+        Args:
+            func: 呼び出す同期関数（boto の API 等）
+            timeout: この呼び出しの期限（秒、デフォルト: call_timeout）
+
+        Returns:
+            func の戻り値
+
+        Raises:
+            CircuitOpenError: 回路が開いている場合（func は呼び出さない）
+            TimeoutError: 期限内に完了しなかった場合
+            Exception: func が送出した例外
+        """
+        self._before_call()
+        deadline = self.call_timeout if timeout is None else timeout
+        try:
+            result = await asyncio.wait_for(
+                asyncio.to_thread(func, *args, **kwargs), timeout=deadline
+            )
+        except TimeoutError:
+            self._on_failure(timed_out=True)
+            raise TimeoutError(
+                f"{self.name} の呼び出しが期限（{deadline:.1f}秒）を超えました"
+            ) from None
+        except asyncio.CancelledError:
+            with self._lock:
+                self._probing = False
+            raise
+        except Exception:
+            self._on_failure(timed_out=False)
+            raise
+        self._on_success()
+        return result
+
+    def snapshot(self) -> dict[str, Any]:
+        """状態と統計を取得（監視・メトリクス出力用）"""
+        state = self.state
+        with self._lock:
+            return {
+                "state": state,
+                "consecutive_failures": self._consecutive_failures,
+                **asdict(self.stats),
+            }
+
+    def _cooled_down(self) -> bool:
+        return self._clock() - self._opened_at >= self.reset_timeout
+
+    def _before_call(self) -> None:
+        with self._lock:
+            if self._state == "open":
+                if not self._cooled_down():
+                    self.stats.rejected += 1
+                    raise CircuitOpenError(f"{self.name} の回路が開いています")
+                self._transition("half_open")
+            if self._state == "half_open":
+                if self._probing:
+                    self.stats.rejected += 1
+                    raise CircuitOpenError(f"{self.name} の回路は試行中です")
+                self._probing = True
+            self.stats.calls += 1
+
+    def _on_success(self) -> None:
+        with self._lock:
+            self.stats.successes += 1
+            self._consecutive_failures = 0
+            self._probing = False
+            if self._state != "closed":
+                self._transition("closed")
+
+    def _on_failure(self, timed_out: bool) -> None:
+        with self._lock:
+            self.stats.failures += 1
+            if timed_out:
+                self.stats.timeouts += 1
+            self._consecutive_failures += 1
+            self._probing = False
+            if (
+                self._state == "half_open"
+                or self._consecutive_failures >= self.failure_threshold
+            ):
+                self._opened_at = self._clock()
+                if self._state != "open":
+                    self.stats.opened += 1
+                    self._transition("open")
+
+    def _transition(self, state: BreakerState) -> None:
+        logger.warning(
+            f"サーキットブレーカーの状態遷移: name={self.name}, {self._state} -> {state}"
+        )
+        self._state = state
+
+
+class CircuitBreakerRegistry:
+    """依存先ごとのサーキットブレーカー管理"""
+
+    def __init__(
+        self,
+        default_failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        default_reset_timeout: float = DEFAULT_RESET_TIMEOUT,
+        default_call_timeout: float = DEFAULT_CALL_TIMEOUT,
+        overrides: dict[str, dict[str, Any]] | None = None,
+    ) -> None:
+        """
+        Args:
+            default_failure_threshold: 個別設定がない場合の連続失敗回数
+            default_reset_timeout: 個別設定がない場合の待機時間（秒）
+            default_call_timeout: 個別設定がない場合の呼び出し期限（秒）
+            overrides: 依存先ごとの設定
+                {"name": {"failure_threshold": int, "reset_timeout": float, "call_timeout": float}}
+        """
+        self.default_failure_threshold = default_failure_threshold
+        self.default_reset_timeout = default_reset_timeout
+        self.default_call_timeout = default_call_timeout
+        self._overrides = dict(overrides or {})
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "CircuitBreakerRegistry":
+        """環境変数から設定を読み込んで生成
+
+        - CIRCUIT_BREAKER_FAILURE_THRESHOLD: 既定の連続失敗回数
+        - CIRCUIT_BREAKER_RESET_SECONDS: 既定の待機時間
+        - CIRCUIT_BREAKER_CALL_TIMEOUT_SECONDS: 既定の呼び出し期限
+        - CIRCUIT_BREAKERS: 依存先ごとの設定（JSON）
+        """
+        defaults: dict[str, Any] = {
+            "failure_threshold": DEFAULT_FAILURE_THRESHOLD,
+            "reset_timeout": DEFAULT_RESET_TIMEOUT,
+            "call_timeout": DEFAULT_CALL_TIMEOUT,
+        }
+        for key, env_name in (
+            ("failure_threshold", "CIRCUIT_BREAKER_FAILURE_THRESHOLD"),
+            ("reset_timeout", "CIRCUIT_BREAKER_RESET_SECONDS"),
+            ("call_timeout", "CIRCUIT_BREAKER_CALL_TIMEOUT_SECONDS"),
+        ):
+            raw = os.getenv(env_name)
+            if raw:
+                try:
+                    defaults[key] = _parse_setting(key, raw)
+                except ValueError as e:
+                    logger.warning(
+                        f"{env_name} の解析に失敗（既定値で継続）: {raw!r}, {e}"
+                    )
+
+        # 依存先ごとの設定も読み込み時に検証し、不正な依存先は既定値で動作させる
+        overrides: dict[str, dict[str, Any]] = {}
+        raw_overrides = os.getenv("CIRCUIT_BREAKERS")
+        parsed: Any = {}
+        if raw_overrides:
+            try:
+                parsed = json.loads(raw_overrides)
+                if not isinstance(parsed, dict):
+                    raise ValueError("JSON オブジェクトではありません")
+            except ValueError as e:
+                parsed = {}
+                logger.warning(f"CIRCUIT_BREAKERS の解析に失敗（既定値で継続）: {e}")
+        for name, settings in parsed.items():
+            try:
+                if not isinstance(settings, dict):
+                    raise ValueError("JSON オブジェクトではありません")
+                overrides[name] = {
+                    key: _parse_setting(key, value)
+                    for key, value in settings.items()
+                    if key in _SETTING_PARSERS
+                }
+            except (TypeError, ValueError) as e:
+                logger.warning(
+                    f"CIRCUIT_BREAKERS の {name} の設定が不正（既定値で継続）: {e}"
+                )
+
+        return cls(
+            default_failure_threshold=defaults["failure_threshold"],
+            default_reset_timeout=defaults["reset_timeout"],
+            default_call_timeout=defaults["call_timeout"],
+            overrides=overrides,
+        )
+
+    def get(self, name: str) -> CircuitBreaker:
+        """依存先のサーキットブレーカーを取得（未作成なら生成）"""
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                settings = self._overrides.get(name, {})
+                breaker = CircuitBreaker(
+                    name,
+                    failure_threshold=int(
+                        settings.get(
+                            "failure_threshold", self.default_failure_threshold
+                        )
+                    ),
+                    reset_timeout=float(
+                        settings.get("reset_timeout", self.default_reset_timeout)
+                    ),
+                    call_timeout=float(
+                        settings.get("call_timeout", self.default_call_timeout)
+                    ),
+                )
+                self._breakers[name] = breaker
+            return breaker
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        """依存先ごとの状態と統計を取得（監視・メトリクス出力用）"""
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {breaker.name: breaker.snapshot() for breaker in breakers}
+
+
+# 全ての外部依存の呼び出しが共有するプロセス全体のサーキットブレーカー
+circuit_breakers = CircuitBreakerRegistry.from_env()
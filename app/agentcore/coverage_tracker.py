@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+カバレッジトラッカー - タスク・サービスの出題状況を日別ビットセットで保持
+
+直近 N 日間に出題した試験ガイドのタスク（約20件）と範囲内サービス（約200件）を
+日別のビットセットとして保持し、生成のたびに差分更新します。
+「まだ出題していないタスク・サービス」を Memory のイベントを走査せずに求められます。
+
+設計判断:
+- ビット位置はタスクID（T1.4 -> 分野ごとに16ビットの区画）とサービスカタログの項目IDから決める
+- 1日分は (タスクのビットセット, サービスのビットセット) の整数2つで、保存時は16進文字列にする
+- 保持期間内の和集合はキャッシュし、記録時・日付の変わり目のみ再計算する（照会は O(1)）
+- 保存先はバックエンド（CoverageStore）として差し替え可能にする。
+  ローカルでは JSON ファイル、AgentCore Memory では試験ごとのセッションに
+  要約イベント1件（最新のイベントが現在の状態）として書き込む
+"""
+
+import json
+import logging
+import re
+import threading
+from collections.abc import Iterable
+from datetime import UTC, date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Protocol
+
+from bedrock_agentcore.memory import MemoryClient
+
+logger = logging.getLogger(__name__)
+
+# カバレッジ設定定数
+# - 保持期間: Memory のイベント保持期間（eventExpiryDuration=30）に合わせる
+# - タスク区画: 1分野あたりのタスク数の上限（SAP-C02 は最大6タスク）
+DEFAULT_WINDOW_DAYS = 30
+TASKS_PER_DOMAIN_SLOT = 16
+
+# Memory 上の要約イベントに使うアクター（学習分野履歴と同じアクター、セッションで区別する）
+COVERAGE_ACTOR_ID = "cloud-copass-agent"
+COVERAGE_SUMMARY_VERSION = 1
+# 要約は保存ごとに1件（30日で自動削除）のため1ページ分を読む
+COVERAGE_MAX_EVENTS = 100
+
+_TASK_ID = re.compile(r"^T(\d+)\.(\d+)$")
+
+# 日付（ISO 形式） -> (タスクのビットセット, サービスのビットセット)
+DailyCoverage = dict[str, tuple[int, int]]
+
+
+def task_bit(task_id: str) -> int:
+    """タスクIDのビット位置
+
+    Raises:
+        ValueError: タスクIDの形式が不正な場合
+    """
+    match = _TASK_ID.match(task_id)
+    if match is None:
+        raise ValueError(f"タスクIDの形式が不正です: {task_id}")
+    domain, task = int(match.group(1)), int(match.group(2))
+    return (domain - 1) * TASKS_PER_DOMAIN_SLOT + (task - 1)
+
+
+def _mask(bits: Iterable[int]) -> int:
+    mask = 0
+    for bit in bits:
+        mask |= 1 << bit
+    return mask
+
+
+def encode_days(days: DailyCoverage) -> dict[str, list[str]]:
+    """保存用の表現（16進文字列）"""
+    return {
+        day: [f"{tasks:x}", f"{services:x}"] for day, (tasks, services) in days.items()
+    }
+
+
+def decode_days(data: dict[str, list[str]]) -> DailyCoverage:
+    """保存用の表現から復元"""
+    return {
+        day: (int(tasks, 16), int(services, 16))
+        for day, (tasks, services) in data.items()
+    }
+
+
+class CoverageStore(Protocol):
+    """カバレッジの保存先インターフェース"""
+
+    def load(self, exam_type: str) -> DailyCoverage:
+        """試験の日別カバレッジを読み込む"""
+        ...
+
+    def save(self, exam_type: str, days: DailyCoverage) -> None:
+        """試験の日別カバレッジを保存"""
+        ...
+
+
+class LocalCoverageStore:
+    """JSON ファイルを使ったカバレッジの保存先"""
+
+    def __init__(self, path: str | Path) -> None:
+        """
+        Args:
+            path: JSON ファイルのパス
+        """
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def load(self, exam_type: str) -> DailyCoverage:
+        with self._lock:
+            data = self._read()
+        return decode_days(data.get(exam_type, {}))
+
+    def save(self, exam_type: str, days: DailyCoverage) -> None:
+        with self._lock:
+            data = self._read()
+            data[exam_type] = encode_days(days)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+            tmp_path.write_text(json.dumps(data), encoding="utf-8")
+            tmp_path.replace(self.path)
+
+    def _read(self) -> dict[str, Any]:
+        if not self.path.exists():
+            return {}
+        try:
+            data: dict[str, Any] = json.loads(self.path.read_text(encoding="utf-8"))
+            return data
+        except json.JSONDecodeError as e:
+            logger.warning(f"カバレッジファイルの解析に失敗（空として扱う）: {e}")
+            return {}
+
+
+class MemoryCoverageStore:
+    """AgentCore Memory を使ったカバレッジの保存先（試験ごとの要約イベント）"""
+
+    def __init__(self, memory_id: str, region_name: str = "us-east-1") -> None:
+        """
+        Args:
+            memory_id: AgentCore Memory リソースID
+            region_name: AWS リージョン
+        """
+        self.memory_id = memory_id
+        self.client = MemoryClient(region_name=region_name)
+
+    @staticmethod
+    def session_id(exam_type: str) -> str:
+        """要約イベントを保持するセッションID（学習分野履歴のセッションと分離）"""
+        return f"coverage-{exam_type}"
+
+    def load(self, exam_type: str) -> DailyCoverage:
+        events = self.client.list_events(
+            memory_id=self.memory_id,
+            actor_id=COVERAGE_ACTOR_ID,
+            session_id=self.session_id(exam_type),
+            max_results=COVERAGE_MAX_EVENTS,
+            include_payload=True,
+        )
+        # list_events は時系列順で返すため、返却順に依存せず saved_at の最も新しい要約を採用する
+        # （同時刻の場合は後に現れた要約を優先）
+        latest: tuple[str, DailyCoverage] | None = None
+        for event in events:
+            for item in event.get("payload", []):
+                text = item.get("conversational", {}).get("content", {}).get("text")
+                if not text:
+                    continue
+                try:
+                    summary = json.loads(text)
+                    saved_at = str(summary.get("saved_at", ""))
+                    days = decode_days(summary["days"])
+                except (
+                    json.JSONDecodeError,
+                    AttributeError,
+                    KeyError,
+                    TypeError,
+                    ValueError,
+                ) as e:
+                    logger.warning(f"カバレッジ要約の解析に失敗（スキップ）: {e}")
+                    continue
+                if latest is None or saved_at >= latest[0]:
+                    latest = (saved_at, days)
+        return latest[1] if latest else {}
+
+    def save(self, exam_type: str, days: DailyCoverage) -> None:
+        summary = {
+            "version": COVERAGE_SUMMARY_VERSION,
+            "saved_at": datetime.now(UTC).isoformat(),
+            "days": encode_days(days),
+        }
+        self.client.create_event(
+            memory_id=self.memory_id,
+            actor_id=COVERAGE_ACTOR_ID,
+            session_id=self.session_id(exam_type),
+            messages=[(json.dumps(summary), "USER")],
+            event_timestamp=datetime.now(),
+        )
+
+
+class CoverageTracker:
+    """タスク・サービスの出題状況（日別ビットセット）"""
+
+    def __init__(
+        self, store: CoverageStore, window_days: int = DEFAULT_WINDOW_DAYS
+    ) -> None:
+        """
+        Args:
+            store: 保存先
+            window_days: 出題済みとみなす期間（日数）
+        """
+        self.store = store
+        self.window_days = window_days
+        self._days: dict[str, DailyCoverage] = {}
+        # 試験 -> (基準日, 保持期間内の和集合)
+        self._union: dict[str, tuple[str, tuple[int, int]]] = {}
+
+    def record(
+        self,
+        exam_type: str,
+        task_ids: Iterable[str],
+        service_ids: Iterable[int],
+        today: date | None = None,
+    ) -> None:
+        """出題したタスク・サービスを当日分に記録して保存"""
+        today = today or date.today()
+        days = self._load(exam_type)
+        tasks, services = days.get(today.isoformat(), (0, 0))
+        days[today.isoformat()] = (
+            tasks | _mask(task_bit(task_id) for task_id in task_ids),
+            services | _mask(service_ids),
+        )
+
+        # 保持期間外の日を破棄し、和集合のキャッシュを無効化する
+        oldest = (today - timedelta(days=self.window_days - 1)).isoformat()
+        for day in [day for day in days if day < oldest]:
+            del days[day]
+        self._union.pop(exam_type, None)
+        self.store.save(exam_type, days)
+
+    def covered(self, exam_type: str, today: date | None = None) -> tuple[int, int]:
+        """保持期間内に出題したタスク・サービスのビットセット（同じ日の照会はキャッシュ）"""
+        today_iso = (today or date.today()).isoformat()
+        cached = self._union.get(exam_type)
+        if cached is None or cached[0] != today_iso:
+            oldest = (
+                date.fromisoformat(today_iso) - timedelta(days=self.window_days - 1)
+            ).isoformat()
+            tasks = services = 0
+            for day, (day_tasks, day_services) in self._load(exam_type).items():
+                if oldest <= day <= today_iso:
+                    tasks |= day_tasks
+                    services |= day_services
+            cached = (today_iso, (tasks, services))
+            self._union[exam_type] = cached
+        return cached[1]
+
+    def uncovered_tasks(
+        self, exam_type: str, task_ids: Iterable[str], today: date | None = None
+    ) -> list[str]:
+        """保持期間内に出題していないタスク"""
+        tasks, _ = self.covered(exam_type, today)
+        return [task_id for task_id in task_ids if not tasks >> task_bit(task_id) & 1]
+
+    def uncovered_services(
+        self, exam_type: str, service_ids: Iterable[int], today: date | None = None
+    ) -> list[int]:
+        """保持期間内に出題していないサービス"""
+        _, services = self.covered(exam_type, today)
+        return [
+            service_id for service_id in service_ids if not services >> service_id & 1
+        ]
+
+    def summary(self, exam_type: str) -> dict[str, Any]:
+        """監視・デバッグ用の要約"""
+        tasks, services = self.covered(exam_type)
+        return {
+            "exam_type": exam_type,
+            "window_days": self.window_days,
+            "days": len(self._load(exam_type)),
+            "covered_tasks": tasks.bit_count(),
+            "covered_services": services.bit_count(),
+        }
+
+    def _load(self, exam_type: str) -> DailyCoverage:
+        if exam_type not in self._days:
+            self._days[exam_type] = self.store.load(exam_type)
+        return self._days[exam_type]
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+呼び出し期限 - invoke 全体の期限をフェーズごとの予算に分割して伝播
+
+Bedrock（read_timeout 300秒・再試行3回）、Teams（30秒）、Memory（期限なし）と
+タイムアウトが個別に設定されているため、合計がトリガー側の待機時間を超えることがあります。
+呼び出し単位の期限を1つ決め、Memory・Bedrock・Teams の各フェーズに予算として配分します。
+
+設計判断:
+- 期限は contextvars で伝播し、DomainMemoryClient 等の呼び出しシグネチャを変えずに参照できるようにする
+  （配信キューのワーカーなど、期限の設定前に作られたタスクには伝播しない）
+- 予算は「期限全体 × フェーズの配分」を上限とし、最後に行う Teams 投稿の配分を残した残り時間で打ち切る
+  （Bedrock が遅くても Teams 投稿の時間は確保する。Memory は生成の前後で読み書きするため順序を持たない）
+- 生成中に MCP ツールは呼び出されないため、ツール用のフェーズは持たない
+- 期限切れは DeadlineExceededError（TimeoutError のサブクラス）で通知し、
+  呼び出し側はそれまでの結果で部分的な応答を返す
+"""
+
+import json
+import logging
+import os
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Literal
+
+logger = logging.getLogger(__name__)
+
+# 呼び出し期限の設定定数
+# - 期限: トリガー（Lambda）の read_timeout 290秒から、応答の返却に必要な余裕を差し引いた値
+# - 配分: 問題生成（Bedrock）に大半を割り当て、Memory の読み書きと Teams 投稿の時間を確保する
+DEFAULT_INVOCATION_DEADLINE_SECONDS = 270.0
+DEFAULT_PHASE_SHARES: dict[str, float] = {
+    "memory": 0.05,
+    "bedrock": 0.80,
+    "teams": 0.15,
+}
+
+Phase = Literal["memory", "bedrock", "teams"]
+
+# 最後に行うフェーズ（他のフェーズの予算からは、このフェーズの配分を差し引く）
+FINAL_PHASE: Phase = "teams"
+
+_current_deadline: ContextVar["Deadline | None"] = ContextVar(
+    "invocation_deadline", default=None
+)
+
+
+class DeadlineExceededError(TimeoutError):
+    """呼び出し期限（またはフェーズの予算）を使い切った"""
+
+    def __init__(self, phase: str) -> None:
+        super().__init__(f"呼び出し期限を超過しました: phase={phase}")
+        self.phase = phase
+
+
+class Deadline:
+    """呼び出し1回分の期限"""
+
+    def __init__(
+        self,
+        seconds: float,
+        shares: dict[str, float] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Args:
+            seconds: 期限（呼び出し開始からの秒数）
+            shares: フェーズごとの配分（期限全体に対する割合）
+            clock: 単調増加する時刻関数（テスト用に差し替え可能）
+
+        Raises:
+            ValueError: 期限が正の値でない場合
+        """
+        if seconds <= 0:
+            raise ValueError("期限は正の値が必須です")
+
+        self.seconds = seconds
+        self.shares = {**DEFAULT_PHASE_SHARES, **(shares or {})}
+        self._clock = clock
+        self._started_at = clock()
+        self.exceeded_phases: list[str] = []
+
+    @classmethod
+    def from_config(cls, seconds: float | None = None) -> "Deadline":
+        """ペイロードの指定値、または環境変数から生成
+
+        - INVOCATION_DEADLINE_SECONDS: 既定の期限
+        - INVOCATION_PHASE_SHARES: フェーズごとの配分（JSON）
+        """
+        shares: dict[str, float] = {}
+        raw_shares = os.getenv("INVOCATION_PHASE_SHARES")
+        if raw_shares:
+            try:
+                parsed = json.loads(raw_shares)
+                if not isinstance(parsed, dict):
+                    raise ValueError("JSON オブジェクトではありません")
+                shares = {phase: float(share) for phase, share in parsed.items()}
+                if any(not 0 <= share <= 1 for share in shares.values()):
+                    raise ValueError("配分は0〜1の範囲が必須です")
+            except (TypeError, ValueError) as e:
+                shares = {}
+                logger.warning(
+                    f"INVOCATION_PHASE_SHARES の解析に失敗（既定値で継続）: {e}"
+                )
+
+        if seconds is None:
+            seconds = DEFAULT_INVOCATION_DEADLINE_SECONDS
+            raw_seconds = os.getenv("INVOCATION_DEADLINE_SECONDS")
+            if raw_seconds:
+                try:
+                    seconds = float(raw_seconds)
+                    if not seconds > 0:
+                        raise ValueError("正の値が必須です")
+                except ValueError as e:
+                    seconds = DEFAULT_INVOCATION_DEADLINE_SECONDS
+                    logger.warning(
+                        f"INVOCATION_DEADLINE_SECONDS の解析に失敗（既定値で継続）: {raw_seconds!r}, {e}"
+                    )
+        return cls(seconds, shares)
+
+    def elapsed(self) -> float:
+        """開始からの経過秒数"""
+        return self._clock() - self._started_at
+
+    def remaining(self) -> float:
+        """期限までの残り秒数（超過時は0）"""
+        return max(0.0, self.seconds - self.elapsed())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def budget(self, phase: Phase) -> float:
+        """フェーズに使える秒数（最後のフェーズの配分を残した残り時間が上限）"""
+        reserved = (
+            0.0 if phase == FINAL_PHASE else self.seconds * self.shares[FINAL_PHASE]
+        )
+        allowance = self.seconds * self.shares[phase]
+        return max(0.0, min(allowance, self.remaining() - reserved))
+
+    def check(self, phase: Phase) -> float:
+        """フェーズの予算を返す（使い切っている場合は例外）
+
+        Raises:
+            DeadlineExceededError: 予算が残っていない場合
+        """
+        budget = self.budget(phase)
+        if budget <= 0:
+            raise self.exceed(phase)
+        return budget
+
+    def exceed(self, phase: Phase) -> DeadlineExceededError:
+        """フェーズの予算超過を記録し、送出する例外を返す"""
+        if phase not in self.exceeded_phases:
+            self.exceeded_phases.append(phase)
+        return DeadlineExceededError(phase)
+
+    @property
+    def was_exceeded(self) -> bool:
+        """いずれかのフェーズで予算を超過したか（応答が部分的な結果かどうか）"""
+        return bool(self.exceeded_phases)
+
+    def to_dict(self) -> dict[str, Any]:
+        """ログ・応答用の表現"""
+        return {
+            "seconds": self.seconds,
+            "elapsed_seconds": round(self.elapsed(), 3),
+            "exceeded_phases": list(self.exceeded_phases),
+        }
+
+
+def current_deadline() -> Deadline | None:
+    """現在のコンテキストの期限（未設定の場合は None）"""
+    return _current_deadline.get()
+
+
+@contextmanager
+def deadline_scope(deadline: Deadline) -> Iterator[Deadline]:
+    """コンテキスト内の処理に期限を設定"""
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def phase_timeout(phase: Phase, default: float | None = None) -> float | None:
+    """現在の期限に基づくフェーズのタイムアウト（期限未設定時は default）
+
+    Raises:
+        DeadlineExceededError: 予算が残っていない場合
+    """
+    deadline = current_deadline()
+    if deadline is None:
+        return default
+    budget = deadline.check(phase)
+    return budget if default is None else min(default, budget)
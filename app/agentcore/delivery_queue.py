@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Teams 配信キュー - Fire-and-forget 配信ステージ
+
+invoke が Webhook の往復（最大30秒）を待たずに結果を返せるよう、
+Teams 投稿をアプリプロセスが所有するバックグラウンドキューに委譲します。
+
+設計判断:
+- キューはプロセス内の asyncio.Queue（上限付き）で実装し、外部依存を持たない
+- 投稿処理は送信関数として注入し、TeamsClient への直接依存を避ける
+- キューが満杯の場合は一定時間待機（バックプレッシャー）し、それでも空かなければ例外
+- ワーカーは最初の投入時に実行中のイベントループ上で遅延起動する。
+  別スレッドのループから投入された場合は、稼働中のループのキューにそのまま投入する。
+  ループが停止していた場合のみ新しいループで起動し直し、未配信の項目を移し替える
+- 投入から配信完了までを非同期タスクとして登録（task_tracker）し、
+  配信中に /ping が Healthy を返してセッションが終了されないようにする
+- シャットダウン時は残りの配信をタイムアウト付きで排出（drain）してから停止する
+- 配信は投入元の contextvars（トレースのスパン等）で送信する。ワーカーは最初の投入元の
+  コンテキストで起動されるため、そのまま送信すると全ての配信が最初の呼び出しに紐づく
+"""
+
+import asyncio
+import contextvars
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import Callable, Coroutine
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+# AgentCore環境では相対インポートが必要
+try:
+    from run_tracker import AsyncTaskTracker
+# ローカル環境（テスト・開発）では絶対インポートが必要
+except ImportError:
+    from app.agentcore.run_tracker import AsyncTaskTracker
+
+logger = logging.getLogger(__name__)
+
+# 配信キュー設定定数
+# - 想定負荷: 1回の invoke で1件投入（平日1回実行 + 手動実行）
+# - 上限を超える投入は ENQUEUE_TIMEOUT 秒まで待機してから拒否する
+DEFAULT_MAX_QUEUE_SIZE = 100
+DEFAULT_ENQUEUE_TIMEOUT = 5.0
+DEFAULT_WORKER_COUNT = 1
+# シャットダウン時の排出待ち時間（Teams タイムアウト30秒 + 余裕）
+DEFAULT_DRAIN_TIMEOUT = 45.0
+# ステータス照会用に保持するチケット数（古いものから破棄）
+MAX_TRACKED_TICKETS = 1000
+
+
+class DeliveryQueueFullError(Exception):
+    """配信キューが満杯で投入できなかった場合の例外"""
+
+
+@dataclass
+class DeliveryTicket:
+    """配信チケット（投入した配信の追跡情報）"""
+
+    ticket_id: str
+    status: str = "queued"  # queued / sending / delivered / failed
+    enqueued_at: float = field(default_factory=time.time)
+    completed_at: float | None = None
+    error: str | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        """レスポンス用の辞書に変換"""
+        return asdict(self)
+
+
+class DeliveryQueue:
+    """バックグラウンド配信キュー
+
+    投入された AgentOutput をワーカーが順次送信関数に渡します。
+    """
+
+    def __init__(
+        self,
+        send: Callable[[Any], Coroutine[Any, Any, None]],
+        max_size: int = DEFAULT_MAX_QUEUE_SIZE,
+        worker_count: int = DEFAULT_WORKER_COUNT,
+        enqueue_timeout: float = DEFAULT_ENQUEUE_TIMEOUT,
+        task_tracker: AsyncTaskTracker | None = None,
+    ) -> None:
+        """配信キューを初期化
+
+        Args:
+            send: 1件の AgentOutput を配信する非同期関数
+            max_size: キューの最大長（バックプレッシャーの閾値）
+            worker_count: 並行して配信するワーカー数
+            enqueue_timeout: キュー満杯時に空きを待つ最大秒数
+            task_tracker: 配信中の非同期タスクの登録先（AgentCore アプリ）
+        """
+        self.send = send
+        self.max_size = max_size
+        self.worker_count = worker_count
+        self.enqueue_timeout = enqueue_timeout
+        self.task_tracker = task_tracker
+
+        self._queue: (
+            asyncio.Queue[tuple[DeliveryTicket, Any, contextvars.Context]] | None
+        ) = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._workers: list[asyncio.Task[None]] = []
+        self._tickets: OrderedDict[str, DeliveryTicket] = OrderedDict()
+        self._task_ids: dict[str, int] = {}
+        self._closed = False
+
+    @property
+    def pending(self) -> int:
+        """未処理（キュー内）の配信件数"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        """キューとワーカーが動作するイベントループを返す（未起動・停止済みなら遅延起動）
+
+        稼働中のループが別スレッドにある場合はそのループを使い続ける。
+        ループが停止していた場合は実行中のループで起動し直し、未配信の項目を移し替える。
+        """
+        loop = asyncio.get_running_loop()
+        current = self._loop
+        if (
+            self._queue is not None
+            and current is not None
+            and (current is loop or (current.is_running() and not current.is_closed()))
+        ):
+            return current
+
+        pending = self._take_pending()
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=max(self.max_size, len(pending)))
+        for item in pending:
+            self._queue.put_nowait(item)
+        self._workers = [
+            loop.create_task(self._worker(), name=f"teams-delivery-{i}")
+            for i in range(self.worker_count)
+        ]
+        logger.info(
+            f"配信キュー起動: max_size={self.max_size}, workers={self.worker_count}, migrated={len(pending)}"
+        )
+        return loop
+
+    def _take_pending(
+        self,
+    ) -> list[tuple[DeliveryTicket, Any, contextvars.Context]]:
+        """停止したループのキューから未配信の項目を取り出す
+
+        停止したループ上で送信中だった配信は完了しないため失敗として記録する。
+        """
+        if self._queue is None:
+            return []
+
+        pending: list[tuple[DeliveryTicket, Any, contextvars.Context]] = []
+        while True:
+            try:
+                pending.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+
+        for ticket in list(self._tickets.values()):
+            if ticket.status == "sending":
+                ticket.status = "failed"
+                ticket.error = "配信中にイベントループが停止しました"
+                ticket.completed_at = time.time()
+                self._complete_task(ticket)
+        if pending:
+            logger.warning(
+                f"停止したイベントループのキューから未配信の{len(pending)}件を移し替えます"
+            )
+        return pending
+
+    async def submit(self, agent_output: Any) -> DeliveryTicket:
+        """配信をキューに投入し、即座にチケットを返す
+
+        Args:
+            agent_output: 配信対象の AgentOutput
+
+        Returns:
+            DeliveryTicket: 配信追跡用チケット
+
+        Raises:
+            DeliveryQueueFullError: シャットダウン中、または待機してもキューが空かない場合
+        """
+        if self._closed:
+            raise DeliveryQueueFullError("配信キューはシャットダウン済みです")
+
+        loop = self._ensure_started()
+        ticket = DeliveryTicket(ticket_id=uuid.uuid4().hex)
+        item = (ticket, agent_output, contextvars.copy_context())
+        self._begin_task(ticket)
+
+        try:
+            if loop is asyncio.get_running_loop():
+                await self._put(item)
+            else:
+                future = asyncio.run_coroutine_threadsafe(self._put(item), loop)
+                await asyncio.wrap_future(future)
+        except TimeoutError as e:
+            self._complete_task(ticket)
+            raise DeliveryQueueFullError(
+                f"配信キューが満杯です（{self.max_size}件, {self.enqueue_timeout}秒待機）"
+            ) from e
+        except BaseException:
+            self._complete_task(ticket)
+            raise
+
+        self._track(ticket)
+        logger.info(
+            f"配信キューに投入: ticket_id={ticket.ticket_id}, pending={self.pending}"
+        )
+        return ticket
+
+    async def _put(self, item: tuple[DeliveryTicket, Any, contextvars.Context]) -> None:
+        """キューに投入（キューと同じイベントループ上で実行）"""
+        assert self._queue is not None
+        await asyncio.wait_for(self._queue.put(item), timeout=self.enqueue_timeout)
+
+    def get_ticket(self, ticket_id: str) -> DeliveryTicket | None:
+        """チケットIDから配信状況を取得"""
+        return self._tickets.get(ticket_id)
+
+    def _begin_task(self, ticket: DeliveryTicket) -> None:
+        """配信を非同期タスクとして登録（配信完了まで /ping が HealthyBusy を返す）"""
+        if self.task_tracker is not None:
+            self._task_ids[ticket.ticket_id] = self.task_tracker.add_async_task(
+                "teams_delivery", {"ticket_id": ticket.ticket_id}
+            )
+
+    def _complete_task(self, ticket: DeliveryTicket) -> None:
+        """登録した非同期タスクを完了にする"""
+        task_id = self._task_ids.pop(ticket.ticket_id, None)
+        if task_id is not None and self.task_tracker is not None:
+            self.task_tracker.complete_async_task(task_id)
+
+    def _track(self, ticket: DeliveryTicket) -> None:
+        """チケットを保持（上限を超えたら古いものから破棄）"""
+        self._tickets[ticket.ticket_id] = ticket
+        while len(self._tickets) > MAX_TRACKED_TICKETS:
+            self._tickets.popitem(last=False)
+
+    async def _worker(self) -> None:
+        """キューから配信を取り出して送信するワーカー"""
+        assert self._queue is not None
+        queue = self._queue
+        while True:
+            ticket, agent_output, context = await queue.get()
+            ticket.status = "sending"
+            try:
+                await asyncio.create_task(self.send(agent_output), context=context)
+                ticket.status = "delivered"
+                logger.info(f"バックグラウンド配信完了: ticket_id={ticket.ticket_id}")
+            except Exception as e:
+                # 配信失敗でもワーカーは継続（他の配信に影響させない）
+                ticket.status = "failed"
+                ticket.error = str(e)
+                logger.warning(
+                    f"バックグラウンド配信失敗: ticket_id={ticket.ticket_id}, error={e}"
+                )
+            finally:
+                ticket.completed_at = time.time()
+                self._complete_task(ticket)
+                queue.task_done()
+
+    async def drain(self, timeout: float = DEFAULT_DRAIN_TIMEOUT) -> bool:
+        """キュー内の配信が全て完了するまで待機
+
+        Args:
+            timeout: 最大待機秒数
+
+        Returns:
+            bool: タイムアウト前に全件完了した場合 True
+        """
+        if self._queue is None:
+            return True
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+            return True
+        except TimeoutError:
+            logger.warning(
+                f"配信キューの排出がタイムアウトしました: 残り{self.pending}件"
+            )
+            return False
+
+    async def shutdown(self, timeout: float = DEFAULT_DRAIN_TIMEOUT) -> bool:
+        """新規投入を停止し、残りの配信を排出してからワーカーを停止
+
+        キューが別スレッドのイベントループ上で動作している場合は、
+        そのループ上で排出処理を実行します。
+
+        Args:
+            timeout: 排出の最大待機秒数
+
+        Returns:
+            bool: 全件配信が完了した場合 True
+        """
+        self._closed = True
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return True
+
+        if loop is asyncio.get_running_loop():
+            return await self._shutdown(timeout)
+
+        future = asyncio.run_coroutine_threadsafe(self._shutdown(timeout), loop)
+        return await asyncio.wrap_future(future)
+
+    async def _shutdown(self, timeout: float) -> bool:
+        """シャットダウン本体（キューと同じイベントループ上で実行）"""
+        drained = await self.drain(timeout)
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        logger.info(f"配信キュー停止: drained={drained}")
+        return drained
@@ -3,14 +3,40 @@
 AgentCore Memory クライアント
 
 bedrock_agentcore.memory.MemoryClient を活用したシンプルな実装。
+
+履歴の圧縮（コンパクション）:
+- 学習分野の生イベントを、分野ごとの件数と最終使用日を持つ要約イベント1件に畳み込む
+- 要約は試験ごとの別セッション（summary-{exam_type}）にバージョン付きで書き込み、最新の要約が有効
+- 要約には畳み込んだ最後のイベント時刻（watermark）を持たせ、読み出し側は
+  「最新の要約 + watermark より新しい生イベント」だけを読む
+- 畳み込んだ生イベントは要約の書き込み成功後に削除する（削除に失敗しても watermark 以前のため二重計上しない）
+
+障害時の保護:
+- Memory API の呼び出しは全てサーキットブレーカー（circuit_breaker）を経由し、呼び出し単位の期限を設ける
+- 呼び出し期限（deadline）が設定されている場合は、Memory フェーズの予算を呼び出しの期限の上限にする
+- 連続失敗で回路が開いている間は Memory を呼び出さず、プロセス内の履歴キャッシュ
+  （最後に取得できた学習分野と、その後に記録した学習分野）にフォールバックする
 """
 
+import json
 import logging
-from datetime import datetime
+from collections.abc import Callable
+from datetime import UTC, datetime, timedelta
 from typing import Any
 
 from bedrock_agentcore.memory import MemoryClient
 
+try:
+    # AgentCore環境では相対インポートが必要
+    from circuit_breaker import CircuitBreaker, circuit_breakers
+    from deadline import phase_timeout
+    from tracing import record_error, set_attributes, span
+except ImportError:
+    # ローカル環境（テスト・開発）では絶対インポートが必要
+    from app.agentcore.circuit_breaker import CircuitBreaker, circuit_breakers
+    from app.agentcore.deadline import phase_timeout
+    from app.agentcore.tracing import record_error, set_attributes, span
+
 logger = logging.getLogger(__name__)
 
 # Memory設定定数
@@ -21,6 +47,49 @@ logger = logging.getLogger(__name__)
 # - API制限考慮: AgentCore Memory API最大100件まで取得可能
 DEFAULT_MAX_RESULTS = 50
 
+# 履歴の圧縮設定定数
+# - 要約セッション: 学習分野履歴のセッション（exam_type）と分離する
+# - 取得上限: 要約は圧縮ごとに1件（30日で自動削除）のため1ページ分を読む。
+#   圧縮時は MemoryClient のページングで溜まった生イベントをまとめて取得する
+# - 保持期間: 要約内の分野も Memory の自動削除（30日）と同じ期間で失効させる
+HISTORY_ACTOR_ID = "cloud-copass-agent"
+SUMMARY_SESSION_PREFIX = "summary-"
+SUMMARY_VERSION = 1
+SUMMARY_MAX_EVENTS = 100
+COMPACTION_MAX_EVENTS = 1000
+HISTORY_WINDOW_DAYS = 30
+
+# サーキットブレーカーの依存先名（circuit_breakers のキー、CIRCUIT_BREAKERS の設定キー）
+MEMORY_BREAKER_NAME = "memory"
+
+
+def _event_texts(event: dict[str, Any]) -> list[str]:
+    """イベントの payload から USER ロールのテキストを取り出す"""
+    texts = []
+    for item in event.get("payload", []):
+        if "conversational" in item:
+            content = item["conversational"].get("content", {})
+            text = content.get("text", "")
+            role = item["conversational"].get("role", "")
+            if role == "USER" and text:
+                texts.append(text)
+    return texts
+
+
+def _event_time(event: dict[str, Any]) -> float | None:
+    """イベント時刻（エポック秒、取得できない場合は None）"""
+    timestamp = event.get("eventTimestamp")
+    if isinstance(timestamp, datetime):
+        return timestamp.timestamp()
+    if isinstance(timestamp, int | float):
+        return float(timestamp)
+    return None
+
+
+def _summary_order(summary: dict[str, Any]) -> tuple[float, str]:
+    """要約の新しさ（watermark、同じ場合は compacted_at で比較）"""
+    return (summary.get("watermark") or 0.0, summary.get("compacted_at") or "")
+
 
 class DomainMemoryClient:
     """AgentCore Memory API クライアント
@@ -28,23 +97,42 @@ class DomainMemoryClient:
     bedrock_agentcore.memory.MemoryClient を活用したシンプルな実装。
     """
 
-    def __init__(self, memory_id: str, region_name: str = "us-east-1") -> None:
+    def __init__(
+        self,
+        memory_id: str,
+        region_name: str = "us-east-1",
+        breaker: CircuitBreaker | None = None,
+    ) -> None:
         """Memory クライアントを初期化
 
         Args:
             memory_id: AgentCore Memory リソースID
             region_name: AWS リージョン（デフォルト: us-east-1）
+            breaker: サーキットブレーカー（デフォルト: プロセス共有の "memory"）
         """
         self.memory_id = memory_id
         self.region_name = region_name
 
         # bedrock_agentcore の MemoryClient を使用
         self.client = MemoryClient(region_name=region_name)
+        self.breaker = breaker or circuit_breakers.get(MEMORY_BREAKER_NAME)
+
+        # 試験タイプ -> 最近の学習分野（Memory 障害時のフォールバック用、新しい順）
+        self._local_history: dict[str, list[str]] = {}
 
         logger.info(
             f"AgentCore Memory クライアント初期化完了: memory_id={memory_id}, region={region_name}"
         )
 
+    async def _call(self, func: Callable[..., Any], **kwargs: Any) -> Any:
+        """Memory API をサーキットブレーカー経由で呼び出す（期限は Memory フェーズの予算以内）
+
+        Raises:
+            DeadlineExceededError: 呼び出し期限の Memory フェーズの予算を使い切っている場合
+        """
+        timeout = phase_timeout("memory", default=self.breaker.call_timeout)
+        return await self.breaker.call(func, timeout=timeout, **kwargs)
+
     async def create_event(
         self, actor_id: str, session_id: str, learning_domain: str
     ) -> dict[str, Any]:
@@ -59,6 +147,8 @@ class DomainMemoryClient:
             CreateEvent API のレスポンス
 
         Raises:
+            CircuitOpenError: サーキットブレーカーの回路が開いている場合
+            TimeoutError: 呼び出し期限を超えた場合（DeadlineExceededError を含む）
             Exception: API 呼び出しに失敗した場合
         """
         try:
@@ -66,7 +156,8 @@ class DomainMemoryClient:
             # シンプルに学習分野名のみを記録
             messages = [(learning_domain, "USER")]
 
-            response = self.client.create_event(
+            response: dict[str, Any] = await self._call(
+                self.client.create_event,
                 memory_id=self.memory_id,
                 actor_id=actor_id,
                 session_id=session_id,
@@ -97,6 +188,8 @@ class DomainMemoryClient:
             イベントのリスト（Memory設定により30日以内のイベントのみ）
 
         Raises:
+            CircuitOpenError: サーキットブレーカーの回路が開いている場合
+            TimeoutError: 呼び出し期限を超えた場合（DeadlineExceededError を含む）
             Exception: API 呼び出しに失敗した場合
 
         Note:
@@ -107,7 +200,8 @@ class DomainMemoryClient:
         try:
             # bedrock_agentcore.memory.MemoryClient の list_events を使用
             # Memory設定により30日以内のイベントのみ取得される
-            events = self.client.list_events(
+            events: list[dict[str, Any]] = await self._call(
+                self.client.list_events,
                 memory_id=self.memory_id,
                 actor_id=actor_id,
                 session_id=session_id,
@@ -134,41 +228,221 @@ class DomainMemoryClient:
             最近使用された学習分野のリスト（重複なし、30日以内）
 
         Note:
-            Memory設定により30日経過後のイベントは自動削除されるため、
-            取得されるイベントは全て30日以内のものとなる。
+            最新の要約イベントと、その watermark より新しい生イベントのみを読む。
+            生イベントは新しい順、要約内の分野は最終使用日の新しい順に並べる。
+            Memory設定により30日経過後の生イベントは自動削除され、
+            要約内の分野も最終使用日から30日経過したものは除外する。
+            Memory から取得できない場合（回路が開いている場合を含む）は
+            プロセス内の履歴キャッシュを返す。
         """
-        try:
-            actor_id = "cloud-copass-agent"
-            session_id = exam_type
+        with span("memory.get_recent_domains", {"exam_type": exam_type}):
+            try:
+                try:
+                    summary = await self.get_history_summary(exam_type)
+                except Exception as e:
+                    logger.warning(f"履歴の要約取得に失敗（生イベントのみで継続）: {e}")
+                    summary = None
+                watermark = summary["watermark"] if summary else None
+
+                events = await self.list_events(
+                    actor_id=HISTORY_ACTOR_ID,
+                    session_id=exam_type,
+                    max_results=DEFAULT_MAX_RESULTS,
+                )
+
+                # 学習分野を抽出（重複除去）
+                # list_events は時系列順（古い順）で返すため、イベント時刻の新しい順に並べ替える
+                # （時刻のないイベントは末尾）
+                events = sorted(
+                    events,
+                    key=lambda event: _event_time(event) or 0.0,
+                    reverse=True,
+                )
+                recent_domains = []
+                for event in events:
+                    event_time = _event_time(event)
+                    if watermark is not None and event_time is not None:
+                        if event_time <= watermark:
+                            continue  # 要約に畳み込み済み
+                    for text in _event_texts(event):
+                        if text not in recent_domains:
+                            recent_domains.append(text)
+                        break
+
+                if summary:
+                    oldest = (
+                        datetime.now(UTC) - timedelta(days=HISTORY_WINDOW_DAYS)
+                    ).date()
+                    last_seen: dict[str, str] = summary["last_seen"]
+                    for domain in sorted(
+                        last_seen, key=last_seen.__getitem__, reverse=True
+                    ):
+                        if (
+                            domain not in recent_domains
+                            and last_seen[domain] >= oldest.isoformat()
+                        ):
+                            recent_domains.append(domain)
+
+                logger.info(
+                    f"最近の学習分野取得: exam_type={exam_type}, domains={recent_domains}"
+                )
+                self._local_history[exam_type] = recent_domains[:DEFAULT_MAX_RESULTS]
+                set_attributes(
+                    {
+                        "memory.domain_count": len(recent_domains),
+                        "memory.fallback": False,
+                    }
+                )
+                return recent_domains
+
+            except Exception as e:
+                # エラー時は履歴キャッシュ（未取得なら空リスト）を返して処理継続
+                cached = list(self._local_history.get(exam_type, []))
+                logger.warning(
+                    f"最近の学習分野取得に失敗（履歴キャッシュで処理継続）: {e}, domains={cached}"
+                )
+                record_error(e)
+                set_attributes(
+                    {"memory.domain_count": len(cached), "memory.fallback": True}
+                )
+                return cached
+
+    @staticmethod
+    def summary_session_id(exam_type: str) -> str:
+        """要約イベントを保持するセッションID"""
+        return f"{SUMMARY_SESSION_PREFIX}{exam_type}"
+
+    async def get_history_summary(self, exam_type: str) -> dict[str, Any] | None:
+        """最新の要約イベントを取得
 
-            events = await self.list_events(
-                actor_id=actor_id,
-                session_id=session_id,
-                max_results=DEFAULT_MAX_RESULTS,
-            )
+        Args:
+            exam_type: 試験タイプ
 
-            # 学習分野を抽出（重複除去）
-            recent_domains = []
-            for event in events:
-                # payload から学習分野を取得
-                payload = event.get("payload", [])
-                for item in payload:
-                    if "conversational" in item:
-                        content = item["conversational"].get("content", {})
-                        text = content.get("text", "")
-                        role = item["conversational"].get("role", "")
-                        if role == "USER" and text and text not in recent_domains:
-                            recent_domains.append(text)
-                            break
+        Returns:
+            要約（version, compacted_at, watermark, event_count, counts, last_seen）。
+            要約が存在しない場合は None
 
-            logger.info(
-                f"最近の学習分野取得: exam_type={exam_type}, domains={recent_domains}"
+        Raises:
+            Exception: 要約セッションの取得に失敗した場合（「要約なし」とは区別する）
+
+        Note:
+            list_events の返却順（時系列順）には依存せず、watermark・compacted_at が
+            最も新しい現行バージョンの要約を採用する。
+        """
+        events = await self.list_events(
+            actor_id=HISTORY_ACTOR_ID,
+            session_id=self.summary_session_id(exam_type),
+            max_results=SUMMARY_MAX_EVENTS,
+        )
+
+        latest: dict[str, Any] | None = None
+        for event in events:
+            for text in _event_texts(event):
+                try:
+                    summary = json.loads(text)
+                except json.JSONDecodeError:
+                    continue
+                if not (
+                    isinstance(summary, dict)
+                    and summary.get("version") == SUMMARY_VERSION
+                ):
+                    continue
+                if latest is None or _summary_order(summary) > _summary_order(latest):
+                    latest = summary
+        return latest
+
+    async def compact_history(
+        self, exam_type: str, now: datetime | None = None
+    ) -> dict[str, Any]:
+        """学習分野の生イベントを要約イベントに畳み込む
+
+        Args:
+            exam_type: 試験タイプ
+            now: 基準時刻（テスト用、デフォルト: 現在時刻）
+
+        Returns:
+            {"summary": 新しい要約, "folded": 畳み込んだ件数, "deleted": 削除した件数}
+
+        Raises:
+            Exception: 要約・生イベントの取得、要約の書き込みに失敗した場合（生イベントは削除しない）
+        """
+        now = now or datetime.now(UTC)
+        previous = await self.get_history_summary(exam_type)
+        watermark: float | None = previous["watermark"] if previous else None
+        counts: dict[str, int] = dict(previous["counts"]) if previous else {}
+        last_seen: dict[str, str] = dict(previous["last_seen"]) if previous else {}
+        event_count: int = previous["event_count"] if previous else 0
+
+        events = await self.list_events(
+            actor_id=HISTORY_ACTOR_ID,
+            session_id=exam_type,
+            max_results=COMPACTION_MAX_EVENTS,
+        )
+
+        # watermark より新しいイベントを畳み込み、以前のイベントは削除のみ行う
+        # （前回の圧縮で削除に失敗したイベント）
+        folded = 0
+        stale: list[dict[str, Any]] = []
+        new_watermark = watermark
+        for event in events:
+            event_time = _event_time(event)
+            if event_time is None:
+                continue
+            stale.append(event)
+            if watermark is not None and event_time <= watermark:
+                continue
+            day = datetime.fromtimestamp(event_time, UTC).date().isoformat()
+            for text in _event_texts(event)[:1]:
+                counts[text] = counts.get(text, 0) + 1
+                last_seen[text] = max(last_seen.get(text, day), day)
+            folded += 1
+            new_watermark = max(new_watermark or event_time, event_time)
+
+        # 保持期間を過ぎた分野は要約からも除外する
+        oldest = (now - timedelta(days=HISTORY_WINDOW_DAYS)).date().isoformat()
+        for domain in [domain for domain, day in last_seen.items() if day < oldest]:
+            del last_seen[domain]
+            counts.pop(domain, None)
+
+        summary = {
+            "version": SUMMARY_VERSION,
+            "compacted_at": now.isoformat(),
+            "watermark": new_watermark,
+            "event_count": event_count + folded,
+            "counts": counts,
+            "last_seen": last_seen,
+        }
+        if folded or previous is None:
+            await self._call(
+                self.client.create_event,
+                memory_id=self.memory_id,
+                actor_id=HISTORY_ACTOR_ID,
+                session_id=self.summary_session_id(exam_type),
+                messages=[(json.dumps(summary, ensure_ascii=False), "USER")],
+                event_timestamp=now,
             )
-            return recent_domains
 
-        except Exception as e:
-            logger.warning(f"最近の学習分野取得に失敗（処理継続）: {e}")
-            return []  # エラー時は空リストを返して処理継続
+        deleted = 0
+        for event in stale:
+            try:
+                await self._call(
+                    # MemoryClient は delete_event を持たないため、データプレーンの boto クライアントを呼ぶ
+                    self.client.gmdp_client.delete_event,
+                    memoryId=self.memory_id,
+                    sessionId=exam_type,
+                    eventId=event["eventId"],
+                    actorId=HISTORY_ACTOR_ID,
+                )
+                deleted += 1
+            except Exception as e:
+                logger.warning(
+                    f"畳み込み済みイベントの削除に失敗（次回の圧縮で再試行）: {event.get('eventId')}: {e}"
+                )
+
+        logger.info(
+            f"学習分野履歴の圧縮完了: exam_type={exam_type}, 畳み込み={folded}件, 削除={deleted}件"
+        )
+        return {"summary": summary, "folded": folded, "deleted": deleted}
 
     async def record_domain_usage(self, learning_domain: str, exam_type: str) -> None:
         """学習分野の使用を記録
@@ -177,17 +451,26 @@ class DomainMemoryClient:
             learning_domain: 使用した学習分野
             exam_type: 試験タイプ
         """
-        try:
-            actor_id = "cloud-copass-agent"
-            session_id = exam_type
-
-            await self.create_event(
-                actor_id=actor_id,
-                session_id=session_id,
-                learning_domain=learning_domain,
-            )
-            # ログは create_event メソッド内で出力されるため、ここでは不要
-
-        except Exception as e:
-            logger.warning(f"学習分野使用記録に失敗（処理継続）: {e}")
-            # エラーが発生しても問題生成処理は継続する
+        # Memory への記録の成否によらず、フォールバック用の履歴キャッシュに反映する
+        history = self._local_history.setdefault(exam_type, [])
+        if learning_domain in history:
+            history.remove(learning_domain)
+        history.insert(0, learning_domain)
+        del history[DEFAULT_MAX_RESULTS:]
+
+        with span(
+            "memory.record_domain_usage",
+            {"exam_type": exam_type, "learning_domain": learning_domain},
+        ):
+            try:
+                await self.create_event(
+                    actor_id=HISTORY_ACTOR_ID,
+                    session_id=exam_type,
+                    learning_domain=learning_domain,
+                )
+                # ログは create_event メソッド内で出力されるため、ここでは不要
+
+            except Exception as e:
+                logger.warning(f"学習分野使用記録に失敗（処理継続）: {e}")
+                record_error(e)
+                # エラーが発生しても問題生成処理は継続する
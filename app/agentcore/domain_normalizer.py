@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+学習分野ノーマライザー - 自由記述の learning_domain を試験ガイドの分野・タスクIDに正規化
+
+モデルが返す learning_domain は自由な日本語のため、わずかな表記の違いで
+同じ分野が Memory 上で別の分野として記録され、ジャンル分散の集計が崩れます。
+試験ガイドの索引から分野・タスクの正規名を引き、コンパクトなID（D1、D1/T1.4）に変換します。
+
+設計判断:
+- 照合は「ID・接頭辞の番号」→「正規化キーの完全一致」→「文字バイグラムの類似度」の順に行い、
+  最初に確定した結果を採用する
+- 類似度は文字バイグラムの Dice 係数を使う（日本語でも分かち書き不要、分野・タスク数は数十件）
+- 照合結果は入力テキストごとにキャッシュする（同じ表記が繰り返し現れるため）
+- Memory にはコンパクトIDを記録し、読み出し時は既存の自由記述イベントも同じIDに正規化する
+"""
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Literal
+
+try:
+    # AgentCore環境では相対インポートが必要
+    from exam_guide_index import ExamGuideIndex, load_exam_guide_index, normalize_name
+except ImportError:
+    # ローカル環境（テスト・開発）では絶対インポートが必要
+    from app.agentcore.exam_guide_index import (
+        ExamGuideIndex,
+        load_exam_guide_index,
+        normalize_name,
+    )
+
+# 照合設定定数
+# - しきい値: 助詞・語尾の違い程度は同一とみなし、別の分野名とは区別できる値
+# - キャッシュ上限: 試験ごとの表記揺れの種類を十分カバーする件数
+DEFAULT_SIMILARITY_THRESHOLD = 0.5
+MAX_CACHE_ENTRIES = 1024
+
+# コンパクトID（"D1" または "D1/T1.4"）
+_COMPACT_ID = re.compile(r"^(D\d+)(?:/(T\d+\.\d+))?$")
+_TASK_NUMBER = re.compile(r"タスク\s*(\d+)\s*\.\s*(\d+)")
+_DOMAIN_NUMBER = re.compile(r"(?:コンテンツ)?分野\s*(\d+)")
+_NUMBER_PREFIX = re.compile(r"^(?:(?:コンテンツ)?分野|タスク)\s*[\d.]+\s*[:：]?\s*")
+
+MatchMethod = Literal["id", "exact", "fuzzy"]
+
+
+@dataclass(frozen=True)
+class DomainMatch:
+    """正規化結果"""
+
+    domain_id: str
+    task_id: str | None
+    method: MatchMethod
+    score: float = 1.0
+
+    @property
+    def compact_id(self) -> str:
+        """Memory に記録するコンパクトID"""
+        return f"{self.domain_id}/{self.task_id}" if self.task_id else self.domain_id
+
+
+def _bigrams(key: str) -> set[str]:
+    """文字バイグラムの集合"""
+    if len(key) < 2:
+        return {key} if key else set()
+    return {key[i : i + 2] for i in range(len(key) - 1)}
+
+
+def _dice(a: set[str], b: set[str]) -> float:
+    """Dice 係数"""
+    if not a or not b:
+        return 0.0
+    return 2 * len(a & b) / (len(a) + len(b))
+
+
+class DomainNormalizer:
+    """学習分野ノーマライザー"""
+
+    def __init__(
+        self,
+        guide_index: ExamGuideIndex,
+        similarity_threshold: float = DEFAULT_SIMILARITY_THRESHOLD,
+    ) -> None:
+        """
+        Args:
+            guide_index: 試験ガイドの索引
+            similarity_threshold: 類似度による照合を採用する Dice 係数の下限
+        """
+        self.guide_index = guide_index
+        self.similarity_threshold = similarity_threshold
+        self._cache: dict[str, DomainMatch | None] = {}
+
+        # 正規化キー -> (分野ID, タスクID)
+        self._exact: dict[str, tuple[str, str | None]] = {}
+        self._grams: list[tuple[set[str], str, str | None]] = []
+        for domain in guide_index.domains.values():
+            key = normalize_name(domain.name)
+            self._exact[key] = (domain.id, None)
+            self._grams.append((_bigrams(key), domain.id, None))
+        for task in guide_index.tasks.values():
+            key = normalize_name(task.name)
+            self._exact.setdefault(key, (task.domain_id, task.id))
+            self._grams.append((_bigrams(key), task.domain_id, task.id))
+
+    def resolve(self, text: str) -> DomainMatch | None:
+        """自由記述・コンパクトIDを分野・タスクIDに正規化（確定できない場合は None）"""
+        if text in self._cache:
+            return self._cache[text]
+
+        match = self._resolve(text)
+        if len(self._cache) >= MAX_CACHE_ENTRIES:
+            self._cache.clear()
+        self._cache[text] = match
+        return match
+
+    def compact_id(self, text: str) -> str:
+        """Memory に記録する値（確定できない場合は元のテキスト）"""
+        match = self.resolve(text)
+        return match.compact_id if match else text
+
+    def domain_name(self, text: str) -> str:
+        """分野の正規名（確定できない場合は元のテキスト）"""
+        match = self.resolve(text)
+        return self.guide_index.domains[match.domain_id].name if match else text
+
+    def task_ids(self, text: str) -> list[str]:
+        """テキスト中で言及されたタスクID（「タスク 1.4」等の表記、重複なし・出現順）"""
+        found: list[str] = []
+        for match in _TASK_NUMBER.finditer(text):
+            task_id = f"T{match.group(1)}.{match.group(2)}"
+            if task_id in self.guide_index.tasks and task_id not in found:
+                found.append(task_id)
+        return found
+
+    def _resolve(self, text: str) -> DomainMatch | None:
+        """照合の本体（ID → 番号 → 完全一致 → 類似度）"""
+        stripped = text.strip()
+        if match := _COMPACT_ID.match(stripped):
+            domain_id, task_id = match.group(1), match.group(2)
+            if domain_id in self.guide_index.domains and (
+                task_id is None or task_id in self.guide_index.tasks
+            ):
+                return DomainMatch(domain_id, task_id, "id")
+
+        if match := _TASK_NUMBER.search(stripped):
+            task_id = f"T{match.group(1)}.{match.group(2)}"
+            if task_id in self.guide_index.tasks:
+                task = self.guide_index.tasks[task_id]
+                return DomainMatch(task.domain_id, task_id, "id")
+        if match := _DOMAIN_NUMBER.search(stripped):
+            domain_id = f"D{match.group(1)}"
+            if domain_id in self.guide_index.domains:
+                return DomainMatch(domain_id, None, "id")
+
+        key = normalize_name(_NUMBER_PREFIX.sub("", stripped))
+        if key in self._exact:
+            domain_id, exact_task_id = self._exact[key]
+            return DomainMatch(domain_id, exact_task_id, "exact")
+
+        grams = _bigrams(key)
+        best: DomainMatch | None = None
+        for candidate, domain_id, task_id in self._grams:
+            score = _dice(grams, candidate)
+            if score >= self.similarity_threshold and (
+                best is None or score > best.score
+            ):
+                best = DomainMatch(domain_id, task_id, "fuzzy", score)
+        return best
+
+
+@lru_cache(maxsize=8)
+def get_domain_normalizer(exam_type: str) -> DomainNormalizer:
+    """試験ごとのノーマライザー（プロセス内でキャッシュ）
+
+    Raises:
+        FileNotFoundError: 指定された試験ガイドファイルが存在しない場合
+    """
+    return DomainNormalizer(load_exam_guide_index(exam_type))
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+試験ガイドインデックス - 試験ガイド（Markdown）の構造化
+
+試験ガイドをプロンプトに埋め込むだけでなく、コンテンツ分野・タスク・範囲内/範囲外の
+AWS サービスをローカルで参照できるよう、見出し構造から索引を作成します。
+生成された問題の検証（学習分野が実在するか等）に使います。
+
+設計判断:
+- 解析は見出しの書式（「## コンテンツ分野 1: …」「### タスク 1.1: …」「#### カテゴリ」）に依存し、
+  正規表現1パスで行う（ガイドは数百行のため十分高速）
+- 分野・タスクには短いID（D1、T1.1）を付与し、名前は表記揺れを吸収した正規化キーで引く
+- 試験ごとの索引はプロセス内でキャッシュし、呼び出しのたびにファイルを解析しない
+"""
+
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+
+# 試験ガイドの格納ディレクトリ（agent_main.load_exam_guide と同じ命名ルール）
+EXAM_RESOURCES_DIR = Path(__file__).parent / "exam_resources"
+
+_DOMAIN_HEADING = re.compile(r"^## コンテンツ分野 (\d+)\s*[:：]\s*(.+?)\s*$")
+_TASK_HEADING = re.compile(r"^### タスク (\d+)\.(\d+)\s*[:：]\s*(.+?)\s*$")
+_DOMAIN_WEIGHT = re.compile(
+    r"^- \*\*コンテンツ分野 (\d+)\*\*\s*[:：].*?(\d+)\s*%\)?\s*$"
+)
+_CATEGORY_HEADING = re.compile(r"^#### (.+?)\s*$")
+_LIST_ITEM = re.compile(r"^- (.+?)\s*$")
+_DOMAIN_PREFIX = re.compile(r"^(コンテンツ)?分野\s*\d+\s*[:：]\s*")
+_REMOVE_PATTERN = re.compile(r"[\s\W_]+", re.UNICODE)
+
+
+def normalize_name(name: str) -> str:
+    """名前の照合用キー（NFKC・小文字化・空白と記号の除去）"""
+    return _REMOVE_PATTERN.sub("", unicodedata.normalize("NFKC", name).lower())
+
+
+@dataclass(frozen=True)
+class GuideDomain:
+    """コンテンツ分野"""
+
+    id: str
+    name: str
+    weight_percent: int | None = None
+
+
+@dataclass(frozen=True)
+class GuideTask:
+    """タスク"""
+
+    id: str
+    domain_id: str
+    name: str
+
+
+@dataclass
+class ExamGuideIndex:
+    """試験ガイドの索引"""
+
+    exam_type: str
+    domains: dict[str, GuideDomain] = field(default_factory=dict)
+    tasks: dict[str, GuideTask] = field(default_factory=dict)
+    in_scope_services: dict[str, list[str]] = field(default_factory=dict)
+    out_of_scope_services: dict[str, list[str]] = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        self._domain_keys = {
+            normalize_name(domain.name): domain for domain in self.domains.values()
+        }
+
+    @property
+    def domain_names(self) -> list[str]:
+        """コンテンツ分野名の一覧（ID順）"""
+        return [domain.name for domain in self.domains.values()]
+
+    def find_domain(self, name: str) -> GuideDomain | None:
+        """表記揺れ（空白・記号・「コンテンツ分野 1:」の接頭辞）を吸収して分野を検索"""
+        return self._domain_keys.get(normalize_name(_DOMAIN_PREFIX.sub("", name)))
+
+
+def parse_exam_guide(content: str, exam_type: str) -> ExamGuideIndex:
+    """試験ガイドの Markdown を解析して索引を作成
+
+    Args:
+        content: 試験ガイドの内容
+        exam_type: 試験タイプ
+
+    Returns:
+        ExamGuideIndex: 試験ガイドの索引
+    """
+    weights: dict[str, int] = {}
+    domains: list[tuple[str, str]] = []
+    tasks: dict[str, GuideTask] = {}
+    in_scope: dict[str, list[str]] = {}
+    out_of_scope: dict[str, list[str]] = {}
+
+    services: dict[str, list[str]] | None = None
+    category: list[str] | None = None
+    for line in content.splitlines():
+        if match := _DOMAIN_WEIGHT.match(line):
+            weights[f"D{match.group(1)}"] = int(match.group(2))
+        elif match := _DOMAIN_HEADING.match(line):
+            domains.append((f"D{match.group(1)}", match.group(2)))
+            services = None
+        elif match := _TASK_HEADING.match(line):
+            domain_id = f"D{match.group(1)}"
+            task_id = f"T{match.group(1)}.{match.group(2)}"
+            tasks[task_id] = GuideTask(
+                id=task_id, domain_id=domain_id, name=match.group(3)
+            )
+        elif line.startswith("### 範囲内の AWS のサービス"):
+            services, category = in_scope, None
+        elif line.startswith("### 範囲外の AWS のサービス"):
+            services, category = out_of_scope, None
+        elif line.startswith(("## ", "### ")):
+            services, category = None, None
+        elif services is not None and (match := _CATEGORY_HEADING.match(line)):
+            category = services.setdefault(match.group(1), [])
+        elif category is not None and (match := _LIST_ITEM.match(line)):
+            category.append(match.group(1))
+
+    return ExamGuideIndex(
+        exam_type=exam_type,
+        domains={
+            domain_id: GuideDomain(
+                id=domain_id, name=name, weight_percent=weights.get(domain_id)
+            )
+            for domain_id, name in domains
+        },
+        tasks=tasks,
+        in_scope_services=in_scope,
+        out_of_scope_services=out_of_scope,
+    )
+
+
+@lru_cache(maxsize=8)
+def load_exam_guide_index(exam_type: str) -> ExamGuideIndex:
+    """試験ガイドファイルを読み込んで索引を作成（試験ごとにキャッシュ）
+
+    Raises:
+        FileNotFoundError: 指定された試験ガイドファイルが存在しない場合
+    """
+    guide_path = EXAM_RESOURCES_DIR / f"{exam_type}-guide.md"
+    return parse_exam_guide(guide_path.read_text(encoding="utf-8"), exam_type)
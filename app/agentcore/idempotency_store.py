@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+冪等性ストア - スケジューラー再試行による二重生成の防止
+
+EventBridge Scheduler の再試行や Lambda 非同期呼び出しの再試行で同じ実行が
+再トリガーされた場合に、問題を再生成・再投稿せず前回の結果を返すための記録を保持します。
+
+設計判断:
+- キーはトリガー Lambda がスケジュール時刻とターゲットから導出した実行キー（run_key）
+- begin() で「実行中」を登録し、既に実行中・完了済みの記録があればそれを返す。
+  呼び出し側は記録が返された場合に生成をスキップする
+- 実行中の記録は生成時間（最大300秒）を十分に超える期限で失効し、
+  異常終了した実行の再試行を妨げない
+- 失敗した実行は release() で記録を削除し、再試行で再生成できるようにする
+- ローカル代替（LocalIdempotencyStore）はプロセス内の辞書で保持する。
+  同じ runtimeSessionId の再試行は同じセッションに届くため、プロセス内でも重複を検出できる
+- AgentCore Memory 版（MemoryIdempotencyStore）はセッションをまたいで記録を共有する。
+  Memory には条件付き書き込みがないため、同時実行の排他はベストエフォート。
+  Memory API は学習分野履歴と同じサーキットブレーカー（"memory"）を経由してスレッドで呼び出す
+"""
+
+import json
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Literal, Protocol
+
+from bedrock_agentcore.memory import MemoryClient
+
+# AgentCore環境では相対インポートが必要
+try:
+    from circuit_breaker import CircuitBreaker, circuit_breakers
+    from deadline import phase_timeout
+    from domain_memory_client import MEMORY_BREAKER_NAME
+# ローカル環境（テスト・開発）では絶対インポートが必要
+except ImportError:
+    from app.agentcore.circuit_breaker import CircuitBreaker, circuit_breakers
+    from app.agentcore.deadline import phase_timeout
+    from app.agentcore.domain_memory_client import MEMORY_BREAKER_NAME
+
+logger = logging.getLogger(__name__)
+
+# 冪等性ストア設定定数
+# - 完了済みの記録: スケジューラーの再試行期間（MaximumEventAgeInSeconds=3600）を十分カバー
+# - 実行中の記録: 生成時間（最大300秒）+ Teams 投稿を超える期限で失効させる
+# - ローカル代替の保持上限: 1日数回の実行を想定し、古い記録から破棄
+DEFAULT_COMPLETED_TTL_SECONDS = 24 * 60 * 60
+DEFAULT_IN_PROGRESS_TTL_SECONDS = 15 * 60
+MAX_LOCAL_RECORDS = 1000
+
+# Memory 上の記録に使うアクター（学習分野履歴と同じアクター、セッションで区別する）
+IDEMPOTENCY_ACTOR_ID = "cloud-copass-agent"
+# 実行キーごとの記録は再試行のたびに追記されるため、1ページ分をまとめて読む
+IDEMPOTENCY_MAX_EVENTS = 100
+
+RecordStatus = Literal["in_progress", "completed", "released"]
+
+
+@dataclass
+class IdempotencyRecord:
+    """実行キーの記録"""
+
+    run_key: str
+    status: RecordStatus = "in_progress"
+    created_at: float = field(default_factory=time.time)
+    completed_at: float | None = None
+    result: dict[str, Any] | None = None
+
+    def is_expired(
+        self,
+        now: float,
+        completed_ttl: float = DEFAULT_COMPLETED_TTL_SECONDS,
+        in_progress_ttl: float = DEFAULT_IN_PROGRESS_TTL_SECONDS,
+    ) -> bool:
+        """記録が期限切れかどうか（破棄済みの記録は常に期限切れ）"""
+        if self.status == "released":
+            return True
+        if self.status == "completed":
+            return now - (self.completed_at or self.created_at) > completed_ttl
+        return now - self.created_at > in_progress_ttl
+
+
+class IdempotencyStore(Protocol):
+    """冪等性ストアのインターフェース"""
+
+    async def begin(self, run_key: str) -> IdempotencyRecord | None:
+        """実行を開始（有効な記録があればそれを返し、なければ実行中として登録して None を返す）"""
+        ...
+
+    async def complete(self, run_key: str, result: dict[str, Any]) -> None:
+        """実行結果を完了済みとして記録"""
+        ...
+
+    async def release(self, run_key: str) -> None:
+        """実行中の記録を破棄（失敗時、再試行で再生成できるようにする）"""
+        ...
+
+
+class LocalIdempotencyStore:
+    """プロセス内の冪等性ストア（ローカル環境・テスト用の代替実装）"""
+
+    def __init__(
+        self,
+        completed_ttl_seconds: float = DEFAULT_COMPLETED_TTL_SECONDS,
+        in_progress_ttl_seconds: float = DEFAULT_IN_PROGRESS_TTL_SECONDS,
+        max_records: int = MAX_LOCAL_RECORDS,
+    ) -> None:
+        """
+        Args:
+            completed_ttl_seconds: 完了済みの記録の有効期間
+            in_progress_ttl_seconds: 実行中の記録の有効期間
+            max_records: 保持する記録の上限
+        """
+        self.completed_ttl_seconds = completed_ttl_seconds
+        self.in_progress_ttl_seconds = in_progress_ttl_seconds
+        self.max_records = max_records
+        self._records: OrderedDict[str, IdempotencyRecord] = OrderedDict()
+
+    async def begin(self, run_key: str) -> IdempotencyRecord | None:
+        # await を挟まないため、同一イベントループ内では判定と登録が不可分になる
+        existing = self._records.get(run_key)
+        if existing is not None and not existing.is_expired(
+            time.time(), self.completed_ttl_seconds, self.in_progress_ttl_seconds
+        ):
+            return existing
+
+        self._records[run_key] = IdempotencyRecord(run_key=run_key)
+        self._records.move_to_end(run_key)
+        while len(self._records) > self.max_records:
+            self._records.popitem(last=False)
+        return None
+
+    async def complete(self, run_key: str, result: dict[str, Any]) -> None:
+        self._records[run_key] = IdempotencyRecord(
+            run_key=run_key,
+            status="completed",
+            completed_at=time.time(),
+            result=result,
+        )
+        self._records.move_to_end(run_key)
+
+    async def release(self, run_key: str) -> None:
+        self._records.pop(run_key, None)
+
+
+class MemoryIdempotencyStore:
+    """AgentCore Memory を使った冪等性ストア
+
+    実行キーごとのセッションに記録（JSON）をイベントとして追記し、
+    最新のイベントを現在の状態とみなす。
+    """
+
+    def __init__(
+        self,
+        memory_id: str,
+        region_name: str = "us-east-1",
+        completed_ttl_seconds: float = DEFAULT_COMPLETED_TTL_SECONDS,
+        in_progress_ttl_seconds: float = DEFAULT_IN_PROGRESS_TTL_SECONDS,
+        breaker: CircuitBreaker | None = None,
+    ) -> None:
+        """
+        Args:
+            memory_id: AgentCore Memory リソースID
+            region_name: AWS リージョン
+            completed_ttl_seconds: 完了済みの記録の有効期間
+            in_progress_ttl_seconds: 実行中の記録の有効期間
+            breaker: サーキットブレーカー（デフォルト: プロセス共有の "memory"）
+        """
+        self.memory_id = memory_id
+        self.completed_ttl_seconds = completed_ttl_seconds
+        self.in_progress_ttl_seconds = in_progress_ttl_seconds
+        self.client = MemoryClient(region_name=region_name)
+        self.breaker = breaker or circuit_breakers.get(MEMORY_BREAKER_NAME)
+
+    @staticmethod
+    def session_id(run_key: str) -> str:
+        """実行キーの記録を保持するセッションID（学習分野履歴のセッションと分離）"""
+        return f"idempotency-{run_key}"
+
+    async def begin(self, run_key: str) -> IdempotencyRecord | None:
+        existing = await self._latest(run_key)
+        if existing is not None and not existing.is_expired(
+            time.time(), self.completed_ttl_seconds, self.in_progress_ttl_seconds
+        ):
+            return existing
+
+        await self._append(IdempotencyRecord(run_key=run_key))
+        return None
+
+    async def complete(self, run_key: str, result: dict[str, Any]) -> None:
+        await self._append(
+            IdempotencyRecord(
+                run_key=run_key,
+                status="completed",
+                completed_at=time.time(),
+                result=result,
+            )
+        )
+
+    async def release(self, run_key: str) -> None:
+        # Memory のイベントは削除せず、破棄済みの記録を追記して無効化する
+        await self._append(IdempotencyRecord(run_key=run_key, status="released"))
+
+    async def _call(self, func: Callable[..., Any], **kwargs: Any) -> Any:
+        """Memory API をサーキットブレーカー経由で呼び出す（期限は Memory フェーズの予算以内）"""
+        timeout = phase_timeout("memory", default=self.breaker.call_timeout)
+        return await self.breaker.call(func, timeout=timeout, **kwargs)
+
+    async def _append(self, record: IdempotencyRecord) -> None:
+        """記録をイベントとして追記"""
+        await self._call(
+            self.client.create_event,
+            memory_id=self.memory_id,
+            actor_id=IDEMPOTENCY_ACTOR_ID,
+            session_id=self.session_id(record.run_key),
+            messages=[(json.dumps(asdict(record), ensure_ascii=False), "USER")],
+            event_timestamp=datetime.now(),
+        )
+
+    async def _latest(self, run_key: str) -> IdempotencyRecord | None:
+        """実行キーの最新の記録を取得"""
+        events = await self._call(
+            self.client.list_events,
+            memory_id=self.memory_id,
+            actor_id=IDEMPOTENCY_ACTOR_ID,
+            session_id=self.session_id(run_key),
+            max_results=IDEMPOTENCY_MAX_EVENTS,
+            include_payload=True,
+        )
+
+        latest: IdempotencyRecord | None = None
+        for event in events:
+            for item in event.get("payload", []):
+                text = item.get("conversational", {}).get("content", {}).get("text")
+                if not text:
+                    continue
+                try:
+                    record = IdempotencyRecord(**json.loads(text))
+                except (json.JSONDecodeError, TypeError) as e:
+                    logger.warning(f"冪等性記録の解析に失敗（スキップ）: {e}")
+                    continue
+                # list_events は時系列順で返すため、同時刻の場合は後に現れたイベントを優先
+                if latest is None or _record_time(record) >= _record_time(latest):
+                    latest = record
+        return latest
+
+
+def _record_time(record: IdempotencyRecord) -> float:
+    """記録の新しさの比較に使う時刻"""
+    return max(record.created_at, record.completed_at or 0.0)
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+呼び出しメトリクス - invoke 1回分のトークン・レイテンシ・コストの集計
+
+実行1回あたりのコストや、どのフェーズに時間がかかったかを記録していなかったため、
+invoke 単位の集計先を用意し、終了時に1行の構造化レコード（CloudWatch EMF 形式）として出力します。
+
+設計判断:
+- 集計先は deadline と同じく contextvars で伝播する。モデル応答のコールバックは
+  スレッドで実行されるが、コピーされたコンテキストから同じ集計先を参照できる
+- トークン数はモデル応答の metadata イベントの usage から加算する（キャッシュの読み書きを含む）
+- ツール呼び出しは集計しない（生成は structured_output で行い、MCP ツールを経由しない）
+- フェーズのレイテンシは区間の合計（ミリ秒）として記録する（Memory の読み書きは複数回の合計）
+- コストは価格表（100万トークンあたりの USD）による概算。価格表にないモデルはコストを出力しない
+- EMF レコードは標準出力に1行で書き出す（アプリのログは標準エラーに出力されるため混ざらない）
+- トークン予算はモデル呼び出しの前に確認する（呼び出し中の超過は止められないため、超過後の呼び出しを行わない）
+- 出力後の記録は無視する（問題プールの補充など、invoke 後も動くタスクにコンテキストが引き継がれるため）
+"""
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections.abc import Callable, Iterator, Mapping
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, TextIO
+
+try:
+    # AgentCore環境では相対インポートが必要
+    from prompt_cache import PromptUsage, usage_from_event
+except ImportError:
+    # ローカル環境（テスト・開発）では絶対インポートが必要
+    from app.agentcore.prompt_cache import PromptUsage, usage_from_event
+
+logger = logging.getLogger(__name__)
+
+# メトリクス設定定数
+# - 名前空間: CloudWatch メトリクスの名前空間
+# - 価格表: 100万トークンあたりの USD（モデルIDに含まれるキーで照合、MODEL_PRICES で上書き）
+DEFAULT_NAMESPACE = "CloudCoPassAgent"
+DEFAULT_MODEL_PRICES: dict[str, dict[str, float]] = {
+    "claude-sonnet-4-5": {
+        "input": 3.0,
+        "output": 15.0,
+        "cache_read": 0.30,
+        "cache_write": 3.75,
+    },
+}
+
+_current_metrics: ContextVar["InvocationMetrics | None"] = ContextVar(
+    "invocation_metrics", default=None
+)
+
+
+class TokenBudgetExceededError(Exception):
+    """実行1回あたりのトークン予算を使い切った"""
+
+    def __init__(self, used: int, budget: int) -> None:
+        super().__init__(f"トークン予算を超過しました: used={used}, budget={budget}")
+        self.used = used
+        self.budget = budget
+
+
+class InvocationMetrics:
+    """invoke 1回分のメトリクス"""
+
+    def __init__(
+        self,
+        exam_type: str,
+        question_count: int,
+        model_id: str,
+        token_budget: int | None = None,
+        prices: dict[str, dict[str, float]] | None = None,
+        namespace: str = DEFAULT_NAMESPACE,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Args:
+            exam_type: 試験タイプ（メトリクスのディメンション）
+            question_count: 要求された問題数
+            model_id: 生成に使うモデルID（価格表の照合に使用）
+            token_budget: 実行1回あたりのトークン予算（None の場合は無制限）
+            prices: 価格表（100万トークンあたりの USD）
+            namespace: CloudWatch メトリクスの名前空間
+            clock: 単調増加する時刻関数（テスト用に差し替え可能）
+        """
+        self.exam_type = exam_type
+        self.question_count = question_count
+        self.model_id = model_id
+        self.token_budget = token_budget
+        self.prices = prices if prices is not None else DEFAULT_MODEL_PRICES
+        self.namespace = namespace
+        self.usage = PromptUsage()
+        self.phase_ms: dict[str, float] = {}
+        self._clock = clock
+        self._started_at = clock()
+        self._closed = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(
+        cls,
+        exam_type: str,
+        question_count: int,
+        model_id: str,
+        token_budget: int | None = None,
+    ) -> "InvocationMetrics":
+        """ペイロードの指定値、または環境変数から生成
+
+        - INVOCATION_TOKEN_BUDGET: 既定のトークン予算
+        - MODEL_PRICES: 価格表の追加・上書き（JSON）
+        - METRICS_NAMESPACE: CloudWatch メトリクスの名前空間
+        """
+        prices = dict(DEFAULT_MODEL_PRICES)
+        raw_prices = os.getenv("MODEL_PRICES")
+        if raw_prices:
+            try:
+                parsed = json.loads(raw_prices)
+                if not isinstance(parsed, dict):
+                    raise ValueError("JSON オブジェクトではありません")
+                prices.update(parsed)
+            except ValueError as e:
+                logger.warning(f"MODEL_PRICES の解析に失敗（既定値で継続）: {e}")
+
+        raw_budget = os.getenv("INVOCATION_TOKEN_BUDGET")
+        if token_budget is None and raw_budget:
+            try:
+                token_budget = int(raw_budget)
+                if token_budget < 1:
+                    raise ValueError("1以上が必須です")
+            except ValueError as e:
+                token_budget = None
+                logger.warning(
+                    f"INVOCATION_TOKEN_BUDGET の解析に失敗（予算なしで継続）: {raw_budget!r}, {e}"
+                )
+
+        return cls(
+            exam_type,
+            question_count,
+            model_id,
+            token_budget=token_budget,
+            prices=prices,
+            namespace=os.getenv("METRICS_NAMESPACE", DEFAULT_NAMESPACE),
+        )
+
+    def add_usage(self, usage: Mapping[str, Any]) -> None:
+        """モデル応答の usage を加算"""
+        with self._lock:
+            if not self._closed:
+                self.usage.add(usage)
+
+    def add_phase(self, phase: str, elapsed_ms: float) -> None:
+        """フェーズの所要時間を加算"""
+        with self._lock:
+            if not self._closed:
+                self.phase_ms[phase] = self.phase_ms.get(phase, 0.0) + elapsed_ms
+
+    @property
+    def total_tokens(self) -> int:
+        """キャッシュの読み書きを含む合計トークン数"""
+        usage = self.usage
+        total: int = (
+            usage.input_tokens
+            + usage.output_tokens
+            + usage.cache_read_tokens
+            + usage.cache_write_tokens
+        )
+        return total
+
+    def check_token_budget(self) -> None:
+        """モデル呼び出しの前にトークン予算を確認
+
+        Raises:
+            TokenBudgetExceededError: 予算を使い切っている場合
+        """
+        if self.token_budget is not None and self.total_tokens >= self.token_budget:
+            raise TokenBudgetExceededError(self.total_tokens, self.token_budget)
+
+    def estimated_cost(self) -> float | None:
+        """価格表による概算コスト（USD、価格表にないモデルは None）"""
+        price = next(
+            (
+                price
+                for key, price in self.prices.items()
+                if key in self.model_id.lower()
+            ),
+            None,
+        )
+        if price is None:
+            return None
+        usage = self.usage
+        cost: float = (
+            usage.input_tokens * price.get("input", 0.0)
+            + usage.output_tokens * price.get("output", 0.0)
+            + usage.cache_read_tokens * price.get("cache_read", 0.0)
+            + usage.cache_write_tokens * price.get("cache_write", 0.0)
+        ) / 1_000_000
+        return cost
+
+    def summary(self) -> dict[str, Any]:
+        """集計結果（ログ・応答用）"""
+        with self._lock:
+            phase_ms = {phase: round(ms, 1) for phase, ms in self.phase_ms.items()}
+            usage = self.usage.to_dict()
+        cost = self.estimated_cost()
+        return {
+            "exam_type": self.exam_type,
+            "question_count": self.question_count,
+            "model_id": self.model_id,
+            "duration_ms": round((self._clock() - self._started_at) * 1000, 1),
+            "usage": usage,
+            "total_tokens": self.total_tokens,
+            "token_budget": self.token_budget,
+            "phase_ms": phase_ms,
+            "estimated_cost_usd": None if cost is None else round(cost, 6),
+        }
+
+    def to_emf(self, outcome: str) -> dict[str, Any]:
+        """CloudWatch EMF（Embedded Metric Format）のレコード"""
+        summary = self.summary()
+        usage = summary["usage"]
+        values: dict[str, tuple[float, str]] = {
+            "InputTokens": (usage["input_tokens"], "Count"),
+            "OutputTokens": (usage["output_tokens"], "Count"),
+            "CacheReadTokens": (usage["cache_read_tokens"], "Count"),
+            "CacheWriteTokens": (usage["cache_write_tokens"], "Count"),
+            "ModelCalls": (usage["calls"], "Count"),
+            "Duration": (summary["duration_ms"], "Milliseconds"),
+        }
+        for phase, ms in summary["phase_ms"].items():
+            values[f"{phase.capitalize()}Latency"] = (ms, "Milliseconds")
+        if summary["estimated_cost_usd"] is not None:
+            values["EstimatedCostUSD"] = (summary["estimated_cost_usd"], "None")
+
+        return {
+            "_aws": {
+                "Timestamp": int(time.time() * 1000),
+                "CloudWatchMetrics": [
+                    {
+                        "Namespace": self.namespace,
+                        "Dimensions": [["ExamType"]],
+                        "Metrics": [
+                            {"Name": name, "Unit": unit}
+                            for name, (_, unit) in values.items()
+                        ],
+                    }
+                ],
+            },
+            "ExamType": self.exam_type,
+            "Outcome": outcome,
+            "QuestionCount": self.question_count,
+            "ModelId": self.model_id,
+            "TokenBudget": self.token_budget,
+            **{name: value for name, (value, _) in values.items()},
+        }
+
+    def emit(self, outcome: str, stream: TextIO | None = None) -> dict[str, Any]:
+        """EMF レコードを1行で出力し、以降の記録を締め切る
+
+        Args:
+            outcome: 実行結果（succeeded / partial / error）
+            stream: 出力先（デフォルト: 標準出力）
+
+        Returns:
+            dict[str, Any]: 出力したレコード
+        """
+        record = self.to_emf(outcome)
+        with self._lock:
+            self._closed = True
+        out = stream if stream is not None else sys.stdout
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        out.flush()
+        return record
+
+
+def current_metrics() -> InvocationMetrics | None:
+    """現在のコンテキストの集計先（未設定の場合は None）"""
+    return _current_metrics.get()
+
+
+@contextmanager
+def metrics_scope(metrics: InvocationMetrics) -> Iterator[InvocationMetrics]:
+    """コンテキスト内の処理の集計先を設定"""
+    token = _current_metrics.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current_metrics.reset(token)
+
+
+@contextmanager
+def timed(phase: str) -> Iterator[None]:
+    """区間の所要時間を現在の集計先のフェーズに加算（集計先がない場合は何もしない）"""
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics = current_metrics()
+        if metrics is not None:
+            metrics.add_phase(phase, (time.perf_counter() - started_at) * 1000)
+
+
+def record_metrics_callback(**kwargs: Any) -> None:
+    """Agent のコールバック: モデル応答の usage を現在の集計先に加算"""
+    usage = usage_from_event(**kwargs)
+    metrics = current_metrics()
+    if usage is not None and metrics is not None:
+        metrics.add_usage(usage)
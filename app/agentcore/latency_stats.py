@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+レイテンシ統計 - フェーズごとの分位点スケッチ（プロセス内で集計）
+
+ログには実行ごとの値しか残らないため、生成時間や Teams 投稿の p95/p99 を
+ログを書き出さずに確認できませんでした。プロセス内でフェーズごとの分位点スケッチを保持し、
+stats アクションで参照できるようにします。
+
+統計の範囲:
+- AgentCore Runtime はセッションごとに microVM を割り当て、実行ごとに新しいセッションが作られる。
+  そのため stats アクションの統計（累計を含む）は現在のセッション分のみで、実行をまたいで蓄積されない
+- 実行をまたいだ p95/p99 は、flush が要約と合わせてログに出力するスケッチ（to_dict のバケット）を
+  集めて merge_logged_sketches で併合して求める（要約の分位点同士は平均・併合できないため）
+
+設計判断:
+- スケッチは DDSketch 方式の対数バケット（相対誤差 relative_accuracy を保証）とし、
+  値を保持せずにバケットの件数だけを持つ。同じ精度のスケッチ同士はバケットを足すだけで併合できる
+  （to_dict/from_dict でプロセス間・ログ経由の併合にも使える）
+- 統計は「プロセス起動からの累計」と「前回の出力からの区間」の2つを持ち、
+  一定間隔で区間の要約を1行のログとして出力して累計に併合する
+- 出力タスクは配信キューと同じく、最初の記録時に実行中のイベントループ上で遅延起動する
+- rate_limiter と同じく複数のイベントループ・スレッドから利用されるため threading.Lock で保護する
+"""
+
+import asyncio
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections.abc import Callable, Iterable, Mapping
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# レイテンシ統計の設定定数
+# - 相対誤差: 1%（p99 が 10秒なら ±100ms）
+# - 出力間隔: 5分ごとに区間の要約を出力する
+# - 最小値: これ未満のレイテンシ（ミリ秒）は0として数える
+DEFAULT_RELATIVE_ACCURACY = 0.01
+DEFAULT_FLUSH_INTERVAL = 300.0
+MIN_TRACKED_VALUE = 0.001
+SUMMARY_QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+
+class LatencySketch:
+    """相対誤差を保証する分位点スケッチ（併合可能）"""
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY) -> None:
+        """
+        Args:
+            relative_accuracy: 分位点の相対誤差の上限（0より大きく1未満）
+
+        Raises:
+            ValueError: 相対誤差が範囲外の場合
+        """
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy は0より大きく1未満が必須です")
+
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.buckets: dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def add(self, value: float) -> None:
+        """値を1件追加
+
+        Raises:
+            ValueError: 負の値の場合
+        """
+        if value < 0:
+            raise ValueError("レイテンシは0以上が必須です")
+
+        if value < MIN_TRACKED_VALUE:
+            self.zero_count += 1
+        else:
+            index = math.ceil(math.log(value) / self._log_gamma)
+            self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other: "LatencySketch") -> None:
+        """別のスケッチを併合
+
+        Raises:
+            ValueError: 相対誤差が異なる場合（バケットの境界が一致しない）
+        """
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("相対誤差が異なるスケッチは併合できません")
+
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> float | None:
+        """分位点の推定値（値がない場合は None）
+
+        Raises:
+            ValueError: q が0〜1の範囲外の場合
+        """
+        if not 0 <= q <= 1:
+            raise ValueError("q は0〜1の範囲が必須です")
+        if self.count == 0:
+            return None
+
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if rank < seen:
+                estimate = 2 * self._gamma**index / (self._gamma + 1)
+                return min(max(estimate, self.min), self.max)
+        return self.max
+
+    def summary(self) -> dict[str, Any]:
+        """要約（件数・平均・最小・最大・主要な分位点、ミリ秒）"""
+        if self.count == 0:
+            return {"count": 0}
+        result: dict[str, Any] = {
+            "count": self.count,
+            "mean": round(self.sum / self.count, 1),
+            "min": round(self.min, 1),
+            "max": round(self.max, 1),
+        }
+        for q in SUMMARY_QUANTILES:
+            value = self.quantile(q)
+            result[f"p{round(q * 100)}"] = None if value is None else round(value, 1)
+        return result
+
+    def to_dict(self) -> dict[str, Any]:
+        """併合用の表現（バケットの件数を含む）"""
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "buckets": {str(index): count for index, count in self.buckets.items()},
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "sum": self.sum,
+            "min": None if self.count == 0 else self.min,
+            "max": self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "LatencySketch":
+        """to_dict の表現から復元"""
+        sketch = cls(float(data["relative_accuracy"]))
+        sketch.buckets = {int(index): int(n) for index, n in data["buckets"].items()}
+        sketch.zero_count = int(data["zero_count"])
+        sketch.count = int(data["count"])
+        sketch.sum = float(data["sum"])
+        sketch.min = math.inf if data["min"] is None else float(data["min"])
+        sketch.max = float(data["max"])
+        return sketch
+
+
+class LatencyStats:
+    """フェーズごとのレイテンシ統計（累計と出力区間）"""
+
+    def __init__(
+        self,
+        relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """
+        Args:
+            relative_accuracy: スケッチの相対誤差
+            flush_interval: 区間の要約を出力する間隔（秒）
+            clock: 時刻関数（テスト用に差し替え可能）
+
+        Raises:
+            ValueError: 出力間隔が正の値でない場合
+        """
+        if flush_interval <= 0:
+            raise ValueError("flush_interval は正の値が必須です")
+
+        self.relative_accuracy = relative_accuracy
+        self.flush_interval = flush_interval
+        self._clock = clock
+        self._started_at = clock()
+        self._window_started_at = self._started_at
+        self._totals: dict[str, LatencySketch] = {}
+        self._window: dict[str, LatencySketch] = {}
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._flusher: asyncio.Task[None] | None = None
+
+    @classmethod
+    def from_env(cls) -> "LatencyStats":
+        """環境変数から設定を読み込んで生成
+
+        - LATENCY_STATS_FLUSH_SECONDS: 区間の要約を出力する間隔
+        - LATENCY_STATS_RELATIVE_ACCURACY: スケッチの相対誤差
+        """
+        relative_accuracy = DEFAULT_RELATIVE_ACCURACY
+        raw_accuracy = os.getenv("LATENCY_STATS_RELATIVE_ACCURACY")
+        if raw_accuracy:
+            try:
+                relative_accuracy = float(raw_accuracy)
+                if not 0 < relative_accuracy < 1:
+                    raise ValueError("0より大きく1未満の値が必須です")
+            except ValueError as e:
+                relative_accuracy = DEFAULT_RELATIVE_ACCURACY
+                logger.warning(
+                    f"LATENCY_STATS_RELATIVE_ACCURACY の解析に失敗（既定値で継続）: {raw_accuracy!r}, {e}"
+                )
+
+        flush_interval = DEFAULT_FLUSH_INTERVAL
+        raw_interval = os.getenv("LATENCY_STATS_FLUSH_SECONDS")
+        if raw_interval:
+            try:
+                flush_interval = float(raw_interval)
+                if not flush_interval > 0:
+                    raise ValueError("正の値が必須です")
+            except ValueError as e:
+                flush_interval = DEFAULT_FLUSH_INTERVAL
+                logger.warning(
+                    f"LATENCY_STATS_FLUSH_SECONDS の解析に失敗（既定値で継続）: {raw_interval!r}, {e}"
+                )
+
+        return cls(relative_accuracy=relative_accuracy, flush_interval=flush_interval)
+
+    def record(self, phase: str, elapsed_ms: float) -> None:
+        """フェーズのレイテンシを1件記録"""
+        self.record_many({phase: elapsed_ms})
+
+    def record_many(self, phase_ms: Mapping[str, float]) -> None:
+        """複数フェーズのレイテンシを記録（invoke 1回分のフェーズ別所要時間など）"""
+        with self._lock:
+            for phase, elapsed_ms in phase_ms.items():
+                sketch = self._window.get(phase)
+                if sketch is None:
+                    sketch = self._window[phase] = LatencySketch(self.relative_accuracy)
+                sketch.add(elapsed_ms)
+        self._ensure_flusher()
+
+    def snapshot(self) -> dict[str, Any]:
+        """フェーズごとの要約（累計 + 未出力の区間、現在のセッション分のみ）"""
+        with self._lock:
+            phases = set(self._totals) | set(self._window)
+            merged: dict[str, LatencySketch] = {}
+            for phase in phases:
+                sketch = LatencySketch(self.relative_accuracy)
+                for source in (self._totals, self._window):
+                    if phase in source:
+                        sketch.merge(source[phase])
+                merged[phase] = sketch
+            started_at = self._started_at
+        return {
+            "since": started_at,
+            "relative_accuracy": self.relative_accuracy,
+            "phases": {phase: merged[phase].summary() for phase in sorted(merged)},
+        }
+
+    def flush(self) -> dict[str, Any] | None:
+        """区間の要約を1行のログとして出力し、累計に併合（区間に値がない場合は None）"""
+        with self._lock:
+            window, self._window = self._window, {}
+            window_started_at = self._window_started_at
+            self._window_started_at = self._clock()
+            for phase, sketch in window.items():
+                total = self._totals.get(phase)
+                if total is None:
+                    total = self._totals[phase] = LatencySketch(self.relative_accuracy)
+                total.merge(sketch)
+
+        if not window:
+            return None
+        summary = {
+            "window_start": window_started_at,
+            "window_end": self._window_started_at,
+            "phases": {phase: window[phase].summary() for phase in sorted(window)},
+            # 実行をまたいだ分位点を再計算するための併合用の表現
+            "sketches": {phase: window[phase].to_dict() for phase in sorted(window)},
+        }
+        logger.info(f"レイテンシ統計: {json.dumps(summary, ensure_ascii=False)}")
+        return summary
+
+    def _ensure_flusher(self) -> None:
+        """実行中のイベントループ上で出力タスクを遅延起動（ループ外からの記録では起動しない）"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        with self._lock:
+            if (
+                self._flusher is not None
+                and not self._flusher.done()
+                and self._loop is loop
+            ):
+                return
+            self._loop = loop
+            self._flusher = loop.create_task(
+                self._flush_periodically(), name="latency-stats-flush"
+            )
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self.flush()
+
+    async def shutdown(self) -> None:
+        """出力タスクを停止し、残りの区間を出力"""
+        flusher, self._flusher = self._flusher, None
+        if flusher is not None and not flusher.done():
+            if flusher.get_loop() is asyncio.get_running_loop():
+                flusher.cancel()
+                await asyncio.gather(flusher, return_exceptions=True)
+            else:
+                flusher.get_loop().call_soon_threadsafe(flusher.cancel)
+        self.flush()
+
+
+def merge_logged_sketches(
+    records: Iterable[Mapping[str, Any]],
+) -> dict[str, LatencySketch]:
+    """flush がログに出力した記録のスケッチをフェーズごとに併合（実行をまたいだ分位点用）
+
+    Args:
+        records: flush の戻り値（ログの「レイテンシ統計: 」以降の JSON）の並び
+
+    Raises:
+        ValueError: 相対誤差が異なるスケッチが含まれる場合
+    """
+    merged: dict[str, LatencySketch] = {}
+    for record in records:
+        for phase, data in record.get("sketches", {}).items():
+            sketch = LatencySketch.from_dict(data)
+            if phase in merged:
+                merged[phase].merge(sketch)
+            else:
+                merged[phase] = sketch
+    return merged
+
+
+# 全ての invoke が共有するプロセス全体のレイテンシ統計（セッション単位）
+latency_stats = LatencyStats.from_env()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Webhook ペイロードビルダー - サイズ予算とコンパクション
+
+Power Automate / Teams のメッセージサイズ上限を超えないよう、
+1つの AgentOutput を上限バイト数以下の複数ポストに分割します。
+
+設計判断:
+- サイズは httpx (>=0.28) の json= 送信と同じエンコード（UTF-8, ensure_ascii=False,
+  区切り文字の空白なし）で計測し、実際の送信バイト数と一致させる
+- 分割は問題（またはカード）単位の貪欲パッキング。各ポストは既存と同じ
+  {"security_token", <items_key>: [...]} 形式のため、Power Automate 側の変更は不要
+- 長いフィールド（解説・学習ポイント・参考URL）の後続ポストへの移動は任意機能。
+  移動したフィールドは {"security_token", "followups": [...]} 形式で送信する
+- 1項目だけで上限を超える場合はそれ以上分割できないため、単独ポストとして送信し警告する
+"""
+
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# サイズ予算設定定数
+# - Teams のメッセージ上限（約28KB）に対して、Power Automate 側で付与される
+#   カード外枠の余裕を見込んだ値
+DEFAULT_MAX_PAYLOAD_BYTES = 24_000
+# 後続ポストに移動する対象フィールドと、移動判定の閾値（エンコード後バイト数）
+DEFERRABLE_FIELDS = ("explanation", "learning_insights", "source")
+DEFAULT_LONG_FIELD_BYTES = 2_000
+
+
+def encode_payload(payload: dict[str, Any]) -> bytes:
+    """httpx の json= 送信と同じ形式で JSON エンコード"""
+    return json.dumps(
+        payload, ensure_ascii=False, separators=(",", ":"), allow_nan=False
+    ).encode("utf-8")
+
+
+def encoded_size(value: Any) -> int:
+    """JSON エンコード後のバイト数を計測"""
+    return len(
+        json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    )
+
+
+@dataclass
+class PayloadStats:
+    """ペイロード分割結果の統計情報"""
+
+    item_count: int = 0
+    post_count: int = 0
+    total_bytes: int = 0
+    max_post_bytes: int = 0
+    post_bytes: list[int] = field(default_factory=list)
+    deferred_fields: int = 0
+    oversized_posts: int = 0
+
+    def to_log(self) -> str:
+        """ログ出力用の文字列"""
+        return (
+            f"items={self.item_count}, posts={self.post_count}, "
+            f"total_bytes={self.total_bytes}, max_post_bytes={self.max_post_bytes}, "
+            f"deferred_fields={self.deferred_fields}, oversized={self.oversized_posts}"
+        )
+
+
+def _defer_long_fields(
+    items: list[dict[str, Any]], long_field_bytes: int
+) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    """長いフィールドを項目から取り除き、後続ポスト用のエントリにまとめる"""
+    compacted: list[dict[str, Any]] = []
+    followups: list[dict[str, Any]] = []
+    for index, item in enumerate(items):
+        moved = {
+            name: item[name]
+            for name in DEFERRABLE_FIELDS
+            if name in item and encoded_size(item[name]) > long_field_bytes
+        }
+        if moved:
+            compacted.append({k: v for k, v in item.items() if k not in moved})
+            followups.append({"question_index": index, "fields": moved})
+        else:
+            compacted.append(item)
+    return compacted, followups
+
+
+def _pack(
+    base: dict[str, Any],
+    items_key: str,
+    items: list[dict[str, Any]],
+    max_bytes: int,
+    stats: PayloadStats,
+) -> list[dict[str, Any]]:
+    """項目を上限バイト数以下のポストに貪欲に詰める"""
+    # 空リストのポストサイズ + 項目ごとのサイズ（区切りのカンマ1バイト）で見積もる
+    envelope_bytes = len(encode_payload({**base, items_key: []}))
+    posts: list[dict[str, Any]] = []
+    batch: list[dict[str, Any]] = []
+    batch_bytes = envelope_bytes
+
+    for item in items:
+        item_bytes = encoded_size(item) + (1 if batch else 0)
+        if batch and batch_bytes + item_bytes > max_bytes:
+            posts.append({**base, items_key: batch})
+            batch, batch_bytes = [], envelope_bytes
+            item_bytes -= 1
+        batch.append(item)
+        batch_bytes += item_bytes
+
+    if batch:
+        posts.append({**base, items_key: batch})
+
+    for post in posts:
+        size = len(encode_payload(post))
+        stats.post_bytes.append(size)
+        if size > max_bytes:
+            stats.oversized_posts += 1
+            logger.warning(
+                f"単一項目がサイズ上限を超えています（分割不可）: {size} > {max_bytes} bytes"
+            )
+    return posts
+
+
+def build_payloads(
+    base: dict[str, Any],
+    items_key: str,
+    items: list[dict[str, Any]],
+    max_bytes: int = DEFAULT_MAX_PAYLOAD_BYTES,
+    defer_long_fields: bool = False,
+    long_field_bytes: int = DEFAULT_LONG_FIELD_BYTES,
+) -> tuple[list[dict[str, Any]], PayloadStats]:
+    """項目リストをサイズ上限以下の複数ポストに分割
+
+    Args:
+        base: 全ポスト共通のフィールド（security_token 等）
+        items_key: 項目リストのキー（"questions" または "cards"）
+        items: 送信する項目のリスト
+        max_bytes: 1ポストあたりの最大バイト数
+        defer_long_fields: 長いフィールドを後続ポストに移動するか
+        long_field_bytes: 後続ポストに移動するフィールドの閾値（バイト）
+
+    Returns:
+        tuple[list[dict[str, Any]], PayloadStats]: 送信順のポストと統計情報
+    """
+    stats = PayloadStats(item_count=len(items))
+
+    followups: list[dict[str, Any]] = []
+    if defer_long_fields:
+        items, followups = _defer_long_fields(items, long_field_bytes)
+        stats.deferred_fields = sum(len(f["fields"]) for f in followups)
+
+    posts = _pack(base, items_key, items, max_bytes, stats)
+    if followups:
+        posts.extend(_pack(base, "followups", followups, max_bytes, stats))
+
+    stats.post_count = len(posts)
+    stats.total_bytes = sum(stats.post_bytes)
+    stats.max_post_bytes = max(stats.post_bytes, default=0)
+    return posts, stats
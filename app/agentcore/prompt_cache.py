@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+プロンプトキャッシュ - 静的なプロンプト接頭辞の分離とキャッシュ利用量の記録
+
+システムプロンプト・試験ガイド・サンプル問題は実行ごとに変わらないにもかかわらず、
+ジャンル分散指示などの実行ごとの指示と1つの文字列に埋め込まれていたため、
+Bedrock のプロンプトキャッシュで再利用できませんでした。
+プロンプトを「静的な接頭辞」と「動的な接尾辞」に分け、その境界に cachePoint を置きます。
+
+設計判断:
+- 接頭辞は試験・試験ガイド・サンプル問題・共通の注意事項のみで構成し、問題数や指示は含めない
+  （1文字でも変わるとキャッシュに一致しないため）
+- cachePoint はモデルが対応する場合のみ付ける（非対応モデルでは Bedrock がリクエストを拒否する）。
+  システムプロンプトのキャッシュは BedrockModel の CacheConfig(strategy="auto") に任せる
+- キャッシュの読み書きトークン数は Agent のコールバックに届く metadata イベントの usage から取得する。
+  structured_output はスレッドで実行されるが contextvars はコピーされるため、
+  呼び出しごとの集計先を ContextVar で渡す
+"""
+
+import logging
+import os
+from collections.abc import Iterator, Mapping
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from typing import Any
+
+from strands.types.content import ContentBlock
+
+logger = logging.getLogger(__name__)
+
+_current_usage: ContextVar["PromptUsage | None"] = ContextVar(
+    "prompt_usage", default=None
+)
+
+
+def supports_prompt_cache(model_id: str) -> bool:
+    """モデルがプロンプトキャッシュ（cachePoint）に対応するか
+
+    PROMPT_CACHE_ENABLED=false の場合は対応モデルでも使わない。
+    """
+    if os.getenv("PROMPT_CACHE_ENABLED", "true").lower() != "true":
+        return False
+    model = model_id.lower()
+    return "anthropic" in model or "claude" in model
+
+
+def build_prompt_blocks(
+    static_prefix: str, dynamic_suffix: str, cache: bool
+) -> list[ContentBlock]:
+    """静的な接頭辞と動的な接尾辞からプロンプトを組み立てる
+
+    Args:
+        static_prefix: 実行ごとに変わらない部分（キャッシュ対象）
+        dynamic_suffix: 実行ごとに変わる部分
+        cache: 接頭辞の直後に cachePoint を置くか
+
+    Returns:
+        list[ContentBlock]: Agent に渡すプロンプト
+    """
+    blocks: list[ContentBlock] = [ContentBlock(text=static_prefix)]
+    if cache:
+        blocks.append(ContentBlock(cachePoint={"type": "default"}))
+    blocks.append(ContentBlock(text=dynamic_suffix))
+    return blocks
+
+
+def prompt_text(prompt: str | list[ContentBlock]) -> str:
+    """プロンプトのテキスト部分（ログ・検証用）"""
+    if isinstance(prompt, str):
+        return prompt
+    return "".join(block["text"] for block in prompt if "text" in block)
+
+
+@dataclass
+class PromptUsage:
+    """モデル呼び出しのトークン使用量"""
+
+    calls: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_read_tokens: int = 0
+    cache_write_tokens: int = 0
+
+    def add(self, usage: Mapping[str, Any]) -> None:
+        """Bedrock の usage（inputTokens 等）を加算"""
+        self.calls += 1
+        self.input_tokens += int(usage.get("inputTokens", 0))
+        self.output_tokens += int(usage.get("outputTokens", 0))
+        self.cache_read_tokens += int(usage.get("cacheReadInputTokens", 0))
+        self.cache_write_tokens += int(usage.get("cacheWriteInputTokens", 0))
+
+    @property
+    def cache_hit_ratio(self) -> float:
+        """入力トークンのうちキャッシュから読み込んだ割合"""
+        total = self.input_tokens + self.cache_read_tokens + self.cache_write_tokens
+        return self.cache_read_tokens / total if total else 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        """ログ・応答用の表現"""
+        return {**asdict(self), "cache_hit_ratio": round(self.cache_hit_ratio, 3)}
+
+
+@contextmanager
+def usage_scope(label: str) -> Iterator[PromptUsage]:
+    """コンテキスト内のモデル呼び出しのトークン使用量を集計し、終了時に記録
+
+    Args:
+        label: ログに出力する呼び出しの種類
+    """
+    usage = PromptUsage()
+    token = _current_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _current_usage.reset(token)
+        if usage.calls:
+            logger.info(f"トークン使用量: {label}, {usage.to_dict()}")
+
+
+def usage_from_event(**kwargs: Any) -> Mapping[str, Any] | None:
+    """Agent のコールバック引数からモデル応答の usage を取り出す（metadata イベント以外は None）"""
+    event = kwargs.get("event")
+    if not isinstance(event, Mapping):
+        return None
+    metadata = event.get("metadata")
+    if not isinstance(metadata, Mapping) or "usage" not in metadata:
+        return None
+    usage: Mapping[str, Any] = metadata["usage"]
+    return usage
+
+
+def record_usage_callback(**kwargs: Any) -> None:
+    """Agent のコールバック: metadata イベントの usage を現在の集計先に加算"""
+    event_usage = usage_from_event(**kwargs)
+    usage = _current_usage.get()
+    if event_usage is not None and usage is not None:
+        usage.add(event_usage)
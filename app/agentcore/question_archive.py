@@ -0,0 +1,582 @@
+#!/usr/bin/env python3
+"""
+問題アーカイブ - 生成済み問題の永続化と類似問題の検出
+
+生成した問題を正規化テキストのフィンガープリントと MinHash 署名付きで保存し、
+新しい問題が過去の問題（同じ SCP や Transit Gateway のシナリオなど）と
+ほぼ同じでないかを全履歴に対してサブミリ秒で判定します。
+
+設計判断:
+- 正規化: NFKC・小文字化の後、空白・記号を除去する（日本語は単語分割しない）
+- シングル: 正規化テキストの文字 n-gram（日本語でも分かち書き不要）
+- MinHash: One Permutation Hashing を使う。シングルごとに blake2b（8バイト）を1回だけ計算し、
+  下位ビットで32個のビンに振り分けてビンごとの最小値を署名とする（空のビンは隣のビンで補完）。
+  blake2b はプロセスをまたいで安定した値になるため、署名をそのまま永続化できる
+- LSH: 32個の署名を 8バンド × 4行に分割し、いずれかのバンドが一致した問題のみを
+  候補として署名の一致率（推定 Jaccard 類似度）を計算する
+- 永続化: 署名をバックエンド（QuestionArchiveBackend）に保存し、起動時に LSH インデックスを
+  メモリ上に再構築する。AgentCore Runtime では実行ごとに新しいセッション（microVM）が割り当てられ
+  /tmp は引き継がれないため、本番では AgentCore Memory（MemoryQuestionArchiveBackend）に保存する
+  （照合できる範囲は Memory のイベント保持期間内）。SQLite（SQLiteQuestionArchiveBackend）は開発・テスト用
+- 同じバッチ内の問題同士も照合する（同時に生成された問題が互いに重複していないか）
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import operator
+import random
+import re
+import sqlite3
+import struct
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Protocol
+
+from bedrock_agentcore.memory import MemoryClient
+
+logger = logging.getLogger(__name__)
+
+# 類似判定設定定数
+# - シングル長: 日本語の問題文で語句の並びを捉えられる長さ
+# - 署名長・バンド: 8バンド × 4行で、類似度0.6の問題を約97%の確率で候補に含める
+# - しきい値: 言い回しの違いは許容し、同じシナリオ・同じ選択肢構成を重複とみなす
+SHINGLE_SIZE = 4
+NUM_PERMUTATIONS = 32
+LSH_BANDS = 8
+LSH_ROWS = NUM_PERMUTATIONS // LSH_BANDS
+DEFAULT_SIMILARITY_THRESHOLD = 0.6
+
+_REMOVE_PATTERN = re.compile(r"[\s\W_]+", re.UNICODE)
+_EMPTY_BIN = 0xFFFFFFFFFFFFFFFF
+_SIGNATURE_FORMAT = struct.Struct(f"<{NUM_PERMUTATIONS}Q")
+
+# Memory 上のアーカイブに使うアクター・セッション（学習分野履歴と同じアクター、セッションで区別する）
+ARCHIVE_ACTOR_ID = "cloud-copass-agent"
+ARCHIVE_SESSION_ID = "question-archive"
+# 1イベントに含める問題数（初期投入などで大量に追加する場合はイベントを分割する）
+MAX_MESSAGES_PER_EVENT = 50
+# 起動時に読み込むイベント数の上限（1回の実行で1イベント、Memory のイベント保持期間は30日）
+MAX_ARCHIVE_EVENTS = 1000
+
+
+@dataclass
+class DuplicateMatch:
+    """類似問題の判定結果
+
+    同じバッチ内の先行する問題との一致は question_id が -1 で、batch_index にその添字を持つ。
+    """
+
+    question_id: int
+    similarity: float
+    exact: bool
+    question: str
+    batch_index: int | None = None
+
+
+@dataclass
+class ArchivedQuestion:
+    """永続化する問題の記録（インデックスの再構築に必要な値）"""
+
+    exam_type: str
+    fingerprint: str
+    signature: tuple[int, ...]
+    question: str
+    question_json: str = "{}"
+    created_at: float = field(default_factory=time.time)
+
+
+def normalize_text(text: str) -> str:
+    """比較用にテキストを正規化（NFKC・小文字化・空白と記号の除去）"""
+    return _REMOVE_PATTERN.sub("", unicodedata.normalize("NFKC", text).lower())
+
+
+def question_text(question: dict[str, Any]) -> str:
+    """比較対象のテキスト（問題文 + 選択肢）"""
+    options = question.get("options", [])
+    return "\n".join([str(question.get("question", "")), *map(str, options)])
+
+
+def fingerprint(question: dict[str, Any]) -> str:
+    """正規化テキストのフィンガープリント（完全一致判定用）"""
+    normalized = normalize_text(question_text(question))
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def shingles(normalized: str, size: int = SHINGLE_SIZE) -> set[str]:
+    """文字 n-gram の集合"""
+    if len(normalized) <= size:
+        return {normalized} if normalized else set()
+    return {normalized[i : i + size] for i in range(len(normalized) - size + 1)}
+
+
+def minhash_signature(normalized: str) -> tuple[int, ...]:
+    """MinHash 署名（One Permutation Hashing、NUM_PERMUTATIONS 個のビン）"""
+    signature = [_EMPTY_BIN] * NUM_PERMUTATIONS
+    for shingle in shingles(normalized):
+        value = int.from_bytes(
+            hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little"
+        )
+        bin_index = value % NUM_PERMUTATIONS
+        value //= NUM_PERMUTATIONS
+        if value < signature[bin_index]:
+            signature[bin_index] = value
+
+    # 空のビンは右隣（循環）の空でないビンの値で補完する（短いテキスト向け）
+    filled = [i for i, value in enumerate(signature) if value != _EMPTY_BIN]
+    if filled and len(filled) < NUM_PERMUTATIONS:
+        for i in range(NUM_PERMUTATIONS):
+            if signature[i] == _EMPTY_BIN:
+                source = next((j for j in filled if j > i), filled[0])
+                signature[i] = signature[source]
+    return tuple(signature)
+
+
+def estimate_similarity(a: tuple[int, ...], b: tuple[int, ...]) -> float:
+    """署名の一致率（Jaccard 類似度の推定値）"""
+    matches: int = sum(map(operator.eq, a, b))
+    return matches / NUM_PERMUTATIONS
+
+
+def _band_keys(signature: tuple[int, ...]) -> list[tuple[int, ...]]:
+    """LSH のバンドキー"""
+    return [
+        signature[band * LSH_ROWS : (band + 1) * LSH_ROWS] for band in range(LSH_BANDS)
+    ]
+
+
+class QuestionArchiveBackend(Protocol):
+    """問題アーカイブの保存先インターフェース"""
+
+    def load(self) -> Iterable[ArchivedQuestion]:
+        """保存済みの全ての記録（古い順）"""
+        ...
+
+    def append(self, records: list[ArchivedQuestion]) -> None:
+        """記録を追加"""
+        ...
+
+
+class SQLiteQuestionArchiveBackend:
+    """SQLite を使った問題アーカイブの保存先"""
+
+    def __init__(self, path: str | Path = ":memory:") -> None:
+        """
+        Args:
+            path: データベースファイルのパス（":memory:" の場合はプロセス内のみ）
+        """
+        self.path = str(path)
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS archived_questions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                exam_type TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                signature BLOB NOT NULL,
+                question TEXT NOT NULL,
+                question_json TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_archived_questions_fingerprint "
+            "ON archived_questions (fingerprint)"
+        )
+
+    def load(self) -> Iterable[ArchivedQuestion]:
+        unpack = _SIGNATURE_FORMAT.unpack
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT exam_type, fingerprint, signature, question, created_at "
+                "FROM archived_questions ORDER BY id"
+            ).fetchall()
+        return [
+            ArchivedQuestion(
+                exam_type=exam_type,
+                fingerprint=digest,
+                signature=unpack(blob),
+                question=question,
+                created_at=created_at,
+            )
+            for exam_type, digest, blob, question, created_at in rows
+        ]
+
+    def append(self, records: list[ArchivedQuestion]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO archived_questions "
+                "(exam_type, fingerprint, signature, question, question_json, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        record.exam_type,
+                        record.fingerprint,
+                        _SIGNATURE_FORMAT.pack(*record.signature),
+                        record.question,
+                        record.question_json,
+                        record.created_at,
+                    )
+                    for record in records
+                ],
+            )
+            self._conn.commit()
+
+
+class MemoryQuestionArchiveBackend:
+    """AgentCore Memory を使った問題アーカイブの保存先
+
+    追加のたびに1イベントを追記し、1問を1メッセージ（フィンガープリント・署名・問題文）とする。
+    問題の本文（選択肢・解説）は保存しない。
+    """
+
+    def __init__(self, memory_id: str, region_name: str = "us-east-1") -> None:
+        """
+        Args:
+            memory_id: AgentCore Memory リソースID
+            region_name: AWS リージョン
+        """
+        self.memory_id = memory_id
+        self.client = MemoryClient(region_name=region_name)
+
+    def load(self) -> Iterable[ArchivedQuestion]:
+        events = self.client.list_events(
+            memory_id=self.memory_id,
+            actor_id=ARCHIVE_ACTOR_ID,
+            session_id=ARCHIVE_SESSION_ID,
+            max_results=MAX_ARCHIVE_EVENTS,
+            include_payload=True,
+        )
+        records: list[ArchivedQuestion] = []
+        for event in events:
+            for item in event.get("payload", []):
+                text = item.get("conversational", {}).get("content", {}).get("text")
+                if not text:
+                    continue
+                try:
+                    data = json.loads(text)
+                    signature = _SIGNATURE_FORMAT.unpack(
+                        bytes.fromhex(data["signature"])
+                    )
+                    records.append(
+                        ArchivedQuestion(
+                            exam_type=data["exam_type"],
+                            fingerprint=data["fingerprint"],
+                            signature=signature,
+                            question=data["question"],
+                            created_at=float(data["created_at"]),
+                        )
+                    )
+                except (KeyError, TypeError, ValueError, struct.error) as e:
+                    logger.warning(f"問題アーカイブの記録の解析に失敗（スキップ）: {e}")
+        records.sort(key=lambda record: record.created_at)
+        return records
+
+    def append(self, records: list[ArchivedQuestion]) -> None:
+        for start in range(0, len(records), MAX_MESSAGES_PER_EVENT):
+            chunk = records[start : start + MAX_MESSAGES_PER_EVENT]
+            self.client.create_event(
+                memory_id=self.memory_id,
+                actor_id=ARCHIVE_ACTOR_ID,
+                session_id=ARCHIVE_SESSION_ID,
+                messages=[
+                    (
+                        json.dumps(
+                            {
+                                "exam_type": record.exam_type,
+                                "fingerprint": record.fingerprint,
+                                "signature": _SIGNATURE_FORMAT.pack(
+                                    *record.signature
+                                ).hex(),
+                                "question": record.question,
+                                "created_at": record.created_at,
+                            },
+                            ensure_ascii=False,
+                        ),
+                        "USER",
+                    )
+                    for record in chunk
+                ],
+                event_timestamp=datetime.now(),
+            )
+
+
+class QuestionArchive:
+    """生成済み問題のアーカイブ（永続化 + メモリ上の LSH インデックス）"""
+
+    def __init__(
+        self,
+        path: str | Path = ":memory:",
+        similarity_threshold: float = DEFAULT_SIMILARITY_THRESHOLD,
+        backend: QuestionArchiveBackend | None = None,
+        lazy_load: bool = False,
+    ) -> None:
+        """
+        Args:
+            path: SQLite データベースファイルのパス（backend 未指定時のみ使用、
+                ":memory:" の場合はプロセス内のみ）
+            similarity_threshold: 類似問題とみなす推定 Jaccard 類似度
+            backend: 保存先（未指定時は path の SQLite）
+            lazy_load: True の場合、保存先の読み込みを初回の照合・追加まで遅らせる
+                （モジュール読み込み時に保存先の障害で起動できなくなるのを防ぐ）
+        """
+        self.backend = (
+            backend if backend is not None else SQLiteQuestionArchiveBackend(path)
+        )
+        self.similarity_threshold = similarity_threshold
+
+        self._lock = threading.Lock()
+        self._fingerprints: dict[str, int] = {}
+        self._signatures: dict[int, tuple[int, ...]] = {}
+        self._questions: dict[int, str] = {}
+        self._buckets: list[defaultdict[tuple[int, ...], list[int]]] = [
+            defaultdict(list) for _ in range(LSH_BANDS)
+        ]
+        self._loaded = False
+        if not lazy_load:
+            self._ensure_loaded()
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self._signatures)
+
+    def find_duplicate(self, question: dict[str, Any]) -> DuplicateMatch | None:
+        """過去の問題と完全一致・類似する問題を検索
+
+        Args:
+            question: 判定する問題（Question.model_dump()）
+
+        Returns:
+            DuplicateMatch | None: 最も類似する過去の問題（しきい値未満の場合は None）
+        """
+        self._ensure_loaded()
+        normalized = normalize_text(question_text(question))
+        digest = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+        return self._find(digest, minhash_signature(normalized))
+
+    def find_duplicates(
+        self, questions: list[dict[str, Any]]
+    ) -> dict[int, DuplicateMatch]:
+        """複数の問題を過去の問題、および同じバッチ内の先行する問題と照合
+
+        Args:
+            questions: 判定する問題（Question.model_dump() のリスト）
+
+        Returns:
+            dict[int, DuplicateMatch]: 問題の添字 -> 類似問題（類似しない問題は含まない）
+        """
+        self._ensure_loaded()
+        matches: dict[int, DuplicateMatch] = {}
+        seen: list[tuple[str, tuple[int, ...], str]] = []
+        for index, question in enumerate(questions):
+            normalized = normalize_text(question_text(question))
+            digest = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+            signature = minhash_signature(normalized)
+
+            match = self._find(digest, signature)
+            for earlier, (earlier_digest, earlier_signature, text) in enumerate(seen):
+                similarity = (
+                    1.0
+                    if earlier_digest == digest
+                    else estimate_similarity(signature, earlier_signature)
+                )
+                if similarity >= self.similarity_threshold and (
+                    match is None or similarity > match.similarity
+                ):
+                    match = DuplicateMatch(
+                        question_id=-1,
+                        similarity=similarity,
+                        exact=earlier_digest == digest,
+                        question=text,
+                        batch_index=earlier,
+                    )
+            if match is not None:
+                matches[index] = match
+            seen.append((digest, signature, str(question.get("question", ""))))
+        return matches
+
+    def add(self, question: dict[str, Any], exam_type: str) -> int:
+        """問題をアーカイブに追加
+
+        Returns:
+            int: 問題ID
+        """
+        return self.add_many([question], exam_type)[0]
+
+    def add_many(self, questions: list[dict[str, Any]], exam_type: str) -> list[int]:
+        """複数の問題をまとめて追加（保存先への書き込みは1回）
+
+        Returns:
+            list[int]: 問題ID
+        """
+        self._ensure_loaded()
+        records = []
+        for question in questions:
+            normalized = normalize_text(question_text(question))
+            records.append(
+                ArchivedQuestion(
+                    exam_type=exam_type,
+                    fingerprint=hashlib.sha256(normalized.encode("utf-8")).hexdigest(),
+                    signature=minhash_signature(normalized),
+                    question=str(question.get("question", "")),
+                    question_json=json.dumps(question, ensure_ascii=False),
+                )
+            )
+
+        with self._lock:
+            self.backend.append(records)
+            return [self._index(record) for record in records]
+
+    def _find(self, digest: str, signature: tuple[int, ...]) -> DuplicateMatch | None:
+        """フィンガープリントと署名から類似問題を検索"""
+        exact_id = self._fingerprints.get(digest)
+        if exact_id is not None:
+            return DuplicateMatch(
+                question_id=exact_id,
+                similarity=1.0,
+                exact=True,
+                question=self._questions[exact_id],
+            )
+
+        candidates: set[int] = set()
+        for band, key in enumerate(_band_keys(signature)):
+            candidates.update(self._buckets[band].get(key, ()))
+
+        best: DuplicateMatch | None = None
+        for candidate in candidates:
+            similarity = estimate_similarity(signature, self._signatures[candidate])
+            if similarity >= self.similarity_threshold and (
+                best is None or similarity > best.similarity
+            ):
+                best = DuplicateMatch(
+                    question_id=candidate,
+                    similarity=similarity,
+                    exact=False,
+                    question=self._questions[candidate],
+                )
+        return best
+
+    def _index(self, record: ArchivedQuestion) -> int:
+        """メモリ上のインデックスに登録し、問題ID（プロセス内の連番）を返す"""
+        question_id = len(self._signatures) + 1
+        self._fingerprints.setdefault(record.fingerprint, question_id)
+        self._signatures[question_id] = record.signature
+        self._questions[question_id] = record.question
+        for band, key in enumerate(_band_keys(record.signature)):
+            self._buckets[band][key].append(question_id)
+        return question_id
+
+    def _ensure_loaded(self) -> None:
+        """未読み込みであれば保存先からインデックスを再構築（失敗した場合は次回の呼び出しで再試行）"""
+        if self._loaded:
+            return
+        with self._lock:
+            if not self._loaded:
+                self._load()
+                self._loaded = True
+
+    def _load(self) -> None:
+        """保存先からインデックスを再構築"""
+        for record in self.backend.load():
+            self._index(record)
+        if self._signatures:
+            logger.info(f"問題アーカイブを読み込みました: {len(self._signatures)}件")
+
+
+# 合成問題に使う語句（実際の問題と同程度に語彙が重なるよう、主要サービスと観点を混ぜる）
+_BENCHMARK_TERMS = tuple(
+    """
+    Organizations SCP TransitGateway VPCピアリング ControlTower S3 Lambda DynamoDB
+    DirectConnect Route53 CloudFront Aurora KMS IAMIdentityCenter EventBridge
+    StepFunctions ECS EKS Fargate EC2AutoScaling ELB APIGateway SQS SNS Kinesis
+    Redshift Athena Glue LakeFormation SageMaker Bedrock CloudWatch CloudTrail Config
+    SecurityHub GuardDuty Macie WAF Shield SecretsManager SystemsManager Backup
+    ElasticDisasterRecovery DataSync StorageGateway Snowball DMS MGN ElastiCache
+    OpenSearch Neptune DocumentDB EFS FSx PrivateLink NetworkFirewall GlobalAccelerator
+    CostExplorer SavingsPlans ServiceCatalog CloudFormation CDK CodePipeline
+    マルチアカウント コスト最適化 災害対策 移行 可用性 セキュリティ オンプレミス
+    レイテンシー 監査 暗号化 スケーラビリティ 運用効率 コンプライアンス ハイブリッド
+    """.split()
+)
+
+
+def _synthetic_question(rng: random.Random, index: int) -> dict[str, Any]:
+    """ベンチマーク用の合成問題（語句をランダムに組み合わせた互いに異なる問題）"""
+
+    def phrase(words: int) -> str:
+        terms = rng.sample(_BENCHMARK_TERMS, words)
+        return "と".join(terms) + f"の要件{rng.randint(1, 10**6)}"
+
+    return {
+        "question": f"企業{index}は{phrase(4)}を満たす必要がある。最適な構成はどれか。",
+        "options": [f"**{label}.** {phrase(3)}を設定する" for label in "ABCD"],
+    }
+
+
+def run_benchmark(count: int, queries: int = 1000, seed: int = 0) -> dict[str, float]:
+    """アーカイブのベンチマーク（投入時間と1問あたりの判定時間）
+
+    Args:
+        count: 事前に投入する問題数
+        queries: 判定する問題数
+        seed: 合成問題の乱数シード
+
+    Returns:
+        dict[str, float]: 計測結果
+    """
+    rng = random.Random(seed)
+    archive = QuestionArchive()
+    stored = [_synthetic_question(rng, i) for i in range(count)]
+
+    started = time.perf_counter()
+    archive.add_many(stored, exam_type="AWS-SAP")
+    insert_seconds = time.perf_counter() - started
+
+    probes = [_synthetic_question(rng, count + i) for i in range(queries)]
+    signatures = [
+        (
+            hashlib.sha256(
+                normalize_text(question_text(probe)).encode("utf-8")
+            ).hexdigest(),
+            minhash_signature(normalize_text(question_text(probe))),
+        )
+        for probe in probes
+    ]
+
+    started = time.perf_counter()
+    for digest, signature in signatures:
+        archive._find(digest, signature)
+    lookup_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for probe in probes:
+        archive.find_duplicate(probe)
+    check_seconds = time.perf_counter() - started
+
+    return {
+        "stored": float(len(archive)),
+        "insert_seconds": insert_seconds,
+        "lookup_ms_per_question": lookup_seconds / queries * 1000,
+        "check_ms_per_question": check_seconds / queries * 1000,
+    }
+
+
+if __name__ == "__main__":
+    # ベンチマーク実行 (uv run python app/agentcore/question_archive.py --benchmark 100000)
+    parser = argparse.ArgumentParser(description="問題アーカイブのベンチマーク")
+    parser.add_argument("--benchmark", type=int, default=100_000, help="投入する問題数")
+    parser.add_argument("--queries", type=int, default=1000, help="判定する問題数")
+    args = parser.parse_args()
+    print(json.dumps(run_benchmark(args.benchmark, args.queries), indent=2))
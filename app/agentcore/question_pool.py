@@ -0,0 +1,509 @@
+#!/usr/bin/env python3
+"""
+問題プール - 事前生成した問題の在庫管理
+
+定期実行のたびに Bedrock + MCP 検証で数分かけて生成するのではなく、
+試験・学習分野ごとの問題在庫から即座に払い出し、在庫が下限（ローウォーターマーク）を
+下回ったらバックグラウンドで補充します。
+
+設計判断:
+- 保存先はバックエンド（QuestionPoolBackend）として差し替え可能にする。
+  AgentCore Runtime では実行ごとに新しいセッション（microVM）が割り当てられ /tmp は
+  引き継がれないため、本番では AgentCore Memory（MemoryQuestionPoolBackend）に保存する。
+  ローカルの SQLite（SQLiteQuestionPoolBackend）は開発・テスト用
+- 払い出しは SELECT と DELETE を1トランザクションで行い、同じ問題を二重に払い出さない
+- 払い出し時は最近使用された分野を後回しにし、ジャンル分散を維持する
+- 補充は試験ごとに1タスクのみ実行し、バッチ単位（エージェントの上限5問）で目標在庫まで生成する
+- 補充の失敗・保存先の障害は在庫不足として扱い、払い出し側は従来のライブ生成にフォールバックする
+- 補充中は非同期タスクとして登録（task_tracker）し、/ping が HealthyBusy を返して
+  補充途中でセッションが終了されないようにする
+- 保存先の処理はイベントループを塞がないようスレッドで実行する。Memory の場合は
+  学習分野履歴と同じサーキットブレーカー（breaker）を経由し、払い出しは呼び出し期限の
+  Memory フェーズの予算内に収める（バックグラウンド補充はブレーカーの期限のみ）
+"""
+
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections.abc import Awaitable, Callable
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Protocol, TypeVar
+
+from bedrock_agentcore.memory import MemoryClient
+
+# AgentCore環境では相対インポートが必要
+try:
+    from circuit_breaker import CircuitBreaker
+    from deadline import phase_timeout
+    from run_tracker import AsyncTaskTracker, wait_tasks
+# ローカル環境（テスト・開発）では絶対インポートが必要
+except ImportError:
+    from app.agentcore.circuit_breaker import CircuitBreaker
+    from app.agentcore.deadline import phase_timeout
+    from app.agentcore.run_tracker import AsyncTaskTracker, wait_tasks
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# 問題プール設定定数
+# - 下限: 1日1回・最大5問の払い出しを2回分まかなえる在庫
+# - 目標: 補充時に1週間分（平日5回 × 最大5問）程度まで積み増す
+# - バッチ: エージェントの1回あたりの生成上限（AgentInput.question_count の le=5）
+DEFAULT_LOW_WATER_MARK = 10
+DEFAULT_TARGET_SIZE = 25
+DEFAULT_BATCH_SIZE = 5
+
+# 補充の失敗が続く場合に打ち切るまでの連続失敗回数
+MAX_CONSECUTIVE_FAILURES = 2
+
+# Memory 上の在庫スナップショットに使うアクター（学習分野履歴と同じアクター、セッションで区別する）
+POOL_ACTOR_ID = "cloud-copass-agent"
+POOL_SNAPSHOT_VERSION = 1
+# 最新のスナップショットを探すために読み込むイベント数の上限
+# （払い出し1回・補充1バッチごとに1イベント、Memory のイベント保持期間は30日）
+MAX_SNAPSHOT_EVENTS = 500
+
+# 問題を生成する関数: (exam_type, count, focus_domains) -> 問題（Question.model_dump()）のリスト
+GenerateFunc = Callable[[str, int, list[str]], Awaitable[list[dict[str, Any]]]]
+
+
+class QuestionPoolBackend(Protocol):
+    """問題プールの保存先インターフェース"""
+
+    def add(self, exam_type: str, questions: list[dict[str, Any]]) -> int:
+        """問題を在庫に追加し、追加件数を返す"""
+        ...
+
+    def take(
+        self, exam_type: str, count: int, avoid_domains: list[str] | None = None
+    ) -> list[dict[str, Any]]:
+        """最大 count 件の問題を在庫から取り出す（取り出した問題は在庫から削除）"""
+        ...
+
+    def count(self, exam_type: str) -> int:
+        """試験の在庫数"""
+        ...
+
+    def counts_by_domain(self, exam_type: str) -> dict[str, int]:
+        """試験の学習分野ごとの在庫数"""
+        ...
+
+
+class SQLiteQuestionPoolBackend:
+    """SQLite を使った問題プールの保存先"""
+
+    def __init__(self, path: str | Path = ":memory:") -> None:
+        """
+        Args:
+            path: データベースファイルのパス（":memory:" の場合はプロセス内のみ）
+        """
+        self.path = str(path)
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            self.path, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pooled_questions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                exam_type TEXT NOT NULL,
+                learning_domain TEXT NOT NULL,
+                question_json TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_pooled_questions_exam "
+            "ON pooled_questions (exam_type, learning_domain, created_at)"
+        )
+
+    def add(self, exam_type: str, questions: list[dict[str, Any]]) -> int:
+        now = time.time()
+        rows = [
+            (
+                exam_type,
+                str(question.get("learning_domain", "")),
+                json.dumps(question, ensure_ascii=False),
+                now,
+            )
+            for question in questions
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO pooled_questions "
+                "(exam_type, learning_domain, question_json, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                rows,
+            )
+        return len(rows)
+
+    def take(
+        self, exam_type: str, count: int, avoid_domains: list[str] | None = None
+    ) -> list[dict[str, Any]]:
+        if count <= 0:
+            return []
+
+        avoid = list(avoid_domains or [])
+        placeholders = ",".join("?" * len(avoid)) or "''"
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # 最近使用された分野を後回しにし、同じ分野内では古い問題から払い出す
+                rows = self._conn.execute(
+                    f"""
+                    SELECT id, question_json FROM pooled_questions
+                    WHERE exam_type = ?
+                    ORDER BY learning_domain IN ({placeholders}), created_at, id
+                    LIMIT ?
+                    """,
+                    [exam_type, *avoid, count],
+                ).fetchall()
+                self._conn.executemany(
+                    "DELETE FROM pooled_questions WHERE id = ?",
+                    [(row[0],) for row in rows],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [json.loads(row[1]) for row in rows]
+
+    def count(self, exam_type: str) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM pooled_questions WHERE exam_type = ?",
+                (exam_type,),
+            ).fetchone()
+        return int(row[0])
+
+    def counts_by_domain(self, exam_type: str) -> dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT learning_domain, COUNT(*) FROM pooled_questions "
+                "WHERE exam_type = ? GROUP BY learning_domain",
+                (exam_type,),
+            ).fetchall()
+        return {domain: int(n) for domain, n in rows}
+
+
+class MemoryQuestionPoolBackend:
+    """AgentCore Memory を使った問題プールの保存先（試験ごとの在庫スナップショット）
+
+    在庫が変わるたびに試験ごとのセッションへ在庫全体を1イベントとして追記し、
+    保存時刻が最も新しいスナップショットを現在の在庫とみなす。
+    イベントの先頭メッセージはヘッダー（版・保存時刻・件数）、以降は1問1メッセージ。
+    在庫は試験ごとに最初の参照時に読み込み、以降はプロセス内の値を使う
+    （1回の実行は1セッションで完結する）。Memory には条件付き書き込みがないため、
+    同時に動く別セッションとの排他はベストエフォート。
+    """
+
+    def __init__(self, memory_id: str, region_name: str = "us-east-1") -> None:
+        """
+        Args:
+            memory_id: AgentCore Memory リソースID
+            region_name: AWS リージョン
+        """
+        self.memory_id = memory_id
+        self.client = MemoryClient(region_name=region_name)
+        self._lock = threading.Lock()
+        # 試験 -> [{"created_at": float, "question": dict}]
+        self._stock: dict[str, list[dict[str, Any]]] = {}
+
+    @staticmethod
+    def session_id(exam_type: str) -> str:
+        """在庫スナップショットを保持するセッションID（学習分野履歴のセッションと分離）"""
+        return f"question-pool-{exam_type}"
+
+    def add(self, exam_type: str, questions: list[dict[str, Any]]) -> int:
+        now = time.time()
+        with self._lock:
+            stock = self._load(exam_type)
+            stock += [{"created_at": now, "question": q} for q in questions]
+            self._save(exam_type, stock)
+        return len(questions)
+
+    def take(
+        self, exam_type: str, count: int, avoid_domains: list[str] | None = None
+    ) -> list[dict[str, Any]]:
+        if count <= 0:
+            return []
+
+        avoid = set(avoid_domains or [])
+        with self._lock:
+            stock = self._load(exam_type)
+            # 最近使用された分野を後回しにし、同じ分野内では古い問題から払い出す
+            order = sorted(
+                range(len(stock)),
+                key=lambda i: (
+                    str(stock[i]["question"].get("learning_domain", "")) in avoid,
+                    stock[i]["created_at"],
+                    i,
+                ),
+            )
+            chosen = order[:count]
+            if not chosen:
+                return []
+            taken = set(chosen)
+            remaining = [entry for i, entry in enumerate(stock) if i not in taken]
+            self._save(exam_type, remaining)
+        return [stock[i]["question"] for i in chosen]
+
+    def count(self, exam_type: str) -> int:
+        with self._lock:
+            return len(self._load(exam_type))
+
+    def counts_by_domain(self, exam_type: str) -> dict[str, int]:
+        with self._lock:
+            stock = self._load(exam_type)
+        counts: dict[str, int] = {}
+        for entry in stock:
+            domain = str(entry["question"].get("learning_domain", ""))
+            counts[domain] = counts.get(domain, 0) + 1
+        return counts
+
+    def _load(self, exam_type: str) -> list[dict[str, Any]]:
+        """試験の在庫（未読み込みなら Memory の最新スナップショットから復元）"""
+        stock = self._stock.get(exam_type)
+        if stock is not None:
+            return stock
+
+        events = self.client.list_events(
+            memory_id=self.memory_id,
+            actor_id=POOL_ACTOR_ID,
+            session_id=self.session_id(exam_type),
+            max_results=MAX_SNAPSHOT_EVENTS,
+            include_payload=True,
+        )
+        latest: list[dict[str, Any]] = []
+        latest_saved_at = float("-inf")
+        for event in events:
+            texts = [
+                item.get("conversational", {}).get("content", {}).get("text")
+                for item in event.get("payload", [])
+            ]
+            try:
+                header = json.loads(texts[0])
+                entries = [json.loads(text) for text in texts[1:]]
+                if header["version"] != POOL_SNAPSHOT_VERSION or header["count"] != len(
+                    entries
+                ):
+                    raise ValueError("スナップショットの版または件数が一致しません")
+                saved_at = float(header["saved_at"])
+            except (IndexError, KeyError, TypeError, ValueError) as e:
+                logger.warning(
+                    f"問題プールのスナップショットの解析に失敗（スキップ）: {e}"
+                )
+                continue
+            if saved_at > latest_saved_at:
+                latest, latest_saved_at = entries, saved_at
+
+        self._stock[exam_type] = latest
+        return latest
+
+    def _save(self, exam_type: str, stock: list[dict[str, Any]]) -> None:
+        """在庫全体をスナップショットとして追記（成功後にプロセス内の値を更新）"""
+        header = {
+            "version": POOL_SNAPSHOT_VERSION,
+            "saved_at": time.time(),
+            "count": len(stock),
+        }
+        self.client.create_event(
+            memory_id=self.memory_id,
+            actor_id=POOL_ACTOR_ID,
+            session_id=self.session_id(exam_type),
+            messages=[(json.dumps(header), "USER")]
+            + [(json.dumps(entry, ensure_ascii=False), "USER") for entry in stock],
+            event_timestamp=datetime.now(),
+        )
+        self._stock[exam_type] = stock
+
+
+class QuestionPool:
+    """問題プール（払い出しとローウォーターマーク補充）"""
+
+    def __init__(
+        self,
+        backend: QuestionPoolBackend,
+        generate: GenerateFunc,
+        low_water_mark: int = DEFAULT_LOW_WATER_MARK,
+        target_size: int = DEFAULT_TARGET_SIZE,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        task_tracker: AsyncTaskTracker | None = None,
+        breaker: CircuitBreaker | None = None,
+    ) -> None:
+        """
+        Args:
+            backend: 在庫の保存先
+            generate: 補充用の問題生成関数
+            low_water_mark: 補充を開始する在庫数の下限
+            target_size: 補充で目指す在庫数
+            batch_size: 1回の生成で作る問題数
+            task_tracker: 補充中の非同期タスクの登録先（AgentCore アプリ）
+            breaker: 保存先の呼び出しに使うサーキットブレーカー（Memory の場合。
+                None の場合はスレッドで実行するのみ）
+
+        Raises:
+            ValueError: 目標在庫が下限以下の場合
+        """
+        if target_size <= low_water_mark:
+            raise ValueError("target_size は low_water_mark より大きい値が必須です")
+
+        self.backend = backend
+        self.generate = generate
+        self.low_water_mark = low_water_mark
+        self.target_size = target_size
+        self.batch_size = batch_size
+        self.task_tracker = task_tracker
+        self.breaker = breaker
+        self._replenish_tasks: dict[str, asyncio.Task[int]] = {}
+
+    async def take(
+        self, exam_type: str, count: int, avoid_domains: list[str] | None = None
+    ) -> list[dict[str, Any]]:
+        """在庫から最大 count 件を払い出す（不足分は呼び出し側でライブ生成する）
+
+        保存先の障害時は在庫なしとして扱う。
+        """
+        started = time.perf_counter()
+        try:
+            questions = await self._call(
+                self.backend.take, exam_type, count, avoid_domains
+            )
+        except Exception as e:
+            logger.warning(
+                f"問題プールから払い出せません（ライブ生成で継続）: exam_type={exam_type}, error={e}"
+            )
+            return []
+        logger.info(
+            f"問題プールから払い出し: exam_type={exam_type}, requested={count}, served={len(questions)}, elapsed_ms={(time.perf_counter() - started) * 1000:.1f}"
+        )
+        return questions
+
+    async def needs_replenish(self, exam_type: str) -> bool:
+        """在庫が下限を下回っているか"""
+        return await self._call(self.backend.count, exam_type) < self.low_water_mark
+
+    async def schedule_replenish(self, exam_type: str) -> asyncio.Task[int] | None:
+        """在庫が下限を下回っていればバックグラウンド補充を開始（試験ごとに1タスクのみ）
+
+        Returns:
+            asyncio.Task[int] | None: 補充タスク（補充不要の場合は None）
+        """
+        running = self._replenish_tasks.get(exam_type)
+        if running is not None and not running.done():
+            return running
+        try:
+            if not await self.needs_replenish(exam_type):
+                return None
+        except Exception as e:
+            logger.warning(
+                f"問題プールの在庫を確認できません（補充をスキップ）: exam_type={exam_type}, error={e}"
+            )
+            return None
+
+        task_id = (
+            self.task_tracker.add_async_task(
+                "question_pool_replenish", {"exam_type": exam_type}
+            )
+            if self.task_tracker is not None
+            else None
+        )
+        task = asyncio.create_task(self.replenish(exam_type))
+        self._replenish_tasks[exam_type] = task
+
+        def on_done(_: asyncio.Task[int]) -> None:
+            self._replenish_tasks.pop(exam_type, None)
+            if task_id is not None and self.task_tracker is not None:
+                self.task_tracker.complete_async_task(task_id)
+
+        task.add_done_callback(on_done)
+        return task
+
+    async def replenish(self, exam_type: str) -> int:
+        """目標在庫まで問題を生成して補充
+
+        Returns:
+            int: 追加した問題数
+        """
+        added = 0
+        failures = 0
+        try:
+            while (
+                stock := await self._call(
+                    self.backend.count, exam_type, within_deadline=False
+                )
+            ) < self.target_size:
+                batch = min(self.batch_size, self.target_size - stock)
+                focus_domains = await self._focus_domains(exam_type)
+                try:
+                    questions = await self.generate(exam_type, batch, focus_domains)
+                except Exception as e:
+                    failures += 1
+                    logger.warning(
+                        f"問題プールの補充に失敗: exam_type={exam_type}, failures={failures}, error={e}"
+                    )
+                    if failures >= MAX_CONSECUTIVE_FAILURES:
+                        break
+                    continue
+
+                failures = 0
+                if not questions:
+                    break
+                added += await self._call(
+                    self.backend.add, exam_type, questions, within_deadline=False
+                )
+        except Exception as e:
+            # 保存先の障害（生成済みのバッチは失われるが、次回の実行で補充し直す）
+            logger.warning(
+                f"問題プールの保存先にアクセスできないため補充を中断: exam_type={exam_type}, added={added}, error={e}"
+            )
+            return added
+
+        logger.info(
+            f"問題プール補充完了: exam_type={exam_type}, added={added}, stock={stock}"
+        )
+        return added
+
+    async def wait_replenished(self, timeout: float | None = None) -> None:
+        """実行中の補充タスクの完了を待機（テスト・シャットダウン用）
+
+        補充タスクは AgentCore のワーカースレッドのイベントループ上で動作するため、
+        タスクのループ上で待機する。
+        """
+        await wait_tasks(list(self._replenish_tasks.values()), timeout=timeout)
+
+    async def _call(
+        self, func: Callable[..., T], *args: Any, within_deadline: bool = True
+    ) -> T:
+        """保存先の処理をスレッドで実行（breaker 指定時はサーキットブレーカーを経由）
+
+        within_deadline=False はバックグラウンド補充用で、応答後に切れる呼び出し期限ではなく
+        ブレーカーの呼び出し期限のみを適用する。
+        """
+        if self.breaker is None:
+            return await asyncio.to_thread(func, *args)
+        timeout = (
+            phase_timeout("memory", default=self.breaker.call_timeout)
+            if within_deadline
+            else None
+        )
+        result: T = await self.breaker.call(func, *args, timeout=timeout)
+        return result
+
+    async def _focus_domains(self, exam_type: str) -> list[str]:
+        """在庫の少ない分野（補充時に優先して生成する分野）"""
+        counts = await self._call(
+            self.backend.counts_by_domain, exam_type, within_deadline=False
+        )
+        if not counts:
+            return []
+        fewest = min(counts.values())
+        return sorted(domain for domain, n in counts.items() if n == fewest)
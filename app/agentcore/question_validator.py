@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+問題バリデーター - 生成された問題の構造検証
+
+Question モデルはプロンプトの指示に頼っている不変条件（選択肢の書式、正解ラベル、
+出典、学習分野）をローカルで検証し、違反した問題だけを再生成の対象にします。
+
+設計判断:
+- 検証は LLM を使わない純粋な関数とし、1問あたりマイクロ秒単位で完了させる
+- 違反は例外ではなく ValidationIssue のリストで返し、修正指示としてプロンプトに渡せるようにする
+- 学習分野の検証は試験ガイドの索引（ExamGuideIndex）がある場合のみ行う
+- primary_technologies はサービスカタログ（ServiceCatalog）がある場合に範囲外サービスのみを違反とする。
+  カタログで解決できない表記は機能名・概念名の可能性があるため違反にしない
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Any
+
+try:
+    # AgentCore環境では相対インポートが必要
+    from exam_guide_index import ExamGuideIndex
+    from service_catalog import ServiceCatalog
+except ImportError:
+    # ローカル環境（テスト・開発）では絶対インポートが必要
+    from app.agentcore.exam_guide_index import ExamGuideIndex
+    from app.agentcore.service_catalog import ServiceCatalog
+
+# 検証ルール定数
+# - 選択肢: 「**A.** 内容」の形式で A から順にラベル付けされた4つ以上
+# - 正解: 選択肢のラベルのいずれか1文字
+# - 出典: AWS Documentation MCP Server で検証に用いた https の URL を1つ以上
+MIN_OPTIONS = 4
+OPTION_PATTERN = re.compile(r"^\*\*([A-Z])\.\*\*\s*\S")
+CORRECT_ANSWER_PATTERN = re.compile(r"^[A-Z]$")
+SOURCE_PATTERN = re.compile(r"^https://\S+$")
+
+
+@dataclass(frozen=True)
+class ValidationIssue:
+    """検証で見つかった違反"""
+
+    field: str
+    message: str
+
+    def __str__(self) -> str:
+        return f"{self.field}: {self.message}"
+
+
+def validate_question(
+    question: dict[str, Any],
+    guide_index: ExamGuideIndex | None = None,
+    service_catalog: ServiceCatalog | None = None,
+) -> list[ValidationIssue]:
+    """1問を検証
+
+    Args:
+        question: 検証する問題（Question.model_dump()）
+        guide_index: 試験ガイドの索引（None の場合は学習分野を検証しない）
+        service_catalog: サービスカタログ（None の場合は primary_technologies を検証しない）
+
+    Returns:
+        list[ValidationIssue]: 違反のリスト（空の場合は合格）
+    """
+    issues: list[ValidationIssue] = []
+
+    if not str(question.get("question", "")).strip():
+        issues.append(ValidationIssue("question", "問題文が空です"))
+
+    options = [str(option).strip() for option in question.get("options", [])]
+    if len(options) < MIN_OPTIONS:
+        issues.append(
+            ValidationIssue(
+                "options", f"選択肢は{MIN_OPTIONS}つ以上必要です（{len(options)}つ）"
+            )
+        )
+    labels: list[str] = []
+    for position, option in enumerate(options):
+        match = OPTION_PATTERN.match(option)
+        expected = chr(ord("A") + position)
+        if match is None or match.group(1) != expected:
+            issues.append(
+                ValidationIssue(
+                    "options",
+                    f"{position + 1}番目の選択肢は「**{expected}.** 内容」の形式が必要です: {option[:40]}",
+                )
+            )
+        else:
+            labels.append(match.group(1))
+
+    correct_answer = str(question.get("correct_answer", "")).strip()
+    if not CORRECT_ANSWER_PATTERN.match(correct_answer):
+        issues.append(
+            ValidationIssue(
+                "correct_answer",
+                f"正解は選択肢のラベル1文字が必要です: {correct_answer!r}",
+            )
+        )
+    elif labels and correct_answer not in labels:
+        issues.append(
+            ValidationIssue(
+                "correct_answer",
+                f"正解 {correct_answer} に対応する選択肢がありません",
+            )
+        )
+
+    sources = [str(source).strip() for source in question.get("source", [])]
+    if not sources:
+        issues.append(ValidationIssue("source", "出典URLが1つ以上必要です"))
+    for source in sources:
+        if not SOURCE_PATTERN.match(source):
+            issues.append(ValidationIssue("source", f"出典URLが不正です: {source}"))
+
+    learning_domain = str(question.get("learning_domain", ""))
+    if guide_index is not None and guide_index.domains:
+        if guide_index.find_domain(learning_domain) is None:
+            issues.append(
+                ValidationIssue(
+                    "learning_domain",
+                    f"試験ガイドに存在しない学習分野です: {learning_domain}"
+                    f"（{' / '.join(guide_index.domain_names)} のいずれか）",
+                )
+            )
+
+    if service_catalog is not None:
+        for resolution in service_catalog.check(
+            question.get("primary_technologies", [])
+        ):
+            if resolution.status == "out_of_scope":
+                issues.append(
+                    ValidationIssue(
+                        "primary_technologies",
+                        f"試験範囲外のサービスです: {resolution.text}",
+                    )
+                )
+
+    return issues
+
+
+def validate_questions(
+    questions: list[dict[str, Any]],
+    guide_index: ExamGuideIndex | None = None,
+    service_catalog: ServiceCatalog | None = None,
+) -> dict[int, list[ValidationIssue]]:
+    """複数の問題を検証し、違反のある問題のみを返す
+
+    Returns:
+        dict[int, list[ValidationIssue]]: 問題の位置 -> 違反のリスト
+    """
+    failures: dict[int, list[ValidationIssue]] = {}
+    for index, question in enumerate(questions):
+        issues = validate_question(question, guide_index, service_catalog)
+        if issues:
+            failures[index] = issues
+    return failures
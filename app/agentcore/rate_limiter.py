@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+トークンバケット方式のレートリミッター - Webhook 送信の平準化
+
+バッチ実行や複数チャネルへの一斉投稿で Power Automate にスロットリング（429）
+されないよう、全ての Webhook 送信が共有するプロセス全体のレートリミッターを提供します。
+
+設計判断:
+- Webhook ホスト単位にトークンバケットを持ち、レートとバーストをホストごとに設定可能
+- 予約方式: トークン残量を負にしてでも先に予約し、不足分の時間だけ待機する。
+  先着順（FIFO）が保たれ、ロックを保持したまま待機しない
+- 配信キューのワーカーループなど複数のイベントループ・スレッドから利用されるため、
+  asyncio.Lock ではなく threading.Lock で予約を保護する
+- 待機時間は統計（回数・合計・最大）として保持し、待機が発生した送信はログに出力する。
+  統計は stats アクションで参照できる
+- 設定値の誤り（数値でない・範囲外）はモジュール読み込みを失敗させず、警告を出して既定値で継続する
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from typing import Any
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# レート制限設定定数
+# - Power Automate の HTTP トリガーは短時間の連続呼び出しで 429 を返すため、
+#   既定では毎秒1件・最大5件までのバーストに平準化する
+DEFAULT_RATE_PER_SECOND = 1.0
+DEFAULT_BURST = 5
+
+
+@dataclass
+class RateLimitStats:
+    """レートリミッターの待機統計"""
+
+    acquired: int = 0
+    waited: int = 0
+    total_wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+
+
+class TokenBucket:
+    """トークンバケット（予約方式）"""
+
+    def __init__(
+        self,
+        rate_per_second: float,
+        burst: int,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Args:
+            rate_per_second: 1秒あたりのトークン補充数
+            burst: バケット容量（連続して即時送信できる最大件数）
+            clock: 単調増加する時刻関数（テスト用に差し替え可能）
+
+        Raises:
+            ValueError: レートまたはバーストが正の値でない場合
+        """
+        if rate_per_second <= 0 or burst < 1:
+            raise ValueError("rate_per_second は正の値、burst は1以上が必須です")
+
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self._clock = clock
+        self._tokens = float(burst)
+        self._updated_at = clock()
+        self._lock = threading.Lock()
+        self.stats = RateLimitStats()
+
+    def reserve(self) -> float:
+        """トークンを1つ予約し、送信まで待機すべき秒数を返す"""
+        with self._lock:
+            now = self._clock()
+            elapsed = now - self._updated_at
+            self._tokens = min(
+                float(self.burst), self._tokens + elapsed * self.rate_per_second
+            )
+            self._updated_at = now
+            self._tokens -= 1
+            wait = max(0.0, -self._tokens / self.rate_per_second)
+
+            self.stats.acquired += 1
+            if wait > 0:
+                self.stats.waited += 1
+                self.stats.total_wait_seconds += wait
+                self.stats.max_wait_seconds = max(self.stats.max_wait_seconds, wait)
+            return wait
+
+    async def acquire(self) -> float:
+        """トークンを取得（不足時は補充されるまで待機）
+
+        Returns:
+            float: 待機した秒数
+        """
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+
+class RateLimiterRegistry:
+    """Webhook ホスト単位のトークンバケット管理"""
+
+    def __init__(
+        self,
+        default_rate_per_second: float = DEFAULT_RATE_PER_SECOND,
+        default_burst: int = DEFAULT_BURST,
+        host_limits: dict[str, dict[str, Any]] | None = None,
+    ) -> None:
+        """
+        Args:
+            default_rate_per_second: ホスト個別設定がない場合のレート
+            default_burst: ホスト個別設定がない場合のバースト
+            host_limits: ホスト個別設定 {"host": {"rate": float, "burst": int}}
+        """
+        self.default_rate_per_second = default_rate_per_second
+        self.default_burst = default_burst
+        self._host_limits = dict(host_limits or {})
+        self._buckets: dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "RateLimiterRegistry":
+        """環境変数から設定を読み込んで生成
+
+        - TEAMS_RATE_LIMIT_PER_SECOND: 既定のレート
+        - TEAMS_RATE_LIMIT_BURST: 既定のバースト
+        - TEAMS_RATE_LIMITS: ホスト個別設定（JSON）
+        """
+        host_limits: dict[str, dict[str, Any]] = {}
+        raw_limits = os.getenv("TEAMS_RATE_LIMITS")
+        if raw_limits:
+            try:
+                parsed = json.loads(raw_limits)
+                if not isinstance(parsed, dict):
+                    raise ValueError("JSON オブジェクトではありません")
+                host_limits = parsed
+            except ValueError as e:
+                logger.warning(f"TEAMS_RATE_LIMITS の解析に失敗（既定値で継続）: {e}")
+
+        rate_per_second = DEFAULT_RATE_PER_SECOND
+        raw_rate = os.getenv("TEAMS_RATE_LIMIT_PER_SECOND")
+        if raw_rate:
+            try:
+                rate_per_second = float(raw_rate)
+                if not rate_per_second > 0:
+                    raise ValueError("正の値が必須です")
+            except ValueError as e:
+                rate_per_second = DEFAULT_RATE_PER_SECOND
+                logger.warning(
+                    f"TEAMS_RATE_LIMIT_PER_SECOND の解析に失敗（既定値で継続）: {raw_rate!r}, {e}"
+                )
+
+        burst = DEFAULT_BURST
+        raw_burst = os.getenv("TEAMS_RATE_LIMIT_BURST")
+        if raw_burst:
+            try:
+                burst = int(raw_burst)
+                if burst < 1:
+                    raise ValueError("1以上が必須です")
+            except ValueError as e:
+                burst = DEFAULT_BURST
+                logger.warning(
+                    f"TEAMS_RATE_LIMIT_BURST の解析に失敗（既定値で継続）: {raw_burst!r}, {e}"
+                )
+
+        return cls(
+            default_rate_per_second=rate_per_second,
+            default_burst=burst,
+            host_limits=host_limits,
+        )
+
+    def configure(self, host: str, rate_per_second: float, burst: int) -> None:
+        """ホスト個別のレートとバーストを設定（既存のバケットは置き換える）"""
+        with self._lock:
+            self._host_limits[host] = {"rate": rate_per_second, "burst": burst}
+            self._buckets.pop(host, None)
+
+    def get(self, host: str) -> TokenBucket:
+        """ホストのトークンバケットを取得（未作成なら生成）"""
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                limits = self._host_limits.get(host, {})
+                try:
+                    bucket = TokenBucket(
+                        rate_per_second=float(
+                            limits.get("rate", self.default_rate_per_second)
+                        ),
+                        burst=int(limits.get("burst", self.default_burst)),
+                    )
+                except (AttributeError, TypeError, ValueError) as e:
+                    logger.warning(
+                        f"ホスト個別のレート制限設定が不正です（既定値で継続）: host={host}, {e}"
+                    )
+                    bucket = TokenBucket(
+                        rate_per_second=self.default_rate_per_second,
+                        burst=self.default_burst,
+                    )
+                self._buckets[host] = bucket
+            return bucket
+
+    async def acquire(self, url: str) -> float:
+        """URL のホストに対するトークンを取得
+
+        Args:
+            url: 送信先の Webhook URL
+
+        Returns:
+            float: 待機した秒数
+        """
+        host = urlsplit(url).netloc
+        wait = await self.get(host).acquire()
+        if wait > 0:
+            logger.info(
+                f"Webhook レート制限で待機: host={host}, wait_ms={wait * 1000:.1f}"
+            )
+        return wait
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        """ホストごとの設定と待機統計を取得（stats アクション用）"""
+        with self._lock:
+            return {
+                host: {
+                    "rate_per_second": bucket.rate_per_second,
+                    "burst": bucket.burst,
+                    **asdict(bucket.stats),
+                }
+                for host, bucket in self._buckets.items()
+            }
+
+
+# 全ての Webhook 送信が共有するプロセス全体のレートリミッター
+rate_limiters = RateLimiterRegistry.from_env()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+バックグラウンド実行トラッカー - 非同期トリガーモード用
+
+トリガー Lambda が生成完了を待たずに戻れるよう、問題生成をバックグラウンドの
+asyncio タスクとして実行し、その進行状況（受付・実行中・成功・失敗）を記録します。
+
+設計判断:
+- 実行 ID（run_id）はトリガー側が発行した runtimeSessionId をそのまま使う。
+  同じ run_id の再送（スケジューラーのリトライ）は既存の実行記録を返し、二重に生成しない
+- タスクへの強参照を保持し、ガベージコレクションで実行途中のタスクが消えないようにする
+- 実行記録は件数上限付きで保持し、古い完了済みの記録から破棄する
+- 生成結果そのものは保持せず、問題数などの要約のみを記録する（メモリ使用量を抑える）
+- 同じ実行キーの生成が別の実行で進行中の場合（冪等性ストアが in_progress を返す）は、
+  生成していないため succeeded ではなく duplicate として記録する
+- タスクは AgentCore のワーカースレッドのイベントループ上で動作するため、
+  シャットダウン時の待機は配信キューと同じくタスクのループ上で行う
+  （別ループからの asyncio.wait は完了通知を受け取れず、常にタイムアウトまで待つ）
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict, dataclass
+from typing import Any, Literal, Protocol
+
+logger = logging.getLogger(__name__)
+
+# 実行記録の保持上限（古い完了済みの記録から破棄）
+MAX_TRACKED_RUNS = 1000
+
+RunStatus = Literal["accepted", "running", "succeeded", "failed", "duplicate"]
+
+
+class AsyncTaskTracker(Protocol):
+    """非同期タスクの登録先（BedrockAgentCoreApp の add_async_task / complete_async_task）
+
+    登録中のタスクがある間は /ping が HealthyBusy を返し、セッションが終了されない。
+    """
+
+    def add_async_task(self, name: str, metadata: dict[str, Any] | None = None) -> int:
+        """タスクを登録してタスクIDを返す"""
+        ...
+
+    def complete_async_task(self, task_id: int) -> bool:
+        """登録したタスクを完了にする"""
+        ...
+
+
+@dataclass
+class RunRecord:
+    """バックグラウンド実行の記録"""
+
+    run_id: str
+    status: RunStatus = "accepted"
+    accepted_at: float = 0.0
+    completed_at: float | None = None
+    question_count: int = 0
+    error: str | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        """レスポンス用の辞書に変換"""
+        return asdict(self)
+
+
+class RunTracker:
+    """バックグラウンド実行の起動と状態管理"""
+
+    def __init__(self, max_tracked_runs: int = MAX_TRACKED_RUNS) -> None:
+        """
+        Args:
+            max_tracked_runs: 保持する実行記録の上限
+        """
+        self.max_tracked_runs = max_tracked_runs
+        self._records: OrderedDict[str, RunRecord] = OrderedDict()
+        self._tasks: dict[str, asyncio.Task[None]] = {}
+
+    def start(
+        self, run_id: str, work: Callable[[], Awaitable[dict[str, Any]]]
+    ) -> RunRecord:
+        """バックグラウンド実行を開始（同じ run_id が実行中・成功済みなら既存の記録を返す）
+
+        Args:
+            run_id: 実行 ID
+            work: 生成処理（AgentOutput.model_dump() またはエラー情報を返す）
+
+        Returns:
+            RunRecord: 実行記録
+        """
+        existing = self._records.get(run_id)
+        if existing is not None and existing.status != "failed":
+            logger.info(
+                f"実行 ID が重複しているため既存の実行を返します: run_id={run_id}, status={existing.status}"
+            )
+            return existing
+
+        record = RunRecord(run_id=run_id, accepted_at=time.time())
+        self._records[run_id] = record
+        self._records.move_to_end(run_id)
+        self._tasks[run_id] = asyncio.create_task(self._run(record, work))
+        self._evict()
+
+        logger.info(f"バックグラウンド実行を受け付けました: run_id={run_id}")
+        return record
+
+    def get(self, run_id: str) -> RunRecord | None:
+        """実行記録を取得"""
+        return self._records.get(run_id)
+
+    @property
+    def active(self) -> int:
+        """実行中（未完了）の件数"""
+        return len(self._tasks)
+
+    async def wait(self, timeout: float | None = None) -> None:
+        """実行中のタスクが全て完了するまで待機（テスト・シャットダウン用）"""
+        await wait_tasks(list(self._tasks.values()), timeout=timeout)
+
+    async def _run(
+        self, record: RunRecord, work: Callable[[], Awaitable[dict[str, Any]]]
+    ) -> None:
+        """生成処理を実行して記録を更新"""
+        record.status = "running"
+        try:
+            result = await work()
+            if "error" in result:
+                record.status = "failed"
+                record.error = str(result["error"])
+            elif result.get("status") == "in_progress":
+                # 同じ実行キーの生成が別の実行で進行中（この実行では生成していない）
+                record.status = "duplicate"
+            else:
+                record.status = "succeeded"
+                record.question_count = len(result.get("questions", []))
+        except Exception as e:
+            record.status = "failed"
+            record.error = str(e)
+        finally:
+            record.completed_at = time.time()
+            self._tasks.pop(record.run_id, None)
+
+        elapsed = record.completed_at - record.accepted_at
+        logger.info(
+            f"バックグラウンド実行完了: run_id={record.run_id}, status={record.status}, elapsed_seconds={elapsed:.1f}"
+        )
+
+    def _evict(self) -> None:
+        """上限を超えた完了済みの実行記録を古い順に破棄"""
+        overflow = len(self._records) - self.max_tracked_runs
+        if overflow <= 0:
+            return
+        for run_id in list(self._records):
+            if overflow <= 0:
+                break
+            if run_id not in self._tasks:
+                del self._records[run_id]
+                overflow -= 1
+
+
+async def wait_tasks(
+    tasks: list[asyncio.Task[Any]], timeout: float | None = None
+) -> None:
+    """タスクが全て完了するまで待機（別スレッドのイベントループ上のタスクはそのループ上で待機）
+
+    Args:
+        tasks: 待機するタスク
+        timeout: 最大待機秒数
+    """
+    if not tasks:
+        return
+
+    running = asyncio.get_running_loop()
+    by_loop: dict[asyncio.AbstractEventLoop, list[asyncio.Task[Any]]] = {}
+    for task in tasks:
+        by_loop.setdefault(task.get_loop(), []).append(task)
+
+    waiters: list[asyncio.Future[Any]] = []
+    for loop, group in by_loop.items():
+        if loop is running:
+            waiters.append(asyncio.ensure_future(asyncio.wait(group, timeout=timeout)))
+        elif not loop.is_closed():
+            future = asyncio.run_coroutine_threadsafe(
+                asyncio.wait(group, timeout=timeout), loop
+            )
+            waiters.append(asyncio.wrap_future(future))
+    if waiters:
+        # タスクのループが停止している場合に備え、外側でもタイムアウトを設ける
+        await asyncio.wait(waiters, timeout=timeout)
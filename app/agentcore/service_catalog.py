@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+サービスカタログ - primary_technologies を試験ガイドの範囲内/範囲外サービスに照合
+
+試験ガイドの付録に記載された範囲内・範囲外の AWS サービスから別名の索引を事前に構築し、
+問題の primary_technologies を正規のカタログ項目に解決します。
+範囲外のサービスを投稿前に検出し、サービスごとの出題数の集計にも使います。
+
+設計判断:
+- 別名は正式名・「Amazon」「AWS」の接頭辞なし・括弧内の略称（Amazon MSK / MSK など）から自動生成し、
+  ガイドに載らない慣用名（IAM Identity Center 等）のみ補助的に定義する
+- 照合キーは NFKC・小文字化・空白と記号の除去で正規化し、トライ木の最長一致で引く
+  （入力長に比例する O(length)。「VPC ピアリング」のように機能名が続く表記も VPC に解決できる）
+- 最長一致の直後が同じ単語の英数字の場合（S3bucket 等）は別の単語の一部とみなし、
+  誤った解決を避ける。元の表記で空白・記号があった位置は単語の区切りとして扱う
+- カタログ項目には出現順の整数IDを振り、カバレッジ集計（ビットセット）で使えるようにする
+"""
+
+import re
+import unicodedata
+from collections import Counter
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Literal
+
+try:
+    # AgentCore環境では相対インポートが必要
+    from exam_guide_index import ExamGuideIndex, load_exam_guide_index, normalize_name
+except ImportError:
+    # ローカル環境（テスト・開発）では絶対インポートが必要
+    from app.agentcore.exam_guide_index import (
+        ExamGuideIndex,
+        load_exam_guide_index,
+        normalize_name,
+    )
+
+# ガイドに記載のない慣用名 -> ガイド上の正式名
+EXTRA_ALIASES = {
+    "IAM Identity Center": "AWS IAM アイデンティティセンター",
+    "AWS Single Sign-On": "AWS IAM アイデンティティセンター",
+    "AWS SSO": "AWS IAM アイデンティティセンター",
+    "Amazon Kinesis Data Firehose": "Amazon Data Firehose",
+    "Amazon Elasticsearch Service": "Amazon OpenSearch Service",
+    "AWS Snowball": "AWS Snow Family",
+    "AWS Site-to-Site VPN": "AWS VPN",
+    "Application Load Balancer": "Elastic Load Balancing (ELB)",
+    "Network Load Balancer": "Elastic Load Balancing (ELB)",
+    "AWS Certificate Manager": "AWS Certificate Manager (ACM)",
+}
+
+_SERVICE_PREFIX = re.compile(r"^(Amazon|AWS)\s+")
+_FORMER_NAME = re.compile(r"^旧名\s*")
+_ABBREVIATION = re.compile(r"^[A-Za-z0-9 .\-]+$")
+_SEPARATOR = re.compile(r"[\s\W_]+", re.UNICODE)
+
+ServiceStatus = Literal["in_scope", "out_of_scope", "unknown"]
+
+
+@dataclass(frozen=True)
+class CatalogEntry:
+    """カタログ項目（範囲内・範囲外のサービス）"""
+
+    id: int
+    name: str
+    category: str
+    in_scope: bool
+
+
+@dataclass(frozen=True)
+class ServiceResolution:
+    """primary_technologies の1項目の照合結果"""
+
+    text: str
+    entry: CatalogEntry | None
+
+    @property
+    def status(self) -> ServiceStatus:
+        if self.entry is None:
+            return "unknown"
+        return "in_scope" if self.entry.in_scope else "out_of_scope"
+
+
+@dataclass
+class _TrieNode:
+    children: dict[str, "_TrieNode"] = field(default_factory=dict)
+    entry: CatalogEntry | None = None
+
+
+def service_aliases(name: str) -> set[str]:
+    """正式名から別名を生成（接頭辞なし・括弧内の略称）"""
+    base, _, rest = name.partition(" (")
+    aliases = {name, base, _SERVICE_PREFIX.sub("", base)}
+    inner = _FORMER_NAME.sub("", rest.rstrip(")").strip())
+    if inner and _ABBREVIATION.match(inner):
+        aliases.update({inner, _SERVICE_PREFIX.sub("", inner)})
+    return {alias for alias in aliases if alias}
+
+
+class ServiceCatalog:
+    """サービス名の別名索引（トライ木）"""
+
+    def __init__(self, entries: list[CatalogEntry]) -> None:
+        """
+        Args:
+            entries: カタログ項目（範囲内・範囲外）
+        """
+        self.entries = entries
+        self._root = _TrieNode()
+        by_name = {entry.name: entry for entry in entries}
+        for entry in entries:
+            for alias in service_aliases(entry.name):
+                self._insert(alias, entry)
+        for alias, name in EXTRA_ALIASES.items():
+            if name in by_name:
+                self._insert(alias, by_name[name])
+
+    @classmethod
+    def from_guide(cls, guide_index: ExamGuideIndex) -> "ServiceCatalog":
+        """試験ガイドの索引からカタログを作成"""
+        entries: list[CatalogEntry] = []
+        for in_scope, services in (
+            (True, guide_index.in_scope_services),
+            (False, guide_index.out_of_scope_services),
+        ):
+            for category, names in services.items():
+                for name in names:
+                    entries.append(
+                        CatalogEntry(
+                            id=len(entries),
+                            name=name,
+                            category=category,
+                            in_scope=in_scope,
+                        )
+                    )
+        return cls(entries)
+
+    def resolve(self, text: str) -> CatalogEntry | None:
+        """サービス名をカタログ項目に解決（最長一致、解決できない場合は None）"""
+        key, boundaries = _key_with_boundaries(text)
+        node = self._root
+        best: CatalogEntry | None = None
+        for position, char in enumerate(key):
+            child = node.children.get(char)
+            if child is None:
+                break
+            node = child
+            end = position + 1
+            if node.entry is not None and (
+                end in boundaries or not _continues_word(key, end)
+            ):
+                best = node.entry
+        return best
+
+    def check(self, technologies: Iterable[str]) -> list[ServiceResolution]:
+        """primary_technologies を照合"""
+        return [ServiceResolution(text, self.resolve(text)) for text in technologies]
+
+    def coverage_counts(self, technology_lists: Iterable[list[str]]) -> Counter[str]:
+        """正式名ごとの出題数（1問で同じサービスが複数回挙がっても1回）"""
+        counts: Counter[str] = Counter()
+        for technologies in technology_lists:
+            counts.update(
+                {
+                    entry.name
+                    for text in technologies
+                    if (entry := self.resolve(text)) is not None
+                }
+            )
+        return counts
+
+    def _insert(self, alias: str, entry: CatalogEntry) -> None:
+        node = self._root
+        for char in normalize_name(alias):
+            node = node.children.setdefault(char, _TrieNode())
+        # 同じ別名が複数の項目から生成された場合は先に登録した項目を優先
+        if node.entry is None:
+            node.entry = entry
+
+
+def _key_with_boundaries(text: str) -> tuple[str, set[int]]:
+    """照合キー（normalize_name と同じ）と、元の表記で単語の区切りがあった位置"""
+    parts = [
+        part
+        for part in _SEPARATOR.split(unicodedata.normalize("NFKC", text).lower())
+        if part
+    ]
+    boundaries: set[int] = set()
+    length = 0
+    for part in parts:
+        length += len(part)
+        boundaries.add(length)
+    return "".join(parts), boundaries
+
+
+def _continues_word(key: str, end: int) -> bool:
+    """一致位置の直後が英数字（別の単語の一部）かどうか"""
+    return end < len(key) and key[end].isascii() and key[end].isalnum()
+
+
+@lru_cache(maxsize=8)
+def get_service_catalog(exam_type: str) -> ServiceCatalog:
+    """試験ごとのサービスカタログ（プロセス内でキャッシュ）
+
+    Raises:
+        FileNotFoundError: 指定された試験ガイドファイルが存在しない場合
+    """
+    return ServiceCatalog.from_guide(load_exam_guide_index(exam_type))
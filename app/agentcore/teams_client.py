@@ -9,6 +9,9 @@ Power Automate "Anyone"モードを使用するため、APIキー認証は不要
 - agent_main.py ⇄ teams_client.py の相互依存を回避
 - model_dump_json()メソッドの存在で実行時の型安全性を保証
 - 使用箇所が限定的（agent_main.pyのみ）なため、実用上問題なし
+- 全ての送信はプロセス共有のトークンバケット（rate_limiter）を経由する
+- カード描画モード（TEAMS_RENDER_CARDS=true）ではサーバーサイドで描画した
+  Adaptive Card JSON を送信し、Power Automate はカードを転送するだけになる
 """
 
 import logging
@@ -18,6 +21,19 @@ from typing import Any
 import httpx
 from dotenv import load_dotenv
 
+try:
+    # AgentCore環境では相対インポートが必要
+    from card_renderer import render_cards
+    from payload_builder import DEFAULT_MAX_PAYLOAD_BYTES, build_payloads
+    from rate_limiter import rate_limiters
+    from tracing import set_attributes, span
+except ImportError:
+    # ローカル環境（テスト・開発）では絶対インポートが必要
+    from app.agentcore.card_renderer import render_cards
+    from app.agentcore.payload_builder import DEFAULT_MAX_PAYLOAD_BYTES, build_payloads
+    from app.agentcore.rate_limiter import rate_limiters
+    from app.agentcore.tracing import set_attributes, span
+
 # .envファイルを読み込み
 load_dotenv()
 
@@ -27,18 +43,35 @@ logger = logging.getLogger(__name__)
 class TeamsClient:
     """Teams投稿クライアント（Power Automate Webhook経由）"""
 
-    def __init__(self, timeout: int = 30):
+    def __init__(
+        self,
+        timeout: float = 30,
+        render_cards: bool | None = None,
+        max_payload_bytes: int | None = None,
+        defer_long_fields: bool | None = None,
+        webhook_url: str | None = None,
+        security_token: str | None = None,
+    ):
         """
         Webhook クライアントを初期化
 
         Args:
             timeout: HTTPリクエストタイムアウト（秒）
+            render_cards: Adaptive Card をサーバーサイドで描画して送信するか
+                         （省略時は環境変数 TEAMS_RENDER_CARDS に従う）
+            max_payload_bytes: 1ポストあたりの最大バイト数
+                         （省略時は環境変数 TEAMS_MAX_PAYLOAD_BYTES に従う）
+            defer_long_fields: 長いフィールドを後続ポストに移動するか
+                         （省略時は環境変数 TEAMS_DEFER_LONG_FIELDS に従う）
+            webhook_url: 送信先URL（省略時は環境変数 POWER_AUTOMATE_WEBHOOK_URL）
+            security_token: セキュリティトークン
+                         （省略時は環境変数 POWER_AUTOMATE_SECURITY_TOKEN）
 
         Raises:
             ValueError: WebhookURLまたはセキュリティトークンが未設定の場合
         """
-        webhook_url = os.getenv("POWER_AUTOMATE_WEBHOOK_URL")
-        security_token = os.getenv("POWER_AUTOMATE_SECURITY_TOKEN")
+        webhook_url = webhook_url or os.getenv("POWER_AUTOMATE_WEBHOOK_URL")
+        security_token = security_token or os.getenv("POWER_AUTOMATE_SECURITY_TOKEN")
 
         if not webhook_url:
             raise ValueError("POWER_AUTOMATE_WEBHOOK_URL の設定が必須です")
@@ -50,6 +83,19 @@ class TeamsClient:
         self.webhook_url: str = webhook_url
         self.security_token: str = security_token
         self.timeout = timeout
+        self.render_cards = (
+            render_cards
+            if render_cards is not None
+            else os.getenv("TEAMS_RENDER_CARDS", "false").lower() == "true"
+        )
+        self.max_payload_bytes = max_payload_bytes or int(
+            os.getenv("TEAMS_MAX_PAYLOAD_BYTES", str(DEFAULT_MAX_PAYLOAD_BYTES))
+        )
+        self.defer_long_fields = (
+            defer_long_fields
+            if defer_long_fields is not None
+            else os.getenv("TEAMS_DEFER_LONG_FIELDS", "false").lower() == "true"
+        )
 
     async def send(self, agent_output: Any) -> None:
         """
@@ -66,38 +112,70 @@ class TeamsClient:
             httpx.TimeoutException: タイムアウト時
             Exception: その他のエラー時
         """
-        try:
-            # AgentOutputをJSONオブジェクトに変換
-            agent_output_data = agent_output.model_dump()
-
-            # セキュリティトークンを追加
-            secure_payload = {
-                "security_token": self.security_token,  # Power Automateで検証
-                **agent_output_data,  # 既存のAgentOutputデータを展開
-            }
-
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                logger.info("Power Automate への送信を開始します")
-
-                response = await client.post(
-                    self.webhook_url,
-                    json=secure_payload,
+        with span("teams.send", {"teams.render_cards": self.render_cards}):
+            try:
+                # AgentOutputをJSONオブジェクトに変換
+                agent_output_data = agent_output.model_dump()
+
+                if self.render_cards:
+                    # 描画済みカードを送信（Power Automate はカードを転送するのみ）
+                    items_key = "cards"
+                    items = render_cards(agent_output_data.pop("questions"))
+                else:
+                    items_key = "questions"
+                    items = agent_output_data.pop("questions")
+
+                # セキュリティトークンを追加し、サイズ上限以下のポストに分割
+                base = {
+                    "security_token": self.security_token,  # Power Automateで検証
+                    **agent_output_data,  # questions 以外のAgentOutputデータを展開
+                }
+                payloads, stats = build_payloads(
+                    base=base,
+                    items_key=items_key,
+                    items=items,
+                    max_bytes=self.max_payload_bytes,
+                    defer_long_fields=self.defer_long_fields,
+                )
+                logger.info(f"Teams投稿ペイロードサイズ: {stats.to_log()}")
+                set_attributes(
+                    {
+                        "question_count": stats.item_count,
+                        "teams.posts": stats.post_count,
+                        "teams.bytes": stats.total_bytes,
+                    }
                 )
 
-                response.raise_for_status()  # 4xx, 5xx で HTTPStatusError を発生
-                logger.info(f"Teams投稿完了 (HTTP {response.status_code})")
-
-        except httpx.HTTPStatusError as e:
-            error_msg = f"HTTP {e.response.status_code}: {e.response.text}"
-            logger.error(f"Teams投稿失敗: {error_msg}")
-            raise  # 例外を再発生
-
-        except httpx.TimeoutException:
-            error_msg = f"タイムアウト: {self.timeout}秒"
-            logger.error(f"Teams投稿タイムアウト: {error_msg}")
-            raise  # 例外を再発生
-
-        except Exception as e:
-            error_msg = f"予期しないエラー: {str(e)}"
-            logger.error(f"Teams投稿でエラーが発生: {error_msg}", exc_info=True)
-            raise  # 例外を再発生
+                async with httpx.AsyncClient(timeout=self.timeout) as client:
+                    logger.info("Power Automate への送信を開始します")
+
+                    for index, secure_payload in enumerate(payloads, start=1):
+                        # プロセス共有のレートリミッターで送信を平準化
+                        await rate_limiters.acquire(self.webhook_url)
+                        response = await client.post(
+                            self.webhook_url,
+                            json=secure_payload,
+                        )
+
+                        set_attributes(
+                            {"http.response.status_code": response.status_code}
+                        )
+                        response.raise_for_status()  # 4xx, 5xx で HTTPStatusError を発生
+                        logger.info(
+                            f"Teams投稿完了 ({index}/{len(payloads)}, HTTP {response.status_code})"
+                        )
+
+            except httpx.HTTPStatusError as e:
+                error_msg = f"HTTP {e.response.status_code}: {e.response.text}"
+                logger.error(f"Teams投稿失敗: {error_msg}")
+                raise  # 例外を再発生
+
+            except httpx.TimeoutException:
+                error_msg = f"タイムアウト: {self.timeout}秒"
+                logger.error(f"Teams投稿タイムアウト: {error_msg}")
+                raise  # 例外を再発生
+
+            except Exception as e:
+                error_msg = f"予期しないエラー: {str(e)}"
+                logger.error(f"Teams投稿でエラーが発生: {error_msg}", exc_info=True)
+                raise  # 例外を再発生
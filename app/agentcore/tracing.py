@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+トレース - OpenTelemetry のスパンとトレースコンテキストの伝播
+
+コンテナは opentelemetry-instrument 配下で動作するが、コードがスパンを作らないため、
+遅い実行を試験ガイド読み込み・Memory 読み込み・モデル呼び出し・Memory 書き込み・
+Teams 投稿に分解できませんでした。各フェーズに明示的なスパンを作ります。
+
+設計判断:
+- OpenTelemetry は任意依存とし、未導入の環境ではスパンを作らずに処理を継続する
+- トレーサーはスパン開始時に取得する（opentelemetry-instrument・テストが後から
+  TracerProvider を設定しても反映される）
+- モデル呼び出しのスパン（execute_structured_output）は strands が作成する。
+  structured_output はスレッドで実行されるが contextvars はコピーされるため、
+  Bedrock フェーズのスパンの子になる。structured_output は MCP ツールを呼び出さないため、
+  ツールのスパン（execute_tool）は作られない
+- Lambda からのトレースコンテキストは invoke ペイロードの trace_context
+  （W3C traceparent 形式の carrier）で受け取り、リモートの親として設定する
+"""
+
+from collections.abc import Iterator, Mapping
+from contextlib import contextmanager
+from typing import Any
+
+try:
+    from opentelemetry import context as otel_context
+    from opentelemetry import propagate, trace
+    from opentelemetry.trace import Status, StatusCode
+
+    OTEL_AVAILABLE = True
+except ImportError:  # pragma: no cover - OpenTelemetry 未導入の環境
+    OTEL_AVAILABLE = False
+
+# スパンの計装スコープ名
+TRACER_NAME = "cloud-copass-agent"
+
+
+def _clean(attributes: Mapping[str, Any] | None) -> dict[str, Any]:
+    """スパン属性として記録できる値のみを残す（None は除外）"""
+    if not attributes:
+        return {}
+    return {key: value for key, value in attributes.items() if value is not None}
+
+
+@contextmanager
+def span(name: str, attributes: Mapping[str, Any] | None = None) -> Iterator[None]:
+    """スパンを開始して現在のコンテキストに設定（OpenTelemetry 未導入時は何もしない）
+
+    スパン内で送出された例外はスパンに記録され、ステータスがエラーになる。
+
+    Args:
+        name: スパン名（例: "memory.get_recent_domains"）
+        attributes: スパン属性
+    """
+    if not OTEL_AVAILABLE:
+        yield
+        return
+    tracer = trace.get_tracer(TRACER_NAME)
+    with tracer.start_as_current_span(name, attributes=_clean(attributes)):
+        yield
+
+
+def set_attributes(attributes: Mapping[str, Any]) -> None:
+    """現在のスパンに属性を追加"""
+    if OTEL_AVAILABLE:
+        trace.get_current_span().set_attributes(_clean(attributes))
+
+
+def record_error(error: BaseException) -> None:
+    """処理を継続する失敗を現在のスパンに記録（例外を送出しない箇所用）"""
+    if OTEL_AVAILABLE:
+        current = trace.get_current_span()
+        current.record_exception(error)
+        current.set_status(Status(StatusCode.ERROR, str(error)))
+
+
+@contextmanager
+def remote_parent(carrier: Mapping[str, str] | None) -> Iterator[None]:
+    """ペイロードで渡されたトレースコンテキストを親として設定
+
+    Args:
+        carrier: W3C Trace Context の carrier（traceparent 等）。未指定時は何もしない
+    """
+    if not OTEL_AVAILABLE or not carrier:
+        yield
+        return
+    token = otel_context.attach(propagate.extract(dict(carrier)))
+    try:
+        yield
+    finally:
+        otel_context.detach(token)
@@ -0,0 +1,200 @@
+"""
+Teams 配信の負荷テストコマンド
+
+ローカルの Webhook スタブサーバー（app/webhook_stub.py）に対して TeamsClient を
+目標レートで駆動し、レイテンシのパーセンタイルとエラー件数を集計します。
+ネットワーク接続や実際の Power Automate フローは不要です。
+
+使用例:
+    uv run python -m app.load_test --rate 20 --requests 200 --latency-ms 50 \\
+        --jitter-ms 30 --error-rate 0.02 --throttle-rps 15
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from typing import Any
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.agentcore.rate_limiter import rate_limiters
+from app.agentcore.teams_client import TeamsClient
+from app.webhook_stub import StubBehavior, WebhookStubServer
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_QUESTION: dict[str, Any] = {
+    "question": "負荷テスト用の問題文です。",
+    "options": [f"**{label}.** 選択肢{label}" for label in "ABCD"],
+    "correct_answer": "B",
+    "explanation": "負荷テスト用の解説です。",
+    "source": ["https://docs.aws.amazon.com/organizations/latest/userguide/"],
+    "learning_domain": "複雑な組織に対応するソリューションの設計",
+    "primary_technologies": ["AWS Organizations"],
+    "learning_insights": "負荷テスト用の学習ポイントです。",
+}
+
+
+class StaticAgentOutput:
+    """TeamsClient.send に渡す固定出力（AgentOutput と同じ model_dump を持つ）"""
+
+    def __init__(self, questions: list[dict[str, Any]]) -> None:
+        self.questions = questions
+
+    def model_dump(self) -> dict[str, Any]:
+        return {"questions": [dict(q) for q in self.questions]}
+
+
+@dataclass
+class LoadTestReport:
+    """負荷テスト結果"""
+
+    requests: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    duration_seconds: float = 0.0
+    achieved_rps: float = 0.0
+    latency_ms: dict[str, float] = field(default_factory=dict)
+    errors: dict[str, int] = field(default_factory=dict)
+    server: dict[str, Any] = field(default_factory=dict)
+
+
+def percentile(sorted_values: list[float], percent: float) -> float:
+    """ソート済みリストのパーセンタイル（nearest-rank 法）"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(percent / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def _classify_error(error: BaseException) -> str:
+    """エラー集計用の分類名"""
+    if isinstance(error, httpx.HTTPStatusError):
+        return f"HTTP {error.response.status_code}"
+    return type(error).__name__
+
+
+async def run_load_test(
+    webhook_url: str,
+    rate: float,
+    total_requests: int,
+    questions_per_post: int = 1,
+    timeout: int = 30,
+) -> LoadTestReport:
+    """TeamsClient を目標レートで駆動して計測
+
+    オープンループ方式: 応答を待たずに 1/rate 秒ごとに送信を開始するため、
+    サーバーの遅延が増えても送信レートは変わらない。
+
+    Args:
+        webhook_url: 送信先（通常はスタブサーバーの URL）
+        rate: 目標送信レート（件/秒）
+        total_requests: 送信件数
+        questions_per_post: 1送信あたりの問題数
+        timeout: TeamsClient のタイムアウト（秒）
+
+    Returns:
+        LoadTestReport: レイテンシ・エラー集計
+    """
+    client = TeamsClient(
+        timeout=timeout, webhook_url=webhook_url, security_token="load-test-token"
+    )
+    agent_output = StaticAgentOutput([SAMPLE_QUESTION] * questions_per_post)
+    latencies: list[float] = []
+    errors: Counter[str] = Counter()
+
+    async def send_one() -> None:
+        start = time.perf_counter()
+        try:
+            await client.send(agent_output)
+            latencies.append((time.perf_counter() - start) * 1000)
+        except Exception as e:
+            errors[_classify_error(e)] += 1
+
+    interval = 1.0 / rate
+    started_at = time.perf_counter()
+    tasks: list[asyncio.Task[None]] = []
+    for i in range(total_requests):
+        delay = started_at + i * interval - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(send_one()))
+    await asyncio.gather(*tasks)
+    duration = time.perf_counter() - started_at
+
+    latencies.sort()
+    return LoadTestReport(
+        requests=total_requests,
+        succeeded=len(latencies),
+        failed=sum(errors.values()),
+        duration_seconds=duration,
+        achieved_rps=total_requests / duration if duration > 0 else 0.0,
+        latency_ms={
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "max": latencies[-1] if latencies else 0.0,
+        },
+        errors=dict(errors),
+    )
+
+
+async def main(args: argparse.Namespace) -> LoadTestReport:
+    """スタブサーバーを起動して負荷テストを実行"""
+    behavior = StubBehavior(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        throttle_rps=args.throttle_rps,
+        seed=args.seed,
+    )
+    async with WebhookStubServer(behavior=behavior) as server:
+        # 目標レートを計測するため、スタブ宛てのレート制限は明示指定時のみ有効にする
+        host = urlsplit(server.url).netloc
+        if args.client_rate_limit is not None:
+            rate_limiters.configure(host, args.client_rate_limit, args.client_burst)
+        else:
+            rate_limiters.configure(host, rate_per_second=1e9, burst=1_000_000)
+
+        report = await run_load_test(
+            webhook_url=server.url,
+            rate=args.rate,
+            total_requests=args.requests,
+            questions_per_post=args.questions_per_post,
+        )
+        report.server = asdict(server.stats)
+        return report
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """コマンドライン引数を解析"""
+    parser = argparse.ArgumentParser(description="Teams 配信の負荷テスト")
+    parser.add_argument("--rate", type=float, default=10.0, help="目標送信レート")
+    parser.add_argument("--requests", type=int, default=100, help="送信件数")
+    parser.add_argument("--questions-per-post", type=int, default=1)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rps", type=int, default=None)
+    parser.add_argument("--client-rate-limit", type=float, default=None)
+    parser.add_argument("--client-burst", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--verbose", action="store_true", help="送信ごとのログを表示")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    # uv run python -m app.load_test --rate 20 --requests 200
+    parsed_args = parse_args()
+    logging.basicConfig(level=logging.INFO if parsed_args.verbose else logging.WARNING)
+    if not parsed_args.verbose:
+        # 送信失敗は集計結果に含まれるため、個別のエラーログは抑制する
+        logging.getLogger("app.agentcore.teams_client").setLevel(logging.CRITICAL)
+    result = asyncio.run(main(parsed_args))
+    print(json.dumps(asdict(result), indent=2, ensure_ascii=False))
@@ -4,21 +4,548 @@ Cloud CoPassAgent - EventBridge Scheduler Trigger Function
 EventBridge SchedulerからAgentCore Runtimeを呼び出すLambda関数
 """
 
+import hashlib
 import json
 import logging
+import sys
+import time
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
 from typing import Any
 
-import boto3
+# 依存ライブラリの import 方針（コールドスタート短縮）
+# - boto3 は使わず、クライアント生成に必要な botocore のみを利用する
+#   （boto3 の import は botocore に加えて約60モジュールを読み込む）
+# - botocore・concurrent.futures・contextvars は使用する関数内で遅延 import し、
+#   モジュール読み込み時は標準ライブラリのみとする
 
 # ログ設定
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# AgentCore Runtime 呼び出し用クライアント設定（botocore.config.Config の引数）
+# - read_timeout: エージェントの問題生成（最大300秒）を待てる値。
+#   botocore 既定の60秒では生成途中でタイムアウトする
+# - connect_timeout: 接続確立は短時間で失敗させる
+# - retries: 接続エラー・スロットリング時のみ実質的に1回再試行
+#   （読み取りタイムアウト後は Lambda のタイムアウト300秒が先に到達する）
+# - max_pool_connections: 複数ターゲットへの並行呼び出しに備えた接続プール
+AGENTCORE_CLIENT_SETTINGS: dict[str, Any] = {
+    "read_timeout": 290,
+    "connect_timeout": 10,
+    "retries": {"total_max_attempts": 2, "mode": "standard"},
+    "max_pool_connections": 10,
+}
+
+# エージェントに渡す呼び出し期限の上限（秒）
+# - エージェントは期限内に部分的な結果を返すため、read_timeout より応答の返却分だけ短くする
+MAX_AGENT_DEADLINE_SECONDS = AGENTCORE_CLIENT_SETTINGS["read_timeout"] - 20
+
+# 実行環境の再利用（ウォームスタート）間で共有するクライアント
+# 生成コスト（エンドポイント解決・認証情報チェーン・サービスモデル読込・TLS接続）を初回のみに抑える
+_agentcore_client: Any | None = None
+
+
+def create_agentcore_client() -> Any:
+    """bedrock-agentcore クライアントを生成（botocore を遅延 import）"""
+    import botocore
+    import botocore.session
+    from botocore.config import Config
+
+    logger.info(f"botocore version: {botocore.__version__}")
+    session = botocore.session.get_session()
+    return session.create_client(
+        "bedrock-agentcore", config=Config(**AGENTCORE_CLIENT_SETTINGS)
+    )
+
+
+def get_agentcore_client() -> tuple[Any, bool]:
+    """bedrock-agentcore クライアントを取得（初回のみ生成）
+
+    Returns:
+        tuple[Any, bool]: クライアントと、今回生成したか（コールド）を示すフラグ
+    """
+    global _agentcore_client
+    if _agentcore_client is not None:
+        return _agentcore_client, False
+
+    _agentcore_client = create_agentcore_client()
+    return _agentcore_client, True
+
+
+def measure_import_time(runs: int = 5) -> dict[str, float]:
+    """新しいインタープリタで本モジュールを import し、コールド import の計測値を返す
+
+    Args:
+        runs: 計測回数（ばらつきを抑えるため最小値を採用）
+
+    Returns:
+        dict[str, float]: import_ms（import 所要時間）と modules（追加で読み込まれたモジュール数）
+    """
+    import subprocess
+    from pathlib import Path
+
+    code = (
+        "import json, sys, time\n"
+        "before = len(sys.modules)\n"
+        "started = time.perf_counter()\n"
+        "import lambda_function\n"
+        "print(json.dumps({'import_ms': (time.perf_counter() - started) * 1000,"
+        " 'modules': len(sys.modules) - before}))\n"
+    )
+    samples = []
+    for _ in range(runs):
+        completed = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=Path(__file__).parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        samples.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    return {
+        "import_ms": min(sample["import_ms"] for sample in samples),
+        "modules": min(sample["modules"] for sample in samples),
+    }
+
+
+def _get_client_with_timing() -> tuple[Any, bool]:
+    """クライアントを取得し、コールド/ウォームと所要時間をログ出力"""
+    client_start = time.perf_counter()
+    client, cold = get_agentcore_client()
+    client_init_ms = (time.perf_counter() - client_start) * 1000
+    logger.info(
+        f"AgentCore client ready: cold={cold}, client_init_ms={client_init_ms:.1f}"
+    )
+    return client, cold
+
+
+# OpenTelemetry のトレース（任意依存）
+# - ADOT の Lambda レイヤー等で opentelemetry が導入されている場合のみスパンを作成し、
+#   トレースコンテキストを invoke ペイロードの trace_context でエージェントに渡す
+# - botocore と同じく使用する関数内で遅延 import する
+TRACER_NAME = "cloud-copass-trigger"
+
+
+@contextmanager
+def trace_span(name: str, attributes: dict[str, Any] | None = None) -> Iterator[Any]:
+    """スパンを開始して現在のコンテキストに設定（opentelemetry 未導入時は None）"""
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        yield None
+        return
+    tracer = trace.get_tracer(TRACER_NAME)
+    with tracer.start_as_current_span(name, attributes=attributes) as span:
+        yield span
+
+
+def _set_span_attributes(span: Any, attributes: dict[str, Any]) -> None:
+    """スパンに属性を追加（None の値とスパンなしは無視）"""
+    if span is not None:
+        span.set_attributes({k: v for k, v in attributes.items() if v is not None})
+
+
+def trace_carrier() -> dict[str, str]:
+    """現在のトレースコンテキストの carrier（W3C traceparent 等、スパン外・未導入時は空）"""
+    try:
+        from opentelemetry import propagate
+    except ImportError:
+        return {}
+    carrier: dict[str, str] = {}
+    propagate.inject(carrier)
+    return carrier
+
+
+# トリガーモード
+# - sync: 従来どおり問題生成の完了まで待機する
+# - async: エージェント側でバックグラウンド実行を開始し、実行IDを受け取ってすぐに戻る
+#   （完了の追跡はエージェント側の run_status で行う）
+TRIGGER_MODES = ("sync", "async")
+
+# 複数ターゲット呼び出しの最大並行数（クライアントの接続プールと同じ上限）
+MAX_CONCURRENT_TARGETS = 10
+
+# 必須パラメータ（単一ターゲット・各ターゲット共通）
+REQUIRED_PARAMS = ["agentRuntimeArn", "exam_type", "question_count"]
+
+# 実行キーの接頭辞（runtimeSessionId の最小長33文字を満たすため、ハッシュと合わせて44文字）
+RUN_KEY_PREFIX = "run-"
+
+# レスポンス本文の読み取り設定
+# - 読み取り単位: StreamingBody から逐次読み取るチャンクサイズ
+# - 上限: 想定外に大きな本文で Lambda のメモリを圧迫しないよう、超過分は読み捨てずに接続を閉じる
+#   （5問分の生成結果でも数十KB程度）
+RESPONSE_CHUNK_SIZE = 8192
+MAX_RESPONSE_BYTES = 1024 * 1024
+
+
+def read_agent_response(
+    response: dict[str, Any],
+    started_at: float,
+    max_bytes: int = MAX_RESPONSE_BYTES,
+) -> dict[str, Any]:
+    """AgentCore Runtime のレスポンス本文を上限付きで逐次読み取り、計測値と共に返す
+
+    Args:
+        response: invoke_agent_runtime のレスポンス
+        started_at: 呼び出し開始時刻（time.perf_counter()）
+        max_bytes: 読み取るバイト数の上限
+
+    Returns:
+        dict[str, Any]: 読み取り結果
+        - outcome: succeeded / partial / agent_error / unparseable / truncated / no_body
+        - body: JSON として解析した本文（解析できない場合は文字列）
+        - error: エージェントが返したエラー（outcome=agent_error の場合）
+        - failed_slots: 生成できなかった問題枠（outcome=partial の場合）
+        - ttfb_ms / total_ms / bytes / truncated: 計測値
+    """
+    result: dict[str, Any] = {
+        "outcome": "no_body",
+        "body": None,
+        "ttfb_ms": None,
+        "total_ms": None,
+        "bytes": 0,
+        "truncated": False,
+    }
+    stream = response.get("response")
+    if stream is None:
+        result["total_ms"] = (time.perf_counter() - started_at) * 1000
+        return result
+
+    chunks: list[bytes] = []
+    size = 0
+    try:
+        for chunk in stream.iter_chunks(chunk_size=RESPONSE_CHUNK_SIZE):
+            if result["ttfb_ms"] is None:
+                result["ttfb_ms"] = (time.perf_counter() - started_at) * 1000
+            size += len(chunk)
+            if size > max_bytes:
+                result["truncated"] = True
+                chunks.append(chunk[: max_bytes - (size - len(chunk))])
+                size = max_bytes
+                break
+            chunks.append(chunk)
+    finally:
+        # 読み残しがあっても接続を解放する
+        stream.close()
+
+    result["total_ms"] = (time.perf_counter() - started_at) * 1000
+    result["bytes"] = size
+    text = b"".join(chunks).decode("utf-8", errors="replace")
+
+    if result["truncated"]:
+        result["outcome"] = "truncated"
+        result["body"] = text
+        return result
+
+    try:
+        body = json.loads(text)
+    except json.JSONDecodeError:
+        result["outcome"] = "unparseable"
+        result["body"] = text
+        return result
+
+    result["body"] = body
+    if isinstance(body, dict) and "error" in body:
+        result["outcome"] = "agent_error"
+        result["error"] = str(body["error"])
+    elif isinstance(body, dict) and body.get("failed_slots"):
+        # 一部の問題枠のみ生成できた（失敗した問題枠だけを再実行できるよう返す）
+        result["outcome"] = "partial"
+        result["failed_slots"] = body["failed_slots"]
+    else:
+        result["outcome"] = "succeeded"
+    return result
+
+
+def derive_run_key(target: dict[str, Any]) -> str | None:
+    """スケジュール時刻とターゲットから決定的な実行キーを導出
+
+    EventBridge Scheduler の再試行や Lambda 非同期呼び出しの再試行では同じ
+    scheduled_time が渡されるため、同じ実行キーになる。
+
+    Args:
+        target: 検証済みのターゲット
+
+    Returns:
+        str | None: 実行キー（scheduled_time がない手動実行の場合は None）
+    """
+    scheduled_time = target.get("scheduled_time")
+    if not scheduled_time:
+        return None
+
+    basis = "|".join(
+        str(value)
+        for value in (
+            scheduled_time,
+            target["agentRuntimeArn"],
+            target["exam_type"],
+            target["question_count"],
+        )
+    )
+    return RUN_KEY_PREFIX + hashlib.sha256(basis.encode("utf-8")).hexdigest()[:40]
+
+
+def validate_target(target: dict[str, Any]) -> None:
+    """ターゲットのパラメータを検証
+
+    Raises:
+        ValueError: 必須パラメータの欠落、不正なトリガーモード、または不正な期限
+    """
+    for param in REQUIRED_PARAMS:
+        if param not in target:
+            raise ValueError(f"Missing required parameter: {param}")
+
+    mode = target.get("mode", "sync")
+    if mode not in TRIGGER_MODES:
+        raise ValueError(f"Invalid mode: {mode} (expected one of {TRIGGER_MODES})")
+
+    if "deadline_seconds" in target:
+        deadline = target["deadline_seconds"]
+        if (
+            isinstance(deadline, bool)
+            or not isinstance(deadline, int | float)
+            or deadline <= 0
+        ):
+            raise ValueError(f"Invalid deadline_seconds: {deadline}")
+
+
+def invoke_target(client: Any, target: dict[str, Any], cold: bool) -> dict[str, Any]:
+    """1ターゲット分の AgentCore Runtime を呼び出す（agentcore.invoke スパン内）
+
+    Args:
+        client: bedrock-agentcore クライアント
+        target: 検証済みのターゲット（agentRuntimeArn, exam_type, question_count, mode 等）
+        cold: クライアントを今回生成したか（ログ用・スパン属性）
+
+    Returns:
+        dict[str, Any]: レスポンスボディ
+    """
+    with trace_span(
+        "agentcore.invoke",
+        {
+            "exam_type": target["exam_type"],
+            "question_count": target["question_count"],
+            "mode": target.get("mode", "sync"),
+            "cold": cold,
+        },
+    ) as span:
+        response_body = _invoke_target(client, target, cold)
+        _set_span_attributes(
+            span,
+            {
+                "outcome": response_body["outcome"],
+                "ttfb_ms": response_body["timing"]["ttfb_ms"],
+                "total_ms": response_body["timing"]["total_ms"],
+                "failed_slots": len(response_body.get("failedSlots", [])),
+            },
+        )
+        return response_body
+
+
+def _invoke_target(client: Any, target: dict[str, Any], cold: bool) -> dict[str, Any]:
+    """1ターゲット分の AgentCore Runtime を呼び出し、レスポンスボディを組み立てる"""
+    mode = target.get("mode", "sync")
+    read_response = bool(target.get("read_response", False))
+
+    agent_runtime_arn = target["agentRuntimeArn"]
+    payload = {
+        "exam_type": target["exam_type"],
+        "question_count": target["question_count"],
+    }
+
+    if "deadline_seconds" in target:
+        # エージェント側で Memory・Bedrock・Teams の予算に分割される（read_timeout 内に収める）
+        payload["deadline_seconds"] = min(
+            target["deadline_seconds"], MAX_AGENT_DEADLINE_SECONDS
+        )
+
+    invoke_kwargs: dict[str, Any] = {}
+    run_key = derive_run_key(target)
+    if run_key is not None:
+        # 再試行が同じセッションに届き、エージェント側で重複を検出できるようにする
+        payload["run_key"] = run_key
+        invoke_kwargs["runtimeSessionId"] = run_key
+
+    run_id = None
+    if mode == "async":
+        # runtimeSessionId を実行IDとしてエージェントに渡し、バックグラウンド実行を依頼
+        run_id = target.get("runtimeSessionId") or run_key or str(uuid.uuid4())
+        payload["run_async"] = True
+        payload["run_id"] = run_id
+        invoke_kwargs["runtimeSessionId"] = run_id
+
+    carrier = trace_carrier()
+    if carrier:
+        # エージェント側のスパンをこの呼び出しのスパンの子にする
+        payload["trace_context"] = carrier
+
+    logger.info(f"Invoking AgentCore Runtime: {agent_runtime_arn}")
+    logger.info(f"Payload: {json.dumps(payload)}")
+
+    invoke_start = time.perf_counter()
+    response = client.invoke_agent_runtime(
+        agentRuntimeArn=agent_runtime_arn,
+        payload=json.dumps(payload).encode("utf-8"),
+        contentType="application/json",
+        accept="application/json",
+        **invoke_kwargs,
+    )
+    invoke_ms = (time.perf_counter() - invoke_start) * 1000
+
+    logger.info("AgentCore invocation successful")
+    logger.info(f"Response content type: {response.get('contentType', 'unknown')}")
+
+    # レスポンス本文を逐次読み取り、生成の成否と所要時間を記録
+    read_result = read_agent_response(response, started_at=invoke_start)
+    timing = {
+        "invoke_ms": round(invoke_ms, 1),
+        "ttfb_ms": _round_ms(read_result["ttfb_ms"]),
+        "total_ms": _round_ms(read_result["total_ms"]),
+        "bytes": read_result["bytes"],
+        "truncated": read_result["truncated"],
+    }
+    logger.info(
+        json.dumps(
+            {
+                "message": "AgentCore invocation metrics",
+                "agentRuntimeArn": agent_runtime_arn,
+                "exam_type": target["exam_type"],
+                "mode": mode,
+                "cold": cold,
+                "outcome": read_result["outcome"],
+                **timing,
+            }
+        )
+    )
+
+    response_body: dict[str, Any] = {
+        "message": "Question generation triggered successfully",
+        "agentRuntimeArn": agent_runtime_arn,
+        "payload": payload,
+        "responseContentType": response.get("contentType", "unknown"),
+        "outcome": read_result["outcome"],
+        "timing": timing,
+    }
+    if "error" in read_result:
+        response_body["agentError"] = read_result["error"]
+    if "failed_slots" in read_result:
+        response_body["failedSlots"] = read_result["failed_slots"]
+    if run_key is not None:
+        response_body["runKey"] = run_key
+    if mode == "async":
+        response_body["mode"] = mode
+        response_body["runId"] = run_id
+    if read_response:
+        # 本文のレスポンスへの同梱はオプトイン（既定では計測値と成否のみ）
+        response_body["agentResponse"] = read_result["body"]
+    return response_body
+
+
+def _round_ms(value: float | None) -> float | None:
+    """ミリ秒をログ出力用に丸める"""
+    return None if value is None else round(value, 1)
+
+
+def _target_status_code(target: dict[str, Any], response_body: dict[str, Any]) -> int:
+    """ターゲットの結果に対応するステータスコード
+
+    エージェントがエラーを返した場合は 502、それ以外は
+    モードに応じて 200（sync）/ 202（async）を返す。
+    """
+    if "agentError" in response_body:
+        return 502
+    return 202 if target.get("mode", "sync") == "async" else 200
+
+
+def build_targets(event: dict[str, Any]) -> list[dict[str, Any]]:
+    """複数ターゲットのイベントを展開（イベント直下の値を各ターゲットの既定値にする）
+
+    Raises:
+        ValueError: targets が空、またはリストでない場合
+    """
+    targets = event["targets"]
+    if not isinstance(targets, list) or not targets:
+        raise ValueError("targets must be a non-empty list")
+
+    defaults = {
+        key: value
+        for key, value in event.items()
+        if key not in ("targets", "max_concurrency")
+    }
+    return [{**defaults, **target} for target in targets]
+
+
+def invoke_targets(
+    client: Any, targets: list[dict[str, Any]], cold: bool, max_concurrency: int
+) -> list[dict[str, Any]]:
+    """複数ターゲットを並行して呼び出す（1ターゲットの失敗は他に影響しない）
+
+    Args:
+        client: bedrock-agentcore クライアント（スレッドセーフ）
+        targets: build_targets で展開したターゲット
+        cold: クライアントを今回生成したか（ログ用）
+        max_concurrency: 最大並行数
+
+    Returns:
+        list[dict[str, Any]]: ターゲットと同じ順序の結果
+    """
+
+    def run(index: int, target: dict[str, Any]) -> dict[str, Any]:
+        try:
+            validate_target(target)
+            result = invoke_target(client, target, cold)
+            status_code = _target_status_code(target, result)
+            return {
+                "index": index,
+                "status": "failed" if status_code >= 400 else "succeeded",
+                "statusCode": status_code,
+                **result,
+            }
+        except ValueError as e:
+            logger.error(f"Target {index} validation error: {str(e)}")
+            return {
+                "index": index,
+                "status": "failed",
+                "statusCode": 400,
+                "error": str(e),
+            }
+        except Exception as e:
+            logger.error(f"Target {index} invocation error: {str(e)}", exc_info=True)
+            return {
+                "index": index,
+                "status": "failed",
+                "statusCode": 500,
+                "error": str(e),
+            }
+
+    import contextvars
+    from concurrent.futures import ThreadPoolExecutor
+
+    # 各スレッドに現在のスパン（contextvars）を引き継ぐ
+    contexts = [contextvars.copy_context() for _ in targets]
+    workers = max(1, min(max_concurrency, len(targets)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(
+            executor.map(
+                lambda context, index, target: context.run(run, index, target),
+                contexts,
+                range(len(targets)),
+                targets,
+            )
+        )
+
 
 def lambda_handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
     """
     EventBridge SchedulerからのトリガーでAgentCore Runtimeを呼び出す
 
+    単一ターゲット（イベント直下に agentRuntimeArn 等）と、複数ターゲット
+    （targets リスト）の両方に対応する。複数ターゲットは並行して呼び出す。
+
     Args:
         event: EventBridge Schedulerからのイベント
         context: Lambda実行コンテキスト
@@ -26,48 +553,30 @@ def lambda_handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
     Returns:
         実行結果のレスポンス
     """
-    try:
-        logger.info(f"Received event: {json.dumps(event)}")
-        logger.info(f"boto3 version: {boto3.__version__}")
-
-        # 必須パラメータの確認
-        required_params = ["agentRuntimeArn", "exam_type", "question_count"]
-        for param in required_params:
-            if param not in event:
-                raise ValueError(f"Missing required parameter: {param}")
+    with trace_span("lambda_handler", {"multi_target": "targets" in event}) as span:
+        response = handle_event(event)
+        _set_span_attributes(span, {"status_code": response["statusCode"]})
+        return response
 
-        # AgentCore Runtime呼び出し
-        client = boto3.client("bedrock-agentcore")
 
-        agent_runtime_arn = event["agentRuntimeArn"]
-        payload = {
-            "exam_type": event["exam_type"],
-            "question_count": event["question_count"],
-        }
+def handle_event(event: dict[str, Any]) -> dict[str, Any]:
+    """イベントを検証してターゲットを呼び出し、Lambda のレスポンスを組み立てる"""
+    try:
+        logger.info(f"Received event: {json.dumps(event)}")
 
-        logger.info(f"Invoking AgentCore Runtime: {agent_runtime_arn}")
-        logger.info(f"Payload: {json.dumps(payload)}")
+        if "targets" in event:
+            return handle_multiple_targets(event)
 
-        response = client.invoke_agent_runtime(
-            agentRuntimeArn=agent_runtime_arn,
-            payload=json.dumps(payload).encode("utf-8"),
-            contentType="application/json",
-            accept="application/json",
-        )
+        # 必須パラメータ・トリガーモードの確認
+        validate_target(event)
 
-        logger.info("AgentCore invocation successful")
-        logger.info(f"Response content type: {response.get('contentType', 'unknown')}")
+        # AgentCore Runtime呼び出し（クライアントはウォームスタート間で再利用）
+        client, cold = _get_client_with_timing()
+        response_body = invoke_target(client, event, cold)
 
         return {
-            "statusCode": 200,
-            "body": json.dumps(
-                {
-                    "message": "Question generation triggered successfully",
-                    "agentRuntimeArn": agent_runtime_arn,
-                    "payload": payload,
-                    "responseContentType": response.get("contentType", "unknown"),
-                }
-            ),
+            "statusCode": _target_status_code(event, response_body),
+            "body": json.dumps(response_body),
         }
 
     except ValueError as e:
@@ -83,3 +592,47 @@ def lambda_handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
             "statusCode": 500,
             "body": json.dumps({"error": "Internal server error", "message": str(e)}),
         }
+
+
+def handle_multiple_targets(event: dict[str, Any]) -> dict[str, Any]:
+    """複数ターゲットを並行して呼び出し、ターゲットごとの結果を返す
+
+    全て成功した場合は 200、一部失敗は 207、全て失敗は 500 を返す。
+    """
+    targets = build_targets(event)
+    max_concurrency = int(event.get("max_concurrency", MAX_CONCURRENT_TARGETS))
+
+    client, cold = _get_client_with_timing()
+    fanout_start = time.perf_counter()
+    results = invoke_targets(client, targets, cold, max_concurrency)
+    fanout_ms = (time.perf_counter() - fanout_start) * 1000
+
+    failed = sum(1 for r in results if r["status"] == "failed")
+    logger.info(
+        f"Multi-target invocation finished: targets={len(results)}, failed={failed}, fanout_ms={fanout_ms:.1f}"
+    )
+
+    if failed == 0:
+        status_code = 200
+    elif failed < len(results):
+        status_code = 207
+    else:
+        status_code = 500
+
+    return {
+        "statusCode": status_code,
+        "body": json.dumps(
+            {
+                "message": "Question generation triggered for multiple targets",
+                "succeeded": len(results) - failed,
+                "failed": failed,
+                "results": results,
+            }
+        ),
+    }
+
+
+if __name__ == "__main__":
+    # コールド import の計測 (python app/trigger/lambda_function.py --import-time)
+    if len(sys.argv) > 1 and sys.argv[1] == "--import-time":
+        print(json.dumps(measure_import_time(), indent=2))
@@ -0,0 +1,183 @@
+"""
+Power Automate Webhook スタブサーバー - 配信負荷テスト用
+
+Power Automate の HTTP トリガーを模擬するローカル asyncio HTTP サーバーです。
+ネットワークや実際の Webhook なしで TeamsClient の配信性能を検証できます。
+
+模擬する挙動:
+- 応答遅延（固定値 + ランダムなゆらぎ）
+- エラー率（指定確率で HTTP 500）
+- スロットリング（直近1秒間のリクエスト数が上限を超えたら HTTP 429 + Retry-After）
+- 受信したリクエストボディの記録（JSON として解析）
+"""
+
+import asyncio
+import json
+import logging
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# 記録するリクエストボディの上限件数（負荷テスト時のメモリ使用量を抑える）
+MAX_RECORDED_BODIES = 10_000
+
+
+@dataclass
+class StubBehavior:
+    """スタブサーバーの挙動設定"""
+
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    throttle_rps: int | None = None  # None の場合はスロットリングしない
+    retry_after_seconds: int = 1
+    seed: int | None = None
+
+
+@dataclass
+class StubStats:
+    """スタブサーバーの受信統計"""
+
+    requests: int = 0
+    accepted: int = 0
+    errors: int = 0
+    throttled: int = 0
+    status_counts: dict[int, int] = field(default_factory=dict)
+
+
+class WebhookStubServer:
+    """Power Automate Webhook スタブサーバー"""
+
+    def __init__(
+        self,
+        behavior: StubBehavior | None = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        """
+        Args:
+            behavior: 応答遅延・エラー率・スロットリングの設定
+            host: 待ち受けアドレス
+            port: 待ち受けポート（0 の場合は空きポートを自動割り当て）
+        """
+        self.behavior = behavior or StubBehavior()
+        self.host = host
+        self.port = port
+        self.stats = StubStats()
+        self.received: list[Any] = []
+
+        self._random = random.Random(self.behavior.seed)
+        self._recent: deque[float] = deque()
+        self._server: asyncio.Server | None = None
+
+    @property
+    def url(self) -> str:
+        """スタブサーバーの Webhook URL"""
+        return f"http://{self.host}:{self.port}/workflows/stub/triggers/manual"
+
+    async def start(self) -> None:
+        """サーバーを起動"""
+        self._server = await asyncio.start_server(
+            self._handle_connection, self.host, self.port
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"Webhook スタブサーバー起動: {self.url}")
+
+    async def stop(self) -> None:
+        """サーバーを停止"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> "WebhookStubServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.stop()
+
+    def _decide_status(self) -> int:
+        """挙動設定に基づいて応答ステータスを決定"""
+        now = time.monotonic()
+        throttle_rps = self.behavior.throttle_rps
+        if throttle_rps is not None:
+            while self._recent and now - self._recent[0] > 1.0:
+                self._recent.popleft()
+            if len(self._recent) >= throttle_rps:
+                return 429
+            self._recent.append(now)
+
+        if self._random.random() < self.behavior.error_rate:
+            return 500
+        return 202
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """1接続分のリクエストを処理（応答後に接続を閉じる）"""
+        try:
+            request_line = await reader.readline()
+            if not request_line:
+                return
+
+            content_length = 0
+            while True:
+                header = await reader.readline()
+                if header in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = header.decode("latin-1").partition(":")
+                if name.strip().lower() == "content-length":
+                    content_length = int(value.strip())
+
+            body = await reader.readexactly(content_length) if content_length else b""
+            status = self._decide_status()
+            self._record(status, body)
+
+            delay_ms = self.behavior.latency_ms + self._random.uniform(
+                0, self.behavior.jitter_ms
+            )
+            if delay_ms > 0:
+                await asyncio.sleep(delay_ms / 1000)
+
+            writer.write(self._build_response(status))
+            await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError) as e:
+            logger.debug(f"スタブサーバー接続エラー: {e}")
+        finally:
+            writer.close()
+
+    def _record(self, status: int, body: bytes) -> None:
+        """受信統計とリクエストボディを記録"""
+        self.stats.requests += 1
+        self.stats.status_counts[status] = self.stats.status_counts.get(status, 0) + 1
+        if status == 429:
+            self.stats.throttled += 1
+        elif status >= 500:
+            self.stats.errors += 1
+        else:
+            self.stats.accepted += 1
+
+        if len(self.received) < MAX_RECORDED_BODIES:
+            try:
+                self.received.append(json.loads(body) if body else None)
+            except json.JSONDecodeError:
+                self.received.append(body.decode("utf-8", errors="replace"))
+
+    def _build_response(self, status: int) -> bytes:
+        """HTTP レスポンスを組み立て"""
+        reasons = {202: "Accepted", 429: "Too Many Requests", 500: "Server Error"}
+        body = json.dumps({"status": status}).encode("utf-8")
+        headers = [
+            f"HTTP/1.1 {status} {reasons.get(status, 'Unknown')}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(body)}",
+            "Connection: close",
+        ]
+        if status == 429:
+            headers.append(f"Retry-After: {self.behavior.retry_after_seconds}")
+        return ("\r\n".join(headers) + "\r\n\r\n").encode("latin-1") + body
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+AgentCore Memory 学習分野履歴の圧縮スクリプト
+
+学習分野の生イベントを、分野ごとの件数と最終使用日を持つ要約イベントに畳み込みます。
+"""
+
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# .env ファイルの読み込み（AWS_PROFILE=sandbox設定を反映）
+load_dotenv()
+
+# プロジェクトルートをパスに追加（app パッケージを参照するため）
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from app.agentcore.domain_memory_client import DomainMemoryClient  # noqa: E402
+
+
+def compact_memory_history(exam_type: str) -> int:
+    """学習分野履歴を圧縮"""
+    memory_id = os.getenv("AGENTCORE_MEMORY_ID")
+    if not memory_id:
+        print("❌ AGENTCORE_MEMORY_ID が .env ファイルに設定されていません")
+        return 1
+
+    client = DomainMemoryClient(
+        memory_id=memory_id, region_name=os.getenv("AWS_REGION", "us-east-1")
+    )
+
+    print("🗜️  学習分野履歴を圧縮中...")
+    print(f"   Memory ID: {memory_id}")
+    print(f"   試験タイプ: {exam_type}")
+
+    try:
+        result = asyncio.run(client.compact_history(exam_type))
+    except Exception as e:
+        print(f"\n❌ 履歴の圧縮に失敗しました: {e}")
+        print("   - AWS認証を確認してください")
+        return 1
+
+    print("\n✅ 圧縮完了！")
+    print(f"   畳み込んだイベント: {result['folded']}件")
+    print(f"   削除したイベント: {result['deleted']}件")
+    print("   要約:")
+    print(json.dumps(result["summary"], ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    exam_type = sys.argv[1] if len(sys.argv) > 1 else "AWS-SAP"
+    sys.exit(compact_memory_history(exam_type))
@@ -22,6 +22,7 @@ def show_usage() -> None:
     print("  create      新しいMemoryリソースを作成")
     print("  list        Memoryリソース一覧を表示")
     print("  delete-old  古いMemoryリソースを削除")
+    print("  compact     学習分野履歴を要約イベントに圧縮（引数: 試験タイプ）")
     print("  show        Memory内容を表示（bash版）")
     print("  analyze     Memory使用状況を詳細分析（bash版）")
     print("  cleanup     最新イベント以外を削除（bash版）")
@@ -31,6 +32,7 @@ def show_usage() -> None:
     print("例:")
     print("  python scripts/agentcore_memory/manage.py create")
     print("  python scripts/agentcore_memory/manage.py list")
+    print("  python scripts/agentcore_memory/manage.py compact AWS-SAP")
     print("  ./scripts/manage-agentcore-memory.sh show")
     print("")
 
@@ -82,6 +84,8 @@ def main() -> int:
         return run_script("list_agentcore_memories.py")
     elif command == "delete-old":
         return run_script("delete_old_agentcore_memory.py")
+    elif command == "compact":
+        return run_script("compact_agentcore_memory.py", sys.argv[2:])
     elif command in ["show", "analyze", "cleanup", "clear"]:
         print(f"🔄 bash版管理スクリプトを実行中: {command}")
         return run_bash_script(command)
@@ -103,9 +103,20 @@ echo "✅ BEDROCK_MODEL_ID を .env から読み込みました"
 echo "✅ BEDROCK_REGION を .env から読み込みました"
 ENV_ARGS="--env POWER_AUTOMATE_WEBHOOK_URL=$WEBHOOK_URL --env POWER_AUTOMATE_SECURITY_TOKEN=$SECURITY_TOKEN --env AGENTCORE_MEMORY_ID=$MEMORY_ID --env BEDROCK_MODEL_ID=$BEDROCK_MODEL_ID --env BEDROCK_REGION=$BEDROCK_REGION"
 
+# 任意設定: TEAMS_RENDER_CARDS（サーバーサイドでの Adaptive Card 描画）
+TEAMS_RENDER_CARDS=$(grep "^TEAMS_RENDER_CARDS=" "$ENV_FILE" | cut -d'=' -f2-)
+if [ -n "$TEAMS_RENDER_CARDS" ]; then
+    echo "✅ TEAMS_RENDER_CARDS を .env から読み込みました"
+    ENV_ARGS="$ENV_ARGS --env TEAMS_RENDER_CARDS=$TEAMS_RENDER_CARDS"
+fi
+
 # AgentCore ディレクトリに移動
 cd app/agentcore
 
+# Adaptive Card テンプレートを同梱（サーバーサイド描画用）
+mkdir -p templates
+cp "$PROJECT_ROOT/templates/teams/adaptive_card.json" templates/adaptive_card.json
+
 # デプロイ実行
 echo ""
 echo "🚀 AgentCore デプロイ実行..."
@@ -129,6 +129,10 @@ cat > "$TEMP_PARAM_FILE" << EOF
     "ParameterKey": "QuestionCount",
     "ParameterValue": "1"
   },
+  {
+    "ParameterKey": "TriggerMode",
+    "ParameterValue": "${TRIGGER_MODE:-sync}"
+  },
   {
     "ParameterKey": "ScheduleState",
     "ParameterValue": "ENABLED"
@@ -9,10 +9,17 @@ AgentCore Runtime (agent_main.py) 用の最小限のテスト設定。
 import asyncio
 import os
 import sys
-from collections.abc import Generator
+from collections.abc import Generator, Iterator
 from pathlib import Path
 
 import pytest
+from opentelemetry import trace
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter,
+)
+from opentelemetry.util._once import Once
 
 # プロジェクトルートをパスに追加
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
@@ -32,8 +39,26 @@ def event_loop() -> Generator[asyncio.AbstractEventLoop, None, None]:
     loop.close()
 
 
-# 現在のテストは自己完結しており、共通フィクスチャは不要
-# test_agent_main.py は契約による設計に基づいて独立したテストを実装
+@pytest.fixture
+def span_exporter() -> Iterator[InMemorySpanExporter]:
+    """スパンを記録するインメモリエクスポーター
+
+    TracerProvider はプロセスで一度しか設定できないため、テスト中のみグローバルに設定し、
+    終了時に未設定へ戻す（opentelemetry-test-utils の reset_trace_globals と同じ方法）。
+    他のテストではスパンは記録されず、トレースコンテキストも伝播しない。
+    """
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    trace._TRACER_PROVIDER_SET_ONCE = Once()
+    trace._TRACER_PROVIDER = None
+    trace.set_tracer_provider(provider)
+    try:
+        yield exporter
+    finally:
+        provider.shutdown()
+        trace._TRACER_PROVIDER_SET_ONCE = Once()
+        trace._TRACER_PROVIDER = None
 
 
 @pytest.fixture(autouse=True)
@@ -12,7 +12,23 @@ from unittest.mock import AsyncMock, MagicMock, patch
 import pytest
 from pydantic import ValidationError
 
-from app.agentcore.agent_main import AgentInput, AgentOutput, Question, invoke
+from app.agentcore.agent_main import (
+    AgentInput,
+    AgentOutput,
+    Question,
+    canonicalize_learning_domains,
+    invoke,
+)
+from app.agentcore.prompt_cache import prompt_text
+
+# 構造検証に合格する選択肢と学習分野（AWS-SAP の試験ガイドに存在する分野）
+VALID_OPTIONS = [
+    "**A.** 選択肢A",
+    "**B.** 選択肢B",
+    "**C.** 選択肢C",
+    "**D.** 選択肢D",
+]
+VALID_DOMAIN = "新しいソリューションのための設計"
 
 
 class TestAgentInput:
@@ -169,12 +185,12 @@ class TestAgentOutput:
         # Given - 事前条件設定
         question = Question(
             question="単一問題テスト",
-            options=["A. 選択肢1", "B. 選択肢2", "C. 選択肢3", "D. 選択肢4"],
+            options=VALID_OPTIONS,
             correct_answer="A",
             explanation="解説",
             source=["https://docs.aws.amazon.com/test/"],
             # 新機能: 試験ガイド活用による問題分類表示
-            learning_domain="テスト分野",
+            learning_domain=VALID_DOMAIN,
             primary_technologies=["テスト技術"],
             learning_insights="テスト分野の重要ポイントは基本概念の理解。実務では継続的な学習が重要。",
         )
@@ -206,7 +222,7 @@ class TestAgentOutput:
         questions = [
             Question(
                 question=f"問題{i + 1}",
-                options=[f"{chr(65 + j)}. 選択肢{j + 1}" for j in range(4)],
+                options=[f"**{chr(65 + j)}.** 選択肢{j + 1}" for j in range(4)],
                 correct_answer="A",
                 explanation=f"解説{i + 1}",
                 source=[f"https://docs.aws.amazon.com/test{i + 1}/"],
@@ -239,12 +255,17 @@ class TestInvokeFunction:
         """テスト用のQuestionモックを作成"""
         return Question(
             question=f"EC2インスタンスに関する問題{index}",
-            options=["A. t2.micro", "B. m5.large", "C. c5.xlarge", "D. r5.2xlarge"],
+            options=[
+                "**A.** t2.micro",
+                "**B.** m5.large",
+                "**C.** c5.xlarge",
+                "**D.** r5.2xlarge",
+            ],
             correct_answer="B",
             explanation=f"m5.largeが最適です。解説{index}",
             source=["https://docs.aws.amazon.com/ec2/"],
             # 新機能: 試験ガイド活用による問題分類表示
-            learning_domain="コンピューティング",
+            learning_domain=VALID_DOMAIN,
             primary_technologies=["EC2", "インスタンスタイプ"],
             learning_insights="EC2インスタンスタイプ選択では、ワークロードの特性を理解することが重要。実務では、コスト最適化とパフォーマンスのバランスを考慮。",
         )
@@ -320,8 +341,9 @@ class TestInvokeFunction:
         mock_memory_client.get_recent_domains.assert_called_once_with(
             exam_type="AWS-SAP"
         )
+        # 試験ガイドの分野はコンパクトID（D2 = 新しいソリューションのための設計）で記録される
         mock_memory_client.record_domain_usage.assert_called_once_with(
-            learning_domain="コンピューティング", exam_type="AWS-SAP"
+            learning_domain="D2", exam_type="AWS-SAP"
         )
         mock_teams_client.send.assert_called_once()
 
@@ -609,10 +631,10 @@ class TestBusinessLogicContracts:
             questions=[
                 Question(
                     question="Solutions Architectに関する問題",
-                    options=["A", "B", "C", "D"],
+                    options=VALID_OPTIONS,
                     correct_answer="A",
                     explanation="解説",
-                    source=[],
+                    source=["https://docs.aws.amazon.com/test/"],
                     # 新機能: 試験ガイド活用による問題分類表示
                     learning_domain="複雑な組織に対応するソリューションの設計",
                     primary_technologies=["AWS Organizations", "AWS Control Tower"],
@@ -636,7 +658,7 @@ class TestBusinessLogicContracts:
 
         # 不変条件検証: プロンプトに試験タイプが含まれることを確認
         call_args = mock_agent.structured_output.call_args
-        prompt_arg = call_args.kwargs["prompt"]
+        prompt_arg = prompt_text(call_args.kwargs["prompt"])
         assert "AWS Certified Solutions Architect - Professional" in prompt_arg
 
     @patch.dict(
@@ -670,12 +692,12 @@ class TestBusinessLogicContracts:
             questions=[
                 Question(
                     question="SAP レベルの問題",
-                    options=["A", "B", "C", "D"],
+                    options=VALID_OPTIONS,
                     correct_answer="A",
                     explanation="解説",
-                    source=[],
+                    source=["https://docs.aws.amazon.com/test/"],
                     # 新機能: 試験ガイド活用による問題分類表示
-                    learning_domain="セキュリティ、アイデンティティ、コンプライアンス",
+                    learning_domain="複雑な組織に対応するソリューションの設計",
                     primary_technologies=["IAM", "CloudTrail"],
                     learning_insights="IAMセキュリティでは最小権限の原則が基本。CloudTrailによる監査ログ記録で、セキュリティインシデントの早期発見と原因究明が可能。実務では定期的な権限レビューが重要。",
                 )
@@ -701,7 +723,7 @@ class TestBusinessLogicContracts:
 
         # 不変条件検証: プロンプトに試験タイプが含まれることを確認
         call_args = mock_agent.structured_output.call_args
-        prompt_arg = call_args.kwargs["prompt"]
+        prompt_arg = prompt_text(call_args.kwargs["prompt"])
         assert "AWS Certified Solutions Architect - Professional" in prompt_arg
 
 
@@ -738,12 +760,12 @@ class TestDataIntegrityContracts:
         mock_questions = [
             Question(
                 question=f"問題{i + 1}",
-                options=[f"{chr(65 + j)}. 選択肢{j + 1}" for j in range(4)],
+                options=[f"**{chr(65 + j)}.** 選択肢{j + 1}" for j in range(4)],
                 correct_answer="A",
                 explanation=f"解説{i + 1}",
                 source=[f"https://docs.aws.amazon.com/test{i + 1}/"],
                 # 新機能: 試験ガイド活用による問題分類表示
-                learning_domain=f"テスト分野{i + 1}",
+                learning_domain=VALID_DOMAIN,
                 primary_technologies=[f"技術{i + 1}"],
                 learning_insights=f"学習ポイント{i + 1}",
             )
@@ -804,12 +826,12 @@ class TestSystemInvariants:
             questions=[
                 Question(
                     question="ログテスト問題",
-                    options=["A", "B", "C", "D"],
+                    options=VALID_OPTIONS,
                     correct_answer="A",
                     explanation="解説",
-                    source=[],
+                    source=["https://docs.aws.amazon.com/test/"],
                     # 新機能: 試験ガイド活用による問題分類表示
-                    learning_domain="ログテスト分野",
+                    learning_domain=VALID_DOMAIN,
                     primary_technologies=["ログテスト技術"],
                     learning_insights="ログテスト分野の学習ポイント。実務での応用と注意点を含む。",
                 )
@@ -850,7 +872,7 @@ class TestSystemInvariants:
                 explanation="説明",
                 source=["https://example.com"],
                 # 新機能: 試験ガイド活用による問題分類表示
-                learning_domain="テスト分野",
+                learning_domain=VALID_DOMAIN,
                 primary_technologies=["テスト技術"],
                 learning_insights="テスト分野の学習ポイント。実務での応用と注意点を含む。",
             )
@@ -947,12 +969,12 @@ class TestIntegrationContracts:
         mock_questions = [
             Question(
                 question=f"統合テスト問題{i + 1}",
-                options=[f"{chr(65 + j)}. 選択肢{j + 1}" for j in range(4)],
+                options=[f"**{chr(65 + j)}.** 選択肢{j + 1}" for j in range(4)],
                 correct_answer="A",
                 explanation=f"統合テスト解説{i + 1}",
                 source=[f"https://docs.aws.amazon.com/integration{i + 1}/"],
                 # 新機能: 試験ガイド活用による問題分類表示
-                learning_domain=f"統合テスト分野{i + 1}",
+                learning_domain=VALID_DOMAIN,
                 primary_technologies=[f"統合テスト技術{i + 1}"],
                 learning_insights=f"統合テストガイド参照{i + 1}",
             )
@@ -1235,21 +1257,31 @@ class TestDomainMemoryIntegration:
         mock_questions = [
             Question(
                 question="EC2に関する問題",
-                options=["A. t2.micro", "B. m5.large", "C. c5.xlarge", "D. r5.2xlarge"],
+                options=[
+                    "**A.** t2.micro",
+                    "**B.** m5.large",
+                    "**C.** c5.xlarge",
+                    "**D.** r5.2xlarge",
+                ],
                 correct_answer="B",
                 explanation="m5.largeが最適です。",
                 source=["https://docs.aws.amazon.com/ec2/"],
-                learning_domain="コンピューティング",
+                learning_domain="複雑な組織に対応するソリューションの設計",
                 primary_technologies=["EC2", "インスタンスタイプ"],
                 learning_insights="EC2インスタンスタイプ選択の重要ポイント",
             ),
             Question(
                 question="S3に関する問題",
-                options=["A. Standard", "B. IA", "C. Glacier", "D. Deep Archive"],
+                options=[
+                    "**A.** Standard",
+                    "**B.** IA",
+                    "**C.** Glacier",
+                    "**D.** Deep Archive",
+                ],
                 correct_answer="A",
                 explanation="Standardが最適です。",
                 source=["https://docs.aws.amazon.com/s3/"],
-                learning_domain="ストレージ",
+                learning_domain="既存のソリューションの継続的な改善",
                 primary_technologies=["S3", "ストレージクラス"],
                 learning_insights="S3ストレージクラス選択の重要ポイント",
             ),
@@ -1276,14 +1308,14 @@ class TestDomainMemoryIntegration:
         # 不変条件検証: 各問題の学習分野が個別に記録される
         assert mock_memory_client.record_domain_usage.call_count == 2
 
-        # 1問目の記録確認
+        # 1問目の記録確認（試験ガイドの分野はコンパクトIDで記録される）
         first_call = mock_memory_client.record_domain_usage.call_args_list[0]
-        assert first_call.kwargs["learning_domain"] == "コンピューティング"
+        assert first_call.kwargs["learning_domain"] == "D1"
         assert first_call.kwargs["exam_type"] == "AWS-SAP"
 
         # 2問目の記録確認
         second_call = mock_memory_client.record_domain_usage.call_args_list[1]
-        assert second_call.kwargs["learning_domain"] == "ストレージ"
+        assert second_call.kwargs["learning_domain"] == "D3"
         assert second_call.kwargs["exam_type"] == "AWS-SAP"
 
     @patch.dict(
@@ -1324,11 +1356,11 @@ class TestDomainMemoryIntegration:
             questions=[
                 Question(
                     question="Memory失敗テスト問題",
-                    options=["A", "B", "C", "D"],
+                    options=VALID_OPTIONS,
                     correct_answer="A",
                     explanation="解説",
                     source=["https://docs.aws.amazon.com/test/"],
-                    learning_domain="テスト分野",
+                    learning_domain=VALID_DOMAIN,
                     primary_technologies=["テスト技術"],
                     learning_insights="テスト学習ポイント",
                 )
@@ -1395,11 +1427,11 @@ class TestDomainMemoryIntegration:
             questions=[
                 Question(
                     question="Memory無効テスト問題",
-                    options=["A", "B", "C", "D"],
+                    options=VALID_OPTIONS,
                     correct_answer="A",
                     explanation="解説",
                     source=["https://docs.aws.amazon.com/test/"],
-                    learning_domain="テスト分野",
+                    learning_domain=VALID_DOMAIN,
                     primary_technologies=["テスト技術"],
                     learning_insights="テスト学習ポイント",
                 )
@@ -1467,11 +1499,11 @@ class TestDomainMemoryIntegration:
             questions=[
                 Question(
                     question="ネットワーキングに関する問題",
-                    options=["A", "B", "C", "D"],
+                    options=VALID_OPTIONS,
                     correct_answer="A",
                     explanation="解説",
                     source=["https://docs.aws.amazon.com/test/"],
-                    learning_domain="ネットワーキング",  # 異なる分野
+                    learning_domain="ワークロードの移行とモダナイゼーションの加速",  # 異なる分野
                     primary_technologies=["VPC", "Route53"],
                     learning_insights="ネットワーキング学習ポイント",
                 )
@@ -1498,7 +1530,7 @@ class TestDomainMemoryIntegration:
 
         # プロンプトにジャンル分散指示が含まれることを確認
         call_args = mock_agent.structured_output.call_args
-        prompt_arg = call_args.kwargs["prompt"]
+        prompt_arg = prompt_text(call_args.kwargs["prompt"])
         assert "ジャンル分散指示" in prompt_arg
         assert "コンピューティング" in prompt_arg
         assert "ストレージ" in prompt_arg
@@ -1548,11 +1580,11 @@ class TestDomainMemoryIntegration:
             questions=[
                 Question(
                     question="分野取得失敗テスト問題",
-                    options=["A", "B", "C", "D"],
+                    options=VALID_OPTIONS,
                     correct_answer="A",
                     explanation="解説",
                     source=["https://docs.aws.amazon.com/test/"],
-                    learning_domain="テスト分野",
+                    learning_domain=VALID_DOMAIN,
                     primary_technologies=["テスト技術"],
                     learning_insights="テスト学習ポイント",
                 )
@@ -1579,7 +1611,7 @@ class TestDomainMemoryIntegration:
 
         # プロンプトにジャンル分散指示が含まれないことを確認
         call_args = mock_agent.structured_output.call_args
-        prompt_arg = call_args.kwargs["prompt"]
+        prompt_arg = prompt_text(call_args.kwargs["prompt"])
         assert "ジャンル分散指示" not in prompt_arg
 
     @patch.dict(
@@ -1624,11 +1656,11 @@ class TestDomainMemoryIntegration:
             questions=[
                 Question(
                     question="分野履歴なしテスト問題",
-                    options=["A", "B", "C", "D"],
+                    options=VALID_OPTIONS,
                     correct_answer="A",
                     explanation="解説",
                     source=["https://docs.aws.amazon.com/test/"],
-                    learning_domain="テスト分野",
+                    learning_domain=VALID_DOMAIN,
                     primary_technologies=["テスト技術"],
                     learning_insights="テスト学習ポイント",
                 )
@@ -1655,5 +1687,1832 @@ class TestDomainMemoryIntegration:
 
         # プロンプトにジャンル分散指示が含まれないことを確認
         call_args = mock_agent.structured_output.call_args
-        prompt_arg = call_args.kwargs["prompt"]
+        prompt_arg = prompt_text(call_args.kwargs["prompt"])
         assert "ジャンル分散指示" not in prompt_arg
+
+
+class TestMemoryCompaction:
+    """学習分野履歴の圧縮アクションの契約検証"""
+
+    @patch("app.agentcore.agent_main.agent")
+    @patch("app.agentcore.agent_main.memory_client")
+    async def test_compact_memory_action_contract(
+        self, mock_memory_client: MagicMock, mock_agent: MagicMock
+    ) -> None:
+        """
+        Given: 有効なMemoryクライアント
+        When: action="compact_memory" で invoke関数を実行する
+        Then: 履歴が圧縮され、要約が返される（問題生成は行わない）
+
+        事前条件: Memoryクライアントが有効
+        事後条件: compact_history の結果に試験タイプを加えて返す
+        不変条件: エージェントは呼び出されない
+        """
+        # Given
+        mock_memory_client.compact_history = AsyncMock(
+            return_value={"summary": {"counts": {"D1": 2}}, "folded": 2, "deleted": 2}
+        )
+
+        # When
+        result = await invoke({"action": "compact_memory", "exam_type": "AWS-SAP"})
+
+        # Then
+        assert result == {
+            "exam_type": "AWS-SAP",
+            "summary": {"counts": {"D1": 2}},
+            "folded": 2,
+            "deleted": 2,
+        }
+        mock_memory_client.compact_history.assert_awaited_once_with("AWS-SAP")
+        mock_agent.structured_output.assert_not_called()
+
+    @patch("app.agentcore.agent_main.memory_client", None)
+    async def test_compact_memory_without_memory_contract(self) -> None:
+        """
+        不変条件: Memoryクライアントが無効な場合はエラー情報を返す
+        """
+        result = await invoke({"action": "compact_memory"})
+
+        assert "error" in result
+
+    @patch("app.agentcore.agent_main.memory_client")
+    async def test_compact_memory_failure_contract(
+        self, mock_memory_client: MagicMock
+    ) -> None:
+        """
+        不変条件: 圧縮に失敗した場合は例外を送出せずエラー情報を返す
+        """
+        mock_memory_client.compact_history = AsyncMock(
+            side_effect=Exception("Memory API Error")
+        )
+
+        result = await invoke({"action": "compact_memory"})
+
+        assert result == {"error": "Memory API Error"}
+
+
+class TestBreakerStatus:
+    """サーキットブレーカーの状態照会の契約検証"""
+
+    async def test_breaker_status_action_contract(self) -> None:
+        """
+        Given: プロセス共有のサーキットブレーカー
+        When: action="breaker_status" で invoke関数を実行する
+        Then: 依存先ごとの状態と統計が返される
+        """
+        # Given
+        from app.agentcore.circuit_breaker import CircuitBreakerRegistry
+
+        registry = CircuitBreakerRegistry()
+        registry.get("memory")
+
+        # When
+        with patch("app.agentcore.agent_main.circuit_breakers", registry):
+            result = await invoke({"action": "breaker_status"})
+
+        # Then
+        assert result["circuit_breakers"]["memory"]["state"] == "closed"
+
+
+class TestAsyncDelivery:
+    """Fire-and-forget 配信（async_delivery）の契約検証"""
+
+    @patch.dict(
+        "os.environ",
+        {
+            "POWER_AUTOMATE_WEBHOOK_URL": "https://test.webhook.url",
+            "POWER_AUTOMATE_SECURITY_TOKEN": "test-security-token",
+        },
+    )
+    @patch("app.agentcore.agent_main.delivery_queue")
+    @patch("app.agentcore.agent_main.TeamsClient")
+    @patch("app.agentcore.agent_main.agent")
+    async def test_async_delivery_returns_ticket_contract(
+        self,
+        mock_agent: MagicMock,
+        mock_teams_client_class: MagicMock,
+        mock_delivery_queue: MagicMock,
+    ) -> None:
+        """
+        契約による設計: バックグラウンド配信時のレスポンス検証
+
+        Given: async_delivery=True のペイロード
+        When: invoke関数を実行する
+        Then: 問題と配信チケットが返され、同期投稿は行われない
+
+        事前条件: async_delivery=True、配信キューが投入を受け付ける
+        事後条件: レスポンスに questions と delivery チケットが含まれる
+        不変条件: TeamsClient による同期投稿は呼び出されない
+        """
+        # Given - 事前条件設定
+        from app.agentcore.delivery_queue import DeliveryTicket
+
+        payload: dict[str, Any] = {"question_count": 1, "async_delivery": True}
+        mock_agent.structured_output.return_value = AgentOutput(
+            questions=[
+                Question(
+                    question="バックグラウンド配信テスト問題",
+                    options=VALID_OPTIONS,
+                    correct_answer="A",
+                    explanation="解説",
+                    source=["https://docs.aws.amazon.com/test/"],
+                    learning_domain=VALID_DOMAIN,
+                    primary_technologies=["テスト技術"],
+                    learning_insights="テスト学習ポイント",
+                )
+            ]
+        )
+        ticket = DeliveryTicket(ticket_id="ticket-123")
+        mock_delivery_queue.submit = AsyncMock(return_value=ticket)
+
+        # When - invoke関数を実行
+        result = await invoke(payload)
+
+        # Then - 事後条件検証
+        assert "error" not in result
+        assert len(result["questions"]) == 1
+        assert result["delivery"]["ticket_id"] == "ticket-123"
+        assert result["delivery"]["status"] == "queued"
+
+        # 不変条件検証: 同期投稿は行われない
+        mock_delivery_queue.submit.assert_called_once()
+        mock_teams_client_class.assert_not_called()
+
+    @patch.dict(
+        "os.environ",
+        {
+            "POWER_AUTOMATE_WEBHOOK_URL": "https://test.webhook.url",
+            "POWER_AUTOMATE_SECURITY_TOKEN": "test-security-token",
+        },
+    )
+    @patch("app.agentcore.agent_main.delivery_queue")
+    @patch("app.agentcore.agent_main.TeamsClient")
+    @patch("app.agentcore.agent_main.agent")
+    async def test_queue_full_falls_back_to_inline_contract(
+        self,
+        mock_agent: MagicMock,
+        mock_teams_client_class: MagicMock,
+        mock_delivery_queue: MagicMock,
+    ) -> None:
+        """
+        契約による設計: 配信キュー満杯時のフォールバック検証
+
+        Given: async_delivery=True だが配信キューが満杯
+        When: invoke関数を実行する
+        Then: 同期投稿にフォールバックし、問題生成結果が返される
+
+        事前条件: 配信キューが DeliveryQueueFullError を発生させる
+        事後条件: TeamsClient.send が1回呼び出される
+        不変条件: 配信が失われない
+        """
+        # Given - 事前条件設定
+        from app.agentcore.agent_main import DeliveryQueueFullError
+
+        payload: dict[str, Any] = {"question_count": 1, "async_delivery": True}
+        mock_agent.structured_output.return_value = AgentOutput(
+            questions=[
+                Question(
+                    question="キュー満杯テスト問題",
+                    options=VALID_OPTIONS,
+                    correct_answer="A",
+                    explanation="解説",
+                    source=["https://docs.aws.amazon.com/test/"],
+                    learning_domain=VALID_DOMAIN,
+                    primary_technologies=["テスト技術"],
+                    learning_insights="テスト学習ポイント",
+                )
+            ]
+        )
+        mock_delivery_queue.submit = AsyncMock(
+            side_effect=DeliveryQueueFullError("full")
+        )
+        mock_teams_client = MagicMock()
+        mock_teams_client.send = AsyncMock(return_value=None)
+        mock_teams_client_class.return_value = mock_teams_client
+
+        # When - invoke関数を実行
+        result = await invoke(payload)
+
+        # Then - 事後条件検証
+        assert "error" not in result
+        assert "delivery" not in result
+
+        # 不変条件検証: 同期投稿で配信される
+        mock_teams_client.send.assert_called_once()
+
+    @patch("app.agentcore.agent_main.delivery_queue")
+    async def test_delivery_status_returns_ticket_contract(
+        self, mock_delivery_queue: MagicMock
+    ) -> None:
+        """
+        契約による設計: バックグラウンド配信の状態照会
+
+        Given: 投入済みの配信チケット
+        When: action="delivery_status" で invoke関数を実行する
+        Then: チケットの状態が返され、未知・未指定の ticket_id はエラー情報になる
+
+        事前条件: 配信キューがチケットを保持している
+        事後条件: レスポンスに ticket_id と配信チケットが含まれる
+        不変条件: 例外は発生しない
+        """
+        # Given - 事前条件設定
+        from app.agentcore.delivery_queue import DeliveryTicket
+
+        ticket = DeliveryTicket(ticket_id="ticket-456", status="delivered")
+        mock_delivery_queue.get_ticket.side_effect = lambda ticket_id: (
+            ticket if ticket_id == "ticket-456" else None
+        )
+
+        # When - invoke関数を実行
+        result = await invoke({"action": "delivery_status", "ticket_id": "ticket-456"})
+
+        # Then - 事後条件検証
+        assert result["ticket_id"] == "ticket-456"
+        assert result["delivery"]["status"] == "delivered"
+
+        # 不変条件検証: 未知・未指定の ticket_id
+        assert "error" in await invoke(
+            {"action": "delivery_status", "ticket_id": "unknown"}
+        )
+        assert "error" in await invoke({"action": "delivery_status"})
+
+
+class TestBackgroundRun:
+    """非同期トリガーモード（run_async）の契約検証"""
+
+    @patch("app.agentcore.agent_main.app")
+    @patch("app.agentcore.agent_main.TeamsClient")
+    @patch("app.agentcore.agent_main.agent")
+    async def test_run_async_returns_before_generation_contract(
+        self,
+        mock_agent: MagicMock,
+        mock_teams_client_class: MagicMock,
+        mock_app: MagicMock,
+    ) -> None:
+        """
+        契約による設計: 非同期トリガーモードの受付と完了追跡
+
+        Given: run_async=True と run_id を含むペイロード
+        When: invoke関数を実行する
+        Then: 生成完了を待たずに実行記録が返され、完了後は状態照会で succeeded になる
+
+        事前条件: run_async=True
+        事後条件: 受付レスポンスに run_id と実行記録が含まれる
+        不変条件: 実行中は AgentCore の非同期タスクとして登録され、完了時に解除される
+        """
+        # Given - 事前条件設定
+        from app.agentcore.agent_main import run_tracker
+
+        mock_agent.structured_output.return_value = AgentOutput(
+            questions=[
+                Question(
+                    question="非同期トリガーテスト問題",
+                    options=VALID_OPTIONS,
+                    correct_answer="A",
+                    explanation="解説",
+                    source=["https://docs.aws.amazon.com/test/"],
+                    learning_domain=VALID_DOMAIN,
+                    primary_technologies=["テスト技術"],
+                    learning_insights="テスト学習ポイント",
+                )
+            ]
+        )
+        mock_teams_client = MagicMock()
+        mock_teams_client.send = AsyncMock(return_value=None)
+        mock_teams_client_class.return_value = mock_teams_client
+        mock_app.add_async_task.return_value = 42
+        payload: dict[str, Any] = {"run_async": True, "run_id": "run-async-test-001"}
+
+        # When - invoke関数を実行
+        accepted = await invoke(payload)
+
+        # Then - 事後条件検証: 受付レスポンス
+        assert accepted["run_id"] == "run-async-test-001"
+        assert accepted["run"]["status"] in ("accepted", "running")
+        assert "questions" not in accepted
+
+        # 完了まで待機して状態照会
+        await run_tracker.wait(timeout=5.0)
+        status = await invoke({"action": "run_status", "run_id": "run-async-test-001"})
+        assert status["run"]["status"] == "succeeded"
+        assert status["run"]["question_count"] == 1
+
+        # 不変条件検証: 非同期タスクの登録と解除
+        mock_app.add_async_task.assert_called_once()
+        mock_app.complete_async_task.assert_called_once_with(42)
+        mock_teams_client.send.assert_called_once()
+
+    async def test_run_status_unknown_run_contract(self) -> None:
+        """
+        契約による設計: 存在しない実行の状態照会
+
+        事前条件: 記録のない run_id
+        事後条件: エラー情報が返される
+        不変条件: 例外は発生しない
+        """
+        result = await invoke({"action": "run_status", "run_id": "unknown-run"})
+        assert "error" in result
+
+        result = await invoke({"action": "run_status"})
+        assert "error" in result
+
+
+class TestIdempotentRun:
+    """実行キー（run_key）による重複生成防止の契約検証"""
+
+    @patch("app.agentcore.agent_main.idempotency_store")
+    @patch("app.agentcore.agent_main.TeamsClient")
+    @patch("app.agentcore.agent_main.agent")
+    async def test_duplicate_run_key_returns_cached_result_contract(
+        self,
+        mock_agent: MagicMock,
+        mock_teams_client_class: MagicMock,
+        mock_store: MagicMock,
+    ) -> None:
+        """
+        契約による設計: 同じ実行キーの再送
+
+        Given: 同じ run_key で2回 invoke する（スケジューラーの再試行を模擬）
+        When: invoke関数を実行する
+        Then: 2回目は前回の結果が返され、生成と投稿は1回のみ
+
+        事前条件: run_key が指定されている
+        事後条件: 2回目のレスポンスに idempotent_replay=True が含まれる
+        不変条件: structured_output と TeamsClient.send は1回のみ呼び出される
+        """
+        # Given - 事前条件設定
+        from app.agentcore.idempotency_store import LocalIdempotencyStore
+
+        store = LocalIdempotencyStore()
+        mock_store.begin = store.begin
+        mock_store.complete = store.complete
+        mock_store.release = store.release
+
+        mock_agent.structured_output.return_value = AgentOutput(
+            questions=[
+                Question(
+                    question="冪等性テスト問題",
+                    options=VALID_OPTIONS,
+                    correct_answer="A",
+                    explanation="解説",
+                    source=["https://docs.aws.amazon.com/test/"],
+                    learning_domain=VALID_DOMAIN,
+                    primary_technologies=["テスト技術"],
+                    learning_insights="テスト学習ポイント",
+                )
+            ]
+        )
+        mock_teams_client = MagicMock()
+        mock_teams_client.send = AsyncMock(return_value=None)
+        mock_teams_client_class.return_value = mock_teams_client
+        payload: dict[str, Any] = {"question_count": 1, "run_key": "run-test-key"}
+
+        # When - 2回実行
+        first = await invoke(payload)
+        second = await invoke(payload)
+
+        # Then - 事後条件検証
+        assert first["questions"][0]["question"] == "冪等性テスト問題"
+        assert "idempotent_replay" not in first
+        assert second["idempotent_replay"] is True
+        assert second["questions"] == first["questions"]
+
+        # 不変条件検証: 生成と投稿は1回のみ
+        mock_agent.structured_output.assert_called_once()
+        mock_teams_client.send.assert_called_once()
+
+    @patch("app.agentcore.agent_main.idempotency_store")
+    @patch("app.agentcore.agent_main.agent")
+    async def test_failed_run_can_be_retried_contract(
+        self,
+        mock_agent: MagicMock,
+        mock_store: MagicMock,
+    ) -> None:
+        """
+        契約による設計: 失敗した実行の再試行
+
+        事前条件: 1回目の生成が失敗する
+        事後条件: 同じ run_key の2回目は再度生成を試みる
+        不変条件: 失敗結果はキャッシュされない
+        """
+        # Given - 事前条件設定
+        from app.agentcore.idempotency_store import LocalIdempotencyStore
+
+        store = LocalIdempotencyStore()
+        mock_store.begin = store.begin
+        mock_store.complete = store.complete
+        mock_store.release = store.release
+        mock_agent.structured_output.side_effect = RuntimeError("生成失敗")
+        payload: dict[str, Any] = {"question_count": 1, "run_key": "run-fail-key"}
+
+        # When - 2回実行
+        first = await invoke(payload)
+        second = await invoke(payload)
+
+        # Then
+        assert "error" in first
+        assert "error" in second
+        assert mock_agent.structured_output.call_count == 2
+
+
+class TestQuestionPoolServing:
+    """問題プールからの払い出しの契約検証"""
+
+    @staticmethod
+    def _pooled_question(text: str) -> dict[str, Any]:
+        return Question(
+            question=text,
+            options=VALID_OPTIONS,
+            correct_answer="A",
+            explanation="解説",
+            source=["https://docs.aws.amazon.com/test/"],
+            learning_domain=VALID_DOMAIN,
+            primary_technologies=["テスト技術"],
+            learning_insights="テスト学習ポイント",
+        ).model_dump()
+
+    @patch("app.agentcore.agent_main.agent")
+    async def test_pool_generation_stores_canonical_domains_contract(
+        self, mock_agent: MagicMock
+    ) -> None:
+        """
+        契約による設計: 補充時の学習分野の正規化
+
+        Given: タスク名・表記揺れで学習分野が記載された問題が生成される
+        When: 問題プール補充用の生成を実行する
+        Then: ライブ生成と同じく正規化してから検証され、正規名で在庫に入る
+
+        事前条件: 問題検証が有効
+        事後条件: 正規化で受け入れられる分野の問題は除外されない
+        """
+        # Given - 事前条件設定
+        from app.agentcore.agent_main import generate_for_pool
+
+        mock_agent.structured_output.return_value = AgentOutput(
+            questions=[
+                Question(**self._pooled_question(f"問題{i}")).model_copy(
+                    update={"learning_domain": domain}
+                )
+                for i, domain in enumerate(
+                    [
+                        "タスク1.4: マルチアカウント AWS 環境を設計する",
+                        "複雑な組織に対応したソリューション設計",
+                    ]
+                )
+            ]
+        )
+
+        # When - 補充用の生成を実行
+        questions = await generate_for_pool("AWS-SAP", 2, [])
+
+        # Then - 事後条件検証
+        assert [q["learning_domain"] for q in questions] == [
+            "複雑な組織に対応するソリューションの設計",
+            "複雑な組織に対応するソリューションの設計",
+        ]
+
+    @pytest.mark.parametrize(
+        ("low_water_mark", "target_size"),
+        [("ten", "25"), ("10", "2.5"), ("30", "25"), ("-1", "25")],
+    )
+    def test_invalid_pool_settings_fall_back_to_defaults_contract(
+        self, low_water_mark: str, target_size: str, tmp_path: Any
+    ) -> None:
+        """
+        事前条件: 下限・目標在庫の設定が数値でない、または目標在庫が下限以下
+        事後条件: 例外を送出せず、既定の下限・目標在庫で問題プールを生成する
+        """
+        from app.agentcore.agent_main import create_question_pool
+        from app.agentcore.question_pool import (
+            DEFAULT_LOW_WATER_MARK,
+            DEFAULT_TARGET_SIZE,
+        )
+
+        with patch.dict(
+            "os.environ",
+            {
+                "QUESTION_POOL_ENABLED": "true",
+                "QUESTION_POOL_PATH": str(tmp_path / "pool.sqlite3"),
+                "QUESTION_POOL_LOW_WATER_MARK": low_water_mark,
+                "QUESTION_POOL_TARGET_SIZE": target_size,
+            },
+        ):
+            pool = create_question_pool()
+
+        assert pool is not None
+        assert pool.low_water_mark == DEFAULT_LOW_WATER_MARK
+        assert pool.target_size == DEFAULT_TARGET_SIZE
+
+    @patch("app.agentcore.agent_main.TeamsClient")
+    @patch("app.agentcore.agent_main.agent")
+    async def test_serves_from_pool_without_live_generation_contract(
+        self,
+        mock_agent: MagicMock,
+        mock_teams_client_class: MagicMock,
+    ) -> None:
+        """
+        契約による設計: 在庫からの払い出し
+
+        Given: 在庫が十分にある問題プール
+        When: invoke関数を実行する
+        Then: ライブ生成せずに在庫の問題が投稿される
+
+        事前条件: 在庫数 >= question_count
+        事後条件: レスポンスの問題は在庫の問題
+        不変条件: structured_output は呼び出されない
+        """
+        # Given - 事前条件設定
+        from app.agentcore.question_pool import (
+            QuestionPool,
+            SQLiteQuestionPoolBackend,
+        )
+
+        backend = SQLiteQuestionPoolBackend()
+        backend.add(
+            "AWS-SAP", [self._pooled_question(f"在庫問題{i}") for i in range(5)]
+        )
+        pool = QuestionPool(
+            backend, AsyncMock(return_value=[]), low_water_mark=1, target_size=10
+        )
+        mock_teams_client = MagicMock()
+        mock_teams_client.send = AsyncMock(return_value=None)
+        mock_teams_client_class.return_value = mock_teams_client
+
+        # When - invoke関数を実行
+        with patch("app.agentcore.agent_main.question_pool", pool):
+            result = await invoke({"question_count": 2})
+
+        # Then - 事後条件検証
+        assert [q["question"] for q in result["questions"]] == [
+            "在庫問題0",
+            "在庫問題1",
+        ]
+        assert backend.count("AWS-SAP") == 3
+
+        # 不変条件検証: ライブ生成は行わない
+        mock_agent.structured_output.assert_not_called()
+        mock_teams_client.send.assert_called_once()
+
+    @patch("app.agentcore.agent_main.TeamsClient")
+    @patch("app.agentcore.agent_main.agent")
+    async def test_shortage_falls_back_to_live_generation_contract(
+        self,
+        mock_agent: MagicMock,
+        mock_teams_client_class: MagicMock,
+    ) -> None:
+        """
+        契約による設計: 在庫不足時のライブ生成フォールバック
+
+        Given: 在庫が1問、要求は2問
+        When: invoke関数を実行する
+        Then: 在庫の1問 + ライブ生成の1問が返され、補充がスケジュールされる
+
+        事前条件: 在庫数 < question_count
+        事後条件: ライブ生成のプロンプトは不足数（1問）を指定する
+        不変条件: 在庫が下限を下回ると補充が開始される
+        """
+        # Given - 事前条件設定
+        from app.agentcore.question_pool import (
+            QuestionPool,
+            SQLiteQuestionPoolBackend,
+        )
+
+        backend = SQLiteQuestionPoolBackend()
+        backend.add("AWS-SAP", [self._pooled_question("在庫問題")])
+        generate = AsyncMock(return_value=[])
+        pool = QuestionPool(backend, generate, low_water_mark=1, target_size=10)
+        mock_agent.structured_output.return_value = AgentOutput(
+            questions=[Question(**self._pooled_question("ライブ生成問題"))]
+        )
+        mock_teams_client = MagicMock()
+        mock_teams_client.send = AsyncMock(return_value=None)
+        mock_teams_client_class.return_value = mock_teams_client
+
+        # When - invoke関数を実行
+        with patch("app.agentcore.agent_main.question_pool", pool):
+            result = await invoke({"question_count": 2})
+            await pool.wait_replenished(timeout=1.0)
+
+        # Then - 事後条件検証
+        assert [q["question"] for q in result["questions"]] == [
+            "在庫問題",
+            "ライブ生成問題",
+        ]
+        prompt = prompt_text(mock_agent.structured_output.call_args.kwargs["prompt"])
+        assert "1問の実践的な問題" in prompt
+
+        # 不変条件検証: 補充が開始される
+        generate.assert_called()
+
+
+class TestNearDuplicateRegeneration:
+    """過去の問題と類似する問題の再生成の契約検証"""
+
+    @staticmethod
+    def _question(text: str) -> Question:
+        return Question(
+            question=text,
+            options=VALID_OPTIONS,
+            correct_answer="A",
+            explanation="解説",
+            source=["https://docs.aws.amazon.com/test/"],
+            learning_domain=VALID_DOMAIN,
+            primary_technologies=["テスト技術"],
+            learning_insights="テスト学習ポイント",
+        )
+
+    @patch("app.agentcore.agent_main.TeamsClient")
+    @patch("app.agentcore.agent_main.agent")
+    async def test_near_duplicate_is_regenerated_before_posting_contract(
+        self,
+        mock_agent: MagicMock,
+        mock_teams_client_class: MagicMock,
+    ) -> None:
+        """
+        契約による設計: 類似問題の投稿前再生成
+
+        Given: 過去に投稿した問題とほぼ同じ問題が生成される
+        When: invoke関数を実行する
+        Then: 類似問題のみ再生成され、差し替え後の問題が投稿・アーカイブされる
+
+        事前条件: アーカイブに過去の問題がある
+        事後条件: 再生成のプロンプトは類似数（1問）と過去問題の回避を指定する
+        不変条件: 類似しない問題は差し替えない
+        """
+        # Given - 事前条件設定
+        from app.agentcore.question_archive import QuestionArchive
+
+        past = (
+            "ある企業はAWS Organizationsで200個のアカウントを管理している。"
+            "SCPで特定リージョン以外の利用を禁止するには、どの設定が最適か。"
+        )
+        archive = QuestionArchive()
+        archive.add(self._question(past).model_dump(), exam_type="AWS-SAP")
+
+        mock_agent.structured_output.side_effect = [
+            AgentOutput(
+                questions=[
+                    self._question(past.replace("200個", "250個")),
+                    self._question("Transit Gatewayで複数VPCを接続する構成はどれか。"),
+                ]
+            ),
+            AgentOutput(
+                questions=[self._question("S3のレプリケーション要件を満たす構成は。")]
+            ),
+        ]
+        mock_teams_client = MagicMock()
+        mock_teams_client.send = AsyncMock(return_value=None)
+        mock_teams_client_class.return_value = mock_teams_client
+
+        # When - invoke関数を実行
+        with patch("app.agentcore.agent_main.question_archive", archive):
+            result = await invoke({"question_count": 2})
+
+        # Then - 事後条件検証
+        assert [q["question"] for q in result["questions"]] == [
+            "S3のレプリケーション要件を満たす構成は。",
+            "Transit Gatewayで複数VPCを接続する構成はどれか。",
+        ]
+        assert mock_agent.structured_output.call_count == 2
+        prompt = prompt_text(mock_agent.structured_output.call_args.kwargs["prompt"])
+        assert "1問の実践的な問題" in prompt
+        assert "重複回避指示" in prompt
+
+        # 投稿した問題はアーカイブに追加される
+        assert len(archive) == 3
+        mock_teams_client.send.assert_called_once()
+
+    @patch("app.agentcore.agent_main.TeamsClient")
+    @patch("app.agentcore.agent_main.agent")
+    async def test_regeneration_attempts_are_bounded_contract(
+        self,
+        mock_agent: MagicMock,
+        mock_teams_client_class: MagicMock,
+    ) -> None:
+        """
+        契約による設計: 再生成回数の上限
+
+        Given: 何度生成しても過去と同じ問題が返される
+        When: invoke関数を実行する
+        Then: 上限回数で再生成を打ち切り、問題は投稿される
+        """
+        from app.agentcore.agent_main import MAX_DUPLICATE_REGENERATIONS
+        from app.agentcore.question_archive import QuestionArchive
+
+        question = self._question("同じシナリオの問題文です。最適な構成はどれか。")
+        archive = QuestionArchive()
+        archive.add(question.model_dump(), exam_type="AWS-SAP")
+        mock_agent.structured_output.return_value = AgentOutput(questions=[question])
+        mock_teams_client = MagicMock()
+        mock_teams_client.send = AsyncMock(return_value=None)
+        mock_teams_client_class.return_value = mock_teams_client
+
+        with patch("app.agentcore.agent_main.question_archive", archive):
+            result = await invoke({"question_count": 1})
+
+        assert "error" not in result
+        assert (
+            mock_agent.structured_output.call_count == 1 + MAX_DUPLICATE_REGENERATIONS
+        )
+        mock_teams_client.send.assert_called_once()
+
+    @patch("app.agentcore.agent_main.TeamsClient")
+    @patch("app.agentcore.agent_main.agent")
+    async def test_near_duplicates_within_batch_are_regenerated_contract(
+        self,
+        mock_agent: MagicMock,
+        mock_teams_client_class: MagicMock,
+    ) -> None:
+        """
+        契約による設計: 同じバッチ内の類似問題の再生成
+
+        Given: アーカイブは空だが、同時に生成された2問がほぼ同じ
+        When: invoke関数を実行する
+        Then: 後の問題のみが再生成され、先の問題はそのまま投稿される
+        """
+        from app.agentcore.question_archive import QuestionArchive
+
+        scenario = (
+            "ある企業はAWS Organizationsで200個のアカウントを管理している。"
+            "SCPで特定リージョン以外の利用を禁止するには、どの設定が最適か。"
+        )
+        archive = QuestionArchive()
+        mock_agent.structured_output.side_effect = [
+            AgentOutput(
+                questions=[
+                    self._question(scenario),
+                    self._question(scenario.replace("200個", "300個")),
+                ]
+            ),
+            AgentOutput(
+                questions=[self._question("Auroraのグローバルデータベースの要件は。")]
+            ),
+        ]
+        mock_teams_client = MagicMock()
+        mock_teams_client.send = AsyncMock(return_value=None)
+        mock_teams_client_class.return_value = mock_teams_client
+
+        with patch("app.agentcore.agent_main.question_archive", archive):
+            result = await invoke({"question_count": 2})
+
+        assert [q["question"] for q in result["questions"]] == [
+            scenario,
+            "Auroraのグローバルデータベースの要件は。",
+        ]
+        prompt = prompt_text(mock_agent.structured_output.call_args.kwargs["prompt"])
+        assert "1問の実践的な問題" in prompt
+        assert "重複回避指示" in prompt
+
+    @patch("app.agentcore.agent_main.TeamsClient")
+    @patch("app.agentcore.agent_main.agent")
+    async def test_archive_backend_failure_does_not_block_delivery_contract(
+        self,
+        mock_agent: MagicMock,
+        mock_teams_client_class: MagicMock,
+    ) -> None:
+        """
+        契約による設計: アーカイブの保存先の障害時の投稿継続
+
+        Given: 読み込み・書き込みの両方が失敗する保存先のアーカイブ（遅延読み込み）
+        When: invoke関数を実行する
+        Then: 類似判定・保存をスキップして問題が Teams に投稿される
+
+        事前条件: アーカイブの生成時点では保存先にアクセスしない
+        事後条件: 生成した問題は破棄されない
+        """
+        # Given - 事前条件設定
+        from app.agentcore.question_archive import QuestionArchive
+
+        backend = MagicMock()
+        backend.load.side_effect = RuntimeError("Memory unavailable")
+        backend.append.side_effect = RuntimeError("Memory unavailable")
+        archive = QuestionArchive(backend=backend, lazy_load=True)
+        backend.load.assert_not_called()
+
+        question = self._question("Transit Gatewayで複数VPCを接続する構成はどれか。")
+        mock_agent.structured_output.return_value = AgentOutput(questions=[question])
+        mock_teams_client = MagicMock()
+        mock_teams_client.send = AsyncMock(return_value=None)
+        mock_teams_client_class.return_value = mock_teams_client
+
+        # When - invoke関数を実行
+        with patch("app.agentcore.agent_main.question_archive", archive):
+            result = await invoke({"question_count": 1})
+
+        # Then - 事後条件検証
+        assert "error" not in result
+        assert [q["question"] for q in result["questions"]] == [question.question]
+        mock_teams_client.send.assert_called_once()
+
+    @patch("app.agentcore.agent_main.TeamsClient")
+    @patch("app.agentcore.agent_main.agent")
+    async def test_memory_archive_calls_go_through_circuit_breaker_contract(
+        self,
+        mock_agent: MagicMock,
+        mock_teams_client_class: MagicMock,
+    ) -> None:
+        """
+        契約による設計: Memory を保存先とするアーカイブの遮断
+
+        Given: Memory が有効で、Memory のサーキットブレーカーの回路が開いている
+        When: invoke関数を実行する
+        Then: アーカイブの保存先を呼び出さずに問題が Teams に投稿される
+
+        事前条件: アーカイブは遅延読み込み
+        事後条件: 回路が開いている間は保存先の読み込み・書き込みを行わない
+        """
+        # Given - 事前条件設定
+        from app.agentcore.circuit_breaker import CircuitBreakerRegistry
+        from app.agentcore.question_archive import QuestionArchive
+
+        registry = CircuitBreakerRegistry(default_reset_timeout=60)
+        for _ in range(registry.default_failure_threshold):
+            registry.get("memory")._on_failure(timed_out=False)
+        backend = MagicMock()
+        archive = QuestionArchive(backend=backend, lazy_load=True)
+
+        question = self._question("Transit Gatewayで複数VPCを接続する構成はどれか。")
+        mock_agent.structured_output.return_value = AgentOutput(questions=[question])
+        mock_teams_client = MagicMock()
+        mock_teams_client.send = AsyncMock(return_value=None)
+        mock_teams_client_class.return_value = mock_teams_client
+
+        # When - invoke関数を実行
+        with (
+            patch("app.agentcore.agent_main.question_archive", archive),
+            patch("app.agentcore.agent_main.circuit_breakers", registry),
+            patch.dict("app.agentcore.agent_main.MEMORY_CONFIG", {"enabled": True}),
+        ):
+            result = await invoke({"question_count": 1})
+
+        # Then - 事後条件検証
+        assert "error" not in result
+        backend.load.assert_not_called()
+        backend.append.assert_not_called()
+        mock_teams_client.send.assert_called_once()
+
+    @pytest.mark.parametrize("similarity", ["high", "0", "1.5", "nan"])
+    def test_invalid_similarity_falls_back_to_default_contract(
+        self, similarity: str, tmp_path: Any
+    ) -> None:
+        """
+        事前条件: 類似度のしきい値の設定が数値でない、または0より大きく1以下の範囲外
+        事後条件: 例外を送出せず、既定のしきい値でアーカイブを生成する
+        """
+        from app.agentcore.agent_main import create_question_archive
+        from app.agentcore.question_archive import DEFAULT_SIMILARITY_THRESHOLD
+
+        with patch.dict(
+            "os.environ",
+            {
+                "QUESTION_ARCHIVE_ENABLED": "true",
+                "QUESTION_ARCHIVE_PATH": str(tmp_path / "archive.sqlite3"),
+                "QUESTION_ARCHIVE_SIMILARITY": similarity,
+            },
+        ):
+            archive = create_question_archive()
+
+        assert archive is not None
+        assert archive.similarity_threshold == DEFAULT_SIMILARITY_THRESHOLD
+
+
+class TestTargetedRepair:
+    """検証に失敗した問題のみの再生成の契約検証"""
+
+    @staticmethod
+    def _question(text: str, **overrides: Any) -> Question:
+        fields: dict[str, Any] = {
+            "question": text,
+            "options": [
+                "**A.** 選択肢A",
+                "**B.** 選択肢B",
+                "**C.** 選択肢C",
+                "**D.** 選択肢D",
+            ],
+            "correct_answer": "A",
+            "explanation": "解説",
+            "source": ["https://docs.aws.amazon.com/test/"],
+            "learning_domain": "新しいソリューションのための設計",
+            "primary_technologies": ["テスト技術"],
+            "learning_insights": "テスト学習ポイント",
+        }
+        fields.update(overrides)
+        return Question(**fields)
+
+    @patch("app.agentcore.agent_main.QUESTION_VALIDATION_ENABLED", True)
+    @patch("app.agentcore.agent_main.TeamsClient")
+    @patch("app.agentcore.agent_main.agent")
+    async def test_only_failing_question_is_regenerated_contract(
+        self,
+        mock_agent: MagicMock,
+        mock_teams_client_class: MagicMock,
+    ) -> None:
+        """
+        契約による設計: 違反した問題のみの再生成
+
+        Given: 3問中1問の正解ラベルが選択肢と一致しない
+        When: invoke関数を実行する
+        Then: 違反した1問のみが再生成され、元の位置で差し替えられる
+
+        事前条件: QUESTION_VALIDATION_ENABLED=true
+        事後条件: 再生成のプロンプトは1問と違反内容を指定する
+        不変条件: 合格した問題は再生成しない
+        """
+        # Given - 事前条件設定
+        mock_agent.structured_output.side_effect = [
+            AgentOutput(
+                questions=[
+                    self._question("問題1"),
+                    self._question("問題2", correct_answer="B. 選択肢B"),
+                    self._question("問題3"),
+                ]
+            ),
+            AgentOutput(questions=[self._question("問題2（修正版）")]),
+        ]
+        mock_teams_client = MagicMock()
+        mock_teams_client.send = AsyncMock(return_value=None)
+        mock_teams_client_class.return_value = mock_teams_client
+
+        # When - invoke関数を実行
+        result = await invoke({"question_count": 3})
+
+        # Then - 事後条件検証
+        assert [q["question"] for q in result["questions"]] == [
+            "問題1",
+            "問題2（修正版）",
+            "問題3",
+        ]
+        assert mock_agent.structured_output.call_count == 2
+        prompt = prompt_text(mock_agent.structured_output.call_args.kwargs["prompt"])
+        assert "1問の実践的な問題" in prompt
+        assert "correct_answer" in prompt
+        mock_teams_client.send.assert_called_once()
+
+    @patch("app.agentcore.agent_main.QUESTION_VALIDATION_ENABLED", True)
+    @patch("app.agentcore.agent_main.TeamsClient")
+    @patch("app.agentcore.agent_main.agent")
+    async def test_persistently_invalid_question_is_dropped_contract(
+        self,
+        mock_agent: MagicMock,
+        mock_teams_client_class: MagicMock,
+    ) -> None:
+        """
+        契約による設計: 修正上限を超えた問題の除外
+
+        Given: 2問中1問の学習分野が何度生成しても試験ガイドに存在しない
+        When: invoke関数を実行する
+        Then: 上限回数で再生成を打ち切り、合格した1問のみが投稿される
+        """
+        from app.agentcore.agent_main import MAX_REPAIR_ATTEMPTS
+
+        invalid = self._question("分野不正", learning_domain="存在しない分野")
+        mock_agent.structured_output.side_effect = [
+            AgentOutput(questions=[self._question("問題1"), invalid]),
+            *[AgentOutput(questions=[invalid])] * MAX_REPAIR_ATTEMPTS,
+        ]
+        mock_teams_client = MagicMock()
+        mock_teams_client.send = AsyncMock(return_value=None)
+        mock_teams_client_class.return_value = mock_teams_client
+
+        result = await invoke({"question_count": 2})
+
+        assert [q["question"] for q in result["questions"]] == ["問題1"]
+        assert mock_agent.structured_output.call_count == 1 + MAX_REPAIR_ATTEMPTS
+        sent = mock_teams_client.send.call_args.args[0]
+        assert len(sent.questions) == 1
+        assert [(f["slot"], f["stage"]) for f in result["failed_slots"]] == [
+            (1, "validation")
+        ]
+        assert "learning_domain" in result["failed_slots"][0]["reason"]
+
+    @patch("app.agentcore.agent_main.QUESTION_VALIDATION_ENABLED", True)
+    @patch("app.agentcore.agent_main.TeamsClient")
+    @patch("app.agentcore.agent_main.agent")
+    async def test_repaired_question_is_checked_for_duplicates_contract(
+        self,
+        mock_agent: MagicMock,
+        mock_teams_client_class: MagicMock,
+    ) -> None:
+        """
+        契約による設計: 修正で再生成された問題の類似判定
+
+        Given: 修正で再生成された問題が過去の問題とほぼ同じ
+        When: invoke関数を実行する
+        Then: 類似判定は検証の後に行われ、修正後の問題も重複回避で再生成される
+        """
+        from app.agentcore.question_archive import QuestionArchive
+
+        past = (
+            "ある企業はAWS Organizationsで200個のアカウントを管理している。"
+            "SCPで特定リージョン以外の利用を禁止するには、どの設定が最適か。"
+        )
+        archive = QuestionArchive()
+        archive.add(self._question(past).model_dump(), exam_type="AWS-SAP")
+        mock_agent.structured_output.side_effect = [
+            AgentOutput(
+                questions=[
+                    self._question("Transit Gatewayで複数VPCを接続する構成はどれか。"),
+                    self._question("修正対象", correct_answer="B. 選択肢B"),
+                ]
+            ),
+            AgentOutput(questions=[self._question(past.replace("200個", "250個"))]),
+            AgentOutput(
+                questions=[self._question("S3のレプリケーション要件を満たす構成は。")]
+            ),
+        ]
+        mock_teams_client = MagicMock()
+        mock_teams_client.send = AsyncMock(return_value=None)
+        mock_teams_client_class.return_value = mock_teams_client
+
+        with patch("app.agentcore.agent_main.question_archive", archive):
+            result = await invoke({"question_count": 2})
+
+        assert [q["question"] for q in result["questions"]] == [
+            "Transit Gatewayで複数VPCを接続する構成はどれか。",
+            "S3のレプリケーション要件を満たす構成は。",
+        ]
+        assert mock_agent.structured_output.call_count == 3
+        prompt = prompt_text(mock_agent.structured_output.call_args.kwargs["prompt"])
+        assert "重複回避指示" in prompt
+
+
+class TestDomainNormalization:
+    """学習分野の正規化の契約検証"""
+
+    # 正規化できない分野を通すため、この契約では問題検証を無効化する
+    @patch("app.agentcore.agent_main.QUESTION_VALIDATION_ENABLED", False)
+    @patch("app.agentcore.agent_main.memory_client")
+    @patch("app.agentcore.agent_main.TeamsClient")
+    @patch("app.agentcore.agent_main.agent")
+    async def test_memory_stores_compact_ids_contract(
+        self,
+        mock_agent: MagicMock,
+        mock_teams_client_class: MagicMock,
+        mock_memory_client: MagicMock,
+    ) -> None:
+        """
+        契約による設計: 学習分野の正規化と Memory への記録
+
+        Given: 表記揺れのある学習分野の問題、過去の自由記述イベントとコンパクトID
+        When: invoke関数を実行する
+        Then: 問題の学習分野は正規名になり、Memory にはコンパクトIDが記録される
+
+        事前条件: 過去の履歴に自由記述とコンパクトIDが混在する
+        事後条件: プロンプトの分散指示は同じ分野を1つに集約した正規名を使う
+        不変条件: 正規化できない分野はそのまま記録する
+        """
+        # Given - 事前条件設定
+        mock_memory_client.get_recent_domains = AsyncMock(
+            return_value=["D2", "新しいソリューションの設計", "テスト分野"]
+        )
+        mock_memory_client.record_domain_usage = AsyncMock(return_value=None)
+        mock_agent.structured_output.return_value = AgentOutput(
+            questions=[
+                Question(
+                    question=f"問題{i}",
+                    options=VALID_OPTIONS,
+                    correct_answer="A",
+                    explanation="解説",
+                    source=["https://docs.aws.amazon.com/test/"],
+                    learning_domain=domain,
+                    primary_technologies=["テスト技術"],
+                    learning_insights="テスト学習ポイント",
+                )
+                for i, domain in enumerate(
+                    [
+                        "複雑な組織に対応したソリューション設計",
+                        "タスク1.4: マルチアカウント AWS 環境を設計する",
+                        "テスト分野",
+                    ]
+                )
+            ]
+        )
+        mock_teams_client = MagicMock()
+        mock_teams_client.send = AsyncMock(return_value=None)
+        mock_teams_client_class.return_value = mock_teams_client
+
+        # When - invoke関数を実行
+        result = await invoke({"question_count": 3})
+
+        # Then - 事後条件検証: 問題の分野は正規名、Memory にはタスクを含むコンパクトID
+        assert [q["learning_domain"] for q in result["questions"]] == [
+            "複雑な組織に対応するソリューションの設計",
+            "複雑な組織に対応するソリューションの設計",
+            "テスト分野",
+        ]
+        recorded = [
+            call.kwargs["learning_domain"]
+            for call in mock_memory_client.record_domain_usage.call_args_list
+        ]
+        assert recorded == ["D1", "D1/T1.4", "テスト分野"]
+
+        prompt = prompt_text(mock_agent.structured_output.call_args.kwargs["prompt"])
+        assert "'新しいソリューションのための設計': 2" in prompt
+
+    def test_canonicalize_keeps_resolved_task_contract(self) -> None:
+        """
+        契約による設計: 正規化で確定したタスクの保持
+
+        Given: タスク名で記載された学習分野の問題
+        When: 正規化を2回適用する（修正・類似問題の差し替え後の再正規化）
+        Then: 学習分野は分野の正規名、コンパクトIDはタスクを含んだまま
+
+        事前条件: learning_domain がタスクに照合できる
+        事後条件: learning_domain_id は "D1/T1.4"
+        不変条件: learning_domain_id は出力（model_dump）に含まれない
+        """
+        # Given - 事前条件設定
+        question = Question(
+            question="問題",
+            options=VALID_OPTIONS,
+            correct_answer="A",
+            explanation="解説",
+            source=["https://docs.aws.amazon.com/test/"],
+            learning_domain="マルチアカウントAWS環境の設計",
+            primary_technologies=["AWS Organizations"],
+            learning_insights="テスト学習ポイント",
+        )
+
+        # When - 正規化を2回適用
+        once = canonicalize_learning_domains("AWS-SAP", [question])
+        twice = canonicalize_learning_domains("AWS-SAP", once)
+
+        # Then - 事後条件・不変条件検証
+        for canonical in (once[0], twice[0]):
+            assert (
+                canonical.learning_domain == "複雑な組織に対応するソリューションの設計"
+            )
+            assert canonical.learning_domain_id == "D1/T1.4"
+            assert "learning_domain_id" not in canonical.model_dump()
+
+
+class TestCoverageTracking:
+    """カバレッジ記録と未出題タスク指示の契約検証"""
+
+    @patch("app.agentcore.agent_main.TeamsClient")
+    @patch("app.agentcore.agent_main.agent")
+    async def test_records_coverage_and_prompts_uncovered_tasks_contract(
+        self,
+        mock_agent: MagicMock,
+        mock_teams_client_class: MagicMock,
+        tmp_path: Any,
+    ) -> None:
+        """
+        契約による設計: カバレッジの記録と未出題タスクの優先指示
+
+        Given: タスク1.1のみ出題済みのカバレッジ
+        When: invoke関数を実行する
+        Then: プロンプトに未出題タスクが示され、生成した問題のタスク・サービスが記録される
+
+        事前条件: カバレッジトラッカーが有効
+        事後条件: learning_insights で言及したタスクとカタログで解決したサービスが記録される
+        不変条件: 出題済みのタスクはプロンプトの未出題タスクに含まれない
+        """
+        # Given - 事前条件設定
+        from app.agentcore.coverage_tracker import CoverageTracker, LocalCoverageStore
+
+        tracker = CoverageTracker(LocalCoverageStore(tmp_path / "coverage.json"))
+        tracker.record("AWS-SAP", ["T1.1"], [])
+        mock_agent.structured_output.return_value = AgentOutput(
+            questions=[
+                Question(
+                    question="マルチアカウントの問題",
+                    options=VALID_OPTIONS,
+                    correct_answer="A",
+                    explanation="解説",
+                    source=["https://docs.aws.amazon.com/test/"],
+                    learning_domain="複雑な組織に対応するソリューションの設計",
+                    primary_technologies=["AWS Organizations", "独自の概念"],
+                    learning_insights="試験ガイドの「タスク1.4: マルチアカウント AWS 環境を設計する」に該当します。",
+                )
+            ]
+        )
+        mock_teams_client = MagicMock()
+        mock_teams_client.send = AsyncMock(return_value=None)
+        mock_teams_client_class.return_value = mock_teams_client
+
+        # When - invoke関数を実行
+        with patch("app.agentcore.agent_main.coverage_tracker", tracker):
+            result = await invoke({"question_count": 1})
+
+        # Then - 事後条件検証
+        assert "error" not in result
+        prompt = prompt_text(mock_agent.structured_output.call_args.kwargs["prompt"])
+        assert "未出題タスク" in prompt
+        assert "タスク 1.2: セキュリティコントロールを規定する" in prompt
+        assert "- タスク 1.1:" not in prompt
+
+        from app.agentcore.service_catalog import get_service_catalog
+
+        organizations = get_service_catalog("AWS-SAP").resolve("AWS Organizations")
+        assert organizations is not None
+        assert "T1.4" not in tracker.uncovered_tasks("AWS-SAP", ["T1.4"])
+        assert tracker.uncovered_services("AWS-SAP", [organizations.id]) == []
+
+    @patch("app.agentcore.agent_main.TeamsClient")
+    @patch("app.agentcore.agent_main.agent")
+    async def test_memory_coverage_calls_go_through_circuit_breaker_contract(
+        self,
+        mock_agent: MagicMock,
+        mock_teams_client_class: MagicMock,
+    ) -> None:
+        """
+        契約による設計: Memory を保存先とするカバレッジの遮断
+
+        Given: Memory が有効で、Memory のサーキットブレーカーの回路が開いている
+        When: invoke関数を実行する
+        Then: カバレッジの保存先を呼び出さずに問題が Teams に投稿される
+
+        事後条件: 回路が開いている間は保存先の読み込み・書き込みを行わない
+        """
+        # Given - 事前条件設定
+        from app.agentcore.circuit_breaker import CircuitBreakerRegistry
+        from app.agentcore.coverage_tracker import CoverageTracker
+
+        registry = CircuitBreakerRegistry(default_reset_timeout=60)
+        for _ in range(registry.default_failure_threshold):
+            registry.get("memory")._on_failure(timed_out=False)
+        store = MagicMock()
+        mock_agent.structured_output.return_value = AgentOutput(
+            questions=[
+                Question(
+                    question="マルチアカウントの問題",
+                    options=VALID_OPTIONS,
+                    correct_answer="A",
+                    explanation="解説",
+                    source=["https://docs.aws.amazon.com/test/"],
+                    learning_domain="複雑な組織に対応するソリューションの設計",
+                    primary_technologies=["AWS Organizations"],
+                    learning_insights="テスト学習ポイント",
+                )
+            ]
+        )
+        mock_teams_client = MagicMock()
+        mock_teams_client.send = AsyncMock(return_value=None)
+        mock_teams_client_class.return_value = mock_teams_client
+
+        # When - invoke関数を実行
+        with (
+            patch("app.agentcore.agent_main.coverage_tracker", CoverageTracker(store)),
+            patch("app.agentcore.agent_main.circuit_breakers", registry),
+            patch.dict("app.agentcore.agent_main.MEMORY_CONFIG", {"enabled": True}),
+        ):
+            result = await invoke({"question_count": 1})
+
+        # Then - 事後条件検証
+        assert "error" not in result
+        store.load.assert_not_called()
+        store.save.assert_not_called()
+        mock_teams_client.send.assert_called_once()
+
+    @pytest.mark.parametrize("window_days", ["month", "7.5", "0"])
+    def test_invalid_window_falls_back_to_default_contract(
+        self, window_days: str, tmp_path: Any
+    ) -> None:
+        """
+        事前条件: 保持期間の設定が整数でない、または正の値でない
+        事後条件: 例外を送出せず、既定の保持期間でカバレッジトラッカーを生成する
+        """
+        from app.agentcore.agent_main import create_coverage_tracker
+        from app.agentcore.coverage_tracker import DEFAULT_WINDOW_DAYS
+
+        with patch.dict(
+            "os.environ",
+            {
+                "COVERAGE_TRACKING_ENABLED": "true",
+                "COVERAGE_PATH": str(tmp_path / "coverage.json"),
+                "COVERAGE_WINDOW_DAYS": window_days,
+            },
+        ):
+            tracker = create_coverage_tracker()
+
+        assert tracker is not None
+        assert tracker.window_days == DEFAULT_WINDOW_DAYS
+
+
+class TestInvocationDeadline:
+    """呼び出し期限の伝播と部分的な結果の契約検証"""
+
+    QUESTION = Question(
+        question="期限内に生成された問題",
+        options=VALID_OPTIONS,
+        correct_answer="A",
+        explanation="解説",
+        source=["https://docs.aws.amazon.com/test/"],
+        learning_domain=VALID_DOMAIN,
+        primary_technologies=["Amazon S3"],
+        learning_insights="テスト",
+    )
+
+    @patch("app.agentcore.agent_main.TeamsClient")
+    @patch("app.agentcore.agent_main.agent")
+    async def test_bedrock_timeout_returns_partial_result_contract(
+        self, mock_agent: MagicMock, mock_teams_client_class: MagicMock
+    ) -> None:
+        """
+        契約による設計: 生成が期限を超えた場合の部分的な結果
+
+        Given: 期限より生成に時間がかかるエージェント
+        When: deadline_seconds を指定して invoke関数を実行する
+        Then: 例外ではなく、空の問題リストと超過したフェーズを含む結果が返される
+
+        事前条件: deadline_seconds=0.5
+        事後条件: 生成の待機は打ち切られ、Teams には投稿しない
+        不変条件: 結果は AgentOutput として解釈できる
+        """
+        # Given
+        import time
+
+        def slow_generation(**_: Any) -> AgentOutput:
+            time.sleep(1.0)
+            return AgentOutput(questions=[self.QUESTION])
+
+        mock_agent.structured_output.side_effect = slow_generation
+
+        # When
+        started = time.monotonic()
+        result = await invoke({"question_count": 1, "deadline_seconds": 0.5})
+        elapsed = time.monotonic() - started
+
+        # Then
+        assert elapsed < 1.0
+        assert "error" not in result
+        assert AgentOutput(**result).questions == []
+        assert result["deadline"]["exceeded_phases"] == ["bedrock"]
+        mock_teams_client_class.assert_not_called()
+
+    @patch("app.agentcore.agent_main.TeamsClient")
+    @patch("app.agentcore.agent_main.agent")
+    async def test_teams_timeout_is_bounded_by_budget_contract(
+        self, mock_agent: MagicMock, mock_teams_client_class: MagicMock
+    ) -> None:
+        """
+        契約による設計: Teams 投稿への予算の伝播
+
+        Given: 期限内に完了する生成
+        When: deadline_seconds=100 で invoke関数を実行する
+        Then: Teams クライアントのタイムアウトは Teams フェーズの予算以内になる
+
+        不変条件: 期限を超過しなかった場合、結果に期限情報は含まれない
+        """
+        # Given
+        mock_agent.structured_output.return_value = AgentOutput(
+            questions=[self.QUESTION]
+        )
+        mock_teams_client = MagicMock()
+        mock_teams_client.send = AsyncMock(return_value=None)
+        mock_teams_client_class.return_value = mock_teams_client
+
+        # When
+        result = await invoke({"question_count": 1, "deadline_seconds": 100})
+
+        # Then
+        assert len(result["questions"]) == 1
+        assert "deadline" not in result
+        timeout = mock_teams_client_class.call_args.kwargs["timeout"]
+        assert 0 < timeout <= 15.0
+        mock_teams_client.send.assert_called_once()
+
+    @patch("app.agentcore.agent_main.TeamsClient")
+    @patch("app.agentcore.agent_main.agent")
+    async def test_teams_timeout_keeps_generated_questions_contract(
+        self, mock_agent: MagicMock, mock_teams_client_class: MagicMock
+    ) -> None:
+        """
+        契約による設計: Teams 投稿が予算を超えた場合
+
+        Given: 投稿が予算内に完了しない Teams クライアント
+        When: invoke関数を実行する
+        Then: 生成した問題は返され、Teams フェーズの超過が記録される
+        """
+        # Given
+        import asyncio
+
+        async def slow_send(_: Any) -> None:
+            await asyncio.sleep(1.0)
+
+        mock_agent.structured_output.return_value = AgentOutput(
+            questions=[self.QUESTION]
+        )
+        mock_teams_client = MagicMock()
+        mock_teams_client.send = slow_send
+        mock_teams_client_class.return_value = mock_teams_client
+
+        # When
+        with patch.dict("os.environ", {"INVOCATION_PHASE_SHARES": '{"teams": 0.1}'}):
+            result = await invoke({"question_count": 1, "deadline_seconds": 2})
+
+        # Then
+        assert len(result["questions"]) == 1
+        assert result["deadline"]["exceeded_phases"] == ["teams"]
+
+
+class TestPartialResults:
+    """一部の問題枠が失敗した場合の部分的な結果の契約検証"""
+
+    @staticmethod
+    def _question(text: str) -> Question:
+        return Question(
+            question=text,
+            options=VALID_OPTIONS,
+            correct_answer="A",
+            explanation="解説",
+            source=["https://docs.aws.amazon.com/test/"],
+            learning_domain=VALID_DOMAIN,
+            primary_technologies=["Amazon S3"],
+            learning_insights="テスト",
+        )
+
+    @patch("app.agentcore.agent_main.TeamsClient")
+    @patch("app.agentcore.agent_main.agent")
+    async def test_failed_slot_does_not_discard_completed_questions_contract(
+        self, mock_agent: MagicMock, mock_teams_client_class: MagicMock
+    ) -> None:
+        """
+        契約による設計: まとめての生成が失敗した場合の1問ずつの生成
+
+        Given: 3問のまとめての生成が失敗し、1問ずつの生成では2問目のみ失敗する
+        When: invoke関数を実行する
+        Then: 完了した2問が返されて Teams に投稿され、失敗した問題枠と理由が返される
+
+        事前条件: question_count=3
+        事後条件: failed_slots は失敗した問題枠の位置と理由を含む
+        不変条件: 1問でも完了していればエラー情報は返さない
+        """
+        # Given
+        mock_agent.structured_output.side_effect = [
+            RuntimeError("ThrottlingException"),
+            AgentOutput(questions=[self._question("問題1")]),
+            RuntimeError("ModelStreamError"),
+            AgentOutput(questions=[self._question("問題3")]),
+        ]
+        mock_teams_client = MagicMock()
+        mock_teams_client.send = AsyncMock(return_value=None)
+        mock_teams_client_class.return_value = mock_teams_client
+
+        # When
+        result = await invoke({"question_count": 3})
+
+        # Then
+        assert "error" not in result
+        assert [q["question"] for q in result["questions"]] == ["問題1", "問題3"]
+        assert result["failed_slots"] == [
+            {"slot": 1, "stage": "generation", "reason": "ModelStreamError"}
+        ]
+        sent = mock_teams_client.send.call_args.args[0]
+        assert [q.question for q in sent.questions] == ["問題1", "問題3"]
+
+        # 1問ずつの生成では、生成済みの問題を避けるよう指示する
+        prompt = prompt_text(mock_agent.structured_output.call_args.kwargs["prompt"])
+        assert "1問の実践的な問題" in prompt
+        assert "生成済みの問題" in prompt
+        assert "問題1" in prompt
+
+    @patch("app.agentcore.agent_main.TeamsClient")
+    @patch("app.agentcore.agent_main.agent")
+    async def test_short_batch_reports_missing_slots_contract(
+        self, mock_agent: MagicMock, mock_teams_client_class: MagicMock
+    ) -> None:
+        """
+        契約による設計: 要求より少ない問題しか返されなかった場合
+
+        事前条件: 3問を要求し、2問が返される
+        事後条件: 2問が返され、不足した問題枠が failed_slots に含まれる
+        不変条件: 不足分のために再生成は行わない
+        """
+        # Given
+        mock_agent.structured_output.return_value = AgentOutput(
+            questions=[self._question("問題1"), self._question("問題2")]
+        )
+        mock_teams_client = MagicMock()
+        mock_teams_client.send = AsyncMock(return_value=None)
+        mock_teams_client_class.return_value = mock_teams_client
+
+        # When
+        result = await invoke({"question_count": 3})
+
+        # Then
+        assert len(result["questions"]) == 2
+        assert [(f["slot"], f["stage"]) for f in result["failed_slots"]] == [
+            (2, "generation")
+        ]
+        assert mock_agent.structured_output.call_count == 1
+        mock_teams_client.send.assert_called_once()
+
+    @patch("app.agentcore.agent_main.TeamsClient")
+    @patch("app.agentcore.agent_main.agent")
+    async def test_all_slots_failed_returns_error_contract(
+        self, mock_agent: MagicMock, mock_teams_client_class: MagicMock
+    ) -> None:
+        """
+        契約による設計: 全ての問題枠が失敗した場合
+
+        事前条件: まとめての生成も1問ずつの生成も失敗する
+        事後条件: エラー情報と全ての問題枠の失敗理由が返され、Teams には投稿しない
+        """
+        # Given
+        mock_agent.structured_output.side_effect = RuntimeError("ServiceUnavailable")
+
+        # When
+        result = await invoke({"question_count": 2})
+
+        # Then
+        assert "ServiceUnavailable" in result["error"]
+        assert [f["slot"] for f in result["failed_slots"]] == [0, 1]
+        assert mock_agent.structured_output.call_count == 3
+        mock_teams_client_class.assert_not_called()
+
+
+class TestPromptCachePrefix:
+    """プロンプトの静的な接頭辞と動的な接尾辞の分離の契約検証"""
+
+    @patch("app.agentcore.agent_main.PROMPT_CACHE_ENABLED", True)
+    def test_static_prefix_is_shared_across_runs_contract(self) -> None:
+        """
+        契約による設計: キャッシュ可能な接頭辞
+
+        Given: 問題数と追加指示が異なる2つのプロンプト
+        When: build_generation_prompt を実行する
+        Then: 接頭辞・cachePoint・接尾辞の順に組み立てられ、接頭辞は完全に一致する
+
+        事後条件: 接頭辞に試験ガイドとサンプル問題が含まれ、問題数・追加指示は含まれない
+        """
+        from app.agentcore.agent_main import build_generation_prompt
+
+        first = build_generation_prompt("AWS-SAP", 3, "ガイド本文", "分散指示A")
+        second = build_generation_prompt("AWS-SAP", 1, "ガイド本文", "修正指示B")
+
+        assert [list(block) for block in first] == [["text"], ["cachePoint"], ["text"]]
+        assert first[1] == {"cachePoint": {"type": "default"}}
+        assert first[0] == second[0]
+
+        prefix = first[0]["text"]
+        assert "ガイド本文" in prefix
+        assert "サンプル問題" in prefix
+        assert "3問" not in prefix
+        assert "分散指示A" not in prefix
+        assert "3問の実践的な問題" in first[2]["text"]
+        assert "分散指示A" in first[2]["text"]
+
+    @patch("app.agentcore.agent_main.PROMPT_CACHE_ENABLED", False)
+    def test_no_cache_point_when_unsupported_contract(self) -> None:
+        """
+        事前条件: モデルがプロンプトキャッシュに対応しない
+        事後条件: cachePoint を含まない（テキストは同じ構成）
+        """
+        from app.agentcore.agent_main import build_generation_prompt
+
+        prompt = build_generation_prompt("AWS-SAP", 2, "", "")
+
+        assert all("cachePoint" not in block for block in prompt)
+        assert "2問の実践的な問題" in prompt_text(prompt)
+        assert "試験ガイド情報は利用できません" in prompt_text(prompt)
+
+
+class TestInvocationMetricsRecord:
+    """呼び出しメトリクスの集計と出力の契約検証"""
+
+    @staticmethod
+    def _question(text: str) -> Question:
+        return Question(
+            question=text,
+            options=VALID_OPTIONS,
+            correct_answer="A",
+            explanation="解説",
+            source=["https://docs.aws.amazon.com/test/"],
+            learning_domain=VALID_DOMAIN,
+            primary_technologies=["Amazon S3"],
+            learning_insights="テスト",
+        )
+
+    @staticmethod
+    def _emf_records(output: str) -> list[dict[str, Any]]:
+        import json
+
+        return [
+            json.loads(line)
+            for line in output.splitlines()
+            if line.startswith('{"_aws"')
+        ]
+
+    @patch("app.agentcore.agent_main.TeamsClient")
+    @patch("app.agentcore.agent_main.agent")
+    async def test_one_record_per_invocation_contract(
+        self,
+        mock_agent: MagicMock,
+        mock_teams_client_class: MagicMock,
+        capsys: pytest.CaptureFixture[str],
+    ) -> None:
+        """
+        契約による設計: invoke 1回につき1行のメトリクスレコード
+
+        Given: 生成中にモデル応答の usage が届くエージェント
+        When: invoke関数を実行する
+        Then: トークン数・フェーズの所要時間を含む EMF レコードが1行出力される
+        """
+        # Given
+        from app.agentcore.agent_main import record_metrics_callback
+
+        def generate(**_: Any) -> AgentOutput:
+            record_metrics_callback(
+                event={
+                    "metadata": {
+                        "usage": {
+                            "inputTokens": 120,
+                            "outputTokens": 800,
+                            "cacheReadInputTokens": 9000,
+                        }
+                    }
+                }
+            )
+            return AgentOutput(questions=[self._question("問題1")])
+
+        mock_agent.structured_output.side_effect = generate
+        mock_teams_client = MagicMock()
+        mock_teams_client.send = AsyncMock(return_value=None)
+        mock_teams_client_class.return_value = mock_teams_client
+
+        # When
+        result = await invoke({"question_count": 1})
+
+        # Then
+        records = self._emf_records(capsys.readouterr().out)
+        assert len(records) == 1
+        record = records[0]
+        assert record["Outcome"] == "succeeded"
+        assert record["ExamType"] == "AWS-SAP"
+        assert record["InputTokens"] == 120
+        assert record["CacheReadTokens"] == 9000
+        assert record["ModelCalls"] == 1
+        assert record["EstimatedCostUSD"] > 0
+        assert {"BedrockLatency", "TeamsLatency"} <= set(record)
+        assert "metrics" not in result
+
+    @patch("app.agentcore.agent_main.TeamsClient")
+    @patch("app.agentcore.agent_main.agent")
+    async def test_token_budget_stops_further_model_calls_contract(
+        self,
+        mock_agent: MagicMock,
+        mock_teams_client_class: MagicMock,
+        capsys: pytest.CaptureFixture[str],
+    ) -> None:
+        """
+        契約による設計: トークン予算の強制
+
+        Given: token_budget=100、まとめての生成が失敗し、1問目の生成で予算を使い切る
+        When: invoke関数を実行する
+        Then: 以降はモデルを呼び出さず、完了した1問と予算超過の問題枠が返される
+        """
+        # Given
+        from app.agentcore.agent_main import record_metrics_callback
+
+        def spend(tokens: int) -> None:
+            record_metrics_callback(
+                event={"metadata": {"usage": {"inputTokens": tokens}}}
+            )
+
+        def failing_batch(**_: Any) -> AgentOutput:
+            spend(40)
+            raise RuntimeError("ModelStreamError")
+
+        def single(**_: Any) -> AgentOutput:
+            spend(80)
+            return AgentOutput(questions=[self._question("問題1")])
+
+        calls = [failing_batch, single]
+        mock_agent.structured_output.side_effect = lambda **kwargs: calls.pop(0)(
+            **kwargs
+        )
+        mock_teams_client = MagicMock()
+        mock_teams_client.send = AsyncMock(return_value=None)
+        mock_teams_client_class.return_value = mock_teams_client
+
+        # When
+        result = await invoke({"question_count": 2, "token_budget": 100})
+
+        # Then
+        assert [q["question"] for q in result["questions"]] == ["問題1"]
+        assert result["failed_slots"][0]["slot"] == 1
+        assert result["failed_slots"][0]["stage"] == "budget"
+        assert mock_agent.structured_output.call_count == 2
+        mock_teams_client.send.assert_called_once()
+
+        record = self._emf_records(capsys.readouterr().out)[0]
+        assert record["Outcome"] == "partial"
+        assert record["TokenBudget"] == 100
+
+    @patch("app.agentcore.agent_main.TeamsClient")
+    @patch("app.agentcore.agent_main.agent")
+    async def test_stats_action_reports_phase_latency_contract(
+        self,
+        mock_agent: MagicMock,
+        mock_teams_client_class: MagicMock,
+    ) -> None:
+        """
+        契約による設計: レイテンシ統計の照会
+
+        Given: 問題生成を2回実行したプロセス
+        When: action="stats" で invoke関数を実行する
+        Then: invoke 全体と各フェーズの件数・分位点、Webhook ホストごとの待機統計が返される
+        """
+        # Given
+        from app.agentcore.latency_stats import LatencyStats
+        from app.agentcore.rate_limiter import RateLimiterRegistry
+
+        stats = LatencyStats(flush_interval=3600.0)
+        limiters = RateLimiterRegistry()
+        await limiters.acquire("https://hooks.example.com/webhook")
+        mock_agent.structured_output.return_value = AgentOutput(
+            questions=[self._question("問題1")]
+        )
+        mock_teams_client = MagicMock()
+        mock_teams_client.send = AsyncMock(return_value=None)
+        mock_teams_client_class.return_value = mock_teams_client
+
+        with (
+            patch("app.agentcore.agent_main.latency_stats", stats),
+            patch("app.agentcore.agent_main.rate_limiters", limiters),
+        ):
+            await invoke({"question_count": 1})
+            await invoke({"question_count": 1})
+
+            # When
+            result = await invoke({"action": "stats"})
+            await stats.shutdown()
+
+        # Then
+        phases = result["latency"]["phases"]
+        assert phases["invocation"]["count"] == 2
+        assert phases["bedrock"]["count"] == 2
+        assert phases["teams"]["count"] == 2
+        assert {"p50", "p95", "p99"} <= set(phases["bedrock"])
+        assert result["rate_limits"]["hooks.example.com"]["acquired"] == 1
+
+
+class TestTracing:
+    """フェーズごとのスパンの契約検証"""
+
+    @patch("app.agentcore.agent_main.TeamsClient")
+    @patch("app.agentcore.agent_main.agent")
+    async def test_phase_spans_under_caller_trace_contract(
+        self,
+        mock_agent: MagicMock,
+        mock_teams_client_class: MagicMock,
+        span_exporter: Any,
+    ) -> None:
+        """
+        契約による設計: 呼び出し元のトレースに属するフェーズごとのスパン
+
+        Given: ペイロードに呼び出し元の traceparent、生成中にモデル応答の usage が届くエージェント
+        When: invoke関数を実行する
+        Then: 試験ガイド読み込み・Bedrock 生成のスパンが generate_and_deliver の子として記録され、
+              試験・問題数・トークン数・キャッシュヒット率が属性になる
+        """
+        # Given
+        from app.agentcore.agent_main import (
+            record_metrics_callback,
+            record_usage_callback,
+        )
+
+        trace_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+        usage = {"inputTokens": 100, "outputTokens": 700, "cacheReadInputTokens": 900}
+
+        def generate(**_: Any) -> AgentOutput:
+            event = {"metadata": {"usage": usage}}
+            record_usage_callback(event=event)
+            record_metrics_callback(event=event)
+            return AgentOutput(
+                questions=[TestInvocationMetricsRecord._question("問題1")]
+            )
+
+        mock_agent.structured_output.side_effect = generate
+        mock_teams_client = MagicMock()
+        mock_teams_client.send = AsyncMock(return_value=None)
+        mock_teams_client_class.return_value = mock_teams_client
+
+        # When
+        await invoke(
+            {
+                "question_count": 1,
+                "trace_context": {"traceparent": f"00-{trace_id}-00f067aa0ba902b7-01"},
+            }
+        )
+
+        # Then
+        spans = {span.name: span for span in span_exporter.get_finished_spans()}
+        root = spans["generate_and_deliver"]
+        assert format(root.context.trace_id, "032x") == trace_id
+        assert root.parent is not None and root.parent.is_remote
+        assert root.attributes["exam_type"] == "AWS-SAP"
+        assert root.attributes["question_count"] == 1
+        assert root.attributes["outcome"] == "succeeded"
+        assert root.attributes["tokens.input"] == 100
+        assert root.attributes["tokens.cache_read"] == 900
+
+        for name in ("guide.load", "bedrock.generate"):
+            assert spans[name].parent is not None
+            assert spans[name].parent.span_id == root.context.span_id
+
+        bedrock = spans["bedrock.generate"]
+        assert bedrock.attributes["tokens.output"] == 700
+        assert bedrock.attributes["cache.hit_ratio"] == 0.9
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+card_renderer のテスト
+
+契約による設計（Design by Contract）に基づく単体テスト
+"""
+
+import json
+import time
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from app.agentcore.card_renderer import (
+    CardTemplateError,
+    compile_template,
+    load_card_template,
+    render_cards,
+    resolve_template_path,
+)
+
+
+@pytest.fixture
+def question() -> dict[str, Any]:
+    """テスト用の問題データ（Question.model_dump() 相当）"""
+    return {
+        "question": "マルチアカウント環境の問題",
+        "options": ["**A.** 選択肢A", "**B.** 選択肢B", "**C.** 選択肢C"],
+        "correct_answer": "B",
+        "explanation": "SCPを使用するのが最適です。",
+        "source": ["https://docs.aws.amazon.com/organizations/"],
+        "learning_domain": "複雑な組織に対応するソリューションの設計",
+        "primary_technologies": ["AWS Organizations"],
+        "learning_insights": "タスク1.4に該当します。",
+    }
+
+
+class TestCompileTemplate:
+    """compile_template 関数の契約検証"""
+
+    def test_repository_template_renders_contract(
+        self, question: dict[str, Any]
+    ) -> None:
+        """
+        事前条件: リポジトリの Power Automate 式入りテンプレート
+        事後条件: 式が全て問題データに置換された有効な Adaptive Card が生成される
+        不変条件: 選択肢・参考リンクのコンテナがローカルで組み立てられる
+        """
+        # Arrange - 事前条件設定
+        template = compile_template(resolve_template_path().read_text("utf-8"))
+
+        # Act
+        card = template.render(question)
+
+        # Assert - 事後条件検証
+        serialized = json.dumps(card, ensure_ascii=False)
+        assert "@{" not in serialized
+        assert card["type"] == "AdaptiveCard"
+        assert question["learning_domain"] in card["body"][0]["text"]
+        assert card["body"][2]["text"] == question["question"]
+        assert "正解は B です" in serialized
+        assert question["explanation"] in serialized
+        assert question["learning_insights"] in serialized
+
+        # 不変条件検証: コンテナ要素
+        options_container = card["body"][3]
+        assert [item["text"] for item in options_container["items"]] == question[
+            "options"
+        ]
+        sources_container = card["body"][-1]
+        assert question["source"][0] in sources_container["items"][0]["text"]
+
+    def test_invalid_template_precondition(self) -> None:
+        """
+        事前条件: JSON として解析できないテンプレート
+        事後条件: CardTemplateError が発生する
+        """
+        with pytest.raises(CardTemplateError):
+            compile_template('{"type": "AdaptiveCard", "body": [}')
+
+    def test_unknown_slot_precondition(self) -> None:
+        """
+        事前条件: 未対応のスロット（@{outputs('Unknown').body}）を含むテンプレート
+        事後条件: CardTemplateError が発生する
+        """
+        with pytest.raises(CardTemplateError):
+            compile_template("{\"items\": @{outputs('Unknown').body}}")
+
+    def test_static_subtrees_shared_invariant(self, question: dict[str, Any]) -> None:
+        """
+        不変条件: 置換を含まない部分木は描画間で同一オブジェクトを共有する
+        """
+        # Arrange
+        template = compile_template(
+            '{"static": {"a": [1, 2]}, "text": "@{items(\'x\')?[\'question\']}"}'
+        )
+
+        # Act
+        first = template.render(question)
+        second = template.render(question)
+
+        # Assert
+        assert first["static"] is second["static"]
+        assert first["text"] == question["question"]
+
+
+class TestLoadCardTemplate:
+    """load_card_template 関数の契約検証"""
+
+    def test_cached_per_version_contract(self, tmp_path: Path) -> None:
+        """
+        事前条件: 同一内容のテンプレートファイル
+        事後条件: 2回目以降はキャッシュ済みのコンパイル結果が返される
+        不変条件: 内容が変わるとバージョンが変わり再コンパイルされる
+        """
+        # Arrange - 事前条件設定
+        template_file = tmp_path / "card.json"
+        template_file.write_text('{"text": "v1"}', encoding="utf-8")
+
+        # Act
+        first = load_card_template(template_file)
+        second = load_card_template(template_file)
+
+        # Assert - 事後条件検証
+        assert first is second
+
+        # 不変条件検証: 内容変更で新バージョン
+        template_file.write_text('{"text": "v2-changed"}', encoding="utf-8")
+        third = load_card_template(template_file)
+        assert third.version != first.version
+        assert third.render({}) == {"text": "v2-changed"}
+
+    def test_render_1000_cards_benchmark(self, question: dict[str, Any]) -> None:
+        """
+        事前条件: 1,000 問分の問題データ
+        事後条件: 1,000 枚のカードが1秒未満で生成される
+        """
+        # Arrange
+        questions = [question] * 1000
+
+        # Act
+        start = time.perf_counter()
+        cards = render_cards(questions)
+        elapsed = time.perf_counter() - start
+
+        # Assert
+        assert len(cards) == 1000
+        assert elapsed < 1.0
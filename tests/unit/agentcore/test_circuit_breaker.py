@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+circuit_breaker のテスト
+
+契約による設計（Design by Contract）に基づく単体テスト
+"""
+
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.agentcore.circuit_breaker import (
+    DEFAULT_CALL_TIMEOUT,
+    DEFAULT_FAILURE_THRESHOLD,
+    DEFAULT_RESET_TIMEOUT,
+    CircuitBreaker,
+    CircuitBreakerRegistry,
+    CircuitOpenError,
+)
+
+
+class FakeClock:
+    """テスト用の手動時計"""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def failing() -> None:
+    raise RuntimeError("Memory API Error")
+
+
+def succeeding() -> str:
+    return "ok"
+
+
+class TestCircuitBreaker:
+    """CircuitBreaker の契約検証"""
+
+    @pytest.fixture
+    def clock(self) -> FakeClock:
+        return FakeClock()
+
+    @pytest.fixture
+    def breaker(self, clock: FakeClock) -> CircuitBreaker:
+        return CircuitBreaker(
+            "memory", failure_threshold=2, reset_timeout=30.0, clock=clock
+        )
+
+    async def test_opens_after_consecutive_failures_contract(
+        self, breaker: CircuitBreaker
+    ) -> None:
+        """
+        事前条件: failure_threshold=2 の closed 状態
+        事後条件: 2回連続で失敗すると open になり、以降は関数を呼び出さずに拒否する
+        """
+        # Arrange
+        func = MagicMock(side_effect=RuntimeError("Memory API Error"))
+
+        # Act
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                await breaker.call(func)
+        with pytest.raises(CircuitOpenError):
+            await breaker.call(func)
+
+        # Assert
+        assert breaker.state == "open"
+        assert func.call_count == 2
+        assert breaker.stats.failures == 2
+        assert breaker.stats.rejected == 1
+        assert breaker.stats.opened == 1
+
+    async def test_success_resets_failure_count_contract(
+        self, breaker: CircuitBreaker
+    ) -> None:
+        """
+        不変条件: 連続していない失敗では回路は開かない
+        """
+        # Act
+        with pytest.raises(RuntimeError):
+            await breaker.call(failing)
+        assert await breaker.call(succeeding) == "ok"
+        with pytest.raises(RuntimeError):
+            await breaker.call(failing)
+
+        # Assert
+        assert breaker.state == "closed"
+
+    async def test_half_open_probe_success_closes_contract(
+        self, breaker: CircuitBreaker, clock: FakeClock
+    ) -> None:
+        """
+        事前条件: open 状態で待機時間が経過している
+        事後条件: half_open となり、試行が成功すると closed に戻る
+        """
+        # Arrange
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                await breaker.call(failing)
+        clock.now += 30.0
+
+        # Act
+        assert breaker.state == "half_open"
+        result = await breaker.call(succeeding)
+
+        # Assert
+        assert result == "ok"
+        assert breaker.state == "closed"
+        assert breaker.snapshot()["consecutive_failures"] == 0
+
+    async def test_half_open_probe_failure_reopens_contract(
+        self, breaker: CircuitBreaker, clock: FakeClock
+    ) -> None:
+        """
+        事前条件: half_open 状態
+        事後条件: 試行が失敗すると再び open になり、待機時間が延長される
+        """
+        # Arrange
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                await breaker.call(failing)
+        clock.now += 30.0
+
+        # Act
+        with pytest.raises(RuntimeError):
+            await breaker.call(failing)
+
+        # Assert
+        assert breaker.state == "open"
+        clock.now += 29.0
+        with pytest.raises(CircuitOpenError):
+            await breaker.call(succeeding)
+
+    async def test_call_timeout_counts_as_failure_contract(self) -> None:
+        """
+        事前条件: 期限より遅い関数
+        事後条件: TimeoutError で打ち切られ、失敗として数えられる
+        """
+        # Arrange
+        breaker = CircuitBreaker("memory", failure_threshold=1, call_timeout=0.05)
+
+        # Act
+        started = time.monotonic()
+        with pytest.raises(TimeoutError):
+            await breaker.call(time.sleep, 0.5)
+        elapsed = time.monotonic() - started
+
+        # Assert
+        assert elapsed < 0.4
+        assert breaker.state == "open"
+        assert breaker.stats.timeouts == 1
+
+    async def test_per_call_timeout_overrides_default_contract(self) -> None:
+        """
+        不変条件: 呼び出し単位の期限は既定の期限より優先される
+        """
+        breaker = CircuitBreaker("memory", call_timeout=10.0)
+
+        with pytest.raises(TimeoutError):
+            await breaker.call(time.sleep, 0.5, timeout=0.05)
+
+    def test_invalid_settings_contract(self) -> None:
+        """
+        事前条件: 不正な設定値
+        事後条件: ValueError が発生する
+        """
+        with pytest.raises(ValueError):
+            CircuitBreaker("memory", failure_threshold=0)
+        with pytest.raises(ValueError):
+            CircuitBreaker("memory", call_timeout=0)
+
+
+class TestCircuitBreakerRegistry:
+    """CircuitBreakerRegistry の契約検証"""
+
+    def test_get_returns_shared_breaker_contract(self) -> None:
+        """
+        事後条件: 同じ依存先には同じブレーカーを返し、個別設定が反映される
+        """
+        # Arrange
+        registry = CircuitBreakerRegistry(
+            default_failure_threshold=5,
+            overrides={"memory": {"failure_threshold": 2, "call_timeout": 1.5}},
+        )
+
+        # Act
+        memory = registry.get("memory")
+        teams = registry.get("teams")
+
+        # Assert
+        assert registry.get("memory") is memory
+        assert memory.failure_threshold == 2
+        assert memory.call_timeout == 1.5
+        assert teams.failure_threshold == 5
+
+    async def test_snapshot_contract(self) -> None:
+        """
+        事後条件: 依存先ごとの状態と統計が取得できる
+        """
+        # Arrange
+        registry = CircuitBreakerRegistry(default_failure_threshold=1)
+        with pytest.raises(RuntimeError):
+            await registry.get("memory").call(failing)
+
+        # Act
+        snapshot = registry.snapshot()
+
+        # Assert
+        assert snapshot["memory"]["state"] == "open"
+        assert snapshot["memory"]["failures"] == 1
+        assert snapshot["memory"]["calls"] == 1
+
+    def test_from_env_contract(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """
+        事後条件: 環境変数の既定値と依存先ごとの設定が反映される
+        不変条件: 不正な JSON は無視して既定値で継続する
+        """
+        # Arrange
+        monkeypatch.setenv("CIRCUIT_BREAKER_FAILURE_THRESHOLD", "4")
+        monkeypatch.setenv("CIRCUIT_BREAKER_CALL_TIMEOUT_SECONDS", "2.5")
+        monkeypatch.setenv("CIRCUIT_BREAKERS", '{"memory": {"reset_timeout": 10}}')
+
+        # Act
+        registry = CircuitBreakerRegistry.from_env()
+
+        # Assert
+        memory = registry.get("memory")
+        assert memory.failure_threshold == 4
+        assert memory.call_timeout == 2.5
+        assert memory.reset_timeout == 10.0
+
+        monkeypatch.setenv("CIRCUIT_BREAKERS", "not-json")
+        assert CircuitBreakerRegistry.from_env().get("memory").failure_threshold == 4
+
+    @pytest.mark.parametrize(
+        ("env_name", "value"),
+        [
+            ("CIRCUIT_BREAKER_FAILURE_THRESHOLD", "three"),
+            ("CIRCUIT_BREAKER_FAILURE_THRESHOLD", "0"),
+            ("CIRCUIT_BREAKER_RESET_SECONDS", "1m"),
+            ("CIRCUIT_BREAKER_CALL_TIMEOUT_SECONDS", "-5"),
+        ],
+    )
+    def test_from_env_invalid_defaults_contract(
+        self, monkeypatch: pytest.MonkeyPatch, env_name: str, value: str
+    ) -> None:
+        """
+        事前条件: 既定値の環境変数が数値でない、または正の値でない
+        事後条件: 例外を送出せず、その設定のみ組み込みの既定値で生成される
+        """
+        monkeypatch.setenv(env_name, value)
+
+        breaker = CircuitBreakerRegistry.from_env().get("memory")
+
+        assert breaker.failure_threshold == DEFAULT_FAILURE_THRESHOLD
+        assert breaker.reset_timeout == DEFAULT_RESET_TIMEOUT
+        assert breaker.call_timeout == DEFAULT_CALL_TIMEOUT
+
+    @pytest.mark.parametrize(
+        "overrides",
+        [
+            "[1, 2]",
+            '{"memory": 5}',
+            '{"memory": {"call_timeout": -1}}',
+            '{"memory": {"failure_threshold": "many"}}',
+            '{"memory": {"reset_timeout": null}}',
+        ],
+    )
+    def test_from_env_invalid_overrides_contract(
+        self, monkeypatch: pytest.MonkeyPatch, overrides: str
+    ) -> None:
+        """
+        事前条件: CIRCUIT_BREAKERS が JSON オブジェクトでない、または依存先の設定が不正
+        事後条件: 読み込み時に検証され、get() は例外を送出せず既定値のブレーカーを返す
+        """
+        monkeypatch.setenv("CIRCUIT_BREAKERS", overrides)
+
+        breaker = CircuitBreakerRegistry.from_env().get("memory")
+
+        assert breaker.failure_threshold == DEFAULT_FAILURE_THRESHOLD
+        assert breaker.reset_timeout == DEFAULT_RESET_TIMEOUT
+        assert breaker.call_timeout == DEFAULT_CALL_TIMEOUT
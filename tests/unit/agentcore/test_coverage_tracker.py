@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+カバレッジトラッカーのテスト
+
+契約による設計（Design by Contract）に基づく単体テスト
+"""
+
+import json
+from datetime import date
+from pathlib import Path
+from typing import Any
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.agentcore.coverage_tracker import (
+    CoverageTracker,
+    LocalCoverageStore,
+    MemoryCoverageStore,
+    task_bit,
+)
+
+TODAY = date(2026, 10, 19)
+
+
+class FakeMemoryClient:
+    """create_event / list_events をメモリ上で再現する MemoryClient のスタブ"""
+
+    def __init__(self) -> None:
+        self.events: dict[str, list[dict[str, Any]]] = {}
+
+    def create_event(self, **kwargs: Any) -> dict[str, Any]:
+        text, role = kwargs["messages"][0]
+        event = {
+            "payload": [{"conversational": {"content": {"text": text}, "role": role}}]
+        }
+        self.events.setdefault(kwargs["session_id"], []).append(event)
+        return event
+
+    def list_events(self, **kwargs: Any) -> list[dict[str, Any]]:
+        # 実際の MemoryClient と同様に時系列順（古い順）で返す
+        return list(self.events.get(kwargs["session_id"], []))[: kwargs["max_results"]]
+
+
+class TestTaskBit:
+    """task_bit の契約検証"""
+
+    def test_task_bits_are_unique_per_domain_slot_contract(self) -> None:
+        """
+        事前条件: 分野・タスク番号の異なるタスクID
+        事後条件: ビット位置は重複しない
+        """
+        assert task_bit("T1.1") == 0
+        assert task_bit("T1.5") == 4
+        assert task_bit("T2.1") == 16
+
+        with pytest.raises(ValueError):
+            task_bit("D1")
+
+
+class TestCoverageTracker:
+    """CoverageTracker の契約検証"""
+
+    def test_uncovered_queries_contract(self, tmp_path: Path) -> None:
+        """
+        事前条件: 一部のタスク・サービスを記録済み
+        事後条件: 未出題のタスク・サービスのみが返される
+        """
+        # Arrange
+        tracker = CoverageTracker(LocalCoverageStore(tmp_path / "coverage.json"))
+
+        # Act
+        tracker.record("AWS-SAP", ["T1.1", "T2.3"], [0, 5], today=TODAY)
+
+        # Assert
+        assert tracker.uncovered_tasks(
+            "AWS-SAP", ["T1.1", "T1.2", "T2.3"], today=TODAY
+        ) == ["T1.2"]
+        assert tracker.uncovered_services("AWS-SAP", range(7), today=TODAY) == [
+            1,
+            2,
+            3,
+            4,
+            6,
+        ]
+        assert tracker.uncovered_tasks("AWS-DVA", ["T1.1"], today=TODAY) == ["T1.1"]
+
+    def test_window_expires_old_days_contract(self, tmp_path: Path) -> None:
+        """
+        事前条件: 保持期間より前の日に記録したタスクがある
+        事後条件: 期間外のタスクは未出題に戻り、保存データからも破棄される
+        """
+        store = LocalCoverageStore(tmp_path / "coverage.json")
+        tracker = CoverageTracker(store, window_days=7)
+        tracker.record("AWS-SAP", ["T1.1"], [], today=date(2026, 10, 1))
+        tracker.record("AWS-SAP", ["T1.2"], [], today=TODAY)
+
+        assert tracker.uncovered_tasks("AWS-SAP", ["T1.1", "T1.2"], today=TODAY) == [
+            "T1.1"
+        ]
+        assert list(store.load("AWS-SAP")) == [TODAY.isoformat()]
+
+    def test_persists_compact_summary_contract(self, tmp_path: Path) -> None:
+        """
+        事前条件: JSON ファイルに記録する
+        事後条件: 日別のビットセットが16進文字列で保存され、新しいインスタンスで復元できる
+        """
+        path = tmp_path / "nested" / "coverage.json"
+        CoverageTracker(LocalCoverageStore(path)).record(
+            "AWS-SAP", ["T1.1", "T2.1"], [3], today=TODAY
+        )
+
+        assert json.loads(path.read_text()) == {
+            "AWS-SAP": {TODAY.isoformat(): ["10001", "8"]}
+        }
+        reopened = CoverageTracker(LocalCoverageStore(path))
+        assert reopened.covered("AWS-SAP", today=TODAY) == (0x10001, 0x8)
+
+    @patch("app.agentcore.coverage_tracker.MemoryClient")
+    def test_memory_store_keeps_latest_summary_contract(
+        self, mock_memory_client_class: MagicMock
+    ) -> None:
+        """
+        事前条件: Memory に要約イベントを複数回書き込む
+        事後条件: 最新の要約が現在の状態として読み出される
+        不変条件: 要約は学習分野履歴とは別のセッションに書き込まれる
+        """
+        fake = FakeMemoryClient()
+        mock_memory_client_class.return_value = fake
+        store = MemoryCoverageStore(memory_id="test-memory-id")
+        tracker = CoverageTracker(store)
+
+        tracker.record("AWS-SAP", ["T1.1"], [1], today=TODAY)
+        tracker.record("AWS-SAP", ["T1.2"], [2], today=TODAY)
+
+        assert store.load("AWS-SAP") == {TODAY.isoformat(): (0b11, 0b110)}
+        assert list(fake.events) == ["coverage-AWS-SAP"]
+        assert len(fake.events["coverage-AWS-SAP"]) == 2
+
+        # 返却順に依存せず saved_at の最も新しい要約を採用する
+        fake.events["coverage-AWS-SAP"].reverse()
+        assert store.load("AWS-SAP") == {TODAY.isoformat(): (0b11, 0b110)}
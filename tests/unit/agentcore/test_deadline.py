@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+deadline のテスト
+
+契約による設計（Design by Contract）に基づく単体テスト
+"""
+
+import pytest
+
+from app.agentcore.deadline import (
+    DEFAULT_INVOCATION_DEADLINE_SECONDS,
+    DEFAULT_PHASE_SHARES,
+    Deadline,
+    DeadlineExceededError,
+    current_deadline,
+    deadline_scope,
+    phase_timeout,
+)
+
+
+class FakeClock:
+    """テスト用の手動時計"""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestDeadline:
+    """Deadline の契約検証"""
+
+    def test_phase_budgets_contract(self) -> None:
+        """
+        事前条件: 期限100秒、既定の配分
+        事後条件: 各フェーズの予算は「期限 × 配分」以内で、Teams の配分を残す
+        """
+        # Arrange
+        clock = FakeClock()
+        deadline = Deadline(100.0, clock=clock)
+
+        # Assert
+        assert deadline.budget("memory") == pytest.approx(5.0)
+        assert deadline.budget("bedrock") == pytest.approx(80.0)
+        assert deadline.budget("teams") == pytest.approx(15.0)
+
+    def test_budget_shrinks_with_elapsed_time_contract(self) -> None:
+        """
+        事前条件: 期限の大半を経過している
+        事後条件: Bedrock の予算は Teams の配分を残した残り時間に切り詰められる
+        不変条件: Teams の予算は残り時間の範囲内で確保される
+        """
+        # Arrange
+        clock = FakeClock()
+        deadline = Deadline(100.0, clock=clock)
+
+        # Act
+        clock.now = 75.0
+
+        # Assert
+        assert deadline.budget("bedrock") == pytest.approx(10.0)
+        assert deadline.budget("teams") == pytest.approx(15.0)
+
+        clock.now = 90.0
+        assert deadline.budget("bedrock") == 0.0
+        assert deadline.budget("teams") == pytest.approx(10.0)
+
+    def test_check_records_exceeded_phase_contract(self) -> None:
+        """
+        事前条件: Bedrock の予算を使い切っている
+        事後条件: DeadlineExceededError が送出され、超過したフェーズが記録される
+        """
+        # Arrange
+        clock = FakeClock()
+        deadline = Deadline(100.0, clock=clock)
+        clock.now = 90.0
+
+        # Act & Assert
+        with pytest.raises(DeadlineExceededError) as exc_info:
+            deadline.check("bedrock")
+        assert exc_info.value.phase == "bedrock"
+        assert isinstance(exc_info.value, TimeoutError)
+        assert deadline.was_exceeded
+        assert deadline.to_dict()["exceeded_phases"] == ["bedrock"]
+
+    def test_from_config_contract(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """
+        事前条件: 環境変数に期限と配分が設定されている
+        事後条件: ペイロードの指定値が環境変数より優先される
+        不変条件: 不正な JSON は無視して既定の配分で継続する
+        """
+        # Arrange
+        monkeypatch.setenv("INVOCATION_DEADLINE_SECONDS", "60")
+        monkeypatch.setenv("INVOCATION_PHASE_SHARES", '{"teams": 0.25}')
+
+        # Act
+        from_env = Deadline.from_config()
+        from_payload = Deadline.from_config(30.0)
+
+        # Assert
+        assert from_env.seconds == 60.0
+        assert from_env.shares["teams"] == 0.25
+        assert from_env.shares["bedrock"] == 0.80
+        assert from_payload.seconds == 30.0
+
+        monkeypatch.setenv("INVOCATION_PHASE_SHARES", "not-json")
+        assert Deadline.from_config().shares["teams"] == 0.15
+
+    @pytest.mark.parametrize(
+        ("seconds", "shares"),
+        [
+            ("abc", "[0.5]"),
+            ("0", '{"teams": "many"}'),
+            ("-10", '{"teams": 2}'),
+            ("nan", '{"teams": {"share": 0.2}}'),
+        ],
+    )
+    def test_from_config_invalid_env_falls_back_contract(
+        self, monkeypatch: pytest.MonkeyPatch, seconds: str, shares: str
+    ) -> None:
+        """
+        事前条件: 環境変数の期限・配分が不正な値
+        事後条件: 例外を送出せず、既定の期限・配分で生成される
+        """
+        # Arrange
+        monkeypatch.setenv("INVOCATION_DEADLINE_SECONDS", seconds)
+        monkeypatch.setenv("INVOCATION_PHASE_SHARES", shares)
+
+        # Act
+        deadline = Deadline.from_config()
+
+        # Assert
+        assert deadline.seconds == DEFAULT_INVOCATION_DEADLINE_SECONDS
+        assert deadline.shares == DEFAULT_PHASE_SHARES
+
+    def test_invalid_seconds_contract(self) -> None:
+        """
+        事前条件: 期限が正の値でない
+        事後条件: ValueError が発生する
+        """
+        with pytest.raises(ValueError):
+            Deadline(0)
+
+
+class TestDeadlineScope:
+    """期限の伝播の契約検証"""
+
+    def test_phase_timeout_without_deadline_contract(self) -> None:
+        """
+        事前条件: 期限が設定されていない
+        事後条件: 既定値をそのまま返す
+        """
+        assert current_deadline() is None
+        assert phase_timeout("memory", default=5.0) == 5.0
+        assert phase_timeout("bedrock") is None
+
+    def test_phase_timeout_within_scope_contract(self) -> None:
+        """
+        事前条件: 期限のスコープ内
+        事後条件: 既定値とフェーズの予算の小さい方を返し、スコープを抜けると解除される
+        """
+        # Arrange
+        clock = FakeClock()
+        deadline = Deadline(100.0, clock=clock)
+
+        # Act & Assert
+        with deadline_scope(deadline):
+            assert current_deadline() is deadline
+            assert phase_timeout("memory", default=10.0) == pytest.approx(5.0)
+            assert phase_timeout("memory", default=2.0) == 2.0
+            clock.now = 100.0
+            with pytest.raises(DeadlineExceededError):
+                phase_timeout("memory", default=2.0)
+        assert current_deadline() is None
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+DeliveryQueue のテスト
+
+契約による設計（Design by Contract）に基づく単体テスト
+"""
+
+import asyncio
+import threading
+from typing import Any
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.agentcore.delivery_queue import (
+    DeliveryQueue,
+    DeliveryQueueFullError,
+    DeliveryTicket,
+)
+
+
+class TestDeliveryQueue:
+    """DeliveryQueue の契約検証"""
+
+    async def test_submit_returns_ticket_before_delivery_contract(self) -> None:
+        """
+        事前条件: 送信関数が完了までに時間を要する
+        事後条件: submit は配信完了を待たずに queued 状態のチケットを返す
+        不変条件: drain 後にはチケットが delivered になる
+        """
+        # Arrange - 事前条件設定
+        release = asyncio.Event()
+        delivered: list[Any] = []
+
+        async def slow_send(agent_output: Any) -> None:
+            await release.wait()
+            delivered.append(agent_output)
+
+        queue = DeliveryQueue(send=slow_send)
+
+        # Act
+        ticket = await queue.submit("output-1")
+
+        # Assert - 事後条件検証: 配信完了前にチケットが返る
+        assert isinstance(ticket, DeliveryTicket)
+        assert ticket.status in ("queued", "sending")
+        assert delivered == []
+
+        # 不変条件検証: 排出後は配信済み
+        release.set()
+        assert await queue.drain(timeout=1.0) is True
+        assert delivered == ["output-1"]
+        assert queue.get_ticket(ticket.ticket_id) is ticket
+        assert ticket.status == "delivered"
+        assert ticket.completed_at is not None
+
+        await queue.shutdown(timeout=1.0)
+
+    async def test_send_failure_marks_ticket_failed_contract(self) -> None:
+        """
+        事前条件: 送信関数が例外を発生させる
+        事後条件: チケットが failed になりエラー内容が記録される
+        不変条件: 後続の配信はワーカーにより継続して処理される
+        """
+        # Arrange - 事前条件設定
+        delivered: list[Any] = []
+
+        async def flaky_send(agent_output: Any) -> None:
+            if agent_output == "bad":
+                raise RuntimeError("webhook down")
+            delivered.append(agent_output)
+
+        queue = DeliveryQueue(send=flaky_send)
+
+        # Act
+        bad_ticket = await queue.submit("bad")
+        good_ticket = await queue.submit("good")
+        await queue.drain(timeout=1.0)
+
+        # Assert - 事後条件検証
+        assert bad_ticket.status == "failed"
+        assert bad_ticket.error == "webhook down"
+
+        # 不変条件検証: ワーカーは停止しない
+        assert good_ticket.status == "delivered"
+        assert delivered == ["good"]
+
+        await queue.shutdown(timeout=1.0)
+
+    async def test_backpressure_when_queue_full_precondition(self) -> None:
+        """
+        事前条件: キューが上限まで埋まり、ワーカーが処理を進められない
+        事後条件: enqueue_timeout 経過後に DeliveryQueueFullError が発生する
+        不変条件: キュー長は max_size を超えない
+        """
+        # Arrange - 事前条件設定
+        release = asyncio.Event()
+
+        async def blocked_send(agent_output: Any) -> None:
+            await release.wait()
+
+        queue = DeliveryQueue(send=blocked_send, max_size=1, enqueue_timeout=0.05)
+        await queue.submit("in-flight")  # ワーカーが取り出して送信中
+        await asyncio.sleep(0)
+        await queue.submit("queued")  # キューを埋める
+
+        # Act & Assert - 事後条件検証
+        with pytest.raises(DeliveryQueueFullError):
+            await queue.submit("overflow")
+
+        # 不変条件検証
+        assert queue.pending <= queue.max_size
+
+        release.set()
+        await queue.shutdown(timeout=1.0)
+
+    async def test_shutdown_drains_and_rejects_new_submissions_contract(
+        self,
+    ) -> None:
+        """
+        事前条件: 未配信の項目がキューに残っている
+        事後条件: shutdown は残りを配信してから完了し、以降の投入は拒否される
+        不変条件: 投入済みの配信は失われない
+        """
+        # Arrange - 事前条件設定
+        delivered: list[Any] = []
+
+        async def send(agent_output: Any) -> None:
+            await asyncio.sleep(0.01)
+            delivered.append(agent_output)
+
+        queue = DeliveryQueue(send=send)
+        for i in range(3):
+            await queue.submit(f"output-{i}")
+
+        # Act
+        drained = await queue.shutdown(timeout=1.0)
+
+        # Assert - 事後条件検証
+        assert drained is True
+        with pytest.raises(DeliveryQueueFullError):
+            await queue.submit("after-shutdown")
+
+        # 不変条件検証
+        assert delivered == ["output-0", "output-1", "output-2"]
+        assert queue.pending == 0
+
+    async def test_send_runs_in_submitter_context_contract(self) -> None:
+        """
+        事前条件: 異なる contextvars の値で2件を投入（ワーカーは1件目の投入時に起動）
+        事後条件: 各配信は投入元のコンテキスト（トレースのスパン等）で送信される
+        """
+        # Arrange
+        import contextvars
+
+        request_id: contextvars.ContextVar[str] = contextvars.ContextVar("request_id")
+        seen: list[str] = []
+
+        async def send(agent_output: Any) -> None:
+            seen.append(request_id.get())
+
+        queue = DeliveryQueue(send=send)
+
+        # Act
+        request_id.set("first")
+        await queue.submit("output-1")
+        request_id.set("second")
+        await queue.submit("output-2")
+        await queue.drain(timeout=1.0)
+
+        # Assert
+        assert seen == ["first", "second"]
+
+        await queue.shutdown(timeout=1.0)
+
+    async def test_delivery_is_registered_as_async_task_contract(self) -> None:
+        """
+        事前条件: 非同期タスクの登録先（AgentCore アプリ）が設定されている
+        事後条件: 投入時に配信ごとのタスクが登録され、配信完了時に解除される
+        不変条件: 送信が失敗しても登録は解除される
+        """
+        # Arrange
+        tracker = MagicMock()
+        tracker.add_async_task.side_effect = [1, 2]
+
+        async def send(agent_output: Any) -> None:
+            if agent_output == "bad":
+                raise RuntimeError("webhook down")
+
+        queue = DeliveryQueue(send=send, task_tracker=tracker)
+
+        # Act
+        good = await queue.submit("good")
+        await queue.submit("bad")
+        await queue.drain(timeout=1.0)
+
+        # Assert
+        tracker.add_async_task.assert_any_call(
+            "teams_delivery", {"ticket_id": good.ticket_id}
+        )
+        assert tracker.add_async_task.call_count == 2
+        assert sorted(
+            c.args[0] for c in tracker.complete_async_task.call_args_list
+        ) == [
+            1,
+            2,
+        ]
+
+        await queue.shutdown(timeout=1.0)
+
+    async def test_submit_from_another_loop_keeps_pending_items_contract(
+        self,
+    ) -> None:
+        """
+        事前条件: キューが別スレッドで稼働中のイベントループ上で起動済み
+        事後条件: 別のループからの投入は稼働中のキューに入り、未配信の項目は失われない
+        不変条件: 配信は投入順に行われる
+        """
+        # Arrange - 別スレッドのループでキューを起動し、1件目の送信を止めておく
+        release = threading.Event()
+        delivered: list[Any] = []
+
+        async def send(agent_output: Any) -> None:
+            await asyncio.to_thread(release.wait, 1.0)
+            delivered.append(agent_output)
+
+        queue = DeliveryQueue(send=send)
+        other = asyncio.new_event_loop()
+        thread = threading.Thread(target=other.run_forever, daemon=True)
+        thread.start()
+        try:
+            asyncio.run_coroutine_threadsafe(queue.submit("first"), other).result(1.0)
+            asyncio.run_coroutine_threadsafe(queue.submit("second"), other).result(1.0)
+
+            # Act - テストのループから投入
+            ticket = await queue.submit("third")
+
+            # Assert
+            assert ticket.status == "queued"
+            release.set()
+            assert await queue.shutdown(timeout=1.0) is True
+            assert delivered == ["first", "second", "third"]
+        finally:
+            other.call_soon_threadsafe(other.stop)
+            thread.join(1.0)
+            other.close()
+
+    async def test_pending_items_migrate_from_stopped_loop_contract(self) -> None:
+        """
+        事前条件: キューを起動したイベントループが未配信の項目を残して停止した
+        事後条件: 次の投入時に新しいループで起動し直し、未配信の項目も配信される
+        不変条件: 停止したループで送信中だった配信は failed として記録され、タスク登録も解除される
+        """
+        # Arrange - 別のループで投入し、1件目の送信中にループを停止する
+        tracker = MagicMock()
+        tracker.add_async_task.side_effect = [1, 2, 3]
+        started = threading.Event()
+        delivered: list[Any] = []
+
+        async def send(agent_output: Any) -> None:
+            if agent_output == "stuck":
+                started.set()
+                await asyncio.Event().wait()
+            delivered.append(agent_output)
+
+        queue = DeliveryQueue(send=send, task_tracker=tracker)
+        other = asyncio.new_event_loop()
+        thread = threading.Thread(target=other.run_forever, daemon=True)
+        thread.start()
+        stuck = asyncio.run_coroutine_threadsafe(queue.submit("stuck"), other).result(
+            1.0
+        )
+        asyncio.run_coroutine_threadsafe(queue.submit("pending"), other).result(1.0)
+        assert started.wait(1.0)
+        other.call_soon_threadsafe(other.stop)
+        thread.join(1.0)
+
+        # Act - テストのループから投入
+        await queue.submit("new")
+        drained = await queue.drain(timeout=1.0)
+
+        # Assert
+        assert drained is True
+        assert delivered == ["pending", "new"]
+        assert stuck.status == "failed"
+        assert tracker.complete_async_task.call_count == 3
+
+        await queue.shutdown(timeout=1.0)
+        other.close()
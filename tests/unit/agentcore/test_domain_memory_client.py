@@ -5,12 +5,19 @@ DomainMemoryClient のテスト
 契約による設計（Design by Contract）に基づく単体テスト
 """
 
-from datetime import datetime
-from unittest.mock import patch
+from datetime import UTC, datetime, timedelta
+from typing import Any
+from unittest.mock import MagicMock, patch
 
 import pytest
 
-from app.agentcore.domain_memory_client import DEFAULT_MAX_RESULTS, DomainMemoryClient
+from app.agentcore.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.agentcore.domain_memory_client import (
+    DEFAULT_MAX_RESULTS,
+    HISTORY_WINDOW_DAYS,
+    SUMMARY_VERSION,
+    DomainMemoryClient,
+)
 
 
 class TestDomainMemoryClient:
@@ -18,8 +25,12 @@ class TestDomainMemoryClient:
 
     @pytest.fixture
     def memory_client(self) -> DomainMemoryClient:
-        """テスト用のDomainMemoryClientインスタンス"""
-        return DomainMemoryClient(memory_id="test-memory-id", region_name="us-east-1")
+        """テスト用のDomainMemoryClientインスタンス（テストごとに独立したブレーカー）"""
+        return DomainMemoryClient(
+            memory_id="test-memory-id",
+            region_name="us-east-1",
+            breaker=CircuitBreaker("memory"),
+        )
 
     async def test_create_event_contract(
         self, memory_client: DomainMemoryClient
@@ -249,3 +260,304 @@ class TestDomainMemoryClient:
 
         # Assert - 事後条件検証: create_eventが呼び出された
         mock_create_event.assert_called_once()
+
+    async def test_memory_spans_contract(
+        self, memory_client: DomainMemoryClient, span_exporter: Any
+    ) -> None:
+        """
+        事前条件: インメモリエクスポーターを設定、Memory の読み込みは失敗・書き込みは成功
+        事後条件: 読み込みのスパンは履歴キャッシュへのフォールバックとエラーを記録し、
+                 書き込みのスパンは学習分野を記録する
+        """
+        # Arrange
+        from opentelemetry.trace import StatusCode
+
+        # Act
+        with (
+            patch.object(memory_client, "create_event"),
+            patch.object(memory_client, "list_events") as mock_list_events,
+        ):
+            mock_list_events.side_effect = Exception("Memory API Error")
+            await memory_client.record_domain_usage("コンピューティング", "AWS-SAP")
+            await memory_client.get_recent_domains("AWS-SAP")
+
+        # Assert
+        write, read = span_exporter.get_finished_spans()
+        assert write.name == "memory.record_domain_usage"
+        assert write.attributes["learning_domain"] == "コンピューティング"
+        assert write.status.status_code == StatusCode.UNSET
+        assert read.name == "memory.get_recent_domains"
+        assert read.attributes["exam_type"] == "AWS-SAP"
+        assert read.attributes["memory.fallback"] is True
+        assert read.attributes["memory.domain_count"] == 1
+        assert read.status.status_code == StatusCode.ERROR
+
+
+class FakeMemoryClient:
+    """セッションごとのイベントを保持する MemoryClient の代替（時系列順に返す）"""
+
+    def __init__(self) -> None:
+        self.sessions: dict[str, list[dict[str, Any]]] = {}
+        self.deleted: list[str] = []
+        self.fail_delete: set[str] = set()
+        # delete_event はデータプレーンの boto クライアント（gmdp_client）で呼ばれる
+        self.gmdp_client = self
+
+    def add(self, session_id: str, text: str, timestamp: datetime) -> str:
+        events = self.sessions.setdefault(session_id, [])
+        event_id = f"{session_id}-{len(events)}"
+        events.append(
+            {
+                "eventId": event_id,
+                "eventTimestamp": timestamp,
+                "payload": [
+                    {"conversational": {"content": {"text": text}, "role": "USER"}}
+                ],
+            }
+        )
+        return event_id
+
+    def create_event(self, **kwargs: Any) -> dict[str, Any]:
+        text, _ = kwargs["messages"][0]
+        return {
+            "eventId": self.add(kwargs["session_id"], text, kwargs["event_timestamp"])
+        }
+
+    def list_events(self, **kwargs: Any) -> list[dict[str, Any]]:
+        # 実際の MemoryClient と同様に時系列順（古い順）で、先頭から max_results 件を返す
+        events = self.sessions.get(kwargs["session_id"], [])
+        ordered = sorted(events, key=lambda event: event["eventTimestamp"])
+        return ordered[: kwargs["max_results"]]
+
+    def delete_event(self, **kwargs: Any) -> None:
+        if kwargs["eventId"] in self.fail_delete:
+            raise Exception("Delete failed")
+        self.sessions[kwargs["sessionId"]] = [
+            event
+            for event in self.sessions[kwargs["sessionId"]]
+            if event["eventId"] != kwargs["eventId"]
+        ]
+        self.deleted.append(kwargs["eventId"])
+
+
+class TestHistoryCompaction:
+    """学習分野履歴の圧縮の契約検証"""
+
+    NOW = datetime(2026, 10, 19, 12, 0, tzinfo=UTC)
+
+    @pytest.fixture
+    def fake(self) -> FakeMemoryClient:
+        return FakeMemoryClient()
+
+    @pytest.fixture
+    def memory_client(self, fake: FakeMemoryClient) -> DomainMemoryClient:
+        client = DomainMemoryClient(
+            memory_id="test-memory-id",
+            region_name="us-east-1",
+            breaker=CircuitBreaker("memory"),
+        )
+        client.client = fake  # type: ignore[assignment]
+        return client
+
+    async def test_compact_history_folds_events_into_summary(
+        self, memory_client: DomainMemoryClient, fake: FakeMemoryClient
+    ) -> None:
+        """
+        事前条件: 学習分野の生イベントが複数ある
+        事後条件: 件数と最終使用日を持つ要約イベントが書き込まれ、生イベントは削除される
+        """
+        # Arrange
+        fake.add("AWS-SAP", "D1", self.NOW - timedelta(days=3))
+        fake.add("AWS-SAP", "D2", self.NOW - timedelta(days=2))
+        fake.add("AWS-SAP", "D1", self.NOW - timedelta(days=1))
+
+        # Act
+        result = await memory_client.compact_history("AWS-SAP", now=self.NOW)
+
+        # Assert
+        summary = result["summary"]
+        assert result["folded"] == 3
+        assert result["deleted"] == 3
+        assert summary["version"] == SUMMARY_VERSION
+        assert summary["counts"] == {"D1": 2, "D2": 1}
+        assert summary["last_seen"] == {"D1": "2026-10-18", "D2": "2026-10-17"}
+        assert summary["event_count"] == 3
+        assert fake.sessions["AWS-SAP"] == []
+        assert await memory_client.get_history_summary("AWS-SAP") == summary
+
+    async def test_compact_history_is_incremental(
+        self, memory_client: DomainMemoryClient, fake: FakeMemoryClient
+    ) -> None:
+        """
+        事前条件: 要約の作成後に新しい生イベントが記録されている
+        事後条件: 新しいイベントのみが既存の要約に加算される
+        """
+        # Arrange
+        fake.add("AWS-SAP", "D1", self.NOW - timedelta(days=3))
+        await memory_client.compact_history("AWS-SAP", now=self.NOW)
+        fake.add("AWS-SAP", "D3", self.NOW - timedelta(hours=1))
+
+        # Act
+        result = await memory_client.compact_history(
+            "AWS-SAP", now=self.NOW + timedelta(days=1)
+        )
+
+        # Assert
+        assert result["folded"] == 1
+        assert result["summary"]["counts"] == {"D1": 1, "D3": 1}
+        assert result["summary"]["event_count"] == 2
+        # 時系列順で返される古い要約ではなく、watermark の新しい要約が採用される
+        assert await memory_client.get_history_summary("AWS-SAP") == result["summary"]
+
+    async def test_compact_history_raises_on_summary_read_error(
+        self, memory_client: DomainMemoryClient, fake: FakeMemoryClient
+    ) -> None:
+        """
+        不変条件: 要約の取得失敗は「要約なし」として扱わず、圧縮を中止する（生イベントは削除しない）
+        """
+        # Arrange
+        fake.add("AWS-SAP", "D1", self.NOW - timedelta(days=3))
+        await memory_client.compact_history("AWS-SAP", now=self.NOW)
+        fake.add("AWS-SAP", "D2", self.NOW - timedelta(hours=1))
+        list_events = fake.list_events
+
+        def failing_summary(**kwargs: Any) -> list[dict[str, Any]]:
+            if kwargs["session_id"].startswith("summary-"):
+                raise Exception("Memory API Error")
+            return list_events(**kwargs)
+
+        fake.list_events = failing_summary  # type: ignore[method-assign]
+
+        # Act & Assert
+        with pytest.raises(Exception, match="Memory API Error"):
+            await memory_client.compact_history(
+                "AWS-SAP", now=self.NOW + timedelta(days=1)
+            )
+        assert len(fake.sessions["AWS-SAP"]) == 1
+        assert len(fake.deleted) == 1  # 初回の圧縮で削除した分のみ
+        assert len(fake.sessions["summary-AWS-SAP"]) == 1
+
+    async def test_compact_history_drops_expired_domains(
+        self, memory_client: DomainMemoryClient, fake: FakeMemoryClient
+    ) -> None:
+        """
+        不変条件: 最終使用日が保持期間を過ぎた分野は要約から除外される
+        """
+        # Arrange
+        fake.add("AWS-SAP", "D4", self.NOW - timedelta(days=HISTORY_WINDOW_DAYS + 5))
+        fake.add("AWS-SAP", "D1", self.NOW - timedelta(days=1))
+
+        # Act
+        result = await memory_client.compact_history("AWS-SAP", now=self.NOW)
+
+        # Assert
+        assert result["summary"]["counts"] == {"D1": 1}
+
+    async def test_failed_deletion_is_not_double_counted(
+        self, memory_client: DomainMemoryClient, fake: FakeMemoryClient
+    ) -> None:
+        """
+        不変条件: 削除に失敗した畳み込み済みイベントは再計上されず、次回の圧縮で削除される
+        """
+        # Arrange
+        event_id = fake.add("AWS-SAP", "D1", self.NOW - timedelta(days=1))
+        fake.fail_delete.add(event_id)
+        first = await memory_client.compact_history("AWS-SAP", now=self.NOW)
+        fake.fail_delete.clear()
+
+        # Act
+        second = await memory_client.compact_history("AWS-SAP", now=self.NOW)
+        recent = await memory_client.get_recent_domains("AWS-SAP")
+
+        # Assert
+        assert first["deleted"] == 0
+        assert second["folded"] == 0
+        assert second["deleted"] == 1
+        assert second["summary"]["counts"] == {"D1": 1}
+        assert recent == ["D1"]
+
+    async def test_get_recent_domains_reads_summary_and_newer_events(
+        self, memory_client: DomainMemoryClient, fake: FakeMemoryClient
+    ) -> None:
+        """
+        事前条件: 要約と、要約以降の生イベントがある
+        事後条件: 生イベントの分野（新しい順）に続けて要約内の分野が重複なしで返される
+        """
+        # Arrange
+        now = datetime.now(UTC)
+        fake.add("AWS-SAP", "D1", now - timedelta(days=3))
+        fake.add("AWS-SAP", "D2", now - timedelta(days=2))
+        await memory_client.compact_history("AWS-SAP", now=now)
+        fake.add("AWS-SAP", "D3", now - timedelta(minutes=5))
+        fake.add("AWS-SAP", "D1", now - timedelta(minutes=1))
+
+        # Act
+        result = await memory_client.get_recent_domains("AWS-SAP")
+
+        # Assert
+        assert result == ["D1", "D3", "D2"]
+
+    async def test_get_recent_domains_without_summary(
+        self, memory_client: DomainMemoryClient, fake: FakeMemoryClient
+    ) -> None:
+        """
+        不変条件: 要約がない場合は従来どおり生イベントのみから取得する
+        """
+        # Arrange
+        fake.add("AWS-SAP", "D2", self.NOW - timedelta(days=1))
+
+        # Act
+        result = await memory_client.get_recent_domains("AWS-SAP")
+
+        # Assert
+        assert result == ["D2"]
+
+
+class TestMemoryCircuitBreaker:
+    """Memory 呼び出しのサーキットブレーカーとフォールバックの契約検証"""
+
+    @pytest.fixture
+    def fake(self) -> FakeMemoryClient:
+        return FakeMemoryClient()
+
+    @pytest.fixture
+    def memory_client(self, fake: FakeMemoryClient) -> DomainMemoryClient:
+        client = DomainMemoryClient(
+            memory_id="test-memory-id",
+            region_name="us-east-1",
+            breaker=CircuitBreaker("memory", failure_threshold=2, reset_timeout=60),
+        )
+        client.client = fake  # type: ignore[assignment]
+        return client
+
+    async def test_open_breaker_skips_memory_and_uses_local_history(
+        self, memory_client: DomainMemoryClient, fake: FakeMemoryClient
+    ) -> None:
+        """
+        事前条件: 学習分野を取得・記録した後に Memory が障害状態になる
+        事後条件: 連続失敗で回路が開き、以降は Memory を呼び出さずに履歴キャッシュを返す
+        不変条件: 障害中に記録した学習分野も履歴キャッシュに反映される
+        """
+        # Arrange - 正常時に取得・記録
+        fake.add("AWS-SAP", "D1", datetime.now(UTC) - timedelta(days=1))
+        assert await memory_client.get_recent_domains("AWS-SAP") == ["D1"]
+
+        failing = MagicMock(side_effect=Exception("Memory API Error"))
+        fake.list_events = failing  # type: ignore[method-assign]
+        fake.create_event = failing  # type: ignore[method-assign]
+
+        # Act
+        await memory_client.record_domain_usage("D2", "AWS-SAP")
+        first = await memory_client.get_recent_domains("AWS-SAP")
+        calls_when_open = failing.call_count
+        second = await memory_client.get_recent_domains("AWS-SAP")
+
+        # Assert
+        assert memory_client.breaker.state == "open"
+        assert failing.call_count == calls_when_open  # 回路が開いた後は呼び出さない
+        assert first == ["D2", "D1"]
+        assert second == ["D2", "D1"]
+        with pytest.raises(CircuitOpenError):
+            await memory_client.list_events(
+                actor_id="cloud-copass-agent", session_id="AWS-SAP"
+            )
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+学習分野ノーマライザーのテスト
+
+契約による設計（Design by Contract）に基づく単体テスト
+"""
+
+import pytest
+
+from app.agentcore.domain_normalizer import DomainNormalizer, get_domain_normalizer
+from app.agentcore.exam_guide_index import load_exam_guide_index
+
+
+class TestDomainNormalizer:
+    """DomainNormalizer の契約検証"""
+
+    @pytest.mark.parametrize(
+        ("text", "compact_id", "method"),
+        [
+            ("複雑な組織に対応するソリューションの設計", "D1", "exact"),
+            ("複雑な組織に対応したソリューション設計", "D1", "fuzzy"),
+            ("新しいソリューションの設計", "D2", "fuzzy"),
+            ("コンテンツ分野 3: 既存ソリューションの継続的改善", "D3", "id"),
+            ("タスク1.4: マルチアカウント AWS 環境を設計する", "D1/T1.4", "id"),
+            ("マルチアカウントAWS環境の設計", "D1/T1.4", "fuzzy"),
+            ("D4", "D4", "id"),
+            ("D2/T2.3", "D2/T2.3", "id"),
+        ],
+    )
+    def test_variants_resolve_to_canonical_ids_contract(
+        self, text: str, compact_id: str, method: str
+    ) -> None:
+        """
+        事前条件: 同じ分野・タスクの表記揺れ、番号付き表記、コンパクトID
+        事後条件: 正規のコンパクトIDに正規化される
+        """
+        normalizer = get_domain_normalizer("AWS-SAP")
+
+        match = normalizer.resolve(text)
+
+        assert match is not None
+        assert match.compact_id == compact_id
+        assert match.method == method
+
+    @pytest.mark.parametrize(
+        "text", ["コンピューティング", "ストレージ", "セキュリティの設計", "D9"]
+    )
+    def test_unrelated_text_is_kept_contract(self, text: str) -> None:
+        """
+        事前条件: 試験ガイドの分野・タスクと対応しないテキスト
+        事後条件: resolve は None、compact_id・domain_name は元のテキストを返す
+        """
+        normalizer = get_domain_normalizer("AWS-SAP")
+
+        assert normalizer.resolve(text) is None
+        assert normalizer.compact_id(text) == text
+        assert normalizer.domain_name(text) == text
+
+    def test_domain_name_from_compact_id_contract(self) -> None:
+        """
+        事前条件: Memory に記録されたコンパクトID
+        事後条件: 分野の正規名に戻せる
+        """
+        normalizer = get_domain_normalizer("AWS-SAP")
+
+        assert normalizer.domain_name("D1/T1.4") == (
+            "複雑な組織に対応するソリューションの設計"
+        )
+
+    def test_results_are_cached_contract(self) -> None:
+        """
+        事前条件: 同じテキストを2回正規化する
+        不変条件: 2回目はキャッシュから同じ結果を返す
+        """
+        normalizer = DomainNormalizer(load_exam_guide_index("AWS-SAP"))
+
+        first = normalizer.resolve("新しいソリューションの設計")
+        second = normalizer.resolve("新しいソリューションの設計")
+
+        assert first is second
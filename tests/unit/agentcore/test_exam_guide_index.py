@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+試験ガイドインデックスのテスト
+
+契約による設計（Design by Contract）に基づく単体テスト
+"""
+
+import pytest
+
+from app.agentcore.exam_guide_index import load_exam_guide_index, parse_exam_guide
+
+GUIDE = """
+### 本試験のコンテンツ分野と重み設定
+
+- **コンテンツ分野 1**: 組織の設計 (採点対象コンテンツの 60%)
+- **コンテンツ分野 2**: 移行の加速 (採点対象コンテンツの 40%)
+
+## コンテンツ分野 1: 組織の設計
+
+### タスク 1.1: ネットワーク接続戦略を設計する
+
+**対象知識:**
+
+- AWS グローバルインフラストラクチャ
+
+## コンテンツ分野 2: 移行の加速
+
+### タスク 2.1: 移行アプローチを決定する
+
+## 付録
+
+### 範囲内の AWS のサービスと機能
+
+#### 分析
+
+- Amazon Athena
+- AWS Glue
+
+### 範囲外の AWS のサービスと機能
+
+#### ゲーム関連テクノロジー
+
+- Amazon GameLift
+
+---
+
+## アンケート
+
+- 範囲外の箇条書き
+"""
+
+
+class TestParseExamGuide:
+    """parse_exam_guide の契約検証"""
+
+    def test_parses_domains_tasks_and_services_contract(self) -> None:
+        """
+        事前条件: 見出し構造を持つ試験ガイド
+        事後条件: 分野・タスク・範囲内/範囲外のサービスが ID 付きで索引化される
+        不変条件: 付録以外の箇条書きはサービスに含めない
+        """
+        # Act
+        index = parse_exam_guide(GUIDE, "TEST")
+
+        # Assert
+        assert index.domain_names == ["組織の設計", "移行の加速"]
+        assert index.domains["D1"].weight_percent == 60
+        assert index.tasks["T2.1"].domain_id == "D2"
+        assert index.tasks["T1.1"].name == "ネットワーク接続戦略を設計する"
+        assert index.in_scope_services == {"分析": ["Amazon Athena", "AWS Glue"]}
+        assert index.out_of_scope_services == {
+            "ゲーム関連テクノロジー": ["Amazon GameLift"]
+        }
+
+    @pytest.mark.parametrize(
+        "name",
+        [
+            "組織の設計",
+            "組織の 設計",
+            "コンテンツ分野 1: 組織の設計",
+            "分野1：組織の設計",
+        ],
+    )
+    def test_find_domain_absorbs_notation_contract(self, name: str) -> None:
+        """
+        事前条件: 空白・接頭辞・全角記号の表記揺れがある分野名
+        事後条件: 同じ分野が返される
+        """
+        index = parse_exam_guide(GUIDE, "TEST")
+
+        domain = index.find_domain(name)
+
+        assert domain is not None and domain.id == "D1"
+        assert index.find_domain("セキュリティの設計") is None
+
+
+class TestLoadExamGuideIndex:
+    """load_exam_guide_index の契約検証"""
+
+    def test_loads_bundled_guide_contract(self) -> None:
+        """
+        事前条件: 同梱の AWS-SAP 試験ガイド
+        事後条件: 4分野・20タスクが索引化され、2回目以降はキャッシュが返される
+        """
+        index = load_exam_guide_index("AWS-SAP")
+
+        assert list(index.domains) == ["D1", "D2", "D3", "D4"]
+        assert len(index.tasks) == 20
+        assert (
+            "Amazon GameLift" in index.out_of_scope_services["ゲーム関連テクノロジー"]
+        )
+        assert load_exam_guide_index("AWS-SAP") is index
+
+    def test_missing_guide_precondition(self) -> None:
+        """
+        事前条件: 存在しない試験タイプ
+        事後条件: FileNotFoundError が発生する
+        """
+        with pytest.raises(FileNotFoundError):
+            load_exam_guide_index("UNKNOWN-EXAM")
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+冪等性ストアのテスト
+
+契約による設計（Design by Contract）に基づく単体テスト
+"""
+
+import json
+import time
+from dataclasses import asdict
+from typing import Any
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.agentcore.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.agentcore.idempotency_store import (
+    IdempotencyRecord,
+    LocalIdempotencyStore,
+    MemoryIdempotencyStore,
+)
+
+
+class FakeMemoryClient:
+    """create_event / list_events をメモリ上で再現する MemoryClient のスタブ"""
+
+    def __init__(self) -> None:
+        self.events: dict[str, list[dict[str, Any]]] = {}
+
+    def create_event(self, **kwargs: Any) -> dict[str, Any]:
+        text, role = kwargs["messages"][0]
+        event = {
+            "payload": [{"conversational": {"content": {"text": text}, "role": role}}]
+        }
+        self.events.setdefault(kwargs["session_id"], []).append(event)
+        return event
+
+    def list_events(self, **kwargs: Any) -> list[dict[str, Any]]:
+        # 実際の MemoryClient と同様に時系列順（古い順）で返す
+        return list(self.events.get(kwargs["session_id"], []))[: kwargs["max_results"]]
+
+
+class TestLocalIdempotencyStore:
+    """LocalIdempotencyStore の契約検証"""
+
+    async def test_begin_complete_replay_contract(self) -> None:
+        """
+        事前条件: 未登録の実行キー
+        事後条件: 初回 begin は None、2回目は実行中、完了後は結果付きの記録を返す
+        不変条件: 同じ実行キーで生成を2回開始できない
+        """
+        # Arrange
+        store = LocalIdempotencyStore()
+
+        # Act & Assert - 初回は実行中として登録
+        assert await store.begin("run-key-1") is None
+
+        # 実行中の再送は実行中の記録を返す
+        in_progress = await store.begin("run-key-1")
+        assert in_progress is not None
+        assert in_progress.status == "in_progress"
+
+        # 完了後の再送は結果を返す
+        await store.complete("run-key-1", {"questions": [{"question": "Q"}]})
+        completed = await store.begin("run-key-1")
+        assert completed is not None
+        assert completed.status == "completed"
+        assert completed.result == {"questions": [{"question": "Q"}]}
+
+    async def test_release_allows_retry_contract(self) -> None:
+        """
+        事前条件: 実行中として登録された実行キー
+        事後条件: release 後の begin は None を返す（再生成できる）
+        """
+        store = LocalIdempotencyStore()
+        await store.begin("run-key-2")
+
+        await store.release("run-key-2")
+
+        assert await store.begin("run-key-2") is None
+
+    async def test_stale_in_progress_expires_contract(self) -> None:
+        """
+        事前条件: 実行中の記録が期限を過ぎている（異常終了した実行）
+        事後条件: begin は None を返し、再試行で再生成できる
+        """
+        store = LocalIdempotencyStore(in_progress_ttl_seconds=0.0)
+        await store.begin("run-key-3")
+
+        assert await store.begin("run-key-3") is None
+
+    async def test_record_limit_contract(self) -> None:
+        """
+        事前条件: 保持上限を超える件数を登録する
+        不変条件: 古い記録から破棄され、保持件数は上限を超えない
+        """
+        store = LocalIdempotencyStore(max_records=2)
+        for i in range(3):
+            await store.begin(f"run-{i}")
+
+        # 最も古い記録は破棄されているため再度開始できる
+        assert await store.begin("run-0") is None
+        assert (await store.begin("run-2")) is not None
+
+
+class TestMemoryIdempotencyStore:
+    """MemoryIdempotencyStore の契約検証"""
+
+    @patch("app.agentcore.idempotency_store.MemoryClient")
+    async def test_records_roundtrip_through_memory_contract(
+        self, mock_memory_client_class: MagicMock
+    ) -> None:
+        """
+        事前条件: Memory が記録をイベントとして保持する
+        事後条件: 最新のイベントが現在の状態として読み出される
+        不変条件: 記録は学習分野履歴とは別のセッションに書き込まれる
+        """
+        # Arrange
+        fake = FakeMemoryClient()
+        mock_memory_client_class.return_value = fake
+        store = MemoryIdempotencyStore(
+            memory_id="test-memory-id", breaker=CircuitBreaker("memory")
+        )
+
+        # Act & Assert - 初回
+        assert await store.begin("run-key-m") is None
+        duplicate = await store.begin("run-key-m")
+        assert isinstance(duplicate, IdempotencyRecord)
+        assert duplicate.status == "in_progress"
+
+        # 完了後
+        await store.complete("run-key-m", {"questions": []})
+        completed = await store.begin("run-key-m")
+        assert completed is not None
+        assert completed.status == "completed"
+        assert completed.result == {"questions": []}
+
+        # 不変条件検証: 専用セッション
+        assert list(fake.events) == ["idempotency-run-key-m"]
+
+    @patch("app.agentcore.idempotency_store.MemoryClient")
+    async def test_release_invalidates_record_contract(
+        self, mock_memory_client_class: MagicMock
+    ) -> None:
+        """
+        事前条件: 実行中の記録がある
+        事後条件: release 後の begin は None を返す
+        """
+        mock_memory_client_class.return_value = FakeMemoryClient()
+        store = MemoryIdempotencyStore(
+            memory_id="test-memory-id", breaker=CircuitBreaker("memory")
+        )
+        await store.begin("run-key-r")
+
+        await store.release("run-key-r")
+
+        assert await store.begin("run-key-r") is None
+
+    @patch("app.agentcore.idempotency_store.MemoryClient")
+    async def test_later_event_wins_on_same_time_contract(
+        self, mock_memory_client_class: MagicMock
+    ) -> None:
+        """
+        事前条件: 同じ時刻の記録が時系列順（古い順）に並んでいる
+        事後条件: 後に追記された記録（破棄済み）が現在の状態として採用される
+        """
+        # Arrange
+        fake = FakeMemoryClient()
+        mock_memory_client_class.return_value = fake
+        store = MemoryIdempotencyStore(
+            memory_id="test-memory-id", breaker=CircuitBreaker("memory")
+        )
+        now = time.time()
+        for status in ("in_progress", "released"):
+            record = IdempotencyRecord(
+                run_key="run-key-t", status=status, created_at=now
+            )
+            fake.create_event(
+                session_id=store.session_id("run-key-t"),
+                messages=[(json.dumps(asdict(record)), "USER")],
+            )
+
+        # Act & Assert
+        assert await store.begin("run-key-t") is None
+
+    @patch("app.agentcore.idempotency_store.MemoryClient")
+    async def test_memory_calls_go_through_circuit_breaker_contract(
+        self, mock_memory_client_class: MagicMock
+    ) -> None:
+        """
+        事前条件: Memory の呼び出しが連続して失敗し、回路が開く
+        事後条件: 回路が開いている間は Memory を呼び出さずに CircuitOpenError を送出する
+        """
+        # Arrange
+        fake = MagicMock()
+        fake.list_events.side_effect = RuntimeError("Memory unavailable")
+        mock_memory_client_class.return_value = fake
+        breaker = CircuitBreaker("memory", failure_threshold=1, reset_timeout=60)
+        store = MemoryIdempotencyStore(memory_id="test-memory-id", breaker=breaker)
+        with pytest.raises(RuntimeError):
+            await store.begin("run-key-b")
+
+        # Act & Assert
+        with pytest.raises(CircuitOpenError):
+            await store.begin("run-key-b")
+        assert fake.list_events.call_count == 1
+        fake.create_event.assert_not_called()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+invocation_metrics のテスト
+
+契約による設計（Design by Contract）に基づく単体テスト
+"""
+
+import asyncio
+import io
+import json
+
+import pytest
+
+from app.agentcore.invocation_metrics import (
+    DEFAULT_MODEL_PRICES,
+    InvocationMetrics,
+    TokenBudgetExceededError,
+    current_metrics,
+    metrics_scope,
+    record_metrics_callback,
+    timed,
+)
+
+MODEL_ID = "jp.anthropic.claude-sonnet-4-5-20250929-v1:0"
+
+
+class FakeClock:
+    """テスト用の手動時計"""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def usage_event(**usage: int) -> dict[str, object]:
+    """Agent のコールバックに届く metadata イベント"""
+    return {"event": {"metadata": {"usage": usage}}}
+
+
+class TestInvocationMetrics:
+    """InvocationMetrics の契約検証"""
+
+    def test_usage_and_cost_contract(self) -> None:
+        """
+        事前条件: 価格表に一致するモデル
+        事後条件: トークン数が加算され、100万トークンあたりの価格から概算コストを求める
+        """
+        # Arrange
+        metrics = InvocationMetrics("AWS-SAP", 3, MODEL_ID)
+
+        # Act
+        metrics.add_usage(
+            {
+                "inputTokens": 1_000,
+                "outputTokens": 2_000,
+                "cacheReadInputTokens": 10_000,
+                "cacheWriteInputTokens": 0,
+            }
+        )
+
+        # Assert
+        assert metrics.total_tokens == 13_000
+        assert metrics.estimated_cost() == pytest.approx(
+            (1_000 * 3.0 + 2_000 * 15.0 + 10_000 * 0.30) / 1_000_000
+        )
+
+    def test_unknown_model_has_no_cost_contract(self) -> None:
+        """
+        不変条件: 価格表にないモデルのコストは推定しない
+        """
+        metrics = InvocationMetrics("AWS-SAP", 1, "amazon.titan-text-express-v1")
+        metrics.add_usage({"inputTokens": 10, "outputTokens": 10})
+
+        assert metrics.estimated_cost() is None
+        assert "EstimatedCostUSD" not in metrics.to_emf("succeeded")
+
+    def test_token_budget_contract(self) -> None:
+        """
+        事前条件: トークン予算100
+        事後条件: 合計が予算に達すると TokenBudgetExceededError が発生する
+        """
+        # Arrange
+        metrics = InvocationMetrics("AWS-SAP", 1, MODEL_ID, token_budget=100)
+        metrics.add_usage({"inputTokens": 60, "outputTokens": 30})
+        metrics.check_token_budget()
+
+        # Act & Assert
+        metrics.add_usage({"inputTokens": 5, "outputTokens": 5})
+        with pytest.raises(TokenBudgetExceededError) as exc_info:
+            metrics.check_token_budget()
+        assert exc_info.value.used == 100
+
+    def test_emit_writes_single_emf_line_contract(self) -> None:
+        """
+        事後条件: CloudWatch EMF 形式のレコードが1行で出力され、以降の記録は無視される
+        """
+        # Arrange
+        clock = FakeClock()
+        metrics = InvocationMetrics("AWS-SAP", 2, MODEL_ID, clock=clock)
+        metrics.add_usage({"inputTokens": 100, "outputTokens": 50})
+        metrics.add_phase("bedrock", 1200.0)
+        metrics.add_phase("memory", 30.0)
+        metrics.add_phase("memory", 20.0)
+        clock.now = 1.5
+        stream = io.StringIO()
+
+        # Act
+        metrics.emit("succeeded", stream=stream)
+        metrics.add_usage({"inputTokens": 999})
+
+        # Assert
+        lines = stream.getvalue().splitlines()
+        assert len(lines) == 1
+        record = json.loads(lines[0])
+        directive = record["_aws"]["CloudWatchMetrics"][0]
+        assert directive["Namespace"] == "CloudCoPassAgent"
+        assert directive["Dimensions"] == [["ExamType"]]
+        names = {metric["Name"] for metric in directive["Metrics"]}
+        assert {"InputTokens", "ModelCalls", "BedrockLatency"} <= names
+        assert all(name in record for name in names)
+        assert record["ExamType"] == "AWS-SAP"
+        assert record["Outcome"] == "succeeded"
+        assert record["InputTokens"] == 100
+        assert record["MemoryLatency"] == 50.0
+        assert record["Duration"] == 1500.0
+        assert metrics.usage.input_tokens == 100
+
+    def test_from_config_contract(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """
+        事後条件: 環境変数の予算・価格表・名前空間が反映され、ペイロードの予算が優先される
+        不変条件: 不正な JSON の価格表は無視して既定値で継続する
+        """
+        # Arrange
+        monkeypatch.setenv("INVOCATION_TOKEN_BUDGET", "5000")
+        monkeypatch.setenv("MODEL_PRICES", '{"nova-pro": {"input": 0.8}}')
+        monkeypatch.setenv("METRICS_NAMESPACE", "Test")
+
+        # Act
+        from_env = InvocationMetrics.from_config("AWS-SAP", 1, "amazon.nova-pro-v1:0")
+        from_payload = InvocationMetrics.from_config(
+            "AWS-SAP", 1, MODEL_ID, token_budget=10
+        )
+
+        # Assert
+        assert from_env.token_budget == 5000
+        assert from_env.namespace == "Test"
+        from_env.add_usage({"inputTokens": 1_000_000})
+        assert from_env.estimated_cost() == pytest.approx(0.8)
+        assert from_payload.token_budget == 10
+
+        monkeypatch.setenv("MODEL_PRICES", "not-json")
+        assert (
+            "claude-sonnet-4-5"
+            in InvocationMetrics.from_config("AWS-SAP", 1, MODEL_ID).prices
+        )
+
+    @pytest.mark.parametrize(
+        ("budget", "prices"), [("abc", "[1, 2]"), ("0", '"price"'), ("-5", "3.0")]
+    )
+    def test_from_config_invalid_env_falls_back_contract(
+        self, monkeypatch: pytest.MonkeyPatch, budget: str, prices: str
+    ) -> None:
+        """
+        事前条件: 環境変数のトークン予算・価格表が不正な値
+        事後条件: 例外を送出せず、予算なし・既定の価格表で生成される
+        """
+        # Arrange
+        monkeypatch.setenv("INVOCATION_TOKEN_BUDGET", budget)
+        monkeypatch.setenv("MODEL_PRICES", prices)
+
+        # Act
+        metrics = InvocationMetrics.from_config("AWS-SAP", 1, MODEL_ID)
+
+        # Assert
+        assert metrics.token_budget is None
+        assert metrics.prices == DEFAULT_MODEL_PRICES
+
+
+class TestMetricsScope:
+    """集計先の伝播の契約検証"""
+
+    async def test_callback_and_timed_within_scope_contract(self) -> None:
+        """
+        事前条件: metrics_scope 内でスレッドからコールバックされる
+        事後条件: usage とフェーズの所要時間が集計先に加算される
+        不変条件: スコープ外では何も記録しない
+        """
+        # Arrange
+        metrics = InvocationMetrics("AWS-SAP", 1, MODEL_ID)
+
+        def generate() -> None:
+            record_metrics_callback(**usage_event(inputTokens=10, outputTokens=5))
+
+        # Act
+        with metrics_scope(metrics):
+            with timed("bedrock"):
+                await asyncio.to_thread(generate)
+            record_metrics_callback(data="ストリーミング中のテキスト")
+        record_metrics_callback(**usage_event(inputTokens=100))
+        with timed("teams"):
+            pass
+
+        # Assert
+        assert current_metrics() is None
+        assert metrics.usage.calls == 1
+        assert metrics.total_tokens == 15
+        assert set(metrics.phase_ms) == {"bedrock"}
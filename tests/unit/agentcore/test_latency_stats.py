@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+latency_stats のテスト
+
+契約による設計（Design by Contract）に基づく単体テスト
+"""
+
+import asyncio
+import json
+import random
+
+import pytest
+
+from app.agentcore.latency_stats import (
+    DEFAULT_FLUSH_INTERVAL,
+    DEFAULT_RELATIVE_ACCURACY,
+    LatencySketch,
+    LatencyStats,
+    merge_logged_sketches,
+)
+
+
+class FakeClock:
+    """テスト用の手動時計"""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestLatencySketch:
+    """LatencySketch の契約検証"""
+
+    def test_quantiles_within_relative_accuracy_contract(self) -> None:
+        """
+        事前条件: 1〜10000ms の一様な値を記録
+        事後条件: 各分位点の推定値は真値の相対誤差 1% 以内
+        不変条件: 件数・最小・最大は正確
+        """
+        # Arrange
+        sketch = LatencySketch(relative_accuracy=0.01)
+        values = [float(v) for v in range(1, 10001)]
+
+        # Act
+        for value in random.Random(0).sample(values, len(values)):
+            sketch.add(value)
+
+        # Assert
+        for q in (0.5, 0.9, 0.95, 0.99):
+            expected = values[round(q * (len(values) - 1))]
+            actual = sketch.quantile(q)
+            assert actual is not None
+            assert actual == pytest.approx(expected, rel=0.01)
+        assert sketch.count == 10000
+        assert sketch.min == 1.0
+        assert sketch.max == 10000.0
+
+    def test_merge_matches_single_sketch_contract(self) -> None:
+        """
+        事前条件: 同じ値を2つのスケッチに分けて記録
+        事後条件: 併合結果は1つのスケッチに記録した場合と同じ要約になる
+        """
+        # Arrange
+        values = [random.Random(1).lognormvariate(8, 1) for _ in range(500)]
+        whole = LatencySketch()
+        left, right = LatencySketch(), LatencySketch()
+        for i, value in enumerate(values):
+            whole.add(value)
+            (left if i % 2 else right).add(value)
+
+        # Act
+        left.merge(right)
+
+        # Assert
+        assert left.buckets == whole.buckets
+        assert left.summary() == whole.summary()
+
+    def test_round_trip_and_accuracy_mismatch_contract(self) -> None:
+        """
+        事前条件: 値を記録したスケッチ、相対誤差の異なるスケッチ
+        事後条件: to_dict/from_dict で同じ要約に復元でき、精度の異なるスケッチは併合できない
+        """
+        # Arrange
+        sketch = LatencySketch()
+        for value in (0.0, 12.5, 830.0, 15000.0):
+            sketch.add(value)
+
+        # Act
+        restored = LatencySketch.from_dict(sketch.to_dict())
+
+        # Assert
+        assert restored.summary() == sketch.summary()
+        assert restored.quantile(0.0) == 0.0
+        with pytest.raises(ValueError):
+            sketch.merge(LatencySketch(relative_accuracy=0.05))
+
+    def test_empty_and_invalid_values_contract(self) -> None:
+        """
+        事前条件: 値のないスケッチ
+        事後条件: 分位点は None、負の値や範囲外の q は ValueError
+        """
+        sketch = LatencySketch()
+        assert sketch.quantile(0.5) is None
+        assert sketch.summary() == {"count": 0}
+        assert LatencySketch.from_dict(sketch.to_dict()).summary() == {"count": 0}
+        with pytest.raises(ValueError):
+            sketch.add(-1.0)
+        with pytest.raises(ValueError):
+            sketch.quantile(1.5)
+
+
+class TestLatencyStats:
+    """LatencyStats の契約検証"""
+
+    def test_flush_moves_window_into_totals_contract(self) -> None:
+        """
+        事前条件: 2フェーズのレイテンシを記録
+        事後条件: flush は区間の要約を返して区間を空にし、snapshot の累計には残る
+        不変条件: 区間が空なら flush は None を返す
+        """
+        # Arrange
+        clock = FakeClock()
+        stats = LatencyStats(flush_interval=60.0, clock=clock)
+        stats.record_many({"bedrock": 12000.0, "teams": 800.0})
+        stats.record("bedrock", 18000.0)
+
+        # Act
+        clock.now = 60.0
+        summary = stats.flush()
+
+        # Assert
+        assert summary is not None
+        assert summary["window_start"] == 0.0
+        assert summary["window_end"] == 60.0
+        assert summary["phases"]["bedrock"]["count"] == 2
+        assert summary["sketches"]["bedrock"]["count"] == 2
+        assert stats.flush() is None
+
+        stats.record("bedrock", 15000.0)
+        snapshot = stats.snapshot()
+        assert snapshot["phases"]["bedrock"]["count"] == 3
+        assert snapshot["phases"]["teams"]["count"] == 1
+
+    def test_logged_sketches_merge_across_sessions_contract(self) -> None:
+        """
+        事前条件: 2つのセッションがそれぞれ区間の記録をログに出力した
+        事後条件: ログの JSON から併合したスケッチの分位点は、全ての値を1つに記録した場合と一致する
+        """
+        # Arrange
+        first, second = LatencyStats(), LatencyStats()
+        expected = LatencySketch()
+        for i in range(1, 101):
+            (first if i % 2 else second).record("bedrock", i * 100.0)
+            expected.add(i * 100.0)
+        second.record("teams", 800.0)
+        logged = [json.loads(json.dumps(stats.flush())) for stats in (first, second)]
+
+        # Act
+        merged = merge_logged_sketches(logged)
+
+        # Assert
+        assert merged["bedrock"].count == 100
+        assert merged["teams"].count == 1
+        for q in (0.5, 0.95, 0.99):
+            assert merged["bedrock"].quantile(q) == expected.quantile(q)
+
+    def test_from_env_contract(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """
+        事前条件: 環境変数に出力間隔と相対誤差が設定されている
+        事後条件: 設定値で生成され、不正な出力間隔は ValueError
+        """
+        # Arrange
+        monkeypatch.setenv("LATENCY_STATS_FLUSH_SECONDS", "30")
+        monkeypatch.setenv("LATENCY_STATS_RELATIVE_ACCURACY", "0.02")
+
+        # Act
+        stats = LatencyStats.from_env()
+
+        # Assert
+        assert stats.flush_interval == 30.0
+        assert stats.relative_accuracy == 0.02
+        with pytest.raises(ValueError):
+            LatencyStats(flush_interval=0)
+
+    @pytest.mark.parametrize(
+        ("flush_seconds", "relative_accuracy"),
+        [("5min", "0.01"), ("0", "0.01"), ("300", "1%"), ("300", "1.5")],
+    )
+    def test_from_env_invalid_values_contract(
+        self,
+        monkeypatch: pytest.MonkeyPatch,
+        flush_seconds: str,
+        relative_accuracy: str,
+    ) -> None:
+        """
+        事前条件: 出力間隔または相対誤差の環境変数が数値でない、または範囲外
+        事後条件: 例外を送出せず、既定値で生成される
+        """
+        monkeypatch.setenv("LATENCY_STATS_FLUSH_SECONDS", flush_seconds)
+        monkeypatch.setenv("LATENCY_STATS_RELATIVE_ACCURACY", relative_accuracy)
+
+        stats = LatencyStats.from_env()
+
+        assert stats.flush_interval == DEFAULT_FLUSH_INTERVAL
+        assert stats.relative_accuracy == DEFAULT_RELATIVE_ACCURACY
+
+    async def test_periodic_flush_and_shutdown_contract(
+        self, caplog: pytest.LogCaptureFixture
+    ) -> None:
+        """
+        事前条件: イベントループ上で記録（出力タスクが遅延起動される）
+        事後条件: 出力間隔ごとに区間の要約がログに出力され、shutdown で残りも出力される
+        """
+        # Arrange
+        stats = LatencyStats(flush_interval=0.01)
+        caplog.set_level("INFO", logger="app.agentcore.latency_stats")
+
+        # Act
+        stats.record("bedrock", 100.0)
+        await asyncio.sleep(0.05)
+        stats.record("teams", 50.0)
+        await stats.shutdown()
+
+        # Assert
+        messages = [r.message for r in caplog.records if "レイテンシ統計" in r.message]
+        assert any('"bedrock"' in m for m in messages)
+        assert any('"teams"' in m for m in messages)
+        assert stats.snapshot()["phases"]["teams"]["count"] == 1
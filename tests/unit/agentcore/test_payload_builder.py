@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+payload_builder のテスト
+
+契約による設計（Design by Contract）に基づく単体テスト
+"""
+
+from typing import Any
+
+import httpx
+
+from app.agentcore.payload_builder import (
+    build_payloads,
+    encode_payload,
+)
+
+BASE = {"security_token": "test-security-token"}
+
+
+def make_question(index: int, explanation_chars: int = 100) -> dict[str, Any]:
+    """テスト用の問題データ（Question.model_dump() 相当）"""
+    return {
+        "question": f"テスト問題{index}",
+        "options": ["**A.** 選択肢1", "**B.** 選択肢2"],
+        "correct_answer": "A",
+        "explanation": "解" * explanation_chars,
+        "source": [f"https://docs.aws.amazon.com/test{index}/"],
+        "learning_domain": "テスト分野",
+        "primary_technologies": ["テスト技術"],
+        "learning_insights": "学習ポイント",
+    }
+
+
+class TestEncodePayload:
+    """encode_payload 関数の契約検証"""
+
+    def test_matches_httpx_encoding_invariant(self) -> None:
+        """
+        不変条件: 計測に使うエンコードは httpx の json= 送信と同一バイト列になる
+        """
+        # Arrange
+        payload = {**BASE, "questions": [make_question(1)]}
+
+        # Act
+        request = httpx.Request("POST", "https://test.webhook.url", json=payload)
+
+        # Assert
+        assert encode_payload(payload) == request.content
+
+
+class TestBuildPayloads:
+    """build_payloads 関数の契約検証"""
+
+    def test_small_output_single_post_contract(self) -> None:
+        """
+        事前条件: 上限に収まる少数の問題
+        事後条件: 既存と同じ形式の単一ポストが生成される
+        不変条件: 統計情報が実際のエンコードサイズと一致する
+        """
+        # Arrange
+        questions = [make_question(i) for i in range(2)]
+
+        # Act
+        posts, stats = build_payloads(BASE, "questions", questions)
+
+        # Assert - 事後条件検証
+        assert posts == [{**BASE, "questions": questions}]
+        assert stats.post_count == 1
+        assert stats.item_count == 2
+
+        # 不変条件検証
+        assert stats.total_bytes == len(encode_payload(posts[0]))
+        assert stats.oversized_posts == 0
+
+    def test_split_under_byte_limit_contract(self) -> None:
+        """
+        事前条件: 1ポストに収まらない問題数とサイズ上限
+        事後条件: 全ポストが上限以下に分割される
+        不変条件: 問題の順序と件数が保持され、全ポストにトークンが含まれる
+        """
+        # Arrange
+        questions = [make_question(i, explanation_chars=300) for i in range(5)]
+        single_size = len(encode_payload({**BASE, "questions": questions[:1]}))
+        max_bytes = single_size * 2 + 10
+
+        # Act
+        posts, stats = build_payloads(BASE, "questions", questions, max_bytes=max_bytes)
+
+        # Assert - 事後条件検証
+        assert stats.post_count == len(posts) > 1
+        assert all(len(encode_payload(post)) <= max_bytes for post in posts)
+        assert stats.max_post_bytes <= max_bytes
+
+        # 不変条件検証
+        flattened = [q for post in posts for q in post["questions"]]
+        assert flattened == questions
+        assert all(post["security_token"] == BASE["security_token"] for post in posts)
+
+    def test_defer_long_fields_contract(self) -> None:
+        """
+        事前条件: 解説が閾値を超える問題、defer_long_fields=True
+        事後条件: 長い解説が本体から除かれ、followups ポストで後送される
+        不変条件: 短いフィールドは本体に残る
+        """
+        # Arrange
+        questions = [make_question(0, explanation_chars=2000), make_question(1)]
+
+        # Act
+        posts, stats = build_payloads(
+            BASE,
+            "questions",
+            questions,
+            defer_long_fields=True,
+            long_field_bytes=1000,
+        )
+
+        # Assert - 事後条件検証
+        assert "explanation" not in posts[0]["questions"][0]
+        followups = posts[-1]["followups"]
+        assert followups == [
+            {
+                "question_index": 0,
+                "fields": {"explanation": questions[0]["explanation"]},
+            }
+        ]
+        assert stats.deferred_fields == 1
+
+        # 不変条件検証
+        assert posts[0]["questions"][1] == questions[1]
+        assert posts[0]["questions"][0]["learning_insights"] == "学習ポイント"
+
+    def test_oversized_single_item_precondition(self) -> None:
+        """
+        事前条件: 1問だけで上限を超える問題
+        事後条件: 単独ポストとして送信され、oversized として計上される
+        """
+        # Arrange
+        questions = [make_question(0, explanation_chars=1000), make_question(1)]
+
+        # Act
+        posts, stats = build_payloads(BASE, "questions", questions, max_bytes=1500)
+
+        # Assert
+        assert len(posts) == 2
+        assert stats.oversized_posts == 1
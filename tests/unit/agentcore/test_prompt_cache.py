@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+prompt_cache のテスト
+
+契約による設計（Design by Contract）に基づく単体テスト
+"""
+
+import asyncio
+
+import pytest
+
+from app.agentcore.prompt_cache import (
+    PromptUsage,
+    build_prompt_blocks,
+    prompt_text,
+    record_usage_callback,
+    supports_prompt_cache,
+    usage_scope,
+)
+
+
+def metadata_event(**usage: int) -> dict[str, object]:
+    """Agent のコールバックに届く metadata イベント"""
+    return {"event": {"metadata": {"usage": usage, "metrics": {"latencyMs": 10}}}}
+
+
+class TestPromptBlocks:
+    """プロンプトの組み立ての契約検証"""
+
+    def test_cache_point_between_prefix_and_suffix_contract(self) -> None:
+        """
+        事後条件: 接頭辞・cachePoint・接尾辞の順に並び、テキストは元の順序で連結できる
+        """
+        # Act
+        blocks = build_prompt_blocks("静的", "動的", cache=True)
+
+        # Assert
+        assert blocks == [
+            {"text": "静的"},
+            {"cachePoint": {"type": "default"}},
+            {"text": "動的"},
+        ]
+        assert prompt_text(blocks) == "静的動的"
+
+    def test_without_cache_point_contract(self) -> None:
+        """
+        事前条件: cache=False
+        事後条件: cachePoint を含まない
+        """
+        assert build_prompt_blocks("静的", "動的", cache=False) == [
+            {"text": "静的"},
+            {"text": "動的"},
+        ]
+
+    def test_supports_prompt_cache_contract(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """
+        事後条件: Claude 系モデルのみ対応とし、PROMPT_CACHE_ENABLED=false で無効化できる
+        """
+        model_id = "jp.anthropic.claude-sonnet-4-5-20250929-v1:0"
+        assert supports_prompt_cache(model_id)
+        assert not supports_prompt_cache("amazon.titan-text-express-v1")
+
+        monkeypatch.setenv("PROMPT_CACHE_ENABLED", "false")
+        assert not supports_prompt_cache(model_id)
+
+
+class TestUsageRecording:
+    """キャッシュ利用量の記録の契約検証"""
+
+    def test_usage_is_recorded_within_scope_contract(self) -> None:
+        """
+        事前条件: usage_scope 内でモデル応答の metadata イベントを受け取る
+        事後条件: 入出力・キャッシュの読み書きトークン数が加算される
+        不変条件: スコープ外のイベントは集計しない
+        """
+        # Act
+        with usage_scope("generation") as usage:
+            record_usage_callback(
+                **metadata_event(
+                    inputTokens=100,
+                    outputTokens=50,
+                    totalTokens=150,
+                    cacheReadInputTokens=900,
+                )
+            )
+            record_usage_callback(data="ストリーミング中のテキスト")
+        record_usage_callback(**metadata_event(inputTokens=1, outputTokens=1))
+
+        # Assert
+        assert usage.calls == 1
+        assert usage.input_tokens == 100
+        assert usage.output_tokens == 50
+        assert usage.cache_read_tokens == 900
+        assert usage.cache_write_tokens == 0
+        assert usage.cache_hit_ratio == pytest.approx(0.9)
+
+    async def test_usage_is_recorded_from_worker_thread_contract(self) -> None:
+        """
+        契約による設計: スレッドで実行される生成の記録
+
+        事前条件: structured_output と同様にスレッドからコールバックされる
+        事後条件: 呼び出し元のスコープに加算される
+        """
+
+        def generate() -> None:
+            record_usage_callback(
+                **metadata_event(inputTokens=10, cacheWriteInputTokens=2000)
+            )
+
+        with usage_scope("generation") as usage:
+            await asyncio.to_thread(generate)
+
+        assert usage.cache_write_tokens == 2000
+        assert usage.to_dict()["calls"] == 1
+
+    def test_empty_usage_contract(self) -> None:
+        """
+        不変条件: 呼び出しがない場合のキャッシュ率は0
+        """
+        assert PromptUsage().cache_hit_ratio == 0.0
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+問題アーカイブのテスト
+
+契約による設計（Design by Contract）に基づく単体テスト
+"""
+
+import random
+import time
+from pathlib import Path
+from typing import Any
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.agentcore.question_archive import (
+    ArchivedQuestion,
+    MemoryQuestionArchiveBackend,
+    QuestionArchive,
+    _synthetic_question,
+    fingerprint,
+    minhash_signature,
+    normalize_text,
+    question_text,
+    run_benchmark,
+)
+
+SCP_QUESTION = (
+    "ある企業はAWS Organizationsで200個のアカウントを管理している。"
+    "セキュリティチームはSCPを使って承認されたリージョン以外でのリソース作成を禁止したい。"
+    "管理アカウントへの影響を避けつつ要件を満たす方法はどれか。"
+)
+
+
+def make_question(text: str, options: list[str] | None = None) -> dict[str, Any]:
+    """テスト用の問題"""
+    return {
+        "question": text,
+        "options": options
+        or ["A. SCPを設定する", "B. IAMポリシー", "C. Config", "D. なし"],
+    }
+
+
+class TestNormalization:
+    """正規化とフィンガープリントの契約検証"""
+
+    def test_fingerprint_ignores_formatting_contract(self) -> None:
+        """
+        事前条件: 全角・半角、大文字・小文字、空白・記号だけが異なる問題
+        事後条件: フィンガープリントが一致する
+        """
+        a = make_question("ＡＷＳ Organizations で SCP を設定する。")
+        b = make_question("aws organizationsでscpを設定する")
+
+        assert normalize_text("Ａ b、 C!") == "abc"
+        assert fingerprint(a) == fingerprint(b)
+        assert fingerprint(a) != fingerprint(make_question("Transit Gateway"))
+
+
+class TestQuestionArchive:
+    """QuestionArchive の契約検証"""
+
+    def test_exact_and_near_duplicates_contract(self) -> None:
+        """
+        事前条件: アーカイブに過去の問題がある
+        事後条件: 完全一致・言い回し違いは検出され、別シナリオは検出されない
+        """
+        # Arrange
+        archive = QuestionArchive()
+        question_id = archive.add(make_question(SCP_QUESTION), exam_type="AWS-SAP")
+
+        # Act
+        exact = archive.find_duplicate(make_question(SCP_QUESTION + " "))
+        near = archive.find_duplicate(
+            make_question(
+                SCP_QUESTION.replace("200個", "350個").replace(
+                    "禁止したい", "拒否したい"
+                )
+            )
+        )
+        different = archive.find_duplicate(
+            make_question(
+                "複数のVPCとオンプレミスをTransit Gatewayで接続している。"
+                "ルートテーブルを分離してセグメント間の通信を制御する方法はどれか。",
+                [
+                    "A. TGWルートテーブル",
+                    "B. VPCピアリング",
+                    "C. NACL",
+                    "D. PrivateLink",
+                ],
+            )
+        )
+
+        # Assert
+        assert exact is not None and exact.exact
+        assert exact.question_id == question_id
+        assert near is not None and not near.exact
+        assert near.similarity >= archive.similarity_threshold
+        assert different is None
+
+    def test_persists_across_instances_contract(self, tmp_path: Path) -> None:
+        """
+        事前条件: ファイルに問題を保存する
+        事後条件: 新しいインスタンスで LSH インデックスが再構築され、類似問題を検出できる
+        """
+        path = tmp_path / "nested" / "archive.sqlite3"
+        QuestionArchive(path).add(make_question(SCP_QUESTION), exam_type="AWS-SAP")
+
+        reopened = QuestionArchive(path)
+
+        assert len(reopened) == 1
+        assert reopened.find_duplicate(
+            make_question(SCP_QUESTION.replace("200個", "300個"))
+        )
+
+    def test_duplicates_within_batch_contract(self) -> None:
+        """
+        事前条件: 同じバッチに言い回しだけが異なる2問と別シナリオの1問がある（アーカイブは空）
+        事後条件: 後の問題が先行する問題との類似として検出され、先行する問題・別シナリオは検出されない
+        """
+        archive = QuestionArchive()
+        batch = [
+            make_question(SCP_QUESTION),
+            make_question("複数のVPCをTransit Gatewayで接続する構成はどれか。"),
+            make_question(SCP_QUESTION.replace("200個", "350個")),
+        ]
+
+        matches = archive.find_duplicates(batch)
+
+        assert list(matches) == [2]
+        assert matches[2].batch_index == 0
+        assert matches[2].question_id == -1
+        assert matches[2].similarity >= archive.similarity_threshold
+
+    @patch("app.agentcore.question_archive.MemoryClient")
+    def test_memory_backend_survives_new_session_contract(
+        self, mock_memory_client_class: MagicMock
+    ) -> None:
+        """
+        事前条件: Memory を保存先とするアーカイブに問題を追加する
+        事後条件: 新しいセッション（プロセス）のアーカイブで LSH インデックスが再構築され、類似問題を検出できる
+        不変条件: 1回の追加は1イベントとして書き込まれる
+        """
+        # Arrange
+        events: list[dict[str, Any]] = []
+
+        def create_event(**kwargs: Any) -> dict[str, Any]:
+            event = {
+                "payload": [
+                    {"conversational": {"content": {"text": text}, "role": role}}
+                    for text, role in kwargs["messages"]
+                ]
+            }
+            events.append(event)
+            return event
+
+        fake = MagicMock()
+        fake.create_event.side_effect = create_event
+        fake.list_events.side_effect = lambda **kwargs: list(events)
+        mock_memory_client_class.return_value = fake
+        first = QuestionArchive(
+            backend=MemoryQuestionArchiveBackend(memory_id="test-memory-id")
+        )
+        first.add_many(
+            [make_question(SCP_QUESTION), make_question("Transit Gatewayの問題")],
+            exam_type="AWS-SAP",
+        )
+
+        # Act
+        reopened = QuestionArchive(
+            backend=MemoryQuestionArchiveBackend(memory_id="test-memory-id")
+        )
+
+        # Assert
+        assert len(events) == 1
+        assert len(reopened) == 2
+        assert reopened.find_duplicate(
+            make_question(SCP_QUESTION.replace("200個", "300個"))
+        )
+
+    def test_lazy_load_defers_and_retries_backend_read_contract(self) -> None:
+        """
+        事前条件: 最初の読み込みのみ失敗する保存先を遅延読み込みで使う
+        事後条件: 生成時は保存先を読まず、失敗した読み込みは次回の照合で再試行される
+        """
+        # Arrange
+        stored = ArchivedQuestion(
+            exam_type="AWS-SAP",
+            fingerprint=fingerprint(make_question(SCP_QUESTION)),
+            signature=minhash_signature(
+                normalize_text(question_text(make_question(SCP_QUESTION)))
+            ),
+            question=SCP_QUESTION,
+        )
+        backend = MagicMock()
+        backend.load.side_effect = [RuntimeError("Memory unavailable"), [stored]]
+        archive = QuestionArchive(backend=backend, lazy_load=True)
+        backend.load.assert_not_called()
+
+        # Act / Assert
+        with pytest.raises(RuntimeError):
+            archive.find_duplicate(make_question(SCP_QUESTION))
+        assert archive.find_duplicate(make_question(SCP_QUESTION)) is not None
+        assert backend.load.call_count == 2
+
+    def test_lookup_is_sub_millisecond_contract(self) -> None:
+        """
+        事前条件: 互いに異なる問題が多数アーカイブされている
+        事後条件: 1問あたりの類似判定（署名計算を含む）がサブミリ秒で完了する
+        不変条件: 互いに異なる問題は類似と判定されない
+        """
+        # Arrange
+        rng = random.Random(42)
+        archive = QuestionArchive()
+        archive.add_many(
+            [_synthetic_question(rng, i) for i in range(5000)], exam_type="AWS-SAP"
+        )
+        probes = [_synthetic_question(rng, 5000 + i) for i in range(200)]
+
+        # Act
+        started = time.perf_counter()
+        matches = [archive.find_duplicate(probe) for probe in probes]
+        elapsed_ms = (time.perf_counter() - started) * 1000 / len(probes)
+
+        # Assert（CI の揺らぎを考慮して余裕を持たせる）
+        assert elapsed_ms < 5
+        assert sum(match is not None for match in matches) == 0
+
+    def test_benchmark_reports_metrics_contract(self) -> None:
+        """
+        事前条件: 少数の問題でベンチマークを実行する
+        事後条件: 投入件数と判定時間が返される
+        """
+        result = run_benchmark(200, queries=20)
+
+        assert result["stored"] == 200
+        assert result["lookup_ms_per_question"] >= 0
+        assert result["check_ms_per_question"] >= 0
@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+"""
+問題プールのテスト
+
+契約による設計（Design by Contract）に基づく単体テスト
+"""
+
+import asyncio
+import threading
+import time
+from pathlib import Path
+from typing import Any
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.agentcore.circuit_breaker import CircuitBreaker
+from app.agentcore.question_pool import (
+    MemoryQuestionPoolBackend,
+    QuestionPool,
+    SQLiteQuestionPoolBackend,
+)
+
+
+def make_question(domain: str, text: str = "問題") -> dict[str, Any]:
+    """テスト用の問題"""
+    return {"question": text, "learning_domain": domain}
+
+
+class FakeMemoryClient:
+    """create_event / list_events をメモリ上で再現する MemoryClient のスタブ"""
+
+    def __init__(self) -> None:
+        self.events: dict[str, list[dict[str, Any]]] = {}
+
+    def create_event(self, **kwargs: Any) -> dict[str, Any]:
+        event = {
+            "payload": [
+                {"conversational": {"content": {"text": text}, "role": role}}
+                for text, role in kwargs["messages"]
+            ]
+        }
+        self.events.setdefault(kwargs["session_id"], []).append(event)
+        return event
+
+    def list_events(self, **kwargs: Any) -> list[dict[str, Any]]:
+        # 実際の API と同様に時系列順で返す
+        return list(self.events.get(kwargs["session_id"], []))
+
+
+class TestSQLiteQuestionPoolBackend:
+    """SQLiteQuestionPoolBackend の契約検証"""
+
+    def test_take_removes_questions_contract(self, tmp_path: Path) -> None:
+        """
+        事前条件: 在庫に3問ある
+        事後条件: take は要求数まで払い出し、払い出した問題は在庫から消える
+        不変条件: 試験が異なる在庫には影響しない
+        """
+        # Arrange
+        backend = SQLiteQuestionPoolBackend(tmp_path / "pool.sqlite3")
+        backend.add("AWS-SAP", [make_question("D1", f"Q{i}") for i in range(3)])
+        backend.add("AWS-DVA", [make_question("D1", "other")])
+
+        # Act
+        taken = backend.take("AWS-SAP", 2)
+
+        # Assert
+        assert [q["question"] for q in taken] == ["Q0", "Q1"]
+        assert backend.count("AWS-SAP") == 1
+        assert backend.count("AWS-DVA") == 1
+        assert backend.take("AWS-SAP", 5) == [make_question("D1", "Q2")]
+        assert backend.take("AWS-SAP", 5) == []
+
+    def test_take_defers_recent_domains_contract(self) -> None:
+        """
+        事前条件: 最近使用された分野と未使用の分野の在庫がある
+        事後条件: 未使用の分野から先に払い出される
+        """
+        backend = SQLiteQuestionPoolBackend()
+        backend.add("AWS-SAP", [make_question("頻出分野", "old")])
+        backend.add("AWS-SAP", [make_question("未使用分野", "new")])
+
+        taken = backend.take("AWS-SAP", 1, avoid_domains=["頻出分野"])
+
+        assert taken[0]["learning_domain"] == "未使用分野"
+        assert backend.counts_by_domain("AWS-SAP") == {"頻出分野": 1}
+
+    def test_persists_across_instances_contract(self, tmp_path: Path) -> None:
+        """
+        事前条件: ファイルに在庫を保存する
+        事後条件: 新しいインスタンスから同じ在庫を参照できる
+        """
+        path = tmp_path / "nested" / "pool.sqlite3"
+        SQLiteQuestionPoolBackend(path).add("AWS-SAP", [make_question("D1")])
+
+        assert SQLiteQuestionPoolBackend(path).count("AWS-SAP") == 1
+
+
+@patch("app.agentcore.question_pool.MemoryClient")
+class TestMemoryQuestionPoolBackend:
+    """MemoryQuestionPoolBackend の契約検証"""
+
+    def test_stock_survives_new_session_contract(
+        self, mock_memory_client_class: MagicMock
+    ) -> None:
+        """
+        事前条件: 1つ目のセッション（プロセス）で在庫を追加・払い出しする
+        事後条件: 新しいセッションのバックエンドから残りの在庫を参照できる
+        不変条件: 在庫は学習分野履歴とは別のセッションに書き込まれる
+        """
+        # Arrange
+        fake = FakeMemoryClient()
+        mock_memory_client_class.return_value = fake
+        first = MemoryQuestionPoolBackend(memory_id="test-memory-id")
+        first.add("AWS-SAP", [make_question("D1", f"Q{i}") for i in range(3)])
+
+        # Act
+        taken = first.take("AWS-SAP", 2)
+        second = MemoryQuestionPoolBackend(memory_id="test-memory-id")
+
+        # Assert
+        assert [q["question"] for q in taken] == ["Q0", "Q1"]
+        assert second.count("AWS-SAP") == 1
+        assert second.take("AWS-SAP", 5) == [make_question("D1", "Q2")]
+        assert (
+            MemoryQuestionPoolBackend(memory_id="test-memory-id").count("AWS-SAP") == 0
+        )
+        assert set(fake.events) == {"question-pool-AWS-SAP"}
+
+    def test_take_defers_recent_domains_contract(
+        self, mock_memory_client_class: MagicMock
+    ) -> None:
+        """
+        事前条件: 最近使用された分野と未使用の分野の在庫がある
+        事後条件: 未使用の分野から先に払い出される
+        """
+        mock_memory_client_class.return_value = FakeMemoryClient()
+        backend = MemoryQuestionPoolBackend(memory_id="test-memory-id")
+        backend.add("AWS-SAP", [make_question("頻出分野", "old")])
+        backend.add("AWS-SAP", [make_question("未使用分野", "new")])
+
+        taken = backend.take("AWS-SAP", 1, avoid_domains=["頻出分野"])
+
+        assert taken[0]["learning_domain"] == "未使用分野"
+        assert backend.counts_by_domain("AWS-SAP") == {"頻出分野": 1}
+
+    def test_latest_snapshot_wins_over_event_order_contract(
+        self, mock_memory_client_class: MagicMock
+    ) -> None:
+        """
+        事前条件: 保存時刻の新しいスナップショットがイベント列の先頭にあり、壊れたイベントも混在する
+        事後条件: イベントの並びによらず保存時刻が最も新しいスナップショットが採用される
+        """
+        # Arrange - スナップショットを作ってから並びを入れ替え、壊れたイベントを追加
+        fake = FakeMemoryClient()
+        mock_memory_client_class.return_value = fake
+        writer = MemoryQuestionPoolBackend(memory_id="test-memory-id")
+        writer.add("AWS-SAP", [make_question("D1", "old")])
+        writer.add("AWS-SAP", [make_question("D1", "new")])
+        events = fake.events["question-pool-AWS-SAP"]
+        events.reverse()
+        events.append(
+            {"payload": [{"conversational": {"content": {"text": "broken"}}}]}
+        )
+
+        # Act
+        reader = MemoryQuestionPoolBackend(memory_id="test-memory-id")
+
+        # Assert
+        assert reader.count("AWS-SAP") == 2
+
+
+class TestQuestionPool:
+    """QuestionPool の契約検証"""
+
+    async def test_replenish_below_low_water_mark_contract(self) -> None:
+        """
+        事前条件: 在庫が下限を下回っている
+        事後条件: バックグラウンド補充で目標在庫まで積み増される
+        不変条件: 1回の生成はバッチサイズ以下、補充タスクは試験ごとに1つ
+        """
+        # Arrange
+        requested: list[int] = []
+
+        async def generate(
+            exam_type: str, count: int, focus_domains: list[str]
+        ) -> list[dict[str, Any]]:
+            requested.append(count)
+            await asyncio.sleep(0)
+            return [make_question(f"D{i % 3}") for i in range(count)]
+
+        pool = QuestionPool(
+            SQLiteQuestionPoolBackend(),
+            generate,
+            low_water_mark=3,
+            target_size=12,
+            batch_size=5,
+        )
+
+        # Act
+        first = await pool.schedule_replenish("AWS-SAP")
+        second = await pool.schedule_replenish("AWS-SAP")
+        await pool.wait_replenished(timeout=1.0)
+
+        # Assert
+        assert first is not None
+        assert second is first
+        assert pool.backend.count("AWS-SAP") == 12
+        assert requested == [5, 5, 2]
+
+        # 在庫が下限以上なら補充しない
+        assert await pool.schedule_replenish("AWS-SAP") is None
+
+    async def test_take_is_fast_contract(self) -> None:
+        """
+        事前条件: 在庫に十分な問題がある
+        事後条件: 払い出しはミリ秒単位で完了する（ライブ生成を待たない）
+        """
+
+        async def generate(
+            exam_type: str, count: int, focus_domains: list[str]
+        ) -> list[dict[str, Any]]:
+            raise AssertionError("在庫がある場合は生成しない")
+
+        backend = SQLiteQuestionPoolBackend()
+        backend.add("AWS-SAP", [make_question(f"D{i}") for i in range(100)])
+        pool = QuestionPool(backend, generate, low_water_mark=10, target_size=20)
+
+        started = time.perf_counter()
+        taken = await pool.take("AWS-SAP", 5)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        assert len(taken) == 5
+        assert elapsed_ms < 50
+
+    async def test_replenish_failure_stops_contract(self) -> None:
+        """
+        事前条件: 生成が失敗し続ける
+        事後条件: 連続失敗の上限で補充を打ち切り、例外は伝播しない
+        """
+        calls: list[int] = []
+
+        async def generate(
+            exam_type: str, count: int, focus_domains: list[str]
+        ) -> list[dict[str, Any]]:
+            calls.append(count)
+            raise RuntimeError("Bedrock error")
+
+        pool = QuestionPool(
+            SQLiteQuestionPoolBackend(), generate, low_water_mark=1, target_size=5
+        )
+
+        added = await pool.replenish("AWS-SAP")
+
+        assert added == 0
+        assert len(calls) == 2
+
+    async def test_focus_domains_prefer_low_stock_contract(self) -> None:
+        """
+        事前条件: 分野ごとの在庫に偏りがある
+        事後条件: 補充時は在庫の最も少ない分野が生成関数に渡される
+        """
+        focus: list[list[str]] = []
+
+        async def generate(
+            exam_type: str, count: int, focus_domains: list[str]
+        ) -> list[dict[str, Any]]:
+            focus.append(focus_domains)
+            return [make_question("少ない分野") for _ in range(count)]
+
+        backend = SQLiteQuestionPoolBackend()
+        backend.add("AWS-SAP", [make_question("多い分野") for _ in range(3)])
+        backend.add("AWS-SAP", [make_question("少ない分野")])
+        pool = QuestionPool(backend, generate, low_water_mark=5, target_size=6)
+
+        await pool.replenish("AWS-SAP")
+
+        assert focus[0] == ["少ない分野"]
+
+    def test_invalid_sizes_precondition(self) -> None:
+        """
+        事前条件: 目標在庫が下限以下
+        事後条件: ValueError が発生する
+        """
+
+        async def generate(
+            exam_type: str, count: int, focus_domains: list[str]
+        ) -> list[dict[str, Any]]:
+            return []
+
+        with pytest.raises(ValueError):
+            QuestionPool(
+                SQLiteQuestionPoolBackend(), generate, low_water_mark=5, target_size=5
+            )
+
+    async def test_replenish_is_registered_as_async_task_contract(self) -> None:
+        """
+        事前条件: 非同期タスクの登録先（AgentCore アプリ）が設定され、在庫が下限を下回る
+        事後条件: 補充中はタスクが登録され、補充完了時に解除される
+        """
+        # Arrange
+        tracker = MagicMock()
+        tracker.add_async_task.return_value = 7
+
+        async def generate(
+            exam_type: str, count: int, focus_domains: list[str]
+        ) -> list[dict[str, Any]]:
+            return [make_question("D1") for _ in range(count)]
+
+        pool = QuestionPool(
+            SQLiteQuestionPoolBackend(),
+            generate,
+            low_water_mark=1,
+            target_size=3,
+            task_tracker=tracker,
+        )
+
+        # Act
+        task = await pool.schedule_replenish("AWS-SAP")
+        tracker.complete_async_task.assert_not_called()
+        await pool.wait_replenished(timeout=1.0)
+
+        # Assert
+        assert task is not None
+        tracker.add_async_task.assert_called_once_with(
+            "question_pool_replenish", {"exam_type": "AWS-SAP"}
+        )
+        tracker.complete_async_task.assert_called_once_with(7)
+
+    async def test_wait_replenished_on_another_loop_contract(self) -> None:
+        """
+        事前条件: 補充タスクが別スレッドのイベントループ上で動作している
+        事後条件: 別のループからの wait_replenished は補充の完了時点で戻る（タイムアウトまで待たない）
+        """
+
+        # Arrange
+        async def generate(
+            exam_type: str, count: int, focus_domains: list[str]
+        ) -> list[dict[str, Any]]:
+            await asyncio.sleep(0.05)
+            return [make_question("D1") for _ in range(count)]
+
+        pool = QuestionPool(
+            SQLiteQuestionPoolBackend(), generate, low_water_mark=1, target_size=2
+        )
+        other = asyncio.new_event_loop()
+        thread = threading.Thread(target=other.run_forever, daemon=True)
+        thread.start()
+
+        async def schedule() -> None:
+            await pool.schedule_replenish("AWS-SAP")
+
+        try:
+            asyncio.run_coroutine_threadsafe(schedule(), other).result(1.0)
+
+            # Act
+            started = time.perf_counter()
+            await pool.wait_replenished(timeout=3.0)
+            elapsed = time.perf_counter() - started
+
+            # Assert
+            assert elapsed < 1.0
+            assert pool.backend.count("AWS-SAP") == 2
+        finally:
+            other.call_soon_threadsafe(other.stop)
+            thread.join(1.0)
+            other.close()
+
+    async def test_backend_failure_falls_back_to_live_contract(self) -> None:
+        """
+        事前条件: 在庫の保存先にアクセスできない
+        事後条件: 払い出しは空、補充は開始されず、例外は伝播しない
+        """
+
+        async def generate(
+            exam_type: str, count: int, focus_domains: list[str]
+        ) -> list[dict[str, Any]]:
+            raise AssertionError("在庫を確認できない場合は補充しない")
+
+        backend = MagicMock()
+        backend.take.side_effect = RuntimeError("Memory unavailable")
+        backend.count.side_effect = RuntimeError("Memory unavailable")
+        pool = QuestionPool(backend, generate, low_water_mark=1, target_size=3)
+
+        assert await pool.take("AWS-SAP", 2) == []
+        assert await pool.schedule_replenish("AWS-SAP") is None
+
+    async def test_backend_calls_go_through_circuit_breaker_contract(self) -> None:
+        """
+        事前条件: サーキットブレーカーを指定し、保存先の呼び出しが失敗して回路が開いている
+        事後条件: 払い出しは保存先を呼び出さずに空を返し、補充は開始されない
+        """
+
+        async def generate(
+            exam_type: str, count: int, focus_domains: list[str]
+        ) -> list[dict[str, Any]]:
+            raise AssertionError("回路が開いている場合は補充しない")
+
+        backend = MagicMock()
+        backend.take.side_effect = RuntimeError("Memory unavailable")
+        breaker = CircuitBreaker("memory", failure_threshold=1, reset_timeout=60)
+        pool = QuestionPool(
+            backend, generate, low_water_mark=1, target_size=3, breaker=breaker
+        )
+        assert await pool.take("AWS-SAP", 2) == []
+
+        assert await pool.take("AWS-SAP", 2) == []
+        assert await pool.schedule_replenish("AWS-SAP") is None
+        assert backend.take.call_count == 1
+        backend.count.assert_not_called()
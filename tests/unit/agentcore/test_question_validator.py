@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+問題バリデーターのテスト
+
+契約による設計（Design by Contract）に基づく単体テスト
+"""
+
+from typing import Any
+
+from app.agentcore.exam_guide_index import load_exam_guide_index
+from app.agentcore.question_validator import validate_question, validate_questions
+from app.agentcore.service_catalog import get_service_catalog
+
+
+def valid_question(**overrides: Any) -> dict[str, Any]:
+    """検証に合格する問題"""
+    question = {
+        "question": "最適な構成はどれか。",
+        "options": [
+            "**A.** SCPを設定する",
+            "**B.** IAMポリシーを設定する",
+            "**C.** AWS Configを設定する",
+            "**D.** 何もしない",
+        ],
+        "correct_answer": "A",
+        "explanation": "解説",
+        "source": ["https://docs.aws.amazon.com/organizations/"],
+        "learning_domain": "複雑な組織に対応するソリューションの設計",
+        "primary_technologies": ["AWS Organizations"],
+        "learning_insights": "学習ポイント",
+    }
+    question.update(overrides)
+    return question
+
+
+class TestValidateQuestion:
+    """validate_question の契約検証"""
+
+    def test_valid_question_passes_contract(self) -> None:
+        """
+        事前条件: すべてのルールを満たす問題
+        事後条件: 違反は空
+        """
+        guide = load_exam_guide_index("AWS-SAP")
+
+        assert validate_question(valid_question(), guide) == []
+
+    def test_detects_each_rule_violation_contract(self) -> None:
+        """
+        事前条件: 各ルールに違反した問題
+        事後条件: 違反したフィールドが報告される
+        """
+        guide = load_exam_guide_index("AWS-SAP")
+        cases = {
+            "options": valid_question(options=["**A.** 1", "**B.** 2", "**C.** 3"]),
+            "correct_answer": valid_question(correct_answer="B. IAMポリシー"),
+            "source": valid_question(source=[]),
+            "learning_domain": valid_question(learning_domain="セキュリティの設計"),
+        }
+
+        for field, question in cases.items():
+            issues = validate_question(question, guide)
+            assert [issue.field for issue in issues] == [field], field
+
+    def test_option_labels_must_be_sequential_contract(self) -> None:
+        """
+        事前条件: ラベルの書式・順序が崩れた選択肢、選択肢にない正解
+        事後条件: 崩れた選択肢と正解の不一致が報告される
+        """
+        question = valid_question(
+            options=["**A.** 1", "B. 2", "**D.** 3", "**D.** 4"],
+            correct_answer="E",
+        )
+
+        issues = validate_question(question)
+
+        assert [issue.field for issue in issues] == [
+            "options",
+            "options",
+            "correct_answer",
+        ]
+
+    def test_out_of_scope_service_is_flagged_contract(self) -> None:
+        """
+        事前条件: primary_technologies に範囲外サービスと未知の表記を含む
+        事後条件: 範囲外サービスのみが違反として報告される
+        """
+        question = valid_question(
+            primary_technologies=["Amazon GameLift", "独自の概念", "AWS Lambda"]
+        )
+
+        issues = validate_question(question, None, get_service_catalog("AWS-SAP"))
+
+        assert [str(issue) for issue in issues] == [
+            "primary_technologies: 試験範囲外のサービスです: Amazon GameLift"
+        ]
+
+    def test_learning_domain_skipped_without_guide_contract(self) -> None:
+        """
+        事前条件: 試験ガイドの索引がない
+        不変条件: 学習分野は検証しない
+        """
+        assert validate_question(valid_question(learning_domain="任意の分野")) == []
+
+
+class TestValidateQuestions:
+    """validate_questions の契約検証"""
+
+    def test_reports_only_failing_positions_contract(self) -> None:
+        """
+        事前条件: 合格・不合格の問題が混在する
+        事後条件: 不合格の問題の位置のみが返される
+        """
+        failures = validate_questions(
+            [
+                valid_question(),
+                valid_question(source=["ftp://example"]),
+                valid_question(),
+            ]
+        )
+
+        assert list(failures) == [1]
+        assert failures[1][0].field == "source"
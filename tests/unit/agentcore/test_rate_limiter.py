@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+rate_limiter のテスト
+
+契約による設計（Design by Contract）に基づく単体テスト
+"""
+
+import time
+
+import pytest
+
+from app.agentcore.rate_limiter import (
+    DEFAULT_BURST,
+    DEFAULT_RATE_PER_SECOND,
+    RateLimiterRegistry,
+    TokenBucket,
+)
+
+
+class FakeClock:
+    """テスト用の手動時計"""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTokenBucket:
+    """TokenBucket の契約検証"""
+
+    def test_burst_then_rate_limited_contract(self) -> None:
+        """
+        事前条件: rate=2/秒, burst=3 のバケット
+        事後条件: バースト分は即時、以降は 1/rate 秒ずつ待機が積み上がる
+        不変条件: 待機統計が予約結果と一致する
+        """
+        # Arrange
+        clock = FakeClock()
+        bucket = TokenBucket(rate_per_second=2.0, burst=3, clock=clock)
+
+        # Act
+        waits = [bucket.reserve() for _ in range(5)]
+
+        # Assert - 事後条件検証
+        assert waits == [0.0, 0.0, 0.0, 0.5, 1.0]
+
+        # 不変条件検証
+        assert bucket.stats.acquired == 5
+        assert bucket.stats.waited == 2
+        assert bucket.stats.total_wait_seconds == pytest.approx(1.5)
+        assert bucket.stats.max_wait_seconds == pytest.approx(1.0)
+
+    def test_refill_over_time_contract(self) -> None:
+        """
+        事前条件: バーストを使い切ったバケット
+        事後条件: 時間経過で補充され、容量（burst）を超えては貯まらない
+        """
+        # Arrange
+        clock = FakeClock()
+        bucket = TokenBucket(rate_per_second=1.0, burst=2, clock=clock)
+        bucket.reserve()
+        bucket.reserve()
+
+        # Act - 十分な時間経過
+        clock.now = 100.0
+        waits = [bucket.reserve() for _ in range(3)]
+
+        # Assert
+        assert waits == [0.0, 0.0, 1.0]
+
+    def test_invalid_configuration_precondition(self) -> None:
+        """
+        事前条件: 0以下のレート、または1未満のバースト
+        事後条件: ValueError が発生する
+        """
+        with pytest.raises(ValueError):
+            TokenBucket(rate_per_second=0, burst=1)
+        with pytest.raises(ValueError):
+            TokenBucket(rate_per_second=1.0, burst=0)
+
+    async def test_acquire_waits_for_token_contract(self) -> None:
+        """
+        事前条件: burst=1 のバケットでトークンを使い切った状態
+        事後条件: acquire は補充まで実際に待機し、待機秒数を返す
+        """
+        # Arrange
+        bucket = TokenBucket(rate_per_second=20.0, burst=1)
+        await bucket.acquire()
+
+        # Act
+        start = time.monotonic()
+        waited = await bucket.acquire()
+        elapsed = time.monotonic() - start
+
+        # Assert
+        assert waited > 0
+        assert elapsed >= waited * 0.9
+
+
+class TestRateLimiterRegistry:
+    """RateLimiterRegistry の契約検証"""
+
+    def test_per_host_buckets_contract(self) -> None:
+        """
+        事前条件: ホスト個別設定と既定設定
+        事後条件: ホストごとに独立したバケットが設定値で生成される
+        不変条件: 同一ホストには同一のバケットが返される
+        """
+        # Arrange
+        registry = RateLimiterRegistry(
+            default_rate_per_second=1.0,
+            default_burst=5,
+            host_limits={"slow.example.com": {"rate": 0.5, "burst": 1}},
+        )
+
+        # Act
+        slow = registry.get("slow.example.com")
+        default = registry.get("other.example.com")
+
+        # Assert - 事後条件検証
+        assert (slow.rate_per_second, slow.burst) == (0.5, 1)
+        assert (default.rate_per_second, default.burst) == (1.0, 5)
+
+        # 不変条件検証
+        assert registry.get("slow.example.com") is slow
+
+    async def test_acquire_by_url_records_stats_contract(self) -> None:
+        """
+        事前条件: Webhook URL（パス・クエリ付き）
+        事後条件: ホスト単位で統計が記録され、snapshot で取得できる
+        """
+        # Arrange
+        registry = RateLimiterRegistry()
+        registry.configure("hooks.example.com", rate_per_second=100.0, burst=1)
+
+        # Act
+        await registry.acquire("https://hooks.example.com/workflows/1?sig=x")
+        await registry.acquire("https://hooks.example.com/workflows/2?sig=y")
+
+        # Assert
+        stats = registry.snapshot()["hooks.example.com"]
+        assert stats["acquired"] == 2
+        assert stats["waited"] == 1
+        assert stats["total_wait_seconds"] > 0
+
+    def test_from_env_contract(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """
+        事前条件: レート制限の環境変数が設定されている
+        事後条件: 環境変数の値で既定値・ホスト個別設定が構成される
+        """
+        # Arrange
+        monkeypatch.setenv("TEAMS_RATE_LIMIT_PER_SECOND", "3")
+        monkeypatch.setenv("TEAMS_RATE_LIMIT_BURST", "7")
+        monkeypatch.setenv("TEAMS_RATE_LIMITS", '{"a.example.com": {"rate": 9}}')
+
+        # Act
+        registry = RateLimiterRegistry.from_env()
+
+        # Assert
+        assert registry.get("b.example.com").rate_per_second == 3.0
+        assert registry.get("b.example.com").burst == 7
+        assert registry.get("a.example.com").rate_per_second == 9.0
+
+    def test_from_env_invalid_values_fall_back_to_defaults_contract(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """
+        事前条件: レート制限の環境変数が数値でない・範囲外、ホスト個別設定が不正
+        事後条件: 例外を発生させず、既定値で構成される
+        """
+        # Arrange
+        monkeypatch.setenv("TEAMS_RATE_LIMIT_PER_SECOND", "fast")
+        monkeypatch.setenv("TEAMS_RATE_LIMIT_BURST", "0")
+        monkeypatch.setenv("TEAMS_RATE_LIMITS", '{"a.example.com": {"rate": "x"}}')
+
+        # Act
+        registry = RateLimiterRegistry.from_env()
+
+        # Assert
+        assert registry.get("b.example.com").rate_per_second == DEFAULT_RATE_PER_SECOND
+        assert registry.get("b.example.com").burst == DEFAULT_BURST
+        assert registry.get("a.example.com").rate_per_second == DEFAULT_RATE_PER_SECOND
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+RunTracker のテスト
+
+契約による設計（Design by Contract）に基づく単体テスト
+"""
+
+import asyncio
+from typing import Any
+
+from app.agentcore.run_tracker import RunTracker
+
+
+class TestRunTracker:
+    """RunTracker の契約検証"""
+
+    async def test_start_returns_before_completion_contract(self) -> None:
+        """
+        事前条件: 生成処理が完了までに時間を要する
+        事後条件: start は完了を待たずに記録を返し、完了後は succeeded になる
+        不変条件: 生成結果は保持せず問題数のみを記録する
+        """
+        # Arrange - 事前条件設定
+        release = asyncio.Event()
+
+        async def work() -> dict[str, Any]:
+            await release.wait()
+            return {"questions": [{"question": "Q1"}, {"question": "Q2"}]}
+
+        tracker = RunTracker()
+
+        # Act
+        record = tracker.start("run-1", work)
+        await asyncio.sleep(0)
+
+        # Assert - 事後条件検証: 完了前に記録が返る
+        assert record.status == "running"
+        assert tracker.active == 1
+
+        release.set()
+        await tracker.wait(timeout=1.0)
+        assert record.status == "succeeded"
+        assert record.question_count == 2
+        assert record.completed_at is not None
+        assert tracker.active == 0
+        assert "questions" not in record.to_dict()
+
+    async def test_duplicate_run_id_is_not_started_twice_contract(self) -> None:
+        """
+        事前条件: 同じ run_id で2回 start する（スケジューラーのリトライを模擬）
+        事後条件: 2回目は既存の記録が返る
+        不変条件: 生成処理は1回のみ実行される
+        """
+        # Arrange - 事前条件設定
+        calls: list[int] = []
+
+        async def work() -> dict[str, Any]:
+            calls.append(1)
+            return {"questions": []}
+
+        tracker = RunTracker()
+
+        # Act
+        first = tracker.start("run-dup", work)
+        second = tracker.start("run-dup", work)
+        await tracker.wait(timeout=1.0)
+
+        # Assert
+        assert second is first
+        assert calls == [1]
+
+    async def test_failure_is_recorded_and_retryable_contract(self) -> None:
+        """
+        事前条件: 生成処理がエラー情報を返す、または例外を発生させる
+        事後条件: 記録が failed になりエラー内容が保持される
+        不変条件: 失敗した run_id は再実行できる
+        """
+
+        # Arrange - 事前条件設定
+        async def error_result() -> dict[str, Any]:
+            return {"error": "生成失敗"}
+
+        async def raises() -> dict[str, Any]:
+            raise RuntimeError("例外発生")
+
+        async def succeeds() -> dict[str, Any]:
+            return {"questions": [{}]}
+
+        tracker = RunTracker()
+
+        # Act & Assert - エラー情報
+        record = tracker.start("run-a", error_result)
+        await tracker.wait(timeout=1.0)
+        assert record.status == "failed"
+        assert record.error == "生成失敗"
+
+        # Act & Assert - 例外
+        record = tracker.start("run-b", raises)
+        await tracker.wait(timeout=1.0)
+        assert record.status == "failed"
+        assert record.error == "例外発生"
+
+        # 不変条件検証: 失敗した run_id は再実行できる
+        retried = tracker.start("run-b", succeeds)
+        await tracker.wait(timeout=1.0)
+        assert retried is not record
+        assert retried.status == "succeeded"
+        assert tracker.get("run-b") is retried
+
+    async def test_completed_records_are_evicted_contract(self) -> None:
+        """
+        事前条件: 保持上限を超える件数を実行する
+        事後条件: 古い完了済みの記録から破棄される
+        不変条件: 保持件数は上限を超えない
+        """
+
+        # Arrange - 事前条件設定
+        async def work() -> dict[str, Any]:
+            return {"questions": []}
+
+        tracker = RunTracker(max_tracked_runs=2)
+
+        # Act
+        for i in range(4):
+            tracker.start(f"run-{i}", work)
+            await tracker.wait(timeout=1.0)
+
+        # Assert
+        assert tracker.get("run-0") is None
+        assert tracker.get("run-1") is None
+        assert tracker.get("run-3") is not None
+
+    async def test_in_progress_reply_is_recorded_as_duplicate_contract(self) -> None:
+        """
+        事前条件: 同じ実行キーの生成が別の実行で進行中（冪等性ストアの in_progress 応答）
+        事後条件: 記録は succeeded ではなく duplicate になり、問題数は記録されない
+        """
+
+        # Arrange
+        async def in_progress() -> dict[str, Any]:
+            return {"run_key": "run-key-1", "status": "in_progress"}
+
+        tracker = RunTracker()
+
+        # Act
+        record = tracker.start("run-dup-key", in_progress)
+        await tracker.wait(timeout=1.0)
+
+        # Assert
+        assert record.status == "duplicate"
+        assert record.question_count == 0
+        assert record.error is None
+
+    async def test_wait_on_tasks_of_another_loop_contract(self) -> None:
+        """
+        事前条件: 実行が別スレッドのイベントループ上で動作している（AgentCore のワーカーループ）
+        事後条件: wait は実行の完了で戻り、タイムアウトまで待たない
+        """
+        # Arrange
+        import threading
+        import time
+
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+
+        async def work() -> dict[str, Any]:
+            await asyncio.sleep(0.1)
+            return {"questions": [{}]}
+
+        tracker = RunTracker()
+
+        async def start() -> None:
+            tracker.start("run-other-loop", work)
+
+        asyncio.run_coroutine_threadsafe(start(), loop).result(timeout=1.0)
+
+        try:
+            # Act
+            started = time.monotonic()
+            await tracker.wait(timeout=3.0)
+            elapsed = time.monotonic() - started
+
+            # Assert
+            assert elapsed < 1.0
+            record = tracker.get("run-other-loop")
+            assert record is not None and record.status == "succeeded"
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout=1.0)
+            loop.close()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+サービスカタログのテスト
+
+契約による設計（Design by Contract）に基づく単体テスト
+"""
+
+import pytest
+
+from app.agentcore.service_catalog import get_service_catalog, service_aliases
+
+
+class TestServiceAliases:
+    """service_aliases の契約検証"""
+
+    def test_generates_prefix_and_abbreviation_aliases_contract(self) -> None:
+        """
+        事前条件: 括弧内に略称を持つ正式名
+        事後条件: 接頭辞なし・略称・略称の接頭辞なしが別名に含まれる
+        不変条件: 略称でない括弧書き（注記）は別名にしない
+        """
+        aliases = service_aliases(
+            "Amazon Managed Streaming for Apache Kafka (Amazon MSK)"
+        )
+
+        assert {"Managed Streaming for Apache Kafka", "Amazon MSK", "MSK"} <= aliases
+        assert service_aliases("Amazon DocumentDB (MongoDB 互換)") == {
+            "Amazon DocumentDB (MongoDB 互換)",
+            "Amazon DocumentDB",
+            "DocumentDB",
+        }
+        assert "Amazon SageMaker" in service_aliases(
+            "Amazon SageMaker AI (旧名 Amazon SageMaker)"
+        )
+
+
+class TestServiceCatalog:
+    """ServiceCatalog の契約検証"""
+
+    @pytest.mark.parametrize(
+        ("text", "name"),
+        [
+            ("AWS Organizations", "AWS Organizations"),
+            ("Organizations", "AWS Organizations"),
+            ("MSK", "Amazon Managed Streaming for Apache Kafka (Amazon MSK)"),
+            ("Amazon S3 Glacier", "Amazon S3 Glacier"),
+            ("S3 バケット", "Amazon Simple Storage Service (Amazon S3)"),
+            ("VPC ピアリング", "Amazon Virtual Private Cloud (Amazon VPC)"),
+            ("Route 53 Resolver", "Amazon Route 53"),
+            ("ＥＣ２ Auto Scaling", "Amazon EC2 Auto Scaling"),
+            ("IAM Identity Center", "AWS IAM アイデンティティセンター"),
+        ],
+    )
+    def test_resolves_aliases_to_canonical_entry_contract(
+        self, text: str, name: str
+    ) -> None:
+        """
+        事前条件: 正式名・略称・接頭辞なし・機能名付き・全角の表記
+        事後条件: 最長一致で正式名のカタログ項目に解決される
+        """
+        catalog = get_service_catalog("AWS-SAP")
+
+        entry = catalog.resolve(text)
+
+        assert entry is not None
+        assert entry.name == name
+        assert entry.in_scope
+
+    def test_flags_out_of_scope_and_unknown_contract(self) -> None:
+        """
+        事前条件: 範囲外サービス・誤記・別単語の一部を含む一覧
+        事後条件: 範囲外・未知として区別される
+        """
+        catalog = get_service_catalog("AWS-SAP")
+
+        statuses = [
+            resolution.status
+            for resolution in catalog.check(
+                ["Amazon GameLift", "AWS Lamda", "S3bucket", "AWS Lambda"]
+            )
+        ]
+
+        assert statuses == ["out_of_scope", "unknown", "unknown", "in_scope"]
+
+    def test_coverage_counts_per_question_contract(self) -> None:
+        """
+        事前条件: 1問の中で同じサービスを別表記で挙げた問題を含む
+        事後条件: サービスは1問につき1回だけ数えられる
+        """
+        catalog = get_service_catalog("AWS-SAP")
+
+        counts = catalog.coverage_counts(
+            [["Amazon S3", "S3"], ["S3 Glacier", "AWS Lambda"], ["未知の技術"]]
+        )
+
+        assert counts == {
+            "Amazon Simple Storage Service (Amazon S3)": 1,
+            "Amazon S3 Glacier": 1,
+            "AWS Lambda": 1,
+        }
+
+    def test_entries_have_stable_ids_contract(self) -> None:
+        """
+        不変条件: カタログ項目のIDは出現順の連番（カバレッジのビット位置に使う）
+        """
+        catalog = get_service_catalog("AWS-SAP")
+
+        assert [entry.id for entry in catalog.entries] == list(
+            range(len(catalog.entries))
+        )
+        assert catalog.entries[-1].name == "Amazon GameLift"
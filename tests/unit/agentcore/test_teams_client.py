@@ -5,6 +5,7 @@ AgentOutputをPower Automate Webhookに送信するTeamsClientの
 例外ベースアプローチに基づく契約検証テスト実装。
 """
 
+from collections.abc import Generator
 from typing import Any
 from unittest.mock import AsyncMock, MagicMock, patch
 
@@ -13,6 +14,7 @@ import pytest
 from dotenv import load_dotenv
 
 from app.agentcore.agent_main import AgentOutput, Question
+from app.agentcore.rate_limiter import RateLimiterRegistry
 from app.agentcore.teams_client import TeamsClient
 
 # .envファイルを読み込み
@@ -22,6 +24,13 @@ load_dotenv()
 class TestTeamsClient:
     """TeamsClient の契約検証（例外ベースアプローチ）"""
 
+    @pytest.fixture(autouse=True)
+    def rate_limiters(self) -> Generator[RateLimiterRegistry, None, None]:
+        """テストごとに独立した（実質無制限の）レートリミッターを使用"""
+        registry = RateLimiterRegistry(default_rate_per_second=1000, default_burst=100)
+        with patch("app.agentcore.teams_client.rate_limiters", registry):
+            yield registry
+
     @patch.dict(
         "os.environ",
         {
@@ -383,3 +392,239 @@ class TestTeamsClient:
             call_args = mock_client.return_value.__aenter__.return_value.post.call_args
             assert "json" in call_args.kwargs
             assert call_args.kwargs["json"] == captured_payload
+
+    @patch.dict(
+        "os.environ",
+        {
+            "POWER_AUTOMATE_WEBHOOK_URL": "https://test.webhook.url",
+            "POWER_AUTOMATE_SECURITY_TOKEN": "test-security-token",
+        },
+    )
+    @pytest.mark.asyncio
+    async def test_rendered_cards_payload_contract(self) -> None:
+        """
+        契約による設計: カード描画モードのペイロード検証
+
+        Given: render_cards=True のTeamsClientと複数問題を含むAgentOutput
+        When: send()メソッドを実行する
+        Then: 問題ごとに描画済みの Adaptive Card が送信される
+
+        事前条件: render_cards=True
+        事後条件: ペイロードに問題数分の cards が含まれる
+        不変条件: セキュリティトークンが含まれ、Power Automate 式は残らない
+        """
+        # Given - 事前条件設定
+        client = TeamsClient(render_cards=True)
+        agent_output = AgentOutput(
+            questions=[
+                Question(
+                    question=f"カード描画テスト問題{i + 1}",
+                    options=["**A.** 選択肢1", "**B.** 選択肢2"],
+                    correct_answer="A",
+                    explanation="解説",
+                    source=["https://docs.aws.amazon.com/test/"],
+                    learning_domain="テスト分野",
+                    primary_technologies=["テスト技術"],
+                    learning_insights="テストガイド参照",
+                )
+                for i in range(2)
+            ]
+        )
+        mock_response = MagicMock()
+        mock_response.status_code = 202
+
+        with patch("httpx.AsyncClient") as mock_client:
+            mock_post = AsyncMock(return_value=mock_response)
+            mock_client.return_value.__aenter__.return_value.post = mock_post
+
+            # When - ペイロード送信
+            await client.send(agent_output)
+
+        # Then - 事後条件検証
+        payload = mock_post.call_args.kwargs["json"]
+        assert payload["security_token"] == "test-security-token"
+        assert len(payload["cards"]) == 2
+        assert payload["cards"][0]["type"] == "AdaptiveCard"
+
+        # 不変条件検証
+        assert "questions" not in payload
+        assert "@{" not in str(payload["cards"])
+        assert "カード描画テスト問題2" in str(payload["cards"][1])
+
+    @patch.dict(
+        "os.environ",
+        {
+            "POWER_AUTOMATE_WEBHOOK_URL": "https://test.webhook.url",
+            "POWER_AUTOMATE_SECURITY_TOKEN": "test-security-token",
+        },
+    )
+    @pytest.mark.asyncio
+    async def test_payload_split_by_byte_limit_contract(self) -> None:
+        """
+        契約による設計: サイズ上限による分割送信の検証
+
+        Given: 1ポストに収まらないサイズ上限を設定したTeamsClient
+        When: send()メソッドを実行する
+        Then: 問題が複数ポストに分割されて順に送信される
+
+        事前条件: max_payload_bytes が1問分より少し大きい
+        事後条件: 問題数分のポストが送信される
+        不変条件: 各ポストにセキュリティトークンが含まれ、問題の順序が保持される
+        """
+        # Given - 事前条件設定
+        client = TeamsClient(max_payload_bytes=1500)
+        agent_output = AgentOutput(
+            questions=[
+                Question(
+                    question=f"分割テスト問題{i + 1}",
+                    options=["A. 選択肢1", "B. 選択肢2", "C. 選択肢3", "D. 選択肢4"],
+                    correct_answer="A",
+                    explanation="解説" * 150,
+                    source=["https://docs.aws.amazon.com/test/"],
+                    learning_domain="テスト分野",
+                    primary_technologies=["テスト技術"],
+                    learning_insights="テストガイド参照",
+                )
+                for i in range(3)
+            ]
+        )
+        mock_response = MagicMock()
+        mock_response.status_code = 202
+
+        with patch("httpx.AsyncClient") as mock_client:
+            mock_post = AsyncMock(return_value=mock_response)
+            mock_client.return_value.__aenter__.return_value.post = mock_post
+
+            # When - ペイロード送信
+            await client.send(agent_output)
+
+        # Then - 事後条件検証
+        assert mock_post.call_count == 3
+        payloads = [call.kwargs["json"] for call in mock_post.call_args_list]
+
+        # 不変条件検証
+        assert all(p["security_token"] == "test-security-token" for p in payloads)
+        assert [p["questions"][0]["question"] for p in payloads] == [
+            "分割テスト問題1",
+            "分割テスト問題2",
+            "分割テスト問題3",
+        ]
+
+    @patch.dict(
+        "os.environ",
+        {
+            "POWER_AUTOMATE_WEBHOOK_URL": "https://test.webhook.url/workflows/1",
+            "POWER_AUTOMATE_SECURITY_TOKEN": "test-security-token",
+        },
+    )
+    @pytest.mark.asyncio
+    async def test_rate_limiter_consulted_per_post_contract(
+        self, rate_limiters: RateLimiterRegistry
+    ) -> None:
+        """
+        契約による設計: 送信ごとのレートリミッター参照の検証
+
+        Given: 2ポストに分割されるAgentOutput
+        When: send()メソッドを実行する
+        Then: Webhook ホストのトークンバケットがポストごとに参照される
+
+        事前条件: max_payload_bytes により2ポストに分割される
+        事後条件: ホスト単位の取得回数がポスト数と一致する
+        不変条件: 統計はホスト（パスを除く）単位で集計される
+        """
+        # Given - 事前条件設定
+        client = TeamsClient(max_payload_bytes=1500)
+        agent_output = AgentOutput(
+            questions=[
+                Question(
+                    question=f"レート制限テスト問題{i + 1}",
+                    options=["A. 選択肢1", "B. 選択肢2", "C. 選択肢3", "D. 選択肢4"],
+                    correct_answer="A",
+                    explanation="解説" * 150,
+                    source=["https://docs.aws.amazon.com/test/"],
+                    learning_domain="テスト分野",
+                    primary_technologies=["テスト技術"],
+                    learning_insights="テストガイド参照",
+                )
+                for i in range(2)
+            ]
+        )
+        mock_response = MagicMock()
+        mock_response.status_code = 202
+
+        with patch("httpx.AsyncClient") as mock_client:
+            mock_client.return_value.__aenter__.return_value.post = AsyncMock(
+                return_value=mock_response
+            )
+
+            # When - ペイロード送信
+            await client.send(agent_output)
+
+        # Then - 事後条件検証
+        stats = rate_limiters.snapshot()
+        assert stats["test.webhook.url"]["acquired"] == 2
+
+        # 不変条件検証
+        assert list(stats) == ["test.webhook.url"]
+
+    @patch.dict(
+        "os.environ",
+        {
+            "POWER_AUTOMATE_WEBHOOK_URL": "https://test.webhook.url",
+            "POWER_AUTOMATE_SECURITY_TOKEN": "test-security-token",
+        },
+    )
+    @pytest.mark.asyncio
+    async def test_send_records_span_contract(self, span_exporter: Any) -> None:
+        """
+        契約による設計: Teams 投稿のスパン
+
+        Given: インメモリエクスポーターを設定した TracerProvider
+        When: send()メソッドを実行する（1回は HTTP エラー）
+        Then: teams.send スパンに問題数・ポスト数・HTTPステータスが記録され、失敗はエラーになる
+        """
+        # Given
+        from opentelemetry.trace import StatusCode
+
+        client = TeamsClient()
+        agent_output = AgentOutput(
+            questions=[
+                Question(
+                    question="スパンテスト問題",
+                    options=["A. 選択肢1", "B. 選択肢2"],
+                    correct_answer="A",
+                    explanation="解説",
+                    source=[],
+                    learning_domain="テスト分野",
+                    primary_technologies=["テスト技術"],
+                    learning_insights="テストガイド参照",
+                )
+            ]
+        )
+        ok_response = MagicMock()
+        ok_response.status_code = 202
+        error_response = MagicMock()
+        error_response.status_code = 500
+        error_response.text = "Internal Server Error"
+        error_response.raise_for_status.side_effect = httpx.HTTPStatusError(
+            "HTTP Error", request=MagicMock(), response=error_response
+        )
+
+        # When
+        with patch("httpx.AsyncClient") as mock_client:
+            mock_client.return_value.__aenter__.return_value.post = AsyncMock(
+                side_effect=[ok_response, error_response]
+            )
+            await client.send(agent_output)
+            with pytest.raises(httpx.HTTPStatusError):
+                await client.send(agent_output)
+
+        # Then
+        succeeded, failed = span_exporter.get_finished_spans()
+        assert succeeded.name == "teams.send"
+        assert succeeded.attributes["question_count"] == 1
+        assert succeeded.attributes["teams.posts"] == 1
+        assert succeeded.attributes["http.response.status_code"] == 202
+        assert succeeded.status.status_code == StatusCode.UNSET
+        assert failed.attributes["http.response.status_code"] == 500
+        assert failed.status.status_code == StatusCode.ERROR
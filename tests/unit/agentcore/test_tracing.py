@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+tracing のテスト
+
+契約による設計（Design by Contract）に基づく単体テスト
+"""
+
+import pytest
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter,
+)
+from opentelemetry.trace import StatusCode
+
+from app.agentcore.tracing import record_error, remote_parent, set_attributes, span
+
+# 呼び出し元のトレースコンテキスト（W3C traceparent）
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_SPAN_ID = "00f067aa0ba902b7"
+CARRIER = {"traceparent": f"00-{TRACE_ID}-{PARENT_SPAN_ID}-01"}
+
+
+class TestSpan:
+    """スパンの契約検証"""
+
+    def test_span_records_attributes_contract(
+        self, span_exporter: InMemorySpanExporter
+    ) -> None:
+        """
+        事前条件: インメモリエクスポーターを設定
+        事後条件: 入れ子のスパンが親子関係と属性（None を除く）付きで記録される
+        """
+        # Act
+        with span("outer", {"exam_type": "AWS-SAP", "unused": None}):
+            with span("inner"):
+                set_attributes({"tokens.input": 120, "cache.hit_ratio": None})
+
+        # Assert
+        inner, outer = span_exporter.get_finished_spans()
+        assert outer.name == "outer"
+        assert dict(outer.attributes or {}) == {"exam_type": "AWS-SAP"}
+        assert dict(inner.attributes or {}) == {"tokens.input": 120}
+        assert inner.parent is not None
+        assert inner.parent.span_id == outer.context.span_id
+
+    def test_errors_are_recorded_contract(
+        self, span_exporter: InMemorySpanExporter
+    ) -> None:
+        """
+        事前条件: スパン内で例外を送出・処理継続する失敗を記録
+        事後条件: どちらのスパンもエラーになり、例外のイベントが記録される
+        不変条件: 送出された例外はそのまま呼び出し元に伝わる
+        """
+        # Act
+        with pytest.raises(RuntimeError):
+            with span("raised"):
+                raise RuntimeError("失敗")
+        with span("handled"):
+            record_error(ValueError("処理継続"))
+
+        # Assert
+        raised, handled = span_exporter.get_finished_spans()
+        assert raised.status.status_code == StatusCode.ERROR
+        assert handled.status.status_code == StatusCode.ERROR
+        assert handled.events[0].name == "exception"
+
+    def test_remote_parent_contract(self, span_exporter: InMemorySpanExporter) -> None:
+        """
+        事前条件: 呼び出し元の traceparent を含む carrier
+        事後条件: スコープ内のスパンは呼び出し元のトレースに属し、スコープ外は新しいトレースになる
+        """
+        # Act
+        with remote_parent(CARRIER):
+            with span("child"):
+                pass
+        with remote_parent(None):
+            with span("root"):
+                pass
+
+        # Assert
+        child, root = span_exporter.get_finished_spans()
+        assert format(child.context.trace_id, "032x") == TRACE_ID
+        assert child.parent is not None
+        assert format(child.parent.span_id, "016x") == PARENT_SPAN_ID
+        assert child.parent.is_remote
+        assert format(root.context.trace_id, "032x") != TRACE_ID
+        assert root.parent is None
+
+    def test_without_tracer_provider_contract(self) -> None:
+        """
+        事前条件: TracerProvider が設定されていない
+        事後条件: スパン操作は何も記録せず、例外も発生しない
+        """
+        with remote_parent(CARRIER), span("noop", {"exam_type": "AWS-SAP"}):
+            set_attributes({"tokens.input": 1})
+            record_error(ValueError("記録されない"))
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+負荷テストコマンド（app/load_test.py）のテスト
+
+契約による設計（Design by Contract）に基づく単体テスト
+"""
+
+from app.load_test import main, parse_args, percentile
+
+
+class TestPercentile:
+    """percentile 関数の契約検証"""
+
+    def test_nearest_rank_contract(self) -> None:
+        """
+        事前条件: 1〜100 のソート済みリスト
+        事後条件: nearest-rank 法のパーセンタイルが返される
+        不変条件: 空リストは 0.0
+        """
+        values = [float(v) for v in range(1, 101)]
+
+        assert percentile(values, 50) == 50.0
+        assert percentile(values, 95) == 95.0
+        assert percentile(values, 99) == 99.0
+        assert percentile([], 50) == 0.0
+
+
+class TestRunLoadTest:
+    """負荷テスト実行の契約検証"""
+
+    async def test_load_test_against_stub_contract(self) -> None:
+        """
+        事前条件: エラー率 100% ではない通常のスタブ設定
+        事後条件: 全送信が成功し、p50 <= p95 <= p99 のレイテンシが報告される
+        不変条件: サーバーの受信件数と送信件数が一致する
+        """
+        # Arrange
+        args = parse_args(["--rate", "200", "--requests", "10", "--latency-ms", "5"])
+
+        # Act
+        report = await main(args)
+
+        # Assert - 事後条件検証
+        assert report.requests == 10
+        assert report.succeeded == 10
+        assert report.failed == 0
+        assert 0 < report.latency_ms["p50"] <= report.latency_ms["p95"]
+        assert report.latency_ms["p95"] <= report.latency_ms["p99"]
+
+        # 不変条件検証
+        assert report.server["requests"] == 10
+
+    async def test_errors_counted_by_status_contract(self) -> None:
+        """
+        事前条件: エラー率 100% のスタブ設定
+        事後条件: 全送信が失敗し、HTTP ステータス別に集計される
+        """
+        # Arrange
+        args = parse_args(["--rate", "200", "--requests", "5", "--error-rate", "1"])
+
+        # Act
+        report = await main(args)
+
+        # Assert
+        assert report.failed == 5
+        assert report.errors == {"HTTP 500": 5}
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+WebhookStubServer のテスト
+
+契約による設計（Design by Contract）に基づく単体テスト
+"""
+
+import time
+
+import httpx
+
+from app.webhook_stub import StubBehavior, WebhookStubServer
+
+
+class TestWebhookStubServer:
+    """WebhookStubServer の契約検証"""
+
+    async def test_records_request_bodies_contract(self) -> None:
+        """
+        事前条件: 既定の挙動（遅延・エラーなし）のスタブサーバー
+        事後条件: 202 が返され、受信した JSON ボディが記録される
+        不変条件: 統計の件数が受信件数と一致する
+        """
+        # Arrange
+        async with WebhookStubServer() as server:
+            async with httpx.AsyncClient() as client:
+                # Act
+                response = await client.post(server.url, json={"questions": [1, 2]})
+
+        # Assert - 事後条件検証
+        assert response.status_code == 202
+        assert server.received == [{"questions": [1, 2]}]
+
+        # 不変条件検証
+        assert server.stats.requests == 1
+        assert server.stats.accepted == 1
+
+    async def test_latency_and_error_rate_contract(self) -> None:
+        """
+        事前条件: 遅延 50ms、エラー率 100% の設定
+        事後条件: 遅延後に 500 が返され、エラーとして計上される
+        """
+        # Arrange
+        behavior = StubBehavior(latency_ms=50, error_rate=1.0)
+        async with WebhookStubServer(behavior=behavior) as server:
+            async with httpx.AsyncClient() as client:
+                # Act
+                start = time.perf_counter()
+                response = await client.post(server.url, json={})
+                elapsed_ms = (time.perf_counter() - start) * 1000
+
+        # Assert
+        assert response.status_code == 500
+        assert elapsed_ms >= 45
+        assert server.stats.errors == 1
+
+    async def test_throttling_returns_429_contract(self) -> None:
+        """
+        事前条件: 1秒あたり2件までのスロットリング設定
+        事後条件: 3件目以降は 429 と Retry-After ヘッダーが返される
+        不変条件: 受理件数は上限を超えない
+        """
+        # Arrange
+        behavior = StubBehavior(throttle_rps=2, retry_after_seconds=3)
+        async with WebhookStubServer(behavior=behavior) as server:
+            async with httpx.AsyncClient() as client:
+                # Act
+                responses = [
+                    await client.post(server.url, json={"n": i}) for i in range(4)
+                ]
+
+        # Assert - 事後条件検証
+        assert [r.status_code for r in responses] == [202, 202, 429, 429]
+        assert responses[2].headers["Retry-After"] == "3"
+
+        # 不変条件検証
+        assert server.stats.accepted == 2
+        assert server.stats.throttled == 2
@@ -11,13 +11,24 @@ EventBridge SchedulerからAgentCore Runtimeを呼び出すLambda関数の
 """
 
 import json
+import threading
+import time
 from typing import Any
 from unittest.mock import Mock, patch
 
 import pytest
 
 # テスト対象のインポート - 構造変更によりシンプルなインポートが可能に
-from app.trigger.lambda_function import lambda_handler
+from app.trigger import lambda_function
+from app.trigger.lambda_function import AGENTCORE_CLIENT_SETTINGS, lambda_handler
+
+
+@pytest.fixture(autouse=True)
+def reset_agentcore_client() -> Any:
+    """ウォームスタート間で共有されるクライアントをテストごとに破棄"""
+    lambda_function._agentcore_client = None
+    yield
+    lambda_function._agentcore_client = None
 
 
 class TestLambdaHandler:
@@ -61,14 +72,16 @@ class TestLambdaHandler:
         mock_context.request_id = "test-request-id-12345"
 
         # When - lambda_handler()を実行（Bedrockクライアントをモック）
-        with patch("boto3.client") as mock_boto_client:
+        with patch(
+            "app.trigger.lambda_function.create_agentcore_client"
+        ) as mock_create_client:
             # Bedrockクライアントの正常レスポンスをモック
             mock_bedrock_client = Mock()
             mock_bedrock_client.invoke_agent_runtime.return_value = {
                 "contentType": "application/json",
                 "payload": b'{"status": "success"}',
             }
-            mock_boto_client.return_value = mock_bedrock_client
+            mock_create_client.return_value = mock_bedrock_client
 
             result = lambda_handler(valid_event, mock_context)
 
@@ -236,13 +249,15 @@ class TestLambdaHandler:
         mock_context = Mock()
 
         # When - Bedrockサービスエラーが発生する環境でlambda_handler()を実行
-        with patch("boto3.client") as mock_boto_client:
+        with patch(
+            "app.trigger.lambda_function.create_agentcore_client"
+        ) as mock_create_client:
             mock_bedrock_client = Mock()
             # Bedrockサービスエラーをシミュレート
             mock_bedrock_client.invoke_agent_runtime.side_effect = Exception(
                 "Bedrock service unavailable"
             )
-            mock_boto_client.return_value = mock_bedrock_client
+            mock_create_client.return_value = mock_bedrock_client
 
             result = lambda_handler(valid_event, mock_context)
 
@@ -285,12 +300,14 @@ class TestLambdaHandler:
         mock_context = Mock()
 
         # When - lambda_handler()を実行
-        with patch("boto3.client") as mock_boto_client:
+        with patch(
+            "app.trigger.lambda_function.create_agentcore_client"
+        ) as mock_create_client:
             mock_bedrock_client = Mock()
             mock_bedrock_client.invoke_agent_runtime.return_value = {
                 "contentType": "application/json"
             }
-            mock_boto_client.return_value = mock_bedrock_client
+            mock_create_client.return_value = mock_bedrock_client
 
             lambda_handler(event_with_specific_values, mock_context)
 
@@ -351,14 +368,16 @@ class TestLambdaHandler:
 
         # When - ログをキャプチャしながらlambda_handler()を実行
         with (
-            patch("boto3.client") as mock_boto_client,
+            patch(
+                "app.trigger.lambda_function.create_agentcore_client"
+            ) as mock_create_client,
             patch("app.trigger.lambda_function.logger") as mock_logger,
         ):
             mock_bedrock_client = Mock()
             mock_bedrock_client.invoke_agent_runtime.return_value = {
                 "contentType": "application/json"
             }
-            mock_boto_client.return_value = mock_bedrock_client
+            mock_create_client.return_value = mock_bedrock_client
 
             lambda_handler(event, mock_context)
 
@@ -366,13 +385,13 @@ class TestLambdaHandler:
         # イベント受信ログの検証
         mock_logger.info.assert_any_call(f"Received event: {json.dumps(event)}")
 
-        # boto3バージョンログの検証
+        # バージョンログは呼び出しごとではなくクライアント生成時のみ（create_agentcore_client）
         version_log_calls = [
             call
             for call in mock_logger.info.call_args_list
             if "boto3 version:" in str(call)
         ]
-        assert len(version_log_calls) > 0, "boto3バージョンがログ出力されるべき"
+        assert version_log_calls == [], "boto3バージョンは呼び出しごとに出力しない"
 
         # AgentCore呼び出しログの検証
         mock_logger.info.assert_any_call(
@@ -439,13 +458,15 @@ class TestLambdaHandler:
 
         # When & Then - 各シナリオでレスポンス構造を検証
         for scenario in test_scenarios:
-            with patch("boto3.client") as mock_boto_client:
+            with patch(
+                "app.trigger.lambda_function.create_agentcore_client"
+            ) as mock_create_client:
                 if scenario["mock_bedrock"]:
                     mock_bedrock_client = Mock()
                     mock_bedrock_client.invoke_agent_runtime.return_value = {
                         "contentType": "application/json"
                     }
-                    mock_boto_client.return_value = mock_bedrock_client
+                    mock_create_client.return_value = mock_bedrock_client
 
                 result = lambda_handler(scenario["event"], Mock())  # type: ignore
 
@@ -524,12 +545,14 @@ class TestLambdaHandler:
         mock_context = Mock()
 
         # When - lambda_handler()を実行
-        with patch("boto3.client") as mock_boto_client:
+        with patch(
+            "app.trigger.lambda_function.create_agentcore_client"
+        ) as mock_create_client:
             mock_bedrock_client = Mock()
             mock_bedrock_client.invoke_agent_runtime.return_value = {
                 "contentType": "application/json"
             }
-            mock_boto_client.return_value = mock_bedrock_client
+            mock_create_client.return_value = mock_bedrock_client
 
             result = lambda_handler(mixed_type_event, mock_context)
 
@@ -554,3 +577,817 @@ class TestLambdaHandler:
         # 再度パースして確認
         reparsed_body = json.loads(result["body"])
         assert reparsed_body == body, "レスポンスは再パース可能であるべき"
+
+    def test_client_reused_across_invocations_contract(self) -> None:
+        """
+        契約による設計: クライアント再利用の不変条件検証
+
+        Given: 有効なイベント
+        When: lambda_handler()を2回実行する（ウォームスタートを模擬）
+        Then: クライアントは初回のみ生成され、2回目は再利用される
+
+        事前条件: 実行環境にキャッシュ済みクライアントが存在しない
+        事後条件: 2回とも AgentCore Runtime が呼び出される
+        不変条件: boto3.client() の呼び出しは1回のみ
+        """
+        # Given - 事前条件設定: 有効なイベント
+        valid_event: dict[str, Any] = {
+            "agentRuntimeArn": "arn:aws:bedrock-agentcore:us-east-1:123456789012:runtime/test",
+            "exam_type": "SAP",
+            "question_count": 1,
+        }
+
+        # When - lambda_handler()を2回実行
+        with (
+            patch(
+                "app.trigger.lambda_function.create_agentcore_client"
+            ) as mock_create_client,
+            patch("app.trigger.lambda_function.logger") as mock_logger,
+        ):
+            mock_bedrock_client = Mock()
+            mock_bedrock_client.invoke_agent_runtime.return_value = {
+                "contentType": "application/json"
+            }
+            mock_create_client.return_value = mock_bedrock_client
+
+            first = lambda_handler(valid_event, Mock())
+            second = lambda_handler(valid_event, Mock())
+
+        # Then - 事後条件検証: 2回とも成功
+        assert first["statusCode"] == 200
+        assert second["statusCode"] == 200
+        assert mock_bedrock_client.invoke_agent_runtime.call_count == 2
+
+        # 不変条件検証: クライアント生成は初回のみ
+        mock_create_client.assert_called_once_with()
+
+        # コールド/ウォームの計測ログ
+        client_logs = [
+            str(call)
+            for call in mock_logger.info.call_args_list
+            if "AgentCore client ready" in str(call)
+        ]
+        assert len(client_logs) == 2
+        assert "cold=True" in client_logs[0]
+        assert "cold=False" in client_logs[1]
+
+    def test_async_mode_returns_run_id_contract(self) -> None:
+        """
+        契約による設計: 非同期トリガーモードの事後条件検証
+
+        Given: mode="async" のイベント
+        When: lambda_handler()を実行する
+        Then: 202 と実行IDが返され、実行IDが runtimeSessionId としてエージェントに渡される
+
+        事前条件: mode="async"、必須パラメータが存在する
+        事後条件: statusCode が 202、body に runId が含まれる
+        不変条件: 受付レスポンスは読み取って接続を解放するが、本文は同梱しない（read_response 未指定）
+        """
+        # Given - 事前条件設定
+        event: dict[str, Any] = {
+            "agentRuntimeArn": "arn:aws:bedrock-agentcore:us-east-1:123456789012:runtime/test",
+            "exam_type": "AWS-SAP",
+            "question_count": 2,
+            "mode": "async",
+        }
+
+        # When - lambda_handler()を実行
+        with patch(
+            "app.trigger.lambda_function.create_agentcore_client"
+        ) as mock_create_client:
+            mock_bedrock_client = Mock()
+            mock_body = Mock()
+            mock_body.iter_chunks.return_value = iter(
+                [b'{"run_id": "x", "run": {"status": "accepted"}}']
+            )
+            mock_bedrock_client.invoke_agent_runtime.return_value = {
+                "contentType": "application/json",
+                "response": mock_body,
+            }
+            mock_create_client.return_value = mock_bedrock_client
+
+            result = lambda_handler(event, Mock())
+
+        # Then - 事後条件検証
+        assert result["statusCode"] == 202
+        body = json.loads(result["body"])
+        run_id = body["runId"]
+        assert len(run_id) >= 33, "runtimeSessionId は33文字以上が必要"
+        assert body["mode"] == "async"
+
+        call_kwargs = mock_bedrock_client.invoke_agent_runtime.call_args.kwargs
+        assert call_kwargs["runtimeSessionId"] == run_id
+        payload = json.loads(call_kwargs["payload"].decode("utf-8"))
+        assert payload["run_async"] is True
+        assert payload["run_id"] == run_id
+
+        # 不変条件検証: 本文は読み取って接続を解放するが、レスポンスには同梱しない
+        mock_body.close.assert_called_once()
+        assert body["outcome"] == "succeeded"
+        assert "agentResponse" not in body
+
+    def test_read_response_streams_body_contract(self) -> None:
+        """
+        契約による設計: レスポンス本文のオプトイン読み取り
+
+        Given: read_response=True のイベントと分割されたレスポンス本文
+        When: lambda_handler()を実行する
+        Then: 本文がチャンク単位で読み取られ、JSON として返される
+
+        事前条件: read_response=True
+        事後条件: body に agentResponse が含まれる
+        不変条件: 既定（sync）モードのステータスコードは 200
+        """
+        # Given - 事前条件設定
+        event: dict[str, Any] = {
+            "agentRuntimeArn": "arn:aws:bedrock-agentcore:us-east-1:123456789012:runtime/test",
+            "exam_type": "AWS-SAP",
+            "question_count": 1,
+            "read_response": True,
+        }
+
+        # When - lambda_handler()を実行
+        with patch(
+            "app.trigger.lambda_function.create_agentcore_client"
+        ) as mock_create_client:
+            mock_bedrock_client = Mock()
+            mock_body = Mock()
+            mock_body.iter_chunks.return_value = iter(
+                [b'{"questions": [{"question": ', b'"\\u554f\\u984c"}]}']
+            )
+            mock_bedrock_client.invoke_agent_runtime.return_value = {
+                "contentType": "application/json",
+                "response": mock_body,
+            }
+            mock_create_client.return_value = mock_bedrock_client
+
+            result = lambda_handler(event, Mock())
+
+        # Then - 事後条件検証
+        assert result["statusCode"] == 200
+        body = json.loads(result["body"])
+        assert body["agentResponse"] == {"questions": [{"question": "問題"}]}
+        mock_body.iter_chunks.assert_called_once()
+
+    def test_invalid_mode_precondition(self) -> None:
+        """
+        契約による設計: 不正なトリガーモードの事前条件違反
+
+        事前条件: mode が sync/async 以外
+        事後条件: 400 が返される
+        不変条件: AgentCore Runtime は呼び出されない
+        """
+        event: dict[str, Any] = {
+            "agentRuntimeArn": "arn:aws:bedrock-agentcore:us-east-1:123456789012:runtime/test",
+            "exam_type": "AWS-SAP",
+            "question_count": 1,
+            "mode": "fire",
+        }
+
+        with patch(
+            "app.trigger.lambda_function.create_agentcore_client"
+        ) as mock_create_client:
+            result = lambda_handler(event, Mock())
+
+        assert result["statusCode"] == 400
+        mock_create_client.assert_not_called()
+
+
+class LatencyStubClient:
+    """ターゲットごとの応答遅延を模擬する bedrock-agentcore クライアントのスタブ"""
+
+    def __init__(
+        self, latencies: dict[str, float], failing_arns: set[str] | None = None
+    ) -> None:
+        self.latencies = latencies
+        self.failing_arns = failing_arns or set()
+        self.calls: list[str] = []
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def invoke_agent_runtime(self, **kwargs: Any) -> dict[str, Any]:
+        arn = kwargs["agentRuntimeArn"]
+        with self._lock:
+            self.calls.append(arn)
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+        try:
+            time.sleep(self.latencies.get(arn, 0.0))
+            if arn in self.failing_arns:
+                raise RuntimeError(f"simulated failure: {arn}")
+            return {"contentType": "application/json"}
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+
+class TestMultiTargetFanOut:
+    """複数ターゲットの並行呼び出しの契約検証"""
+
+    ARN_PREFIX = "arn:aws:bedrock-agentcore:us-east-1:123456789012:runtime/"
+
+    def test_targets_invoked_concurrently_contract(self) -> None:
+        """
+        契約による設計: 複数ターゲットの並行呼び出し
+
+        Given: 遅延の異なる3ターゲットと、ターゲットごとの遅延を模擬するクライアント
+        When: lambda_handler()を実行する
+        Then: 全ターゲットの結果が入力順に返され、所要時間は遅延の合計より短い
+
+        事前条件: targets が空でないリスト
+        事後条件: statusCode 200、ターゲットごとの結果が含まれる
+        不変条件: イベント直下の値が各ターゲットの既定値になる
+        """
+        # Given - 事前条件設定
+        latencies = {
+            f"{self.ARN_PREFIX}sap": 0.3,
+            f"{self.ARN_PREFIX}dva": 0.2,
+            f"{self.ARN_PREFIX}soa": 0.1,
+        }
+        stub = LatencyStubClient(latencies)
+        event: dict[str, Any] = {
+            "question_count": 1,
+            "targets": [
+                {"agentRuntimeArn": f"{self.ARN_PREFIX}sap", "exam_type": "AWS-SAP"},
+                {"agentRuntimeArn": f"{self.ARN_PREFIX}dva", "exam_type": "AWS-DVA"},
+                {
+                    "agentRuntimeArn": f"{self.ARN_PREFIX}soa",
+                    "exam_type": "AWS-SOA",
+                    "question_count": 3,
+                },
+            ],
+        }
+
+        # When - lambda_handler()を実行
+        with patch(
+            "app.trigger.lambda_function.create_agentcore_client", return_value=stub
+        ):
+            start = time.perf_counter()
+            result = lambda_handler(event, Mock())
+            elapsed = time.perf_counter() - start
+
+        # Then - 事後条件検証
+        assert result["statusCode"] == 200
+        body = json.loads(result["body"])
+        assert body["succeeded"] == 3
+        assert body["failed"] == 0
+        assert [r["index"] for r in body["results"]] == [0, 1, 2]
+        assert [r["payload"]["exam_type"] for r in body["results"]] == [
+            "AWS-SAP",
+            "AWS-DVA",
+            "AWS-SOA",
+        ]
+
+        # 不変条件検証: 既定値とターゲット個別値
+        assert body["results"][0]["payload"]["question_count"] == 1
+        assert body["results"][2]["payload"]["question_count"] == 3
+
+        # 並行実行: 所要時間は遅延の合計（0.6秒）より短い
+        assert stub.max_in_flight == 3
+        assert elapsed < sum(latencies.values())
+
+    def test_one_target_failure_is_isolated_contract(self) -> None:
+        """
+        契約による設計: ターゲット単位の失敗の分離
+
+        Given: 1ターゲットが呼び出しに失敗し、1ターゲットは必須パラメータが欠落
+        When: lambda_handler()を実行する
+        Then: 他のターゲットは成功し、失敗ターゲットのみエラーが記録される
+
+        事前条件: 3ターゲット中2ターゲットが失敗する
+        事後条件: statusCode 207、失敗ターゲットに statusCode と error が含まれる
+        不変条件: 成功ターゲットの結果は単一ターゲット時と同じ構造
+        """
+        # Given - 事前条件設定
+        stub = LatencyStubClient(
+            {f"{self.ARN_PREFIX}ok": 0.05, f"{self.ARN_PREFIX}ng": 0.01},
+            failing_arns={f"{self.ARN_PREFIX}ng"},
+        )
+        event: dict[str, Any] = {
+            "question_count": 1,
+            "exam_type": "AWS-SAP",
+            "targets": [
+                {"agentRuntimeArn": f"{self.ARN_PREFIX}ok"},
+                {"agentRuntimeArn": f"{self.ARN_PREFIX}ng"},
+                {"exam_type": "AWS-DVA"},
+            ],
+        }
+
+        # When - lambda_handler()を実行
+        with patch(
+            "app.trigger.lambda_function.create_agentcore_client", return_value=stub
+        ):
+            result = lambda_handler(event, Mock())
+
+        # Then - 事後条件検証
+        assert result["statusCode"] == 207
+        body = json.loads(result["body"])
+        ok, ng, invalid = body["results"]
+
+        assert ok["status"] == "succeeded"
+        assert ok["statusCode"] == 200
+        assert ok["message"] == "Question generation triggered successfully"
+
+        assert ng["status"] == "failed"
+        assert ng["statusCode"] == 500
+        assert "simulated failure" in ng["error"]
+
+        assert invalid["status"] == "failed"
+        assert invalid["statusCode"] == 400
+        assert "agentRuntimeArn" in invalid["error"]
+
+        # 不変条件検証: 検証に失敗したターゲットは呼び出されない
+        assert len(stub.calls) == 2
+
+    def test_concurrency_is_bounded_contract(self) -> None:
+        """
+        契約による設計: 並行数の上限
+
+        事前条件: max_concurrency=2、5ターゲット
+        事後条件: 全ターゲットが成功する
+        不変条件: 同時実行数は2を超えない
+        """
+        # Given - 事前条件設定
+        arns = [f"{self.ARN_PREFIX}t{i}" for i in range(5)]
+        stub = LatencyStubClient(dict.fromkeys(arns, 0.05))
+        event: dict[str, Any] = {
+            "exam_type": "AWS-SAP",
+            "question_count": 1,
+            "max_concurrency": 2,
+            "targets": [{"agentRuntimeArn": arn} for arn in arns],
+        }
+
+        # When - lambda_handler()を実行
+        with patch(
+            "app.trigger.lambda_function.create_agentcore_client", return_value=stub
+        ):
+            result = lambda_handler(event, Mock())
+
+        # Then - 事後条件検証
+        assert result["statusCode"] == 200
+        assert stub.max_in_flight <= 2
+        assert len(stub.calls) == 5
+
+    def test_empty_targets_precondition(self) -> None:
+        """
+        契約による設計: 空の targets の事前条件違反
+
+        事前条件: targets が空リスト
+        事後条件: 400 が返される
+        不変条件: クライアントは生成されない
+        """
+        with patch(
+            "app.trigger.lambda_function.create_agentcore_client"
+        ) as mock_create_client:
+            result = lambda_handler({"targets": []}, Mock())
+
+        assert result["statusCode"] == 400
+        mock_create_client.assert_not_called()
+
+
+class TestRunKey:
+    """実行キー（冪等性キー）の契約検証"""
+
+    BASE_EVENT: dict[str, Any] = {
+        "agentRuntimeArn": "arn:aws:bedrock-agentcore:us-east-1:123456789012:runtime/test",
+        "exam_type": "AWS-SAP",
+        "question_count": 1,
+        "scheduled_time": "2026-10-19T00:00:00Z",
+    }
+
+    def _invoke(self, event: dict[str, Any]) -> tuple[dict[str, Any], Mock]:
+        # 呼び出しごとに別のモッククライアントを使うため、キャッシュを破棄
+        lambda_function._agentcore_client = None
+        with patch(
+            "app.trigger.lambda_function.create_agentcore_client"
+        ) as mock_create_client:
+            mock_bedrock_client = Mock()
+            mock_bedrock_client.invoke_agent_runtime.return_value = {
+                "contentType": "application/json"
+            }
+            mock_create_client.return_value = mock_bedrock_client
+            result = lambda_handler(event, Mock())
+        return result, mock_bedrock_client
+
+    def test_retry_uses_same_run_key_contract(self) -> None:
+        """
+        契約による設計: 再試行時の実行キーの決定性
+
+        Given: 同じ scheduled_time のイベントを2回処理する（再試行を模擬）
+        When: lambda_handler()を実行する
+        Then: 同じ実行キーが payload と runtimeSessionId で渡される
+
+        事前条件: scheduled_time が指定されている
+        事後条件: 実行キーは runtimeSessionId の最小長（33文字）を満たす
+        不変条件: スケジュール時刻が異なれば実行キーも異なる
+        """
+        # When
+        first, first_client = self._invoke(dict(self.BASE_EVENT))
+        second, second_client = self._invoke(dict(self.BASE_EVENT))
+        next_day, _ = self._invoke(
+            {**self.BASE_EVENT, "scheduled_time": "2026-10-20T00:00:00Z"}
+        )
+
+        # Then - 事後条件検証
+        run_key = json.loads(first["body"])["runKey"]
+        assert run_key == json.loads(second["body"])["runKey"]
+        assert len(run_key) >= 33
+
+        for client in (first_client, second_client):
+            kwargs = client.invoke_agent_runtime.call_args.kwargs
+            assert kwargs["runtimeSessionId"] == run_key
+            assert json.loads(kwargs["payload"])["run_key"] == run_key
+
+        # 不変条件検証: 異なるスケジュール時刻
+        assert json.loads(next_day["body"])["runKey"] != run_key
+
+    def test_async_mode_uses_run_key_as_run_id_contract(self) -> None:
+        """
+        契約による設計: 非同期モードでの実行IDと実行キーの一致
+
+        事前条件: mode="async"、scheduled_time が指定されている
+        事後条件: 実行IDは実行キーと同じ（エージェント側で重複実行を検出できる）
+        """
+        result, _ = self._invoke({**self.BASE_EVENT, "mode": "async"})
+
+        body = json.loads(result["body"])
+        assert body["runId"] == body["runKey"]
+
+    def test_manual_invocation_has_no_run_key_contract(self) -> None:
+        """
+        契約による設計: 手動実行（scheduled_time なし）
+
+        事前条件: scheduled_time が指定されていない
+        事後条件: 実行キーは付与されず、毎回生成される
+        """
+        event = {k: v for k, v in self.BASE_EVENT.items() if k != "scheduled_time"}
+
+        result, client = self._invoke(event)
+
+        assert "runKey" not in json.loads(result["body"])
+        kwargs = client.invoke_agent_runtime.call_args.kwargs
+        assert "runtimeSessionId" not in kwargs
+        assert "run_key" not in json.loads(kwargs["payload"])
+
+
+class TestDeadlinePropagation:
+    """呼び出し期限の受け渡しの契約検証"""
+
+    BASE_EVENT: dict[str, Any] = {
+        "agentRuntimeArn": "arn:aws:bedrock-agentcore:us-east-1:123456789012:runtime/test",
+        "exam_type": "AWS-SAP",
+        "question_count": 1,
+    }
+
+    def _invoke(self, event: dict[str, Any]) -> tuple[dict[str, Any], Mock]:
+        lambda_function._agentcore_client = None
+        with patch(
+            "app.trigger.lambda_function.create_agentcore_client"
+        ) as mock_create_client:
+            mock_bedrock_client = Mock()
+            mock_bedrock_client.invoke_agent_runtime.return_value = {
+                "contentType": "application/json"
+            }
+            mock_create_client.return_value = mock_bedrock_client
+            result = lambda_handler(event, Mock())
+        return result, mock_bedrock_client
+
+    def test_deadline_is_passed_to_agent_contract(self) -> None:
+        """
+        事前条件: deadline_seconds が指定されている
+        事後条件: ペイロードに期限が渡される
+        不変条件: 期限は read_timeout 内に収まるよう上限で切り詰められる
+        """
+        # When
+        _, client = self._invoke({**self.BASE_EVENT, "deadline_seconds": 120})
+        _, capped_client = self._invoke({**self.BASE_EVENT, "deadline_seconds": 900})
+
+        # Then
+        payload = json.loads(client.invoke_agent_runtime.call_args.kwargs["payload"])
+        assert payload["deadline_seconds"] == 120
+        capped = json.loads(
+            capped_client.invoke_agent_runtime.call_args.kwargs["payload"]
+        )
+        assert capped["deadline_seconds"] == lambda_function.MAX_AGENT_DEADLINE_SECONDS
+        assert (
+            lambda_function.MAX_AGENT_DEADLINE_SECONDS
+            < lambda_function.AGENTCORE_CLIENT_SETTINGS["read_timeout"]
+        )
+
+    def test_invalid_deadline_precondition(self) -> None:
+        """
+        事前条件: deadline_seconds が正の数値でない
+        事後条件: 400 エラーを返し、エージェントを呼び出さない
+        """
+        for invalid in (0, -5, "60", True):
+            result, client = self._invoke(
+                {**self.BASE_EVENT, "deadline_seconds": invalid}
+            )
+
+            assert result["statusCode"] == 400
+            client.invoke_agent_runtime.assert_not_called()
+
+
+class TestStreamingResponse:
+    """レスポンス本文の逐次読み取りの契約検証"""
+
+    BASE_EVENT: dict[str, Any] = {
+        "agentRuntimeArn": "arn:aws:bedrock-agentcore:us-east-1:123456789012:runtime/test",
+        "exam_type": "AWS-SAP",
+        "question_count": 1,
+    }
+
+    def _invoke(
+        self, chunks: list[bytes], event: dict[str, Any] | None = None
+    ) -> tuple[dict[str, Any], Mock, Mock]:
+        with (
+            patch(
+                "app.trigger.lambda_function.create_agentcore_client"
+            ) as mock_create_client,
+            patch("app.trigger.lambda_function.logger") as mock_logger,
+        ):
+            mock_bedrock_client = Mock()
+            mock_body = Mock()
+            mock_body.iter_chunks.return_value = iter(chunks)
+            mock_bedrock_client.invoke_agent_runtime.return_value = {
+                "contentType": "application/json",
+                "response": mock_body,
+            }
+            mock_create_client.return_value = mock_bedrock_client
+            result = lambda_handler(event or dict(self.BASE_EVENT), Mock())
+        return result, mock_body, mock_logger
+
+    def test_timing_fields_logged_for_every_run_contract(self) -> None:
+        """
+        契約による設計: 計測値の構造化ログ
+
+        Given: 複数チャンクに分割された成功レスポンス
+        When: lambda_handler()を実行する
+        Then: TTFB・合計時間・バイト数が構造化ログとレスポンスに含まれる
+
+        事前条件: レスポンス本文が JSON
+        事後条件: outcome が succeeded、bytes が本文のバイト数と一致する
+        不変条件: 本文のストリームは必ず閉じられる
+        """
+        # Given
+        chunks = [b'{"questions": ', b'[{"question": "Q"}]}']
+
+        # When
+        result, mock_body, mock_logger = self._invoke(chunks)
+
+        # Then - 事後条件検証
+        assert result["statusCode"] == 200
+        body = json.loads(result["body"])
+        assert body["outcome"] == "succeeded"
+        assert body["timing"]["bytes"] == sum(len(c) for c in chunks)
+        assert body["timing"]["ttfb_ms"] is not None
+        assert body["timing"]["total_ms"] >= body["timing"]["ttfb_ms"]
+
+        metrics_logs = [
+            json.loads(call.args[0])
+            for call in mock_logger.info.call_args_list
+            if "AgentCore invocation metrics" in str(call.args[0])
+        ]
+        assert len(metrics_logs) == 1
+        assert metrics_logs[0]["outcome"] == "succeeded"
+        assert metrics_logs[0]["bytes"] == body["timing"]["bytes"]
+        assert {"ttfb_ms", "total_ms", "invoke_ms", "cold"} <= set(metrics_logs[0])
+
+        # 不変条件検証
+        mock_body.close.assert_called_once()
+
+    def test_agent_error_is_reported_contract(self) -> None:
+        """
+        契約による設計: エージェントのエラー応答
+
+        事前条件: エージェントが {"error": ...} を返す
+        事後条件: statusCode 502、agentError にエラー内容が含まれる
+        """
+        result, _, _ = self._invoke([b'{"error": "generation failed"}'])
+
+        assert result["statusCode"] == 502
+        body = json.loads(result["body"])
+        assert body["outcome"] == "agent_error"
+        assert body["agentError"] == "generation failed"
+
+    def test_partial_result_is_reported_contract(self) -> None:
+        """
+        契約による設計: 一部の問題枠のみ生成できた応答
+
+        事前条件: エージェントが問題と failed_slots を返す
+        事後条件: statusCode 200、outcome が partial、failedSlots に失敗した問題枠が含まれる
+        """
+        chunks = [
+            b'{"questions": [{"question": "Q"}], '
+            b'"failed_slots": [{"slot": 1, "stage": "generation", "reason": "throttled"}]}'
+        ]
+
+        result, _, _ = self._invoke(chunks)
+
+        assert result["statusCode"] == 200
+        body = json.loads(result["body"])
+        assert body["outcome"] == "partial"
+        assert body["failedSlots"] == [
+            {"slot": 1, "stage": "generation", "reason": "throttled"}
+        ]
+        assert "agentError" not in body
+
+    def test_byte_limit_stops_reading_contract(self) -> None:
+        """
+        契約による設計: 読み取りバイト数の上限
+
+        事前条件: 本文が上限を超える
+        事後条件: 上限で読み取りを打ち切り outcome が truncated になる
+        不変条件: 上限を超えるチャンクは読み取らず、ストリームは閉じられる
+        """
+        chunks = [b"x" * 600, b"y" * 600, b"z" * 600]
+
+        stream = Mock()
+        consumed: list[bytes] = []
+
+        def iter_chunks(chunk_size: int) -> Any:
+            for chunk in chunks:
+                consumed.append(chunk)
+                yield chunk
+
+        stream.iter_chunks.side_effect = iter_chunks
+        read_result = lambda_function.read_agent_response(
+            {"response": stream}, started_at=time.perf_counter(), max_bytes=1000
+        )
+
+        assert read_result["outcome"] == "truncated"
+        assert read_result["truncated"] is True
+        assert read_result["bytes"] == 1000
+        assert len(consumed) == 2
+        stream.close.assert_called_once()
+
+    def test_unparseable_body_contract(self) -> None:
+        """
+        契約による設計: JSON として解析できない本文
+
+        事前条件: 本文が JSON でない
+        事後条件: outcome が unparseable、read_response 指定時は文字列で同梱される
+        """
+        result, _, _ = self._invoke(
+            [b"not json"], {**self.BASE_EVENT, "read_response": True}
+        )
+
+        body = json.loads(result["body"])
+        assert body["outcome"] == "unparseable"
+        assert body["agentResponse"] == "not json"
+
+
+class TestColdStartBudget:
+    """コールドスタート（import・クライアント生成）の契約検証"""
+
+    # 記録済みのベースライン（`python app/trigger/lambda_function.py --import-time` で計測）
+    # - 変更前（boto3 をモジュール読み込み時に import）: 約170-220ms、286モジュール
+    # - 変更後（標準ライブラリのみ）: 約23ms、15モジュール
+    RECORDED_IMPORT_MS = 25.0
+    RECORDED_MODULES = 15
+
+    # 許容幅: 実行環境による時間のばらつきは大きいため4倍まで、モジュール数は+5まで
+    IMPORT_MS_TOLERANCE = 4.0
+    MODULES_TOLERANCE = 5
+
+    def test_import_time_and_module_count_within_budget_contract(self) -> None:
+        """
+        契約による設計: コールド import の予算
+
+        Given: 新しいインタープリタ
+        When: lambda_function を import する
+        Then: import 時間と読み込みモジュール数が記録済みのベースライン内に収まる
+
+        事前条件: モジュール読み込み時に boto3/botocore を import しない
+        事後条件: 計測値がベースライン + 許容幅以下
+        不変条件: botocore はクライアント生成時まで読み込まれない
+        """
+        # When
+        measured = lambda_function.measure_import_time(runs=3)
+
+        # Then - 事後条件検証
+        assert measured["modules"] <= self.RECORDED_MODULES + self.MODULES_TOLERANCE, (
+            f"読み込みモジュール数がベースラインを超過: {measured}"
+        )
+        assert (
+            measured["import_ms"] <= self.RECORDED_IMPORT_MS * self.IMPORT_MS_TOLERANCE
+        ), f"import 時間がベースラインを超過: {measured}"
+
+    def test_client_created_with_explicit_config_contract(self) -> None:
+        """
+        契約による設計: クライアント生成時の設定
+
+        事前条件: botocore セッションをモック
+        事後条件: 問題生成時間に合わせた読み取りタイムアウトでクライアントが生成される
+        不変条件: botocore のバージョンはクライアント生成時に1回だけログ出力される
+        """
+        with (
+            patch("botocore.session.get_session") as mock_get_session,
+            patch("app.trigger.lambda_function.logger") as mock_logger,
+        ):
+            client = lambda_function.create_agentcore_client()
+
+        create_client = mock_get_session.return_value.create_client
+        create_client.assert_called_once()
+        assert create_client.call_args.args == ("bedrock-agentcore",)
+        config = create_client.call_args.kwargs["config"]
+        assert config.read_timeout == AGENTCORE_CLIENT_SETTINGS["read_timeout"]
+        assert config.read_timeout >= 290, (
+            "読み取りタイムアウトは問題生成時間に合わせるべき"
+        )
+        assert config.max_pool_connections == lambda_function.MAX_CONCURRENT_TARGETS
+        assert client is create_client.return_value
+
+        version_logs = [
+            call
+            for call in mock_logger.info.call_args_list
+            if "botocore version:" in str(call)
+        ]
+        assert len(version_logs) == 1
+
+
+class TestTracePropagation:
+    """スパンとトレースコンテキストの受け渡しの契約検証"""
+
+    BASE_EVENT: dict[str, Any] = {
+        "agentRuntimeArn": "arn:aws:bedrock-agentcore:us-east-1:123456789012:runtime/test",
+        "exam_type": "AWS-SAP",
+        "question_count": 3,
+    }
+
+    def _invoke(self, event: dict[str, Any]) -> tuple[dict[str, Any], Mock]:
+        with patch(
+            "app.trigger.lambda_function.create_agentcore_client"
+        ) as mock_create_client:
+            mock_bedrock_client = Mock()
+
+            def respond(**_: Any) -> dict[str, Any]:
+                body = Mock()
+                body.iter_chunks.return_value = iter([b'{"questions": []}'])
+                return {"contentType": "application/json", "response": body}
+
+            mock_bedrock_client.invoke_agent_runtime.side_effect = respond
+            mock_create_client.return_value = mock_bedrock_client
+            result = lambda_handler(event, Mock())
+        return result, mock_bedrock_client
+
+    def test_trace_context_is_passed_to_agent_contract(
+        self, span_exporter: Any
+    ) -> None:
+        """
+        契約による設計: Lambda からエージェントへのトレースコンテキストの受け渡し
+
+        Given: インメモリエクスポーターを設定した TracerProvider
+        When: lambda_handler()を実行する
+        Then: lambda_handler の子に agentcore.invoke スパンが記録され、
+              ペイロードの trace_context は agentcore.invoke スパンを親として指す
+        """
+        # When
+        result, client = self._invoke(self.BASE_EVENT)
+
+        # Then
+        invoke_span, handler_span = span_exporter.get_finished_spans()
+        assert handler_span.name == "lambda_handler"
+        assert handler_span.attributes["status_code"] == result["statusCode"]
+        assert invoke_span.name == "agentcore.invoke"
+        assert invoke_span.parent.span_id == handler_span.context.span_id
+        assert invoke_span.attributes["exam_type"] == "AWS-SAP"
+        assert invoke_span.attributes["question_count"] == 3
+        assert invoke_span.attributes["outcome"] == "succeeded"
+
+        payload = json.loads(client.invoke_agent_runtime.call_args.kwargs["payload"])
+        _, trace_id, span_id, _ = payload["trace_context"]["traceparent"].split("-")
+        assert trace_id == format(invoke_span.context.trace_id, "032x")
+        assert span_id == format(invoke_span.context.span_id, "016x")
+
+    def test_concurrent_targets_share_the_handler_trace_contract(
+        self, span_exporter: Any
+    ) -> None:
+        """
+        契約による設計: 複数ターゲットの並行呼び出しのスパン
+
+        Given: 2ターゲットのイベント
+        When: lambda_handler()を実行する
+        Then: 各ターゲットの agentcore.invoke スパンは（別スレッドでも）lambda_handler の子になる
+        """
+        # When
+        self._invoke({"targets": [self.BASE_EVENT, self.BASE_EVENT]})
+
+        # Then
+        spans = span_exporter.get_finished_spans()
+        handler_span = next(s for s in spans if s.name == "lambda_handler")
+        invoke_spans = [s for s in spans if s.name == "agentcore.invoke"]
+        assert len(invoke_spans) == 2
+        assert all(
+            s.parent.span_id == handler_span.context.span_id for s in invoke_spans
+        )
+
+    def test_no_trace_context_without_tracer_provider_contract(self) -> None:
+        """
+        事前条件: TracerProvider が設定されていない
+        事後条件: ペイロードに trace_context は含まれない
+        """
+        _, client = self._invoke(self.BASE_EVENT)
+        payload = json.loads(client.invoke_agent_runtime.call_args.kwargs["payload"])
+        assert "trace_context" not in payload